@@ -0,0 +1,138 @@
+"""
+Checkpoint serializer cost: bytes and dumps/loads time per channel value for
+the default LangGraph serializer vs `CompactSerializer`, on state shaped like a
+long-running thread (messages with tool calls, eight full docs, a pending
+change set). Every value is round-tripped and compared before timing.
+
+Run from backend/src:
+
+    python ../benchmarks/bench_checkpoint_serde.py [--turns 200] [--doc-kb 16] [--repeat 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import uuid
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage  # noqa: E402
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer  # noqa: E402
+
+from app.agents.state.empty_docs import empty_docs  # noqa: E402
+from app.db.checkpoint_serde import CompactSerializer  # noqa: E402
+from app.diff.engine import compute_diff  # noqa: E402
+
+
+def _doc_body(doc_id: str, kb: int) -> str:
+    line = f"{doc_id}: assumptions, evidence, risks and next steps for the idea.\n"
+    return line * max(1, (kb * 1024) // len(line))
+
+
+def _messages(turns: int) -> list:
+    messages: list = [SystemMessage(content="You are the maestro of a product team.")]
+    for turn in range(turns):
+        call_id = f"call_{turn}"
+        messages.append(HumanMessage(content=f"Turn {turn}: tighten the pricing section.", id=str(uuid.uuid4())))
+        messages.append(
+            AIMessage(
+                content="",
+                id=str(uuid.uuid4()),
+                name="business_lead",
+                tool_calls=[{"id": call_id, "name": "read_docs", "args": {"doc_ids": ["product_brief"]}}],
+                usage_metadata={"input_tokens": 1800, "output_tokens": 40, "total_tokens": 1840},
+            )
+        )
+        messages.append(
+            ToolMessage(
+                content="Pricing: freemium with a team tier. " * 40,
+                tool_call_id=call_id,
+                name="read_docs",
+                id=str(uuid.uuid4()),
+            )
+        )
+        messages.append(
+            AIMessage(
+                content=f"Proposed a tiered pricing experiment for turn {turn}. " * 6,
+                id=str(uuid.uuid4()),
+                name="business_lead",
+                response_metadata={"model_name": "gpt-4.1-mini", "finish_reason": "stop"},
+            )
+        )
+    return messages
+
+
+def _values(turns: int, doc_kb: int) -> dict[str, object]:
+    docs = {
+        doc_id: {**doc, "content": _doc_body(doc_id, doc_kb), "version": 3}
+        for doc_id, doc in empty_docs.items()
+    }
+    old = docs["product_brief"]["content"]
+    new = old + "Added: pricing experiment.\n"
+    return {
+        "messages": _messages(turns),
+        "docs": docs,
+        "pending_change_set": {
+            "change_set_id": str(uuid.uuid4()),
+            "created_by": "business_lead",
+            "summary": "pricing",
+            "edits": [{"doc_id": "product_brief", "new_content": new}],
+            "diffs": {"product_brief": compute_diff(old, new).text},
+            "status": "pending",
+        },
+        "next_agent": "business_lead",
+    }
+
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = perf_counter()
+        fn()
+        samples.append(perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200, help="Human/AI/tool exchanges in the thread")
+    parser.add_argument("--doc-kb", type=int, default=16, help="Size of each of the eight docs")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    serializers = {
+        "default": JsonPlusSerializer(),
+        "compact-l1": CompactSerializer(level=1),
+        "compact-l3": CompactSerializer(level=3),
+    }
+    values = _values(args.turns, args.doc_kb)
+
+    print(f"{'channel':<20} {'serializer':<11} {'type':>13} {'KiB':>9} {'dumps ms':>9} {'loads ms':>9}")
+    totals: dict[str, list[float]] = {name: [0, 0.0, 0.0] for name in serializers}
+    for channel, value in values.items():
+        for name, serde in serializers.items():
+            type_, data = serde.dumps_typed(value)
+            if serde.loads_typed((type_, data)) != value:
+                raise SystemExit(f"{name} did not round-trip {channel}")
+            dumps_ms = _time(lambda: serde.dumps_typed(value), args.repeat) * 1000
+            loads_ms = _time(lambda: serde.loads_typed((type_, data)), args.repeat) * 1000
+            totals[name][0] += len(data)
+            totals[name][1] += dumps_ms
+            totals[name][2] += loads_ms
+            print(f"{channel:<20} {name:<11} {type_:>13} {len(data) / 1024:>9.1f} {dumps_ms:>9.2f} {loads_ms:>9.2f}")
+
+    print()
+    baseline = totals["default"][0]
+    for name, (size, dumps_ms, loads_ms) in totals.items():
+        print(
+            f"{name:<11} {size / 1024:>9.1f} KiB ({size / baseline:>6.1%})  "
+            f"dumps {dumps_ms:>7.2f} ms  loads {loads_ms:>7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
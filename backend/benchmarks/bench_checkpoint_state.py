@@ -0,0 +1,146 @@
+"""
+Checkpoint bytes written per run with STATE_DOC_MODE=inline vs ref.
+
+Replays the state traffic of a delegate -> specialist -> change set -> apply run
+(no model calls) through a graph with the production state schema and an
+in-memory checkpointer using the default serializer, then totals the bytes of
+every blob and pending write it stored.
+
+Run from backend/src:
+
+    python ../benchmarks/bench_checkpoint_state.py [--doc-kb 16] [--runs 5] [--agent-steps 4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+from langgraph.checkpoint.memory import InMemorySaver  # noqa: E402
+from langgraph.graph import END, START, StateGraph  # noqa: E402
+
+from app.agents.state import doc_refs  # noqa: E402
+from app.agents.state.doc_refs import load_docs, to_change_set_edits, to_state_docs  # noqa: E402
+from app.agents.state.empty_docs import empty_docs  # noqa: E402
+from app.agents.state.get_initial_state_update import get_initial_state_update  # noqa: E402
+from app.agents.state.types import AgentState  # noqa: E402
+from app.diff.engine import compute_diff  # noqa: E402
+
+
+def _doc_body(doc_id: str, kb: int, revision: int) -> str:
+    line = f"{doc_id} r{revision}: assumptions, evidence, risks and next steps for the idea.\n"
+    return line * max(1, (kb * 1024) // len(line))
+
+
+def _build_graph(agent_steps: int, checkpointer: InMemorySaver):
+    def agent_step(state: AgentState) -> dict:
+        return {"messages": [AIMessage(content="Thinking about the product brief.")]}
+
+    def build_changeset(state: AgentState) -> dict:
+        doc_id = "product_brief"
+        old = load_docs(state, [doc_id])[doc_id]["content"]
+        new = old + "Added: pricing experiment.\n"
+        edits = [{"doc_id": doc_id, "new_content": new}]
+        diff = compute_diff(old, new).text
+        return {
+            "pending_change_set": {
+                "change_set_id": str(uuid.uuid4()),
+                "created_by": "business_lead",
+                "created_at": "",
+                "summary": "pricing",
+                "edits": to_change_set_edits(edits, thread_id=state["thread_id"], run_id=state["run_id"]),
+                "diffs": {} if doc_refs.use_doc_refs() else {doc_id: diff},
+                "status": "pending",
+            }
+        }
+
+    def apply_changeset(state: AgentState) -> dict:
+        cs = state["pending_change_set"]
+        doc_id = cs["edits"][0]["doc_id"]
+        doc = dict(load_docs(state, [doc_id])[doc_id])
+        doc["content"] += "Added: pricing experiment.\n"
+        doc["version"] += 1
+        updates = to_state_docs({doc_id: doc}, thread_id=state["thread_id"], run_id=state["run_id"])
+        return {"docs": updates, "pending_change_set": None}
+
+    sub = StateGraph(AgentState)
+    previous = START
+    for step in range(agent_steps):
+        name = f"agent_{step}"
+        sub.add_node(name, agent_step)
+        sub.add_edge(previous, name)
+        previous = name
+    sub.add_node("build_changeset", build_changeset)
+    sub.add_node("apply_changeset", apply_changeset)
+    sub.add_edge(previous, "build_changeset")
+    sub.add_edge("build_changeset", "apply_changeset")
+    sub.add_edge("apply_changeset", END)
+
+    def maestro(state: AgentState) -> dict:
+        return {"next_agent": "business_lead", "messages": [AIMessage(content="Delegating.")]}
+
+    parent = StateGraph(AgentState)
+    parent.add_node("maestro", maestro)
+    parent.add_node("business_lead", sub.compile())
+    parent.add_edge(START, "maestro")
+    parent.add_edge("maestro", "business_lead")
+    parent.add_edge("business_lead", END)
+    return parent.compile(checkpointer=checkpointer)
+
+
+def _stored_bytes(saver: InMemorySaver) -> int:
+    total = sum(len(blob) for _, blob in saver.blobs.values())
+    for writes in saver.writes.values():
+        total += sum(len(value[1]) for _, _, value, _ in writes.values())
+    for namespaces in saver.storage.values():
+        for checkpoints in namespaces.values():
+            for checkpoint, metadata, _ in checkpoints.values():
+                total += len(checkpoint[1]) + len(metadata[1])
+    return total
+
+
+def measure(mode: str, *, doc_kb: int, runs: int, agent_steps: int) -> int:
+    doc_refs.STATE_DOC_MODE = mode
+    saver = InMemorySaver()
+    graph = _build_graph(agent_steps, saver)
+    thread_id = str(uuid.uuid4())
+    docs = {
+        doc_id: {**doc, "content": _doc_body(doc_id, doc_kb, 0)}
+        for doc_id, doc in empty_docs.items()
+    }
+    for _ in range(runs):
+        run_id = str(uuid.uuid4())
+        state = get_initial_state_update(
+            thread_id=thread_id,
+            run_id=run_id,
+            user_messages=[HumanMessage(content="Refine the pricing section.")],
+            docs=to_state_docs(docs, thread_id=thread_id, run_id=run_id),
+        )
+        result = graph.invoke(state, {"configurable": {"thread_id": thread_id}})
+        docs = load_docs(result)
+    return _stored_bytes(saver)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doc-kb", type=int, default=16, help="Size of each of the eight docs")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--agent-steps", type=int, default=4)
+    args = parser.parse_args()
+
+    results = {
+        mode: measure(mode, doc_kb=args.doc_kb, runs=args.runs, agent_steps=args.agent_steps)
+        for mode in ("inline", "ref")
+    }
+    for mode, total in results.items():
+        print(f"{mode:<7} {total / 1024:>10.1f} KiB total  {total / args.runs / 1024:>9.1f} KiB/run")
+    print(f"reduction: {1 - results['ref'] / results['inline']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
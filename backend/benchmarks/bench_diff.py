@@ -0,0 +1,101 @@
+"""
+Compare the change-set diff engine against difflib on 10k-line documents.
+
+Run from backend/src:
+
+    python ../benchmarks/bench_diff.py [--lines 10000] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import difflib
+import random
+import statistics
+import sys
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from app.diff.engine import compute_diff  # noqa: E402
+
+
+def _paragraph_line(rng: random.Random) -> str:
+    words = ["market", "pricing", "user", "growth", "risk", "churn", "MVP", "channel", "cost", "team"]
+    return " ".join(rng.choice(words) for _ in range(rng.randint(4, 12))) + "\n"
+
+
+def _doc(rng: random.Random, lines: int) -> list[str]:
+    out = []
+    for i in range(lines):
+        if i % 25 == 0:
+            out.append(f"## Section {i // 25}\n")
+        elif i % 5 == 0:
+            out.append("\n")
+        else:
+            out.append(_paragraph_line(rng))
+    return out
+
+
+def _scenarios(lines: int) -> dict[str, tuple[str, str]]:
+    rng = random.Random(42)
+    base = _doc(rng, lines)
+
+    scattered = list(base)
+    for index in rng.sample(range(lines), lines // 100):
+        scattered[index] = _paragraph_line(rng)
+
+    moved = base[lines // 2 :] + base[: lines // 2]
+
+    # Every non-structural line rewritten: the quadratic case for difflib.
+    rewritten = [line if line.startswith("##") or line == "\n" else _paragraph_line(rng) for line in base]
+
+    return {
+        "scattered_edits_1pct": ("".join(base), "".join(scattered)),
+        "halves_swapped": ("".join(base), "".join(moved)),
+        "full_rewrite": ("".join(base), "".join(rewritten)),
+        "replace_all": ("".join(base), "".join(_doc(random.Random(7), lines))),
+    }
+
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = perf_counter()
+        fn()
+        samples.append(perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=0.5, help="Engine time budget in seconds")
+    parser.add_argument("--skip-difflib", action="store_true")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<24} {'engine s':>9} {'+/-':>13} {'exact':>6} {'difflib s':>10} {'+/-':>13}")
+    for name, (old, new) in _scenarios(args.lines).items():
+        result = compute_diff(old, new, time_budget_seconds=args.budget)
+        engine_seconds = _time(lambda: compute_diff(old, new, time_budget_seconds=args.budget), args.repeat)
+        engine_counts = f"{result.lines_added}/{result.lines_removed}"
+
+        difflib_seconds = difflib_counts = "-"
+        if not args.skip_difflib:
+            old_lines, new_lines = old.splitlines(keepends=True), new.splitlines(keepends=True)
+            text = "".join(difflib.unified_diff(old_lines, new_lines))
+            added = sum(1 for line in text.splitlines() if line.startswith("+") and not line.startswith("+++"))
+            removed = sum(1 for line in text.splitlines() if line.startswith("-") and not line.startswith("---"))
+            difflib_counts = f"{added}/{removed}"
+            difflib_seconds = f"{_time(lambda: ''.join(difflib.unified_diff(old_lines, new_lines)), args.repeat):.3f}"
+
+        print(
+            f"{name:<24} {engine_seconds:>9.3f} {engine_counts:>13} {str(result.exact):>6} "
+            f"{difflib_seconds:>10} {difflib_counts:>13}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,432 @@
+"""
+End-to-end load test of the real workflow behind the FastAPI app.
+
+Starts uvicorn as a subprocess with `CHAT_MODEL_FACTORY=fake_llm:build_fake_chat_model`
+(see fake_llm.py), so `build_workflow()` runs unchanged against a deterministic
+local model, then drives concurrent users through HTTP:
+
+- `independent`: every user has its own thread and runs chat -> approve flows;
+- `same-thread`: every user posts to one shared thread (runs queue per thread);
+  fails if two of its runs overlapped (server `emitted_at` of each run's
+  `run.started` and final event);
+- `consult`: every user asks for a multi-perspective review, so maestro consults
+  all specialists in parallel (compare MAX_PARALLEL_CONSULTATIONS=1 vs 4);
+- `parallel`: maestro delegates to two specialists at once; each stages its own
+  change set, approved one at a time by interrupt id.
+
+Reports throughput, time-to-first-event, time-to-first-delta, p50/p99 run
+latency, `read_docs` round trips per chat run with the speculative context
+prefetch's outcomes (compare with `--no-prefetch`), LLM input tokens per run
+and the share served from the (simulated) prompt cache, maestro decisions per
+model of the routing cascade (compare `--routing-models gpt-5.2`), DB round trips per run (profiled repository and checkpoint calls from
+/metrics, plus Postgres transactions from pg_stat_database) and server memory
+per open thread event stream.
+
+Point it at a disposable Postgres; migrations run on server startup. Run from
+backend/src:
+
+    python ../benchmarks/bench_e2e.py --database-url postgresql://... \\
+        [--scenario independent] [--users 8] [--flows 3] [--ttft-ms 50] [--chunk-ms 5] [--streams 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+
+import httpx
+import psycopg
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCHMARKS_DIR.parent / "src"
+
+TERMINAL_EVENTS = {"run.completed", "run.error", "run.cancelled"}
+SCENARIO_ASKS = {
+    "independent": "tighten the pricing and positioning",
+    "consult": "pressure-test it from every angle",
+    "parallel": "update the launch and technical plans in parallel",
+}
+
+
+@dataclass
+class RunResult:
+    kind: str
+    status: str
+    latency: float
+    first_event: float | None
+    first_delta: float | None
+    events: int
+    doc_reads: int = 0  # read_docs tool round trips
+    approvals: list[str] = field(default_factory=list)  # interrupt ids still waiting
+    # Server clock (`emitted_at`) of `run.started` and of the final event.
+    ran_from: datetime | None = None
+    ran_to: datetime | None = None
+
+
+@dataclass
+class Stats:
+    results: list[RunResult] = field(default_factory=list)
+    failures: list[str] = field(default_factory=list)
+
+    def of(self, kind: str) -> list[RunResult]:
+        return [result for result in self.results if result.kind == kind]
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+async def _consume_run(client: httpx.AsyncClient, events_url: str, *, kind: str, started: float) -> RunResult:
+    first_event = first_delta = None
+    events = 0
+    doc_reads = 0
+    status = "incomplete"
+    event_type = None
+    approvals: list[str] = []
+    ran_from = ran_to = None
+    async with client.stream("GET", events_url) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event_type = line[len("event: ") :]
+                continue
+            if not line.startswith("data: ") or event_type is None or event_type == "keepalive":
+                continue
+            events += 1
+            now = perf_counter()
+            if first_event is None:
+                first_event = now - started
+            if first_delta is None and event_type == "message.delta":
+                first_delta = now - started
+            if event_type == "tool.result" and json.loads(line[len("data: ") :]).get("tool_name") == "read_docs":
+                doc_reads += 1
+            if event_type == "approval.required":
+                approvals.append(json.loads(line[len("data: ") :]).get("interrupt_id"))
+            if event_type == "run.started" or event_type in TERMINAL_EVENTS:
+                emitted_at = json.loads(line[len("data: ") :]).get("emitted_at")
+                if emitted_at and event_type == "run.started":
+                    ran_from = datetime.fromisoformat(emitted_at)
+                elif emitted_at:
+                    ran_to = datetime.fromisoformat(emitted_at)
+            if event_type in TERMINAL_EVENTS:
+                status = json.loads(line[len("data: ") :]).get("status", "error")
+                break
+    return RunResult(
+        kind=kind,
+        status=status,
+        latency=perf_counter() - started,
+        first_event=first_event,
+        first_delta=first_delta,
+        events=events,
+        doc_reads=doc_reads,
+        approvals=approvals,
+        ran_from=ran_from,
+        ran_to=ran_to,
+    )
+
+
+async def _start_run(client: httpx.AsyncClient, path: str, body: dict, *, kind: str) -> RunResult:
+    started = perf_counter()
+    response = await client.post(path, json=body)
+    response.raise_for_status()
+    return await _consume_run(client, response.json()["events_url"], kind=kind, started=started)
+
+
+async def _user(
+    client: httpx.AsyncClient,
+    stats: Stats,
+    *,
+    thread_id: str,
+    user: int,
+    flows: int,
+    approve: bool,
+    ask: str = "tighten the pricing and positioning",
+) -> None:
+    for flow in range(flows):
+        try:
+            chat = await _start_run(
+                client,
+                f"/api/chat/{thread_id}",
+                {"message": f"User {user} idea {flow}: {ask}."},
+                kind="chat",
+            )
+            stats.results.append(chat)
+            pending = chat.approvals if approve and chat.status == "waiting_approval" else []
+            while pending:
+                approval = await _start_run(
+                    client,
+                    f"/api/chat/{thread_id}/approval",
+                    {"decision": "approve", "interrupt_id": pending[0]},
+                    kind="approval",
+                )
+                stats.results.append(approval)
+                pending = approval.approvals if approval.status == "waiting_approval" else []
+        except Exception as exc:  # keep the load going; failures are reported at the end
+            stats.failures.append(f"{type(exc).__name__}: {exc}")
+
+
+async def _hold_streams(client: httpx.AsyncClient, count: int, pid: int) -> tuple[int, float]:
+    """Open `count` thread event streams, wait for their ready frames, return (streams, RSS delta KiB)."""
+    before = _rss_kib(pid)
+    ready = 0
+    release = asyncio.Event()
+
+    async def hold(thread_id: str) -> None:
+        nonlocal ready
+        async with client.stream("GET", f"/api/threads/{thread_id}/events") as response:
+            async for line in response.aiter_lines():
+                if line.startswith("event: ready"):
+                    ready += 1
+                    break
+            await release.wait()
+
+    tasks = [asyncio.create_task(hold(str(uuid.uuid4()))) for _ in range(count)]
+    deadline = perf_counter() + 30
+    while ready < count and perf_counter() < deadline:
+        await asyncio.sleep(0.1)
+    await asyncio.sleep(0.5)
+    after = _rss_kib(pid)
+    release.set()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return ready, after - before
+
+
+def _rss_kib(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return float(line.split()[1])
+    return 0.0
+
+
+def _span_counts(metrics_text: str) -> dict[str, float]:
+    counts: dict[str, float] = {}
+    for match in re.finditer(r'^run_span_duration_seconds_count\{kind="([^"]+)",[^}]*\} (\S+)$', metrics_text, re.M):
+        counts[match.group(1)] = counts.get(match.group(1), 0.0) + float(match.group(2))
+    return counts
+
+
+def _prefetch_counts(metrics_text: str) -> dict[str, float]:
+    return {
+        match.group(1): float(match.group(2))
+        for match in re.finditer(r'^context_prefetch_total\{outcome="([^"]+)"\} (\S+)$', metrics_text, re.M)
+    }
+
+
+def _token_counts(metrics_text: str) -> dict[str, float]:
+    counts: dict[str, float] = {}
+    for match in re.finditer(r'^llm_tokens_total\{direction="([^"]+)",[^}]*\} (\S+)$', metrics_text, re.M):
+        counts[match.group(1)] = counts.get(match.group(1), 0.0) + float(match.group(2))
+    return counts
+
+
+def _routing_counts(metrics_text: str) -> dict[str, float]:
+    counts = {
+        f"decided by {match.group(1)}": float(match.group(2))
+        for match in re.finditer(r'^maestro_routing_decisions_total\{model="([^"]+)"\} (\S+)$', metrics_text, re.M)
+    }
+    for match in re.finditer(r'^maestro_routing_escalations_total\{[^}]*\} (\S+)$', metrics_text, re.M):
+        counts["escalated"] = counts.get("escalated", 0.0) + float(match.group(1))
+    return counts
+
+
+def _pg_transactions(database_url: str) -> int:
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        conn.execute("SELECT pg_stat_clear_snapshot()")
+        row = conn.execute(
+            "SELECT xact_commit + xact_rollback FROM pg_stat_database WHERE datname = current_database()"
+        ).fetchone()
+    return int(row[0])
+
+
+def _start_server(args: argparse.Namespace) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": args.database_url,
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "unused"),
+        "CHAT_MODEL_FACTORY": "fake_llm:build_fake_chat_model",
+        "FAKE_LLM_TTFT_MS": str(args.ttft_ms),
+        "FAKE_LLM_FAST_TTFT_MS": str(args.fast_ttft_ms),
+        "ROUTING_MODELS": args.routing_models,
+        "FAKE_LLM_CHUNK_MS": str(args.chunk_ms),
+        "FAKE_LLM_DOC_KB": str(args.doc_kb),
+        "SPECULATIVE_PREFETCH": "0" if args.no_prefetch else "1",
+        "PYTHONPATH": os.pathsep.join([str(SRC_DIR), str(BENCHMARKS_DIR), os.environ.get("PYTHONPATH", "")]),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=SRC_DIR,
+        env=env,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit("server exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{args.port}/health", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("server did not become healthy")
+
+
+def _overlapping_runs(runs: list[RunResult]) -> list[tuple[RunResult, RunResult]]:
+    """Pairs of consecutive runs (by start) where the second started before the first ended."""
+    timed = sorted((run for run in runs if run.ran_from and run.ran_to), key=lambda run: run.ran_from)
+    return [(first, second) for first, second in zip(timed, timed[1:]) if second.ran_from < first.ran_to]
+
+
+def _ms(value: float | None) -> str:
+    return "-" if value is None else f"{value * 1000:.0f}"
+
+
+async def _main(args: argparse.Namespace, server: subprocess.Popen) -> None:
+    base_url = f"http://127.0.0.1:{args.port}"
+    limits = httpx.Limits(max_connections=args.users * 2 + args.streams + 10)
+    async with httpx.AsyncClient(base_url=base_url, timeout=httpx.Timeout(120), limits=limits) as client:
+        # Warm-up: first graph build, connections, caches.
+        await _user(client, Stats(), thread_id=str(uuid.uuid4()), user=0, flows=1, approve=True)
+
+        metrics_before = (await client.get("/metrics")).text
+        spans_before = _span_counts(metrics_before)
+        prefetch_before = _prefetch_counts(metrics_before)
+        tokens_before = _token_counts(metrics_before)
+        routing_before = _routing_counts(metrics_before)
+        transactions_before = _pg_transactions(args.database_url)
+
+        stats = Stats()
+        shared_thread = str(uuid.uuid4())
+        same_thread = args.scenario == "same-thread"
+        started = perf_counter()
+        await asyncio.gather(
+            *(
+                _user(
+                    client,
+                    stats,
+                    thread_id=shared_thread if same_thread else str(uuid.uuid4()),
+                    user=user,
+                    flows=args.flows,
+                    # Approvals on a shared thread would resume each other's interrupts.
+                    approve=not same_thread,
+                    ask=SCENARIO_ASKS.get(args.scenario, SCENARIO_ASKS["independent"]),
+                )
+                for user in range(args.users)
+            )
+        )
+        elapsed = perf_counter() - started
+
+        await asyncio.sleep(1.0)  # let backends flush their stats
+        metrics_after = (await client.get("/metrics")).text
+        spans_after = _span_counts(metrics_after)
+        prefetch_after = _prefetch_counts(metrics_after)
+        tokens_after = _token_counts(metrics_after)
+        routing_after = _routing_counts(metrics_after)
+        transactions = _pg_transactions(args.database_url) - transactions_before
+
+        streams, rss_delta = await _hold_streams(client, args.streams, server.pid) if args.streams else (0, 0.0)
+
+    runs = stats.results
+    errors = [result for result in runs if result.status not in {"completed", "waiting_approval"}]
+    print(
+        f"scenario {args.scenario}: {args.users} users x {args.flows} flows, "
+        f"fake LLM ttft {args.ttft_ms:g} ms, chunk {args.chunk_ms:g} ms"
+    )
+    print(
+        f"runs: {len(runs)} ({len(stats.of('chat'))} chat, {len(stats.of('approval'))} approval) in {elapsed:.2f} s "
+        f"-> {len(runs) / elapsed:.2f} runs/s; errors {len(errors)}, request failures {len(stats.failures)}"
+    )
+    print(f"{'':<24} {'p50 ms':>8} {'p99 ms':>8}")
+    rows = [
+        ("time to first event", [r.first_event for r in runs if r.first_event is not None]),
+        ("time to first delta", [r.first_delta for r in runs if r.first_delta is not None]),
+        ("chat run latency", [r.latency for r in stats.of("chat")]),
+        ("approval run latency", [r.latency for r in stats.of("approval")]),
+    ]
+    for label, values in rows:
+        print(f"{label:<24} {_ms(_percentile(values, 50)):>8} {_ms(_percentile(values, 99)):>8}")
+
+    chat_runs = stats.of("chat")
+    if chat_runs:
+        prefetches = {
+            outcome: prefetch_after.get(outcome, 0) - prefetch_before.get(outcome, 0)
+            for outcome in ("hit", "miss", "wasted")
+        }
+        print(
+            f"read_docs round trips per chat run: {sum(r.doc_reads for r in chat_runs) / len(chat_runs):.2f}; "
+            f"context prefetch hit {prefetches['hit']:.0f}, miss {prefetches['miss']:.0f}, "
+            f"wasted {prefetches['wasted']:.0f}"
+        )
+    if runs:
+        tokens = {key: tokens_after.get(key, 0) - tokens_before.get(key, 0) for key in ("input", "cached_input")}
+        cached_share = tokens["cached_input"] / tokens["input"] * 100 if tokens["input"] else 0.0
+        print(
+            f"LLM input tokens per run: {tokens['input'] / len(runs):.0f}, "
+            f"{cached_share:.1f}% from the prompt cache"
+        )
+        routing = {key: value - routing_before.get(key, 0) for key, value in sorted(routing_after.items())}
+        print(f"maestro routing ({args.routing_models}): " + ", ".join(f"{key} {value:.0f}" for key, value in routing.items()))
+        per_run = {kind: (spans_after.get(kind, 0) - spans_before.get(kind, 0)) / len(runs) for kind in ("db", "checkpoint")}
+        print(
+            f"DB round trips per run: repository {per_run['db']:.1f}, checkpoint {per_run['checkpoint']:.1f}, "
+            f"postgres transactions {transactions / len(runs):.1f}"
+        )
+    if streams:
+        print(f"server memory per open thread stream: {rss_delta / streams:.1f} KiB ({streams} streams)")
+    for failure in stats.failures[:5]:
+        print(f"failure: {failure}")
+    if same_thread:
+        # The per-thread lock and FIFO queue must keep one graph execution per thread.
+        untimed = sum(run.ran_from is None or run.ran_to is None for run in runs)
+        overlaps = _overlapping_runs(runs)
+        print(f"same-thread runs overlapping: {len(overlaps)} ({untimed} runs without start/end events)")
+        if overlaps or untimed:
+            for first, second in overlaps[:5]:
+                print(f"overlap: run ending {first.ran_to.isoformat()} and run starting {second.ran_from.isoformat()}")
+            raise SystemExit("runs on the shared thread overlapped or could not be timed")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL"), required="BENCH_DATABASE_URL" not in os.environ)
+    parser.add_argument("--scenario", choices=["independent", "same-thread", "consult", "parallel"], default="independent")
+    parser.add_argument("--users", type=int, default=8, help="Concurrent simulated users")
+    parser.add_argument("--flows", type=int, default=3, help="Chat (+ approval) flows per user")
+    parser.add_argument("--ttft-ms", type=float, default=50)
+    parser.add_argument("--chunk-ms", type=float, default=5)
+    parser.add_argument("--fast-ttft-ms", type=float, default=20, help="Time to first chunk of small (-mini, -nano) models")
+    parser.add_argument("--routing-models", default="gpt-5-mini,gpt-5.2", help="Maestro's model cascade, cheapest first")
+    parser.add_argument("--doc-kb", type=float, default=4, help="Size of the doc each specialist stages")
+    parser.add_argument("--streams", type=int, default=200, help="Idle thread streams opened for the memory probe (0 skips)")
+    parser.add_argument("--no-prefetch", action="store_true", help="Disable the speculative context prefetch")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = _start_server(args)
+    try:
+        asyncio.run(_main(args, server))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
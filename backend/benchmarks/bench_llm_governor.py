@@ -0,0 +1,183 @@
+"""
+Model calls under a load spike, with and without the LLM governor, against a
+local stub provider (stub_llm_server.py) that answers 429 beyond --provider-rpm.
+
+Load, for --seconds:
+- `background`: --background-workers closed loops calling back to back, like
+  specialist tool loops across many open chats (a failed or rejected call backs
+  off --backoff-ms before the next);
+- `interactive`: one call every --interactive-every-ms, like first maestro turns
+  and approval resumes.
+
+Policies:
+- `ungoverned`: ChatOpenAI straight to the provider (client retries included);
+- `governed`: the same client behind `get_chat_model`'s wrapper, admitted by
+  the governor at --governor-rpm (a little under the provider's limit).
+
+Reports per priority: calls, completed, failed (provider errors after retries),
+rejected by the governor (and how fast), p50/p95 latency to the first chunk of
+completed calls, and the 429s the provider sent. Nothing else is needed (no
+Postgres, no API key).
+
+Run from backend/src:
+
+    python ../benchmarks/bench_llm_governor.py [--seconds 20] [--provider-rpm 600] [--governor-rpm 570] \\
+        [--background-workers 32] [--interactive-every-ms 500]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from time import perf_counter
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+MODEL = "stub-model"
+PROMPT = [("user", "Give me a one-line launch tip.")]
+
+
+def _start_stub(port: int, *args: str) -> subprocess.Popen:
+    stub = subprocess.Popen([sys.executable, str(BENCHMARKS_DIR / "stub_llm_server.py"), "--port", str(port), *args])
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/stats", timeout=1)
+            return stub
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    stub.terminate()
+    raise SystemExit(f"stub on port {port} did not start")
+
+
+def _percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def _ms(value: float | None) -> str:
+    return "-" if value is None else f"{value * 1000:.0f}"
+
+
+def _result(model, priority: str) -> tuple[str, float]:
+    """("ok" | "failed" | "rejected", seconds to the first chunk or to the failure)."""
+    from langchain_core.runnables import RunnableLambda
+
+    from app.agents.llm_governor import LLMOverloadedError
+
+    def consume(_):
+        started = perf_counter()
+        try:
+            first_chunk = None
+            for _ in model.stream(PROMPT):
+                if first_chunk is None:
+                    first_chunk = perf_counter() - started
+            return "ok", first_chunk if first_chunk is not None else perf_counter() - started
+        except LLMOverloadedError:
+            return "rejected", perf_counter() - started
+        except Exception:
+            return "failed", perf_counter() - started
+
+    # The governor reads the priority from the run config, as inside the graph.
+    return RunnableLambda(consume).invoke(None, {"configurable": {"llm_priority": priority}})
+
+
+def _run(model, args: argparse.Namespace) -> dict[str, list[tuple[str, float]]]:
+    results: dict[str, list[tuple[str, float]]] = {"interactive": [], "background": []}
+    deadline = time.monotonic() + args.seconds
+
+    def background() -> None:
+        while time.monotonic() < deadline:
+            outcome = _result(model, "background")
+            results["background"].append(outcome)
+            if outcome[0] != "ok":
+                time.sleep(args.backoff_ms / 1000)
+
+    def interactive() -> None:
+        results["interactive"].append(_result(model, "interactive"))
+
+    threads = [threading.Thread(target=background) for _ in range(args.background_workers)]
+    for thread in threads:
+        thread.start()
+    while time.monotonic() < deadline:
+        thread = threading.Thread(target=interactive)
+        thread.start()
+        threads.append(thread)
+        time.sleep(args.interactive_every_ms / 1000)
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--provider-rpm", type=float, default=600)
+    parser.add_argument("--governor-rpm", type=float, default=570)
+    parser.add_argument("--max-wait", type=float, default=2.0, help="LLM_GOVERNOR_MAX_WAIT_SECONDS")
+    parser.add_argument("--background-workers", type=int, default=32)
+    parser.add_argument("--interactive-every-ms", type=float, default=500)
+    parser.add_argument("--backoff-ms", type=float, default=500)
+    parser.add_argument("--ttft-ms", type=float, default=200)
+    parser.add_argument("--port", type=int, default=9103)
+    args = parser.parse_args()
+
+    # Read by app.config on import.
+    # A burst of one second's worth stays inside the stub's own (two seconds').
+    os.environ["LLM_RATE_LIMITS"] = json.dumps({MODEL: {"rpm": args.governor_rpm, "burst": args.governor_rpm / 60}})
+    os.environ["LLM_GOVERNOR_MAX_WAIT_SECONDS"] = str(args.max_wait)
+    os.environ["LLM_HEDGING"] = "0"
+
+    from langchain_openai import ChatOpenAI
+
+    from app.agents.resilient_chat_model import Candidate, ResilientChatModel
+
+    stub = _start_stub(args.port, "--ttft-ms", str(args.ttft_ms), "--rpm-limit", str(args.provider_rpm))
+    client = ChatOpenAI(model=MODEL, base_url=f"http://127.0.0.1:{args.port}/v1", api_key="stub")
+    policies = {
+        "ungoverned": client,
+        "governed": ResilientChatModel(candidates=[Candidate("stub", MODEL, client)]),
+    }
+    try:
+        print(
+            f"{args.seconds:g}s: {args.background_workers} background loops + 1 interactive call every "
+            f"{args.interactive_every_ms:g} ms; provider limit {args.provider_rpm:g} rpm, governor "
+            f"{args.governor_rpm:g} rpm, max wait {args.max_wait:g}s"
+        )
+        print(
+            f"{'policy':<11} {'priority':<12} {'calls':>6} {'ok':>6} {'failed':>7} {'rejected':>9} "
+            f"{'reject p95':>11} {'ttft p50':>9} {'p95':>7}"
+        )
+        for name, model in policies.items():
+            before = httpx.get(f"http://127.0.0.1:{args.port}/stats").json().get("rate_limited", 0)
+            results = _run(model, args)
+            limited = httpx.get(f"http://127.0.0.1:{args.port}/stats").json().get("rate_limited", 0) - before
+            for priority, outcomes in results.items():
+                ok = [seconds for outcome, seconds in outcomes if outcome == "ok"]
+                rejected = [seconds for outcome, seconds in outcomes if outcome == "rejected"]
+                failed = sum(outcome == "failed" for outcome, _ in outcomes)
+                print(
+                    f"{name:<11} {priority:<12} {len(outcomes):>6} {len(ok):>6} {failed:>7} {len(rejected):>9} "
+                    f"{_ms(_percentile(rejected, 95)):>11} {_ms(_percentile(ok, 50)):>9} "
+                    f"{_ms(_percentile(ok, 95)):>7}"
+                )
+            print(f"{name:<11} 429s from the provider: {limited}")
+            time.sleep(2)  # let the provider's bucket refill
+    finally:
+        stub.terminate()
+        stub.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Model call latency and errors with and without the resilience layer, against
+two local stub providers (stub_llm_server.py): a primary with injected slow
+responses and errors, and a healthy backup.
+
+Policies:
+- `direct`: ChatOpenAI on the primary, as before (client retries included);
+- `hedged`: ResilientChatModel on the primary only (hedging, breaker);
+- `hedged+failover`: ResilientChatModel on the primary, failing over to the backup.
+
+Phases:
+- `tail`: the primary answers in --ttft-ms, except --slow-share of requests that
+  wait --slow-ms and --error-share that fail;
+- `outage`: every primary request fails; the breaker should stop sending them.
+
+Reports p50/p95/p99 time to first chunk and to the full answer, failed calls,
+and requests the primary and backup received per call. Nothing else is needed
+(no Postgres, no API key).
+
+Run from backend/src:
+
+    python ../benchmarks/bench_llm_resilience.py [--calls 200] [--concurrency 8] [--slow-share 0.05] [--slow-ms 10000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import perf_counter
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from langchain_openai import ChatOpenAI  # noqa: E402
+
+from app.agents.resilient_chat_model import Candidate, ResilientChatModel  # noqa: E402
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+MODEL = "stub-model"
+PROMPT = [("user", "Give me a one-line launch tip.")]
+
+
+def _start_stub(port: int, *args: str) -> subprocess.Popen:
+    stub = subprocess.Popen([sys.executable, str(BENCHMARKS_DIR / "stub_llm_server.py"), "--port", str(port), *args])
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/stats", timeout=1)
+            return stub
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    stub.terminate()
+    raise SystemExit(f"stub on port {port} did not start")
+
+
+def _client(port: int, **kwargs) -> ChatOpenAI:
+    return ChatOpenAI(model=MODEL, base_url=f"http://127.0.0.1:{port}/v1", api_key="stub", **kwargs)
+
+
+def _models(policy: str, phase: str, primary: int, backup: int):
+    # Provider labels are unique per run so breakers and latency history start fresh.
+    if policy == "direct":
+        return _client(primary)
+    if policy == "hedged":
+        return ResilientChatModel(candidates=[Candidate(f"primary/{policy}/{phase}", MODEL, _client(primary))])
+    return ResilientChatModel(
+        candidates=[
+            Candidate(f"primary/{policy}/{phase}", MODEL, _client(primary, max_retries=0)),
+            Candidate(f"backup/{policy}/{phase}", MODEL, _client(backup, max_retries=0)),
+        ]
+    )
+
+
+def _call(model) -> tuple[float | None, float, bool]:
+    started = perf_counter()
+    first_chunk = None
+    try:
+        for _ in model.stream(PROMPT):
+            if first_chunk is None:
+                first_chunk = perf_counter() - started
+        return first_chunk, perf_counter() - started, True
+    except Exception:
+        return first_chunk, perf_counter() - started, False
+
+
+def _percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def _ms(value: float | None) -> str:
+    return "-" if value is None else f"{value * 1000:.0f}"
+
+
+def _requests(port: int) -> int:
+    return sum(httpx.get(f"http://127.0.0.1:{port}/stats").json().values())
+
+
+def _control(port: int, **settings) -> None:
+    httpx.post(f"http://127.0.0.1:{port}/control", json=settings)
+
+
+def _run(model, calls: int, concurrency: int) -> list[tuple[float | None, float, bool]]:
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(lambda _: _call(model), range(calls)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--ttft-ms", type=float, default=150)
+    parser.add_argument("--slow-share", type=float, default=0.05)
+    parser.add_argument("--slow-ms", type=float, default=10000)
+    parser.add_argument("--error-share", type=float, default=0.02)
+    parser.add_argument("--warmup", type=int, default=40, help="Healthy calls first, to learn the hedge delay")
+    parser.add_argument("--ports", default="9101,9102")
+    args = parser.parse_args()
+
+    primary, backup = (int(port) for port in args.ports.split(","))
+    stubs = [
+        _start_stub(primary, "--ttft-ms", str(args.ttft_ms)),
+        _start_stub(backup, "--ttft-ms", str(args.ttft_ms * 1.5)),
+    ]
+    try:
+        print(
+            f"{args.calls} calls x {args.concurrency} concurrent; primary ttft {args.ttft_ms:g} ms, "
+            f"{args.slow_share:.0%} slow ({args.slow_ms:g} ms), {args.error_share:.0%} errors; "
+            f"backup ttft {args.ttft_ms * 1.5:g} ms"
+        )
+        print(
+            f"{'phase':<8} {'policy':<16} {'ttft p50':>9} {'p95':>7} {'p99':>7} {'total p50':>10} {'p99':>7} "
+            f"{'failed':>7} {'primary/call':>13} {'backup/call':>12}"
+        )
+        for phase in ("tail", "outage"):
+            for policy in ("direct", "hedged", "hedged+failover"):
+                model = _models(policy, phase, primary, backup)
+                _control(primary, slow_share=0, error_share=0)
+                _run(model, args.warmup, args.concurrency)
+                if phase == "tail":
+                    _control(primary, slow_share=args.slow_share, error_share=args.error_share)
+                else:
+                    _control(primary, slow_share=0, error_share=1)
+                before = _requests(primary), _requests(backup)
+                results = _run(model, args.calls, args.concurrency)
+                sent = _requests(primary) - before[0], _requests(backup) - before[1]
+
+                ttfts = [ttft for ttft, _, ok in results if ok and ttft is not None]
+                totals = [total for _, total, ok in results if ok]
+                failed = sum(not ok for _, _, ok in results)
+                print(
+                    f"{phase:<8} {policy:<16} {_ms(_percentile(ttfts, 50)):>9} {_ms(_percentile(ttfts, 95)):>7} "
+                    f"{_ms(_percentile(ttfts, 99)):>7} {_ms(_percentile(totals, 50)):>10} "
+                    f"{_ms(_percentile(totals, 99)):>7} {failed:>7} {sent[0] / args.calls:>13.2f} "
+                    f"{sent[1] / args.calls:>12.2f}"
+                )
+    finally:
+        for stub in stubs:
+            stub.terminate()
+            stub.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
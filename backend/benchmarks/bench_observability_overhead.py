@@ -0,0 +1,121 @@
+"""
+Overhead of run profiling.
+
+1. Per-call cost of a `@timed` repository function with profiling off (no run
+   profile active) and on.
+2. Wall time of a small agent/tool graph driven by a fake chat model, with and
+   without the span callback handler. Nodes sleep `--node-ms` to stand in for
+   real LLM/DB latency.
+
+Spans are kept in memory; nothing is written to Postgres.
+
+Run from backend/src:
+
+    python ../benchmarks/bench_observability_overhead.py [--calls 200000] [--runs 50] [--node-ms 2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel  # noqa: E402
+from langchain_core.messages import AIMessage  # noqa: E402
+from langchain_core.tools import tool  # noqa: E402
+from langgraph.graph import END, START, MessagesState, StateGraph  # noqa: E402
+from langgraph.prebuilt import ToolNode  # noqa: E402
+
+from app.observability import spans  # noqa: E402
+
+
+def _per_call_ns(fn, calls: int) -> float:
+    started = perf_counter()
+    for _ in range(calls):
+        fn()
+    return (perf_counter() - started) / calls * 1e9
+
+
+def _build_graph(node_ms: float):
+    @tool
+    def search_web(query: str) -> str:
+        """Search the web."""
+        time.sleep(node_ms / 1000)
+        return "result"
+
+    def responses():
+        while True:
+            yield AIMessage(
+                content="",
+                tool_calls=[{"id": "call_1", "name": "search_web", "args": {"query": "pricing"}}],
+                usage_metadata={"input_tokens": 1200, "output_tokens": 20, "total_tokens": 1220},
+            )
+            yield AIMessage(content="Done.", usage_metadata={"input_tokens": 1300, "output_tokens": 5, "total_tokens": 1305})
+
+    model = GenericFakeChatModel(messages=responses())
+
+    def agent(state: MessagesState) -> dict:
+        time.sleep(node_ms / 1000)
+        return {"messages": [model.invoke(state["messages"])]}
+
+    def route(state: MessagesState) -> str:
+        return "tools" if state["messages"][-1].tool_calls else END
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("agent", agent)
+    graph.add_node("tools", ToolNode([search_web]))
+    graph.add_edge(START, "agent")
+    graph.add_conditional_edges("agent", route, ["tools", END])
+    graph.add_edge("tools", "agent")
+    return graph.compile()
+
+
+def _run_seconds(graph, runs: int, *, profiled: bool) -> float:
+    samples = []
+    for _ in range(runs):
+        profile = spans.RunProfile(run_id="bench", thread_id="bench", max_spans=10_000)
+        token = spans._current_profile.set(profile) if profiled else None
+        started = perf_counter()
+        graph.invoke({"messages": [("user", "hi")]}, {"callbacks": spans.profiling_callbacks()})
+        samples.append(perf_counter() - started)
+        if token is not None:
+            spans._current_profile.reset(token)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--node-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    def plain() -> None:
+        pass
+
+    decorated = spans.timed("db")(plain)
+
+    baseline = _per_call_ns(plain, args.calls)
+    off = _per_call_ns(decorated, args.calls)
+    token = spans._current_profile.set(spans.RunProfile(run_id="bench", thread_id="bench", max_spans=0))
+    on = _per_call_ns(decorated, args.calls)
+    spans._current_profile.reset(token)
+    print(f"@timed call: plain {baseline:.0f} ns, profiling off {off:.0f} ns, profiling on {on:.0f} ns")
+
+    graph = _build_graph(args.node_ms)
+    _run_seconds(graph, 3, profiled=True)
+    without = _run_seconds(graph, args.runs, profiled=False)
+    with_spans = _run_seconds(graph, args.runs, profiled=True)
+    print(
+        f"graph run (median of {args.runs}): without spans {without * 1000:.2f} ms, "
+        f"with spans {with_spans * 1000:.2f} ms ({with_spans / without - 1:+.2%})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Prompt cache reuse of a specialist's model calls, static-first layout vs the
+previous one (doc summaries and prefetched docs inside the system prompt).
+
+Replays one thread in which the same specialist is delegated to on every turn:
+it stages an edit to its doc (which is applied before the next turn, so the
+prefetched context changes), then answers. Each model call's prompt goes
+through the layout under test and then the simulated provider cache from
+fake_llm.py (prefixes of 1024+ tokens, in 128-token steps). No model, network
+or database is involved.
+
+Run from backend/src:
+
+    python ../benchmarks/bench_prompt_cache.py [--turns 8] [--doc-kb 4] [--agent "Growth Lead"]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from langchain.agents.middleware.types import ModelRequest  # noqa: E402
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage  # noqa: E402
+
+from app.agents.defintions.maestro import subagents_by_name  # noqa: E402
+from app.agents.helpers.context_prefetch import release_run_prefetches  # noqa: E402
+from app.agents.state.empty_docs import empty_docs  # noqa: E402
+from fake_llm import prompt_cache_usage  # noqa: E402
+
+
+def _doc_body(doc_id: str, kb: float, revision: int) -> str:
+    line = f"{doc_id} r{revision}: assumptions, evidence, risks and next steps for the idea.\n"
+    return line * max(1, int(kb * 1024) // len(line))
+
+
+def _previous_layout(subagent, request: ModelRequest) -> list:
+    return [SystemMessage(content=f"{subagent.system_prompt}\n\n{subagent.build_context_prompt(request)}"), *request.messages]
+
+
+def _current_layout(subagent, request: ModelRequest) -> list:
+    captured: list = []
+
+    def handler(final_request: ModelRequest):
+        captured.extend([final_request.system_message, *final_request.messages])
+        return AIMessage(content="")
+
+    subagent.build_prompt_middleware().wrap_model_call(request, handler)
+    return captured
+
+
+def _replay(subagent, layout, *, turns: int, doc_kb: float, cache_key: str) -> tuple[int, int]:
+    doc_id = subagent.focus_docs[0]
+    docs = {key: dict(doc) for key, doc in empty_docs.items()}
+    thread_id = str(uuid.uuid4())
+    history: list = []
+    input_tokens = cached_tokens = 0
+    for turn in range(turns):
+        run_id = str(uuid.uuid4())
+        state = {
+            "thread_id": thread_id,
+            "run_id": run_id,
+            "docs": docs,
+            "docs_summary": {key: doc["description"] for key, doc in docs.items()},
+        }
+        history += [
+            HumanMessage(content=f"Turn {turn}: sharpen the {doc_id} for the next launch."),
+            AIMessage(content=f"Handing this to the {subagent.name}."),
+        ]
+        new_content = _doc_body(doc_id, doc_kb, turn + 1)
+        call_id = f"call_{turn}"
+        steps = [
+            AIMessage(
+                content="Staging the revised document.",
+                tool_calls=[{"id": call_id, "name": "stage_edits", "args": {"edits": [{"doc_id": doc_id, "new_content": new_content}]}}],
+            ),
+            ToolMessage(content="Edits staged.", tool_call_id=call_id, name="stage_edits"),
+            AIMessage(content="I have drafted an update for your review."),
+        ]
+        # Model calls: before staging, then after the tool result.
+        for messages in (list(history), history + steps[:2]):
+            request = ModelRequest(model=None, messages=messages, state=state)
+            usage = prompt_cache_usage(cache_key, layout(subagent, request))
+            input_tokens += usage["input_tokens"]
+            cached_tokens += usage["input_token_details"]["cache_read"]
+        history += steps
+        release_run_prefetches(run_id)
+
+        # The change set is approved and applied before the next turn.
+        docs = {**docs, doc_id: {**docs[doc_id], "content": new_content, "version": docs[doc_id]["version"] + 1}}
+    return input_tokens, cached_tokens
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--doc-kb", type=float, default=4)
+    parser.add_argument("--agent", default="Growth Lead")
+    args = parser.parse_args()
+
+    subagent = subagents_by_name[args.agent]
+    print(f"{args.agent}: {args.turns} turns, {args.doc_kb:g} KB doc, 2 model calls per turn")
+    print(f"{'layout':<16} {'input tokens':>13} {'cached':>9} {'cached %':>9} {'uncached':>9}")
+    for name, layout in (("previous", _previous_layout), ("static-first", _current_layout)):
+        input_tokens, cached = _replay(subagent, layout, turns=args.turns, doc_kb=args.doc_kb, cache_key=name)
+        print(
+            f"{name:<16} {input_tokens:>13} {cached:>9} {cached / input_tokens * 100:>8.1f}% "
+            f"{input_tokens - cached:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
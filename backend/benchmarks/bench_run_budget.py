@@ -0,0 +1,206 @@
+"""
+Run budgets against the real workflow behind the FastAPI app, with a slow fake
+model (see fake_llm.py) and concurrent users.
+
+Every chat asks to pressure-test the idea "from every angle", so maestro
+consults all four specialists; with MAX_PARALLEL_CONSULTATIONS=--parallel (1 by
+default) they take turns, and a run lasts several times --deadline unless its
+budget cuts it short. Starts uvicorn like bench_e2e.py once per policy:
+
+- `unbudgeted`: RUN_BUDGET_SECONDS, RUN_BUDGET_TOKENS and RUN_BUDGET_TOOL_CALLS
+  set to 0, so only RUN_MAX_ITERATIONS bounds a run;
+- `budgeted`: RUN_BUDGET_SECONDS=--deadline and RUN_BUDGET_TOKENS=--tokens
+  (tool calls unlimited), with RUN_BUDGET_MIN_TURN_SECONDS=--min-turn and
+  RUN_BUDGET_MIN_CALL_SECONDS=--min-call.
+
+--users users each run --flows chats on fresh threads at once. Reports per
+policy: p50/p99/max run latency (`run.started` to the run's last event), runs
+that ended after the deadline, runs an agent stopped on their budget (a
+`budget.usage` event with `exhausted` set), consultations answered, and final
+statuses. The fake model enforces each request's timeout and `max_tokens`
+(refusing one above FAKE_LLM_MAX_OUTPUT_TOKENS, like a provider), so a call in
+flight at the deadline fails instead of overshooting it. Maestro answers a
+failed model call by ending the run, so the bench exits with an error when a run
+got no consultation answered without stopping on its budget (e.g. a `max_tokens`
+the model refuses).
+
+Point it at a disposable Postgres; run from backend/src:
+
+    python ../benchmarks/bench_run_budget.py --database-url postgresql://... [--users 4] [--flows 2] [--deadline 6] \\
+        [--tokens 500000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from time import perf_counter
+
+import httpx
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCHMARKS_DIR.parent / "src"
+
+TERMINAL_EVENTS = {"run.completed", "run.error", "run.cancelled"}
+ASK = "pressure-test it from every angle"
+
+
+def _start_server(args: argparse.Namespace, budget_env: dict[str, str]) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": args.database_url,
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "unused"),
+        "CHAT_MODEL_FACTORY": "fake_llm:build_fake_chat_model",
+        "FAKE_LLM_TTFT_MS": str(args.ttft_ms),
+        "FAKE_LLM_FAST_TTFT_MS": str(args.ttft_ms),
+        "FAKE_LLM_CHUNK_MS": str(args.chunk_ms),
+        "MAX_PARALLEL_CONSULTATIONS": str(args.parallel),
+        **budget_env,
+        "PYTHONPATH": os.pathsep.join([str(SRC_DIR), str(BENCHMARKS_DIR), os.environ.get("PYTHONPATH", "")]),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=SRC_DIR,
+        env=env,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit("server exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{args.port}/health", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("server did not become healthy")
+
+
+def _events(response: httpx.Response):
+    """(event type, payload) for every non-keepalive SSE event."""
+    event_type = None
+    for line in response.iter_lines():
+        if line.startswith("event: "):
+            event_type = line[len("event: ") :]
+        elif line.startswith("data: ") and event_type and event_type != "keepalive":
+            yield event_type, json.loads(line[len("data: ") :])
+
+
+def _chat(client: httpx.Client) -> dict:
+    started = client.post(f"/api/chat/{uuid.uuid4()}", json={"message": ASK})
+    started.raise_for_status()
+    result = {"latency": None, "status": "incomplete", "stopped_on": None, "consultations": 0}
+    with client.stream("GET", started.json()["events_url"], timeout=300) as response:
+        run_started = None
+        for event_type, payload in _events(response):
+            if event_type == "run.started":
+                run_started = perf_counter()
+            elif event_type == "budget.usage" and payload.get("exhausted"):
+                result["stopped_on"] = result["stopped_on"] or payload["exhausted"]
+            elif event_type == "consultation.completed" and payload.get("status") == "ok":
+                result["consultations"] += 1
+            elif event_type in TERMINAL_EVENTS:
+                if run_started is not None:
+                    result["latency"] = perf_counter() - run_started
+                result["status"] = payload.get("status", "error")
+                break
+    return result
+
+
+def _run_policy(args: argparse.Namespace) -> list[dict]:
+    results: list[dict] = []
+    lock = threading.Lock()
+
+    def user() -> None:
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.port}", timeout=30) as client:
+            for _ in range(args.flows):
+                result = _chat(client)
+                with lock:
+                    results.append(result)
+
+    threads = [threading.Thread(target=user) for _ in range(args.users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def _percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def _s(value: float | None) -> str:
+    return "-" if value is None else f"{value:.2f}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL"), required="BENCH_DATABASE_URL" not in os.environ)
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--flows", type=int, default=2, help="Chats per user")
+    parser.add_argument("--deadline", type=float, default=6.0, help="RUN_BUDGET_SECONDS for `budgeted`")
+    parser.add_argument("--tokens", type=int, default=500_000, help="RUN_BUDGET_TOKENS for `budgeted`")
+    parser.add_argument("--min-turn", type=float, default=2.0, help="RUN_BUDGET_MIN_TURN_SECONDS")
+    parser.add_argument("--min-call", type=float, default=1.0, help="RUN_BUDGET_MIN_CALL_SECONDS")
+    parser.add_argument("--parallel", type=int, default=1, help="MAX_PARALLEL_CONSULTATIONS")
+    parser.add_argument("--ttft-ms", type=float, default=800)
+    parser.add_argument("--chunk-ms", type=float, default=20)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    policies = {
+        "unbudgeted": {"RUN_BUDGET_SECONDS": "0", "RUN_BUDGET_TOKENS": "0", "RUN_BUDGET_TOOL_CALLS": "0"},
+        "budgeted": {
+            "RUN_BUDGET_SECONDS": str(args.deadline),
+            "RUN_BUDGET_TOKENS": str(args.tokens),
+            "RUN_BUDGET_TOOL_CALLS": "0",
+            "RUN_BUDGET_MIN_TURN_SECONDS": str(args.min_turn),
+            "RUN_BUDGET_MIN_CALL_SECONDS": str(args.min_call),
+        },
+    }
+    print(
+        f"{args.users} users x {args.flows} consult chats; ttft {args.ttft_ms:g} ms, chunks every "
+        f"{args.chunk_ms:g} ms, {args.parallel} consultation(s) at a time; deadline {args.deadline:g}s, "
+        f"{args.tokens} tokens"
+    )
+    print(
+        f"{'policy':<11} {'runs':>5} {'p50 s':>7} {'p99 s':>7} {'max s':>7} {'over deadline':>14} "
+        f"{'budget stops':>13} {'consultations':>14} {'statuses':<30}"
+    )
+    unanswered: dict[str, int] = {}
+    for name, budget_env in policies.items():
+        server = _start_server(args, budget_env)
+        try:
+            results = _run_policy(args)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+        latencies = [result["latency"] for result in results if result["latency"] is not None]
+        over = sum(latency > args.deadline for latency in latencies)
+        stopped = sum(result["stopped_on"] is not None for result in results)
+        statuses = {status: sum(r["status"] == status for r in results) for status in {r["status"] for r in results}}
+        print(
+            f"{name:<11} {len(results):>5} {_s(_percentile(latencies, 50)):>7} {_s(_percentile(latencies, 99)):>7} "
+            f"{_s(max(latencies, default=None)):>7} {over / max(1, len(latencies)):>13.0%} "
+            f"{stopped / max(1, len(results)):>12.0%} {sum(r['consultations'] for r in results):>14} "
+            f"{json.dumps(statuses):<30}"
+        )
+        unanswered[name] = sum(r["consultations"] == 0 and r["stopped_on"] is None for r in results)
+    if any(unanswered.values()):
+        raise SystemExit(f"runs with no consultation answered and no budget stop: {json.dumps(unanswered)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Run cancellation against the real workflow behind the FastAPI app, with a slow
+fake model (see fake_llm.py; large staged docs streamed in slow chunks).
+
+Starts uvicorn like bench_e2e.py, with RUN_CANCEL_ON_DISCONNECT on, then for
+--runs chats on fresh threads:
+
+- `request`: follows the run's events and, --cancel-delay-ms after the first
+  `message.delta`, calls `POST /api/runs/{run_id}/cancel`;
+- `disconnect`: drops the event stream at the same point and waits for the
+  run to be cancelled after RUN_CANCEL_ON_DISCONNECT_GRACE_SECONDS.
+
+Reports per scenario: p50/max time from the cancel (or disconnect grace
+expiry) to the run being cancelled, `message.delta` events the client still
+received after the cancel was acknowledged, model chunks streamed after the
+run reported cancelled (`fake_llm_chunks_total` over --settle-ms: at most the
+one chunk each in-flight model request was already producing), the final
+`runs.status`, and whether a follow-up chat on the same thread then runs to
+the approval step (i.e. the checkpoint was left usable). A dropped stream is
+only noticed at its next frame or keepalive, so `disconnect` also includes up
+to a heartbeat interval.
+
+Point it at a disposable Postgres; run from backend/src:
+
+    python ../benchmarks/bench_run_cancel.py --database-url postgresql://... [--runs 5] [--cancel-delay-ms 1500]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+from time import perf_counter
+
+import httpx
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCHMARKS_DIR.parent / "src"
+
+TERMINAL_EVENTS = {"run.completed", "run.error", "run.cancelled"}
+ASK = "tighten the pricing and positioning"
+
+
+def _start_server(args: argparse.Namespace) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": args.database_url,
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "unused"),
+        "CHAT_MODEL_FACTORY": "fake_llm:build_fake_chat_model",
+        "FAKE_LLM_TTFT_MS": str(args.ttft_ms),
+        "FAKE_LLM_CHUNK_MS": str(args.chunk_ms),
+        "FAKE_LLM_DOC_KB": str(args.doc_kb),
+        "RUN_CANCEL_ON_DISCONNECT": "1",
+        "RUN_CANCEL_ON_DISCONNECT_GRACE_SECONDS": str(args.disconnect_grace),
+        "PYTHONPATH": os.pathsep.join([str(SRC_DIR), str(BENCHMARKS_DIR), os.environ.get("PYTHONPATH", "")]),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=SRC_DIR,
+        env=env,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit("server exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{args.port}/health", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("server did not become healthy")
+
+
+def _model_chunks(client: httpx.Client) -> float:
+    metrics = client.get("/metrics").text
+    return sum(float(value) for value in re.findall(r"^fake_llm_chunks_total\{[^}]*\} (\S+)$", metrics, re.M))
+
+
+def _events(response: httpx.Response):
+    """(event type, payload) for every non-keepalive SSE event."""
+    event_type = None
+    for line in response.iter_lines():
+        if line.startswith("event: "):
+            event_type = line[len("event: ") :]
+        elif line.startswith("data: ") and event_type and event_type != "keepalive":
+            yield event_type, json.loads(line[len("data: ") :])
+
+
+def _wait_status(client: httpx.Client, run_id: str, timeout: float) -> str:
+    deadline = time.monotonic() + timeout
+    status = "unknown"
+    while time.monotonic() < deadline:
+        status = client.get(f"/api/runs/{run_id}").json()["run"]["status"]
+        if status not in ("queued", "running"):
+            break
+        time.sleep(0.05)
+    return status
+
+
+def _follow_up(client: httpx.Client, thread_id: str) -> str:
+    """Status of a second chat on the thread once it ends."""
+    started = client.post(f"/api/chat/{thread_id}", json={"message": ASK})
+    started.raise_for_status()
+    with client.stream("GET", started.json()["events_url"], timeout=120) as response:
+        for event_type, payload in _events(response):
+            if event_type in TERMINAL_EVENTS:
+                return payload.get("status", "error")
+    return "incomplete"
+
+
+def _cancel_run(client: httpx.Client, args: argparse.Namespace, scenario: str) -> dict:
+    thread_id = str(uuid.uuid4())
+    started = client.post(f"/api/chat/{thread_id}", json={"message": ASK})
+    started.raise_for_status()
+    run_id = started.json()["run_id"]
+
+    result = {"deltas_after_ack": 0, "latency": None, "status": None}
+    with client.stream("GET", started.json()["events_url"], timeout=120) as response:
+        first_delta = acked_at = None
+        for event_type, payload in _events(response):
+            if first_delta is None and event_type == "message.delta":
+                first_delta = perf_counter()
+            if acked_at is not None:
+                if event_type == "run.cancelled":
+                    result["latency"] = perf_counter() - acked_at
+                    break
+                if event_type in TERMINAL_EVENTS:
+                    break
+                result["deltas_after_ack"] += event_type == "message.delta"
+                continue
+            if event_type in TERMINAL_EVENTS:
+                break  # finished before the cancel point
+            if first_delta is not None and perf_counter() - first_delta >= args.cancel_delay_ms / 1000:
+                if scenario == "disconnect":
+                    break
+                requested = perf_counter()
+                ack = client.post(f"/api/runs/{run_id}/cancel")
+                if ack.status_code != 202:
+                    break
+                acked_at = requested
+
+    if scenario == "disconnect":
+        # Cancelled once the grace period ends; time what it takes after that.
+        left = perf_counter()
+        result["status"] = _wait_status(client, run_id, args.disconnect_grace + 30)
+        result["latency"] = perf_counter() - left - args.disconnect_grace
+    else:
+        result["status"] = _wait_status(client, run_id, 30)
+
+    before = _model_chunks(client)
+    time.sleep(args.settle_ms / 1000)
+    result["chunks_after"] = _model_chunks(client) - before
+    result["follow_up"] = _follow_up(client, thread_id)
+    return result
+
+
+def _ms(value: float | None) -> str:
+    return "-" if value is None else f"{value * 1000:.0f}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL"), required="BENCH_DATABASE_URL" not in os.environ)
+    parser.add_argument("--runs", type=int, default=5, help="Cancelled runs per scenario")
+    parser.add_argument("--cancel-delay-ms", type=float, default=1500, help="Cancel this long after the first delta")
+    parser.add_argument("--ttft-ms", type=float, default=300)
+    parser.add_argument("--chunk-ms", type=float, default=40)
+    parser.add_argument("--doc-kb", type=float, default=32, help="Size of the doc each specialist stages")
+    parser.add_argument("--disconnect-grace", type=float, default=1.0, help="RUN_CANCEL_ON_DISCONNECT_GRACE_SECONDS")
+    parser.add_argument("--settle-ms", type=float, default=1000, help="Window to count model chunks after cancelling")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = _start_server(args)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.port}", timeout=30) as client:
+            print(
+                f"{args.runs} runs per scenario; ttft {args.ttft_ms:g} ms, chunks every {args.chunk_ms:g} ms, "
+                f"{args.doc_kb:g} KB docs; cancel {args.cancel_delay_ms:g} ms after the first delta"
+            )
+            print(
+                f"{'scenario':<11} {'cancel p50':>11} {'max':>6} {'deltas after ack':>17} "
+                f"{'chunks after':>13} {'statuses':<20} {'follow-up':<20}"
+            )
+            for scenario in ("request", "disconnect"):
+                results = [_cancel_run(client, args, scenario) for _ in range(args.runs)]
+                latencies = sorted(result["latency"] for result in results if result["latency"] is not None)
+                statuses = {status: sum(r["status"] == status for r in results) for status in {r["status"] for r in results}}
+                follow_ups = {
+                    status: sum(r["follow_up"] == status for r in results) for status in {r["follow_up"] for r in results}
+                }
+                print(
+                    f"{scenario:<11} {_ms(latencies[len(latencies) // 2] if latencies else None):>11} "
+                    f"{_ms(latencies[-1] if latencies else None):>6} "
+                    f"{sum(r['deltas_after_ack'] for r in results):>17} "
+                    f"{sum(r['chunks_after'] for r in results):>13.0f} "
+                    f"{json.dumps(statuses):<20} {json.dumps(follow_ups):<20}"
+                )
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
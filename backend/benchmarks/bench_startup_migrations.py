@@ -0,0 +1,119 @@
+"""
+Concurrent worker boot against a fresh database.
+
+Creates a throwaway database, then starts N processes at the same instant, each
+running the startup schema steps of a worker (`run_migrations` and
+`ensure_checkpoint_schema`), as uvicorn/gunicorn workers of a new deployment
+would. Checks that every worker succeeds and every migration is recorded once,
+then boots N workers again against the now current schema (the fast path).
+Reports per-worker wall time, lock wait and what each worker applied.
+
+The admin URL needs permission to CREATE/DROP DATABASE. Run from backend/src:
+
+    python ../benchmarks/bench_startup_migrations.py --database-url postgresql://... [--workers 8]
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import sys
+import uuid
+from pathlib import Path
+from time import perf_counter
+from urllib.parse import urlparse, urlunparse
+
+import psycopg
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+
+def _boot_worker(database_url: str, barrier, results) -> None:
+    os.environ["DATABASE_URL"] = database_url
+    sys.path.insert(0, str(SRC_DIR))
+    from app.db.checkpoint import ensure_checkpoint_schema
+    from app.db.migrations import run_migrations
+
+    barrier.wait()
+    started = perf_counter()
+    try:
+        report = run_migrations()
+        ensure_checkpoint_schema()
+    except Exception as exc:
+        results.put({"error": f"{type(exc).__name__}: {exc}"})
+        return
+    results.put(
+        {
+            "total_ms": (perf_counter() - started) * 1000,
+            "migrations_ms": report.total_ms,
+            "lock_wait_ms": report.lock_wait_ms,
+            "applied": len(report.applied),
+            "up_to_date": report.up_to_date,
+        }
+    )
+
+
+def _boot(database_url: str, workers: int) -> list[dict]:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [context.Process(target=_boot_worker, args=(database_url, barrier, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    outcomes = [results.get(timeout=120) for _ in processes]
+    for process in processes:
+        process.join()
+    return outcomes
+
+
+def _report(label: str, outcomes: list[dict]) -> None:
+    errors = [outcome["error"] for outcome in outcomes if "error" in outcome]
+    ok = sorted((outcome for outcome in outcomes if "error" not in outcome), key=lambda outcome: outcome["total_ms"])
+    print(f"\n{label}: {len(ok)}/{len(outcomes)} workers ok")
+    print(f"{'worker':>6} {'total ms':>9} {'migrations ms':>14} {'lock wait ms':>13} {'applied':>8} {'fast path':>10}")
+    for index, outcome in enumerate(ok):
+        print(
+            f"{index:>6} {outcome['total_ms']:>9.1f} {outcome['migrations_ms']:>14.1f} "
+            f"{outcome['lock_wait_ms']:>13.1f} {outcome['applied']:>8} {str(outcome['up_to_date']):>10}"
+        )
+    for error in errors:
+        print(f"error: {error}")
+    if errors:
+        raise SystemExit(f"{label}: {len(errors)} worker(s) failed")
+
+
+def _check_schema(database_url: str) -> None:
+    sys.path.insert(0, str(SRC_DIR))
+    from langgraph.checkpoint.postgres import PostgresSaver
+
+    migration_files = len(list((SRC_DIR / "app" / "db" / "migrations").glob("*.sql")))
+    with psycopg.connect(database_url) as conn:
+        recorded, distinct = conn.execute("SELECT COUNT(*), COUNT(DISTINCT name) FROM schema_migrations").fetchone()
+        checkpoint_versions = conn.execute("SELECT COUNT(*) FROM checkpoint_migrations").fetchone()[0]
+    assert recorded == distinct == migration_files, (recorded, distinct, migration_files)
+    assert checkpoint_versions == len(PostgresSaver.MIGRATIONS), (checkpoint_versions, len(PostgresSaver.MIGRATIONS))
+    print(f"schema ok: {recorded} migrations recorded once, checkpoint schema v{checkpoint_versions - 1}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL"), required="BENCH_DATABASE_URL" not in os.environ)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    database = f"bench_startup_{uuid.uuid4().hex[:8]}"
+    database_url = urlunparse(urlparse(args.database_url)._replace(path=f"/{database}"))
+    with psycopg.connect(args.database_url, autocommit=True) as admin:
+        admin.execute(f'CREATE DATABASE "{database}"')
+    try:
+        _report(f"cold boot, {args.workers} workers", _boot(database_url, args.workers))
+        _check_schema(database_url)
+        _report(f"warm boot, {args.workers} workers", _boot(database_url, args.workers))
+    finally:
+        with psycopg.connect(args.database_url, autocommit=True) as admin:
+            admin.execute(f'DROP DATABASE IF EXISTS "{database}" WITH (FORCE)')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Offline evaluation of maestro's routing cascade (small model first, large model
+on low confidence or an invalid decision).
+
+`record` runs maestro's decision step (same prompt, schema and normalization as
+the graph) on every labelled case in data/routing_cases.jsonl with each model,
+and writes one line per (case, model): the decision, its validation error,
+latency and token usage. Recording calls the models for real (OPENAI_API_KEY),
+or the fake model with CHAT_MODEL_FACTORY=fake_llm:build_fake_chat_model.
+
+`evaluate` replays those recordings without calling anything, for the small
+model alone, the large model alone and the cascade at several confidence
+thresholds: accuracy against the labels, agreement with the large model, p50/p95
+decision latency, escalation rate and tokens per decision. Cost is only shown
+for models given a price with `--price MODEL=INPUT,OUTPUT` (per million tokens).
+
+Run from backend/src:
+
+    python ../benchmarks/eval_routing_cascade.py record --models gpt-5-mini,gpt-5.2 --out routing.jsonl
+    python ../benchmarks/eval_routing_cascade.py evaluate routing.jsonl --fast gpt-5-mini --strong gpt-5.2 \\
+        [--thresholds 0.5,0.6,0.7,0.8] [--price gpt-5-mini=IN,OUT --price gpt-5.2=IN,OUT]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+CASES_PATH = Path(__file__).resolve().parent / "data" / "routing_cases.jsonl"
+
+
+def _load_jsonl(path: Path) -> list[dict[str, Any]]:
+    with path.open() as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def _agents(decision: dict[str, Any]) -> list[str]:
+    if decision["action"] == "delegate":
+        return sorted(decision.get("target_agents") or [decision["target_agent"]])
+    if decision["action"] == "consult":
+        return sorted(decision.get("consult_agents") or [])
+    return []
+
+
+def record(args: argparse.Namespace) -> None:
+    from langchain_core.callbacks import UsageMetadataCallbackHandler
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    from app.agents.defintions.maestro import _decide
+
+    cases = _load_jsonl(Path(args.cases))
+    models = [model.strip() for model in args.models.split(",") if model.strip()]
+    with open(args.out, "w") as out:
+        for case in cases:
+            messages = [
+                HumanMessage(content=m["content"]) if m["role"] == "user" else AIMessage(content=m["content"])
+                for m in case["messages"]
+            ]
+            for model in models:
+                usage = UsageMetadataCallbackHandler()
+                started = perf_counter()
+                decision, error = _decide(model, {"messages": messages}, [usage])
+                latency = perf_counter() - started
+                tokens = {"input": 0, "output": 0}
+                for metadata in usage.usage_metadata.values():
+                    tokens["input"] += metadata.get("input_tokens", 0)
+                    tokens["output"] += metadata.get("output_tokens", 0)
+                row = {
+                    "case": case["id"],
+                    "expected": case["expected"],
+                    "model": model,
+                    "decision": {"action": decision["action"], "agents": _agents(decision)},
+                    "confidence": decision["confidence"],
+                    "error": error,
+                    "latency": latency,
+                    "tokens": tokens,
+                }
+                out.write(json.dumps(row) + "\n")
+                print(f"{case['id']:<24} {model:<14} {row['decision']['action']:<9} {latency * 1000:>7.0f} ms {error or ''}")
+
+
+@dataclass
+class Outcome:
+    decision: dict[str, Any]
+    latency: float
+    tokens: dict[str, int]
+    model_tokens: dict[str, dict[str, int]]
+    escalated: bool
+
+
+def _simulate(fast: dict[str, Any] | None, strong: dict[str, Any], threshold: float | None) -> Outcome:
+    """What a policy would have returned: `fast` alone (threshold None), `strong` alone (fast None) or the cascade."""
+    if fast is None:
+        return Outcome(strong["decision"], strong["latency"], strong["tokens"], {strong["model"]: strong["tokens"]}, False)
+    confidence = fast["confidence"]
+    escalate = threshold is not None and (
+        fast["error"] is not None or (confidence is not None and confidence < threshold)
+    )
+    if not escalate:
+        return Outcome(fast["decision"], fast["latency"], fast["tokens"], {fast["model"]: fast["tokens"]}, False)
+    tokens = {key: fast["tokens"][key] + strong["tokens"][key] for key in ("input", "output")}
+    return Outcome(
+        strong["decision"],
+        fast["latency"] + strong["latency"],
+        tokens,
+        {fast["model"]: fast["tokens"], strong["model"]: strong["tokens"]},
+        True,
+    )
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _cost(outcome: Outcome, prices: dict[str, tuple[float, float]]) -> float | None:
+    total = 0.0
+    for model, tokens in outcome.model_tokens.items():
+        if model not in prices:
+            return None
+        input_price, output_price = prices[model]
+        total += (tokens["input"] * input_price + tokens["output"] * output_price) / 1_000_000
+    return total
+
+
+def evaluate(args: argparse.Namespace) -> None:
+    rows = _load_jsonl(Path(args.recordings))
+    by_case: dict[str, dict[str, dict[str, Any]]] = {}
+    for row in rows:
+        by_case.setdefault(row["case"], {})[row["model"]] = row
+    cases = [models for models in by_case.values() if args.fast in models and args.strong in models]
+    if not cases:
+        raise SystemExit(f"no case was recorded with both {args.fast} and {args.strong}")
+
+    prices: dict[str, tuple[float, float]] = {}
+    for price in args.price:
+        model, _, values = price.partition("=")
+        input_price, _, output_price = values.partition(",")
+        prices[model] = (float(input_price), float(output_price))
+
+    policies: list[tuple[str, bool, float | None]] = [
+        (f"{args.fast} only", True, None),
+        (f"{args.strong} only", False, None),
+    ]
+    policies += [(f"cascade @ {threshold:g}", True, threshold) for threshold in args.thresholds]
+
+    print(f"{len(cases)} cases recorded with {args.fast} and {args.strong}")
+    print(
+        f"{'policy':<24} {'accuracy':>9} {'agrees':>7} {'p50 ms':>7} {'p95 ms':>7} "
+        f"{'escalated':>10} {'tokens':>7} {'cost/1k':>9}"
+    )
+    for name, use_fast, threshold in policies:
+        outcomes = [
+            (models[args.strong], _simulate(models[args.fast] if use_fast else None, models[args.strong], threshold))
+            for models in cases
+        ]
+        correct = sum(
+            outcome.decision["action"] == strong["expected"]["action"]
+            and outcome.decision["agents"] == sorted(strong["expected"]["agents"])
+            for strong, outcome in outcomes
+        )
+        agrees = sum(outcome.decision == strong["decision"] for strong, outcome in outcomes)
+        latencies = [outcome.latency for _, outcome in outcomes]
+        escalated = sum(outcome.escalated for _, outcome in outcomes)
+        tokens = sum(outcome.tokens["input"] + outcome.tokens["output"] for _, outcome in outcomes)
+        costs = [_cost(outcome, prices) for _, outcome in outcomes]
+        cost = "-" if None in costs else f"${sum(costs) / len(costs) * 1000:.2f}"
+        print(
+            f"{name:<24} {correct / len(cases) * 100:>8.1f}% {agrees / len(cases) * 100:>6.1f}% "
+            f"{_percentile(latencies, 50) * 1000:>7.0f} {_percentile(latencies, 95) * 1000:>7.0f} "
+            f"{escalated / len(cases) * 100:>9.1f}% {tokens / len(cases):>7.0f} {cost:>9}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="Run the decision step on every case with each model")
+    record_parser.add_argument("--cases", default=str(CASES_PATH))
+    record_parser.add_argument("--models", default="gpt-5-mini,gpt-5.2", help="Comma-separated model names")
+    record_parser.add_argument("--out", required=True)
+    record_parser.set_defaults(run=record)
+
+    evaluate_parser = commands.add_parser("evaluate", help="Compare routing policies on recorded decisions")
+    evaluate_parser.add_argument("recordings")
+    evaluate_parser.add_argument("--fast", default="gpt-5-mini")
+    evaluate_parser.add_argument("--strong", default="gpt-5.2")
+    evaluate_parser.add_argument(
+        "--thresholds",
+        type=lambda value: [float(item) for item in value.split(",")],
+        default=[0.5, 0.6, 0.7, 0.8],
+    )
+    evaluate_parser.add_argument("--price", action="append", default=[], metavar="MODEL=INPUT,OUTPUT")
+    evaluate_parser.set_defaults(run=evaluate)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
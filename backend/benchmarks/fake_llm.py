@@ -0,0 +1,330 @@
+"""
+Deterministic local chat model for benchmarks.
+
+Plugged into the app with
+
+    CHAT_MODEL_FACTORY=fake_llm:build_fake_chat_model
+
+(with this directory on PYTHONPATH). It replays a fixed script shaped like a
+real conversation, so the production workflow runs end to end without network
+calls:
+
+- maestro delegates each new user message to a specialist (chosen from the
+  message text) and stops once a specialist has answered;
+- a specialist calls `read_docs`, then `stage_edits` on one doc, then answers
+  in plain text, which hands over to the change-set nodes and ends the run in
+  `waiting_approval`; it skips `read_docs` when its prompt already has the doc
+  under "Prefetched context";
+- a message mentioning "every angle" makes maestro consult all specialists in
+  parallel; consultants (no `stage_edits` tool) answer right after `read_docs`;
+- a message mentioning "in parallel" makes maestro delegate to the Growth Lead
+  and the Technical Lead at once, each staging an edit to its own doc;
+- maestro's decisions carry a confidence: small models ("-mini", "-nano") are
+  unsure of one delegation in four, so a routing cascade escalates those.
+
+Text, tool-call arguments and maestro's JSON decision are streamed in small
+chunks. Usage mimics a provider prompt cache: input tokens are ~4 characters of
+prompt each, and the longest prefix shared with one of the agent's recent
+prompts (from 1024 tokens, in 128-token steps) is reported as `cache_read`.
+Latency is shaped by FAKE_LLM_TTFT_MS (before the first chunk; FAKE_LLM_FAST_TTFT_MS
+for small models) and FAKE_LLM_CHUNK_MS (between chunks); FAKE_LLM_DOC_KB sets the
+size of the staged document. Streamed chunks are counted in `fake_llm_chunks_total`
+on /metrics.
+
+Per-request limits are enforced like a provider would: a `max_tokens` above
+FAKE_LLM_MAX_OUTPUT_TOKENS is refused before anything is streamed, a smaller one
+cuts the response off (`finish_reason` "length"), and a call still streaming
+when its `timeout` runs out fails with `TimeoutError`.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+import zlib
+from collections import deque
+from os.path import commonprefix
+from threading import Lock
+from typing import Any, Iterator
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from app.metrics import registry
+
+SMALL_MODEL_SUFFIXES = ("-mini", "-nano")
+SPECIALISTS = ["Product Strategist", "Growth Lead", "Business Lead", "Technical Lead"]
+STAGED_DOC_ID = "product_brief"
+CHUNK_CHARS = 16
+CONSULT_TRIGGER = "every angle"
+PARALLEL_TRIGGER = "in parallel"
+PARALLEL_DOCS = {"Growth Lead": "gtm_plan", "Technical Lead": "technical_plan"}
+CHARS_PER_TOKEN = 4
+CACHE_MIN_TOKENS = 1024
+CACHE_STEP_TOKENS = 128
+CACHED_PROMPTS_PER_AGENT = 64
+OUTPUT_TOKENS = 60
+
+chunks_total = registry.counter("fake_llm_chunks_total", "Chunks streamed by the fake model, by agent.")
+
+_recent_prompts: dict[str, deque[str]] = {}
+_recent_prompts_lock = Lock()
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+def _messages_since_last_human(messages: list[Any]) -> list[Any]:
+    for index in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[index], HumanMessage):
+            return messages[index + 1 :]
+    return list(messages)
+
+
+def _last_human_text(messages: list[Any]) -> str:
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return message.text if hasattr(message, "text") else str(message.content)
+    return ""
+
+
+def _prompt_text(messages: list[Any]) -> str:
+    parts = []
+    for message in messages:
+        parts.append(f"{message.type}: {message.content}\n")
+        for call in getattr(message, "tool_calls", None) or []:
+            parts.append(f"{call['name']}({json.dumps(call['args'], sort_keys=True)})\n")
+    return "".join(parts)
+
+
+def prompt_cache_usage(cache_key: str, messages: list[Any]) -> dict[str, Any]:
+    """Usage metadata for a call, with `cache_read` from the prompts seen before under `cache_key`."""
+    prompt = _prompt_text(messages)
+    with _recent_prompts_lock:
+        recent = _recent_prompts.setdefault(cache_key, deque(maxlen=CACHED_PROMPTS_PER_AGENT))
+        shared = max((len(commonprefix([prompt, seen])) for seen in recent), default=0)
+        recent.append(prompt)
+    input_tokens = max(1, len(prompt) // CHARS_PER_TOKEN)
+    cached = shared // CHARS_PER_TOKEN // CACHE_STEP_TOKENS * CACHE_STEP_TOKENS
+    return {
+        "input_tokens": input_tokens,
+        "output_tokens": OUTPUT_TOKENS,
+        "total_tokens": input_tokens + OUTPUT_TOKENS,
+        "input_token_details": {"cache_read": cached if cached >= CACHE_MIN_TOKENS else 0},
+    }
+
+
+def _doc_body(agent: str, kb: float) -> str:
+    line = f"{agent}: revised assumption, evidence and next experiment for the idea.\n"
+    return line * max(1, int(kb * 1024) // len(line))
+
+
+def _is_small(model: str) -> bool:
+    return model.endswith(SMALL_MODEL_SUFFIXES)
+
+
+def _sleep(seconds: float, deadline: float | None) -> None:
+    """Sleep like a call waiting on the provider, failing at the request's deadline."""
+    if deadline is not None and time.monotonic() + seconds > deadline:
+        time.sleep(max(0.0, deadline - time.monotonic()))
+        raise TimeoutError("Request timed out.")
+    time.sleep(seconds)
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    agent: str
+    model: str = "fake-streaming"
+    ttft_seconds: float = 0.0
+    chunk_seconds: float = 0.0
+    doc_kb: float = 4.0
+    tool_names: tuple[str, ...] = ()
+    structured: bool = False
+    max_output_tokens: int = 16_384
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return {"agent": self.agent, "model": self.model}
+
+    def _get_ls_params(self, stop=None, **kwargs):
+        params = super()._get_ls_params(stop=stop, **kwargs)
+        params["ls_model_name"] = self.model
+        return params
+
+    def bind_tools(self, tools, **kwargs):
+        # The script only needs to know whether it may stage edits.
+        return self.model_copy(update={"tool_names": tuple(getattr(tool, "name", "") for tool in tools)})
+
+    def with_structured_output(self, schema, **kwargs):
+        # The decision is streamed as JSON text, like a json_schema response.
+        return self.model_copy(update={"structured": True}) | JsonOutputParser()
+
+    def _decide(self, messages: list[Any]) -> dict[str, Any]:
+        """Maestro routing decision."""
+        if any(isinstance(message, AIMessage) for message in _messages_since_last_human(messages)):
+            return {
+                "user_message": "The specialist has staged their update; review it when ready.",
+                "action": "stop",
+                "target_agent": None,
+                "rationale": "specialist_answered",
+                "confidence": 0.95,
+            }
+        text = _last_human_text(messages)
+        if CONSULT_TRIGGER in text.lower():
+            return {
+                "user_message": "Let me get every specialist's take on this.",
+                "action": "consult",
+                "target_agent": None,
+                "consult_agents": list(SPECIALISTS),
+                "rationale": "benchmark_script",
+                "confidence": 0.9,
+            }
+        if PARALLEL_TRIGGER in text.lower():
+            return {
+                "user_message": "Splitting this between the Growth Lead and the Technical Lead.",
+                "action": "delegate",
+                "target_agent": None,
+                "target_agents": list(PARALLEL_DOCS),
+                "rationale": "benchmark_script",
+                "confidence": 0.9,
+            }
+        digest = zlib.crc32(text.encode("utf-8"))
+        target = SPECIALISTS[digest % len(SPECIALISTS)]
+        unsure = _is_small(self.model) and digest // len(SPECIALISTS) % 4 == 0
+        return {
+            "user_message": f"Handing this to the {target}.",
+            "action": "delegate",
+            "target_agent": target,
+            "rationale": "benchmark_script",
+            "confidence": 0.4 if unsure else 0.85,
+        }
+
+    def _script(self, messages: list[BaseMessage]) -> AIMessage:
+        if self.structured:
+            return AIMessage(content=json.dumps(self._decide(messages)))
+        turn = _messages_since_last_human(messages)
+        tool_results = [message for message in turn if isinstance(message, ToolMessage)]
+        doc_id = STAGED_DOC_ID
+        if PARALLEL_TRIGGER in _last_human_text(messages).lower():
+            doc_id = PARALLEL_DOCS.get(self.agent, STAGED_DOC_ID)
+        system = "".join(str(message.content) for message in messages if isinstance(message, SystemMessage))
+        prefetched = f"## {doc_id} (" in system
+        if not tool_results and not prefetched:
+            return AIMessage(
+                content="Let me read the current document first.",
+                tool_calls=[{"id": f"call_read_{len(messages)}", "name": "read_docs", "args": {"doc_ids": [doc_id]}}],
+            )
+        if "stage_edits" not in self.tool_names:
+            return AIMessage(content=f"{self.agent} view: the brief is promising; the main risk is an unproven channel.")
+        if any(message.name == "stage_edits" for message in tool_results):
+            return AIMessage(content="I have drafted an update for your review.")
+        return AIMessage(
+            content="Staging the revised document.",
+            tool_calls=[
+                {
+                    "id": f"call_stage_{len(messages)}",
+                    "name": "stage_edits",
+                    "args": {
+                        "edits": [{"doc_id": doc_id, "new_content": _doc_body(self.agent, self.doc_kb)}],
+                        "summary": f"{self.agent} refresh of {doc_id}",
+                        "by": self.agent,
+                    },
+                }
+            ],
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._script(messages)
+        message.usage_metadata = prompt_cache_usage(f"{self.agent}:{self.model}", messages)
+        message.response_metadata = {"model_name": self.model}
+        _sleep(self.ttft_seconds, self._limits(kwargs)[1])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _limits(self, kwargs: dict[str, Any]) -> tuple[int | None, float | None]:
+        """(response character allowance, monotonic deadline) from the request's `max_tokens` and `timeout`."""
+        max_tokens = kwargs.get("max_tokens")
+        if max_tokens is not None and not 1 <= max_tokens <= self.max_output_tokens:
+            raise ValueError(
+                f"max_tokens is too large: {max_tokens}. This model supports at most "
+                f"{self.max_output_tokens} completion tokens."
+            )
+        timeout = kwargs.get("timeout")
+        return (
+            None if max_tokens is None else max_tokens * CHARS_PER_TOKEN,
+            None if timeout is None else time.monotonic() + timeout,
+        )
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        allowance, deadline = self._limits(kwargs)
+        message = self._script(messages)
+        _sleep(self.ttft_seconds, deadline)
+
+        truncated = False
+
+        def take(text: str) -> str:
+            nonlocal allowance, truncated
+            if allowance is None:
+                return text
+            truncated = truncated or len(text) > allowance
+            text = text[:allowance]
+            allowance -= len(text)
+            return text
+
+        text = take(str(message.content))
+        for start in range(0, len(text), CHUNK_CHARS):
+            chunks_total.inc(agent=self.agent)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text[start : start + CHUNK_CHARS]))
+            _sleep(self.chunk_seconds, deadline)
+
+        for index, call in enumerate(message.tool_calls):
+            arguments = take(json.dumps(call["args"]))
+            if not arguments:
+                break
+            for start in range(0, len(arguments), CHUNK_CHARS * 8):
+                first = start == 0
+                chunks_total.inc(agent=self.agent)
+                yield ChatGenerationChunk(
+                    message=AIMessageChunk(
+                        content="",
+                        tool_call_chunks=[
+                            {
+                                "index": index,
+                                "id": call["id"] if first else None,
+                                "name": call["name"] if first else None,
+                                "args": arguments[start : start + CHUNK_CHARS * 8],
+                            }
+                        ],
+                    )
+                )
+                _sleep(self.chunk_seconds, deadline)
+
+        usage = prompt_cache_usage(f"{self.agent}:{self.model}", messages)
+        if truncated:
+            output_tokens = min(OUTPUT_TOKENS, kwargs["max_tokens"])
+            usage = {**usage, "output_tokens": output_tokens, "total_tokens": usage["input_tokens"] + output_tokens}
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(
+                content="",
+                usage_metadata=usage,
+                response_metadata={"model_name": self.model, "finish_reason": "length" if truncated else "stop"},
+            )
+        )
+
+
+def build_fake_chat_model(agent: str, model: str = "fake-streaming") -> FakeStreamingChatModel:
+    ttft_ms = _env_float("FAKE_LLM_FAST_TTFT_MS", 20) if _is_small(model) else _env_float("FAKE_LLM_TTFT_MS", 50)
+    return FakeStreamingChatModel(
+        agent=agent,
+        model=model,
+        ttft_seconds=ttft_ms / 1000,
+        chunk_seconds=_env_float("FAKE_LLM_CHUNK_MS", 5) / 1000,
+        doc_kb=_env_float("FAKE_LLM_DOC_KB", 4),
+        max_output_tokens=int(_env_float("FAKE_LLM_MAX_OUTPUT_TOKENS", 16_384)),
+    )
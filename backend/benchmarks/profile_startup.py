@@ -0,0 +1,114 @@
+"""
+Cold-start profile of the API worker.
+
+Imports `app.main` in a fresh interpreter with `python -X importtime` and prints
+the total import time, the self time grouped by top-level package, and the
+slowest first-party modules (cumulative, including what they import).
+
+With --database-url it also starts uvicorn and reports the time from process
+spawn until /health answers (imports + startup hooks: migrations, checkpoint
+schema, executor), i.e. how long a new worker takes to take traffic. Run from
+backend/src:
+
+    python ../benchmarks/profile_startup.py [--top 15] [--database-url postgresql://...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def _env(database_url: str) -> dict[str, str]:
+    return {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "unused"),
+        "PYTHONPATH": os.pathsep.join([str(SRC_DIR), os.environ.get("PYTHONPATH", "")]),
+    }
+
+
+def profile_imports(top: int) -> None:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=SRC_DIR,
+        env=_env(os.environ.get("DATABASE_URL", "postgresql://profile@localhost/profile")),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    by_package: dict[str, int] = defaultdict(int)
+    first_party: list[tuple[int, str]] = []
+    total_us = 0
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = int(match[1]), int(match[2]), match[3], match[4]
+        by_package[module.split(".", 1)[0]] += self_us
+        total_us += self_us
+        if module.startswith("app.") or module == "app":
+            first_party.append((cumulative_us, f"{indent}{module}"))
+        if module == "app.main":
+            break
+
+    print(f"import app.main: {total_us / 1000:.0f} ms")
+    print(f"\n{'package (self time)':<40} {'ms':>8} {'share':>7}")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        print(f"{package:<40} {self_us / 1000:>8.1f} {self_us / total_us:>7.1%}")
+    print(f"\n{'first-party module (cumulative)':<40} {'ms':>8}")
+    for cumulative_us, module in sorted(first_party, key=lambda item: -item[0])[:top]:
+        print(f"{module.strip():<40} {cumulative_us / 1000:>8.1f}")
+
+
+def time_to_healthy(database_url: str, port: int) -> None:
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=SRC_DIR,
+        env=_env(database_url),
+    )
+    try:
+        deadline = started + 120
+        while time.perf_counter() < deadline:
+            if server.poll() is not None:
+                raise SystemExit("server exited during startup")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=0.5).status_code == 200:
+                    print(f"\nspawn -> /health 200: {(time.perf_counter() - started) * 1000:.0f} ms")
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.02)
+        raise SystemExit("server did not become healthy")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15, help="Rows per table")
+    parser.add_argument("--database-url", help="Also measure time until a real worker answers /health")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    profile_imports(args.top)
+    if args.database_url:
+        time_to_healthy(args.database_url, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+OpenAI-compatible chat completions stub that injects latency and errors.
+
+Serves `POST /v1/chat/completions` (streamed or not) with a short canned answer,
+or a maestro-shaped JSON decision when a `response_format` is requested, so
+`ChatOpenAI(base_url=...)` and the resilience layer can be exercised without a
+provider. Behaviour is set on the command line and can be changed while running
+with `POST /control` (same field names); `GET /stats` counts requests by outcome.
+
+    python ../benchmarks/stub_llm_server.py --port 9101 --ttft-ms 150 --slow-share 0.05 --slow-ms 15000 \\
+        --error-share 0.02
+
+A slow response waits `slow_ms` before its first chunk; an error returns
+`error_status` before any content. With `rpm_limit` set, requests beyond that
+rate (after a burst of a few seconds' worth) get a 429 with a Retry-After, like
+a provider's rate limit.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import Counter
+from typing import Any
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ANSWER = "Here is a short answer from the stub model, streamed in a few chunks."
+DECISION = {
+    "user_message": "Handing this to the Growth Lead.",
+    "action": "delegate",
+    "target_agent": "Growth Lead",
+    "target_agents": None,
+    "consult_agents": None,
+    "rationale": "stub",
+    "confidence": 0.9,
+}
+CHUNK_CHARS = 12
+
+settings: dict[str, Any] = {}
+stats: Counter[str] = Counter()
+# Seconds of requests the rate limit lets through at once.
+RATE_LIMIT_BURST_SECONDS = 2.0
+bucket = {"tokens": float("inf"), "refilled_at": time.monotonic()}
+app = FastAPI()
+
+
+def _content(body: dict[str, Any]) -> str:
+    return json.dumps(DECISION) if body.get("response_format") else ANSWER
+
+
+def _usage(body: dict[str, Any], content: str) -> dict[str, int]:
+    prompt = sum(len(str(message.get("content") or "")) for message in body.get("messages") or [])
+    prompt_tokens, completion_tokens = max(1, prompt // 4), max(1, len(content) // 4)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _chunk(completion_id: str, model: str, delta: dict[str, Any], finish_reason: str | None = None) -> str:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def _rate_limited() -> bool:
+    if not settings["rpm_limit"]:
+        return False
+    rate = settings["rpm_limit"] / 60
+    now = time.monotonic()
+    burst = max(1.0, rate * RATE_LIMIT_BURST_SECONDS)
+    bucket["tokens"] = min(burst, bucket["tokens"] + (now - bucket["refilled_at"]) * rate)
+    bucket["refilled_at"] = now
+    if bucket["tokens"] < 1:
+        return True
+    bucket["tokens"] -= 1
+    return False
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model") or "stub"
+    if _rate_limited():
+        stats["rate_limited"] += 1
+        return JSONResponse(
+            {"error": {"message": "rate limit reached", "type": "rate_limit_exceeded"}},
+            status_code=429,
+            headers={"Retry-After": "1"},
+        )
+    roll = random.random()
+    if roll < settings["error_share"]:
+        stats["error"] += 1
+        return JSONResponse(
+            {"error": {"message": "injected failure", "type": "server_error"}},
+            status_code=settings["error_status"],
+        )
+    slow = roll < settings["error_share"] + settings["slow_share"]
+    stats["slow" if slow else "ok"] += 1
+    await asyncio.sleep((settings["slow_ms"] if slow else settings["ttft_ms"]) / 1000)
+
+    content = _content(body)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    if not body.get("stream"):
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": _usage(body, content),
+        }
+
+    async def frames():
+        yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+        for start in range(0, len(content), CHUNK_CHARS):
+            yield _chunk(completion_id, model, {"content": content[start : start + CHUNK_CHARS]})
+            await asyncio.sleep(settings["chunk_ms"] / 1000)
+        yield _chunk(completion_id, model, {}, "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            usage = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [], "usage": _usage(body, content)}
+            yield f"data: {json.dumps(usage)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(frames(), media_type="text/event-stream")
+
+
+@app.post("/control")
+async def control(request: Request):
+    settings.update({key: value for key, value in (await request.json()).items() if key in settings})
+    return settings
+
+
+@app.get("/stats")
+async def get_stats():
+    return dict(stats)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9101)
+    parser.add_argument("--ttft-ms", type=float, default=150, help="Delay before the first chunk")
+    parser.add_argument("--chunk-ms", type=float, default=5, help="Delay between chunks")
+    parser.add_argument("--slow-share", type=float, default=0.0, help="Share of requests delayed by --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=15000)
+    parser.add_argument("--error-share", type=float, default=0.0, help="Share of requests failed with --error-status")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--rpm-limit", type=float, default=0, help="Requests per minute before 429s (0: none)")
+    args = parser.parse_args()
+    settings.update(
+        ttft_ms=args.ttft_ms,
+        chunk_ms=args.chunk_ms,
+        slow_share=args.slow_share,
+        slow_ms=args.slow_ms,
+        error_share=args.error_share,
+        error_status=args.error_status,
+        rpm_limit=args.rpm_limit,
+    )
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
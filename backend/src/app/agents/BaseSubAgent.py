@@ -1,19 +1,82 @@
 from abc import ABC, abstractmethod
 
+from langchain.agents import create_agent
+from langchain.agents.middleware.types import AgentMiddleware, ModelRequest, wrap_model_call
+
+from app.agents.helpers.context_prefetch import prefetched_context
+from app.agents.models import agent_models, current_model_settings, get_chat_model
+from app.agents.prompts.cache_friendly_prompt import cache_friendly_prompt
+from app.agents.run_budget import budget_middleware
 from app.agents.state.types import AgentState
+from app.agents.tools.read_docs import read_docs
+from app.agents.tools.search_web import search_web
 from langgraph.types import Command
 
 
+CONSULTATION_PROMPT = """
+# Consultation mode
+Maestro is consulting several specialists in parallel on the latest user request.
+You are in analysis-only mode: you cannot stage edits, and other specialists are
+answering at the same time. Read documents or search if you need to, then reply
+with your perspective in a few short bullets: the main risks, the opportunities,
+and the document changes you would propose if asked."""
+
+
 class BaseSubAgent(ABC):
     name: str
     short_desc: str
     system_prompt: str
+    # Documents the specialist usually works on; prefetched into its prompt.
+    focus_docs: tuple[str, ...]
 
-    def __init__(self, name: str, short_desc: str, system_prompt: str):
+    def __init__(self, name: str, short_desc: str, system_prompt: str, focus_docs: tuple[str, ...] = ()):
         self.name = name
         self.short_desc = short_desc
         self.system_prompt = system_prompt
+        self.focus_docs = focus_docs
 
     @abstractmethod
     def build_subgraph(self, state: AgentState) -> Command:
-        ...
\ No newline at end of file
+        ...
+
+    @abstractmethod
+    def build_context_prompt(self, request: ModelRequest) -> str:
+        """Per-call context (doc summaries, prefetched docs); sent after the static prompt and the conversation."""
+        ...
+
+    def build_prompt_middleware(self, *, consultation: bool = False) -> AgentMiddleware:
+        static_prompt = f"{self.system_prompt}\n{CONSULTATION_PROMPT}" if consultation else self.system_prompt
+        return cache_friendly_prompt(static_prompt, self.build_context_prompt)
+
+    def build_model_middleware(self) -> AgentMiddleware:
+        """Calls the first model of the specialist's cascade, as overridden by the thread's settings."""
+
+        @wrap_model_call
+        def thread_model_middleware(request: ModelRequest, handler):
+            model = agent_models(self.name, current_model_settings())[0]
+            return handler(request.override(model=get_chat_model(self.name, model)))
+
+        return thread_model_middleware
+
+    def build_middleware(self, *, consultation: bool = False) -> list[AgentMiddleware]:
+        return [
+            *budget_middleware(self.name),
+            self.build_model_middleware(),
+            self.build_prompt_middleware(consultation=consultation),
+        ]
+
+    def build_prefetched_context_prompt(self, state: AgentState) -> str:
+        """Full focus docs and cached searches, ideally prefetched while maestro was routing."""
+        return prefetched_context(state, self.name, self.focus_docs)
+
+    def build_consultant(self):
+        """
+        Analysis-only variant of the specialist used when maestro consults several
+        specialists at once: same persona, no `stage_edits`, no approval flow.
+        """
+        return create_agent(
+            get_chat_model(self.name),
+            tools=[read_docs, search_web],
+            middleware=self.build_middleware(consultation=True),
+            state_schema=AgentState,
+        )
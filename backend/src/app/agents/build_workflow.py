@@ -1,18 +1,35 @@
+import logging
+from functools import lru_cache
+from threading import Thread
+from time import perf_counter
+
 from langgraph.graph import END, START, StateGraph
+from langgraph.graph.state import CompiledStateGraph
 
-from app.agents.defintions.maestro import maestro
+from app.agents.nodes.consultation import (
+    CONSULT_NODE,
+    MERGE_CONSULTATIONS_NODE,
+    build_consult_node,
+    consultation_sends,
+    merge_consultations_node,
+)
 from app.agents.state.types import AgentState
-
-from app.agents.defintions.product_strategist import product_strategist
-from app.agents.defintions.growth_lead import growth_lead
-from app.agents.defintions.business_lead import business_lead
-from app.agents.defintions.technical_lead import technical_lead
 from app.db.persist_messages_wrapper import persist_messages_adapter
 
 from app.db.get_conn_factory import conn_factory
 
+logger = logging.getLogger(__name__)
+
 
 def build_workflow() -> StateGraph:
+    # The agent definitions pull in langchain's agent stack, the OpenAI client and
+    # the search tool; import them when the graph is first built, not at API startup.
+    from app.agents.defintions.maestro import maestro
+    from app.agents.defintions.product_strategist import product_strategist
+    from app.agents.defintions.growth_lead import growth_lead
+    from app.agents.defintions.business_lead import business_lead
+    from app.agents.defintions.technical_lead import technical_lead
+
     workflow = StateGraph(AgentState)
 
     workflow.add_node(
@@ -33,9 +50,19 @@ def build_workflow() -> StateGraph:
         workflow.add_node(subagent.name, subagent.build_subgraph())
         workflow.add_edge(subagent.name, "maestro")
 
+    # Parallel analysis-only consultations: maestro -> consult (xN) -> merge -> maestro.
+    workflow.add_node(
+        CONSULT_NODE,
+        build_consult_node({subagent.name: subagent.build_consultant() for subagent in subagents}),
+    )
+    workflow.add_node(MERGE_CONSULTATIONS_NODE, merge_consultations_node)
+    workflow.add_edge(CONSULT_NODE, MERGE_CONSULTATIONS_NODE)
+    workflow.add_edge(MERGE_CONSULTATIONS_NODE, "maestro")
+
     route_map = {
         subagent.name: subagent.name for subagent in subagents
     }
+    route_map[CONSULT_NODE] = CONSULT_NODE
     route_map["__end__"] = END
 
     normalized_route_map = {
@@ -46,10 +73,20 @@ def build_workflow() -> StateGraph:
         .replace("`", "'")
         .replace("_", " "): name
         for name in route_map
-        if name != "__end__"
+        if name not in {"__end__", CONSULT_NODE}
     }
 
-    def route_from_maestro(state: AgentState) -> str:
+    def route_from_maestro(state: AgentState):
+        if state.get("last_supervisor_action") == "stop":
+            return "__end__"
+        consult_agents = state.get("consult_agents")
+        if consult_agents:
+            return consultation_sends(state, consult_agents)
+        # Parallel delegation: the specialists run in the same superstep, each
+        # staging (and awaiting approval for) its own change set.
+        delegate_agents = [name for name in state.get("delegate_agents") or [] if name in route_map]
+        if len(delegate_agents) > 1:
+            return delegate_agents
         target = state.get("next_agent")
         if isinstance(target, str):
             if target in route_map:
@@ -70,3 +107,28 @@ def build_workflow() -> StateGraph:
     workflow.add_conditional_edges("maestro", route_from_maestro, route_map)
 
     return workflow
+
+
+@lru_cache(maxsize=1)
+def get_compiled_workflow() -> CompiledStateGraph:
+    """
+    The workflow compiled once per process, without a checkpointer. Runs bind
+    their own with `graph.copy(update={"checkpointer": ...})`; subgraphs use the
+    parent's checkpointer at runtime.
+    """
+    return build_workflow().compile()
+
+
+def preload_workflow() -> None:
+    """Compile the workflow in a background thread so the first run finds it ready."""
+
+    def preload() -> None:
+        started = perf_counter()
+        try:
+            get_compiled_workflow()
+        except Exception:
+            logger.exception("Workflow preload failed; it will be compiled on the first run")
+            return
+        logger.info("Workflow compiled in %.0f ms", (perf_counter() - started) * 1000)
+
+    Thread(target=preload, name="workflow-preload", daemon=True).start()
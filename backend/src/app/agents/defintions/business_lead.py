@@ -1,8 +1,9 @@
 from langchain.agents import create_agent
-from langchain.agents.middleware.types import ModelRequest, dynamic_prompt
+from langchain.agents.middleware.types import ModelRequest
 from langgraph.graph import END, StateGraph
 
 from app.agents.BaseSubAgent import BaseSubAgent
+from app.agents.models import get_chat_model
 from app.agents.nodes.change_set import (
     apply_changeset_node,
     await_approval_node,
@@ -43,13 +44,18 @@ class BusinessLead(BaseSubAgent):
 - You avoid hand-wavy business language.""",
         )
 
-        super().__init__(name=name, short_desc=short_desc, system_prompt=system_prompt)
+        super().__init__(
+            name=name,
+            short_desc=short_desc,
+            system_prompt=system_prompt,
+            focus_docs=("business_model_pricing", "evidence_assumptions_log", "risk_decision_log"),
+        )
 
     def build_subgraph(self):
         agent = create_agent(
-            "gpt-5.2",
+            get_chat_model(self.name),
             tools=[stage_edits, read_docs, search_web],
-            middleware=[dynamic_prompt(self.build_system_prompt)],
+            middleware=self.build_middleware(),
             state_schema=AgentState,
         )
 
@@ -75,11 +81,9 @@ class BusinessLead(BaseSubAgent):
         sg.set_entry_point("agent")
         return sg.compile()
 
-    def build_system_prompt(self, request: ModelRequest) -> str:
-        return f"""{self.system_prompt}
-
-# Current document content summaries
-{build_docs_summaries_prompt(request.state)}"""
+    def build_context_prompt(self, request: ModelRequest) -> str:
+        return f"""# Current document content summaries
+{build_docs_summaries_prompt(request.state)}{self.build_prefetched_context_prompt(request.state)}"""
 
 
 business_lead = BusinessLead()
@@ -1,24 +1,60 @@
-from typing import Literal, Optional, TypedDict
+import uuid
+from typing import Any, Literal, Optional, TypedDict
 
-from langchain_core.messages import AIMessage
-from langchain_openai import ChatOpenAI
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables.config import ensure_config, merge_configs
+from langgraph.constants import TAG_NOSTREAM
 
 from app.agents.defintions.business_lead import business_lead
 from app.agents.defintions.growth_lead import growth_lead
 from app.agents.defintions.product_strategist import product_strategist
 from app.agents.defintions.technical_lead import technical_lead
+from app.agents.helpers.context_prefetch import predict_agents, prefetch_context
+from app.agents.helpers.emit_event import emit_event
+from app.agents.helpers.json_field_stream import JsonStringFieldStream
+from app.agents.llm_governor import INTERACTIVE, LLMOverloadedError
+from app.agents.models import agent_models, current_model_settings, get_chat_model, routing_min_confidence
+from app.agents.run_budget import RunBudgetTracker, budget_stops_total, current_run_budget, emit_budget_usage
 from app.agents.state.types import AgentState
+from app.config import (
+    RUN_BUDGET_MIN_CALL_SECONDS,
+    RUN_BUDGET_MIN_TURN_SECONDS,
+    RUN_MAX_ITERATIONS,
+    SPECULATIVE_PREFETCH,
+)
+from app.metrics import registry
+from app.runs.cancellation import RunCancelledError
 
 
 AGENT_NAME = "maestro"
 MAX_CONSECUTIVE_NOOP = 2
 
+BUDGET_STOP_MESSAGES = {
+    "deadline": "I am stopping here because this run is out of time.",
+    "tokens": "I am stopping here because this run used up its token budget.",
+    "tool_calls": "I am stopping here because this run used up its tool call budget.",
+}
+
+routing_decisions_total = registry.counter(
+    "maestro_routing_decisions_total",
+    "Maestro routing decisions by the model whose decision was kept.",
+)
+routing_escalations_total = registry.counter(
+    "maestro_routing_escalations_total",
+    "Maestro decisions retried on the next model of the cascade, by model and reason "
+    "(a validation error, or low_confidence).",
+)
+
 
 class MaestroDecision(TypedDict):
     user_message: str
-    action: Literal["delegate", "respond", "stop"]
+    action: Literal["delegate", "consult", "respond", "stop"]
     target_agent: Optional[str]
+    target_agents: Optional[list[str]]
+    consult_agents: Optional[list[str]]
     rationale: str
+    confidence: Optional[float]
 
 
 def _normalize_agent_name(value: str) -> str:
@@ -40,6 +76,14 @@ def _resolve_target_agent(value: Optional[str]) -> Optional[str]:
     return normalized_subagent_map.get(normalized_value)
 
 
+def _resolve_agent_list(value: object) -> list[str]:
+    """Valid, de-duplicated specialist names in roster order (the order results are merged in)."""
+    if not isinstance(value, list):
+        return []
+    requested = {_resolve_target_agent(item) for item in value if isinstance(item, str)}
+    return [subagent.name for subagent in subagents if subagent.name in requested]
+
+
 def _fallback_decision(reason: str) -> MaestroDecision:
     return {
         "user_message": (
@@ -48,7 +92,10 @@ def _fallback_decision(reason: str) -> MaestroDecision:
         ),
         "action": "stop",
         "target_agent": None,
+        "target_agents": None,
+        "consult_agents": None,
         "rationale": reason,
+        "confidence": None,
     }
 
 
@@ -62,30 +109,114 @@ def _normalize_decision(raw: object) -> tuple[MaestroDecision, str | None]:
         return _fallback_decision("empty_user_message"), "empty_user_message"
 
     action_raw = raw.get("action")
-    action: Literal["delegate", "respond", "stop"] = (
-        action_raw if action_raw in {"delegate", "respond", "stop"} else "respond"
+    action: Literal["delegate", "consult", "respond", "stop"] = (
+        action_raw if action_raw in {"delegate", "consult", "respond", "stop"} else "respond"
     )
 
     resolved_target = _resolve_target_agent(raw.get("target_agent"))
+    target_agents = _resolve_agent_list(raw.get("target_agents"))
+    if resolved_target is None and target_agents:
+        resolved_target = target_agents[0]
+    consult_agents = _resolve_agent_list(raw.get("consult_agents"))
     error: str | None = None
     if action == "delegate" and resolved_target is None:
         action = "respond"
         error = "invalid_target_agent"
+    if action == "consult" and not consult_agents:
+        action = "respond"
+        error = "invalid_consult_agents"
 
     rationale_raw = raw.get("rationale")
     rationale = rationale_raw.strip() if isinstance(rationale_raw, str) else ""
 
+    confidence_raw = raw.get("confidence")
+    confidence = (
+        min(max(float(confidence_raw), 0.0), 1.0)
+        if isinstance(confidence_raw, (int, float)) and not isinstance(confidence_raw, bool)
+        else None
+    )
+
     return (
         {
             "user_message": user_message,
             "action": action,
             "target_agent": resolved_target if action == "delegate" else None,
+            "target_agents": target_agents if action == "delegate" and len(target_agents) > 1 else None,
+            "consult_agents": consult_agents if action == "consult" else None,
             "rationale": rationale,
+            "confidence": confidence,
         },
         error,
     )
 
 
+class _UserMessageStreamer(BaseCallbackHandler):
+    """
+    Streams `user_message` out of the decision JSON while the model is still
+    generating it, as `message.delta` events for the message maestro will return.
+    The routing fields that follow are only acted on once the whole decision is
+    parsed. Maestro completes the message itself: when the decision is escalated
+    to a larger model, the kept text replaces what was streamed.
+    """
+
+    def __init__(self, message_id: str):
+        self.message_id = message_id
+        self.field = JsonStringFieldStream("user_message")
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if self.field.done:
+            return
+        delta = self.field.feed(token)
+        if delta:
+            emit_event(
+                "message.delta",
+                {"message_id": self.message_id, "by_agent": AGENT_NAME, "delta": delta},
+            )
+
+
+class _TargetPredictor(BaseCallbackHandler):
+    """
+    Guesses where maestro is routing while the decision streams, and starts
+    prefetching those specialists' context: roster names in the last user
+    message, then in `user_message`, then `target_agent` itself. A wrong guess
+    only wastes local work; routing still follows the parsed decision.
+    """
+
+    def __init__(self, state: AgentState):
+        self.state = state
+        self.predicted: set[str] = set()
+        self.restart()
+
+    def restart(self) -> None:
+        """Start reading a new decision (the next model of the cascade)."""
+        self.user_message = JsonStringFieldStream("user_message")
+        self.target_agent = JsonStringFieldStream("target_agent")
+
+    def predict_from_history(self) -> None:
+        for message in reversed(self.state["messages"]):
+            if isinstance(message, HumanMessage):
+                self.predict(predict_agents(message.text, subagents_by_name))
+                break
+        # The specialist this run last delegated to, if any.
+        self.predict([self.state.get("next_agent")])
+
+    def predict(self, agents: list[Optional[str]]) -> None:
+        for agent in agents:
+            subagent = subagents_by_name.get(agent or "")
+            if subagent is None or agent in self.predicted:
+                continue
+            self.predicted.add(agent)
+            prefetch_context(self.state, subagent.name, subagent.focus_docs)
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if not self.user_message.done and self.user_message.feed(token):
+            self.predict(predict_agents(self.user_message.value, subagents_by_name))
+        if not self.target_agent.done:
+            self.target_agent.feed(token)
+            if self.target_agent.done:
+                self.predict([_resolve_target_agent(self.target_agent.value)])
+
+
 def _calculate_consecutive_noop_count(state: AgentState) -> int:
     previous_action = state.get("last_supervisor_action")
     prior_noop_count = int(state.get("consecutive_noop_count") or 0)
@@ -93,15 +224,29 @@ def _calculate_consecutive_noop_count(state: AgentState) -> int:
     if previous_action != "delegate":
         return prior_noop_count
 
-    history = state.get("history") or []
-    cursor = int(state.get("history_cursor_at_last_delegate") or 0)
-    had_activity = len(history) > cursor
+    cursor = int(state.get("activity_cursor_at_last_delegate") or 0)
+    had_activity = int(state.get("activity_count") or 0) > cursor
     if had_activity:
         return 0
 
     return prior_noop_count + 1
 
 
+def _budget_stop_message(reason: str) -> str:
+    return (
+        f"{BUDGET_STOP_MESSAGES[reason]} "
+        "Please review the current outputs and continue with a new message if needed."
+    )
+
+
+def _with_budget(state_update: dict, budget: RunBudgetTracker | None, spent: str | None = None) -> dict:
+    """Records the run's budget usage in the state and reports it to the client."""
+    if budget is not None:
+        state_update["budget"] = budget.snapshot()
+        emit_budget_usage(budget, AGENT_NAME, spent)
+    return state_update
+
+
 def _guardrail_stop_update(
     *,
     message: str,
@@ -114,6 +259,9 @@ def _guardrail_stop_update(
         "messages": AIMessage(content=message),
         "by_agent": AGENT_NAME,
         "next_agent": None,
+        # A stop right after a parallel delegation or a consultation must not fan out again.
+        "delegate_agents": None,
+        "consult_agents": None,
         "iteration_count": iteration_count,
         "max_iterations": max_iterations,
         "loop_status": "guardrail_stop",
@@ -123,12 +271,49 @@ def _guardrail_stop_update(
     }
 
 
+def _decide(
+    model: str,
+    state: AgentState,
+    callbacks: list[BaseCallbackHandler],
+    priority: str | None = None,
+) -> tuple[MaestroDecision, str | None]:
+    # The raw JSON must not reach the client as a message of its own (graph
+    # "messages" stream mode); `_UserMessageStreamer` streams the user message.
+    decision_model = get_chat_model(AGENT_NAME, model).with_structured_output(
+        MaestroDecision,
+        method="json_schema",
+    ).with_config(tags=[TAG_NOSTREAM])
+    try:
+        # Streamed so the user message reaches the client token by token; the
+        # parser yields growing partial objects and the last one is complete.
+        raw_decision = None
+        for raw_decision in decision_model.stream(
+            [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                *state["messages"],
+            ],
+            config=merge_configs(
+                ensure_config(),
+                {"callbacks": callbacks, **({"configurable": {"llm_priority": priority}} if priority else {})},
+            ),
+        ):
+            pass
+        return _normalize_decision(raw_decision)
+    except (LLMOverloadedError, RunCancelledError):
+        # Not a bad decision: the run stops and the user can retry.
+        raise
+    except Exception:
+        validation_error = "structured_output_exception"
+        return _fallback_decision(validation_error), validation_error
+
+
 def maestro(state: AgentState):
     iteration_count = int(state.get("iteration_count") or 0)
-    max_iterations = int(state.get("max_iterations") or 4)
+    max_iterations = int(state.get("max_iterations") or RUN_MAX_ITERATIONS)
     consecutive_noop_count = _calculate_consecutive_noop_count(state)
+    budget = current_run_budget()
 
-    if iteration_count >= max_iterations:
+    if max_iterations and iteration_count >= max_iterations:
         return _guardrail_stop_update(
             message=(
                 "I am stopping here because we reached the loop limit for this run. "
@@ -140,6 +325,21 @@ def maestro(state: AgentState):
             error="max_iterations_reached",
         )
 
+    budget_spent = budget.exhausted(min_seconds=RUN_BUDGET_MIN_CALL_SECONDS) if budget is not None else None
+    if budget_spent is not None:
+        budget_stops_total.inc(agent=AGENT_NAME, reason=budget_spent)
+        return _with_budget(
+            _guardrail_stop_update(
+                message=_budget_stop_message(budget_spent),
+                iteration_count=iteration_count,
+                max_iterations=max_iterations,
+                consecutive_noop_count=consecutive_noop_count,
+                error=f"budget_exhausted:{budget_spent}",
+            ),
+            budget,
+            budget_spent,
+        )
+
     if consecutive_noop_count >= MAX_CONSECUTIVE_NOOP:
         return _guardrail_stop_update(
             message=(
@@ -152,28 +352,62 @@ def maestro(state: AgentState):
             error="consecutive_noop_guardrail",
         )
 
-    decision_model = ChatOpenAI(model="gpt-5.2").with_structured_output(
-        MaestroDecision,
-        method="json_schema",
-    )
-
-    validation_error: str | None = None
-    try:
-        raw_decision = decision_model.invoke(
-            [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                *state["messages"],
-            ]
+    settings = current_model_settings()
+    models = agent_models(AGENT_NAME, settings)
+    min_confidence = routing_min_confidence(settings)
+    # The user is waiting on the first decision of a chat run: it goes ahead of
+    # background model calls (see `llm_governor`).
+    priority = INTERACTIVE if iteration_count == 0 else None
+
+    streamer = _UserMessageStreamer(str(uuid.uuid4()))
+    predictor = _TargetPredictor(state) if SPECULATIVE_PREFETCH else None
+    if predictor is not None:
+        predictor.predict_from_history()
+
+    # Cascade: the first (small) model decides; a decision that fails validation
+    # or is not confident enough is made again by the next model. Only the first
+    # attempt is streamed to the user, through `streamer`: no attempt's raw output
+    # reaches the graph's message stream (see `_decide`), so an escalation shows
+    # up only as the kept text in `message.completed` below.
+    for attempt, model in enumerate(models):
+        callbacks: list[BaseCallbackHandler] = [streamer] if attempt == 0 else []
+        if predictor is not None:
+            predictor.restart()
+            callbacks.append(predictor)
+        decision, validation_error = _decide(model, state, callbacks, priority)
+
+        escalation_reason = validation_error
+        confidence = decision["confidence"]
+        if escalation_reason is None and confidence is not None and confidence < min_confidence:
+            escalation_reason = "low_confidence"
+        if escalation_reason is None or attempt == len(models) - 1:
+            break
+        routing_escalations_total.inc(from_model=model, reason=escalation_reason)
+    routing_decisions_total.inc(model=model)
+
+    # Another specialist turn would not finish in what is left of the run: stop
+    # now rather than have it cut short.
+    budget_spent = None
+    if decision["action"] in ("delegate", "consult") and budget is not None:
+        budget_spent = budget.exhausted(min_seconds=RUN_BUDGET_MIN_TURN_SECONDS)
+    if budget_spent is not None:
+        budget_stops_total.inc(agent=AGENT_NAME, reason=budget_spent)
+        decision = {**decision, "action": "stop", "user_message": _budget_stop_message(budget_spent)}
+
+    # The kept text replaces the streamed one (they differ after an escalation or
+    # a fallback or a budget stop), under the same message id.
+    if streamer.field.value:
+        emit_event(
+            "message.completed",
+            {"message_id": streamer.message_id, "by_agent": AGENT_NAME, "content": decision["user_message"]},
         )
-        decision, validation_error = _normalize_decision(raw_decision)
-    except Exception:
-        validation_error = "structured_output_exception"
-        decision = _fallback_decision(validation_error)
 
     state_update = {
-        "messages": AIMessage(content=decision["user_message"]),
+        "messages": AIMessage(id=streamer.message_id, content=decision["user_message"]),
         "by_agent": AGENT_NAME,
         "next_agent": None,
+        "delegate_agents": None,
+        "consult_agents": None,
         "iteration_count": iteration_count,
         "max_iterations": max_iterations,
         "loop_status": "running",
@@ -184,12 +418,19 @@ def maestro(state: AgentState):
 
     if decision["action"] == "delegate" and decision["target_agent"]:
         state_update["next_agent"] = decision["target_agent"]
+        state_update["delegate_agents"] = decision["target_agents"]
+        state_update["iteration_count"] = iteration_count + 1
+        state_update["activity_cursor_at_last_delegate"] = int(state.get("activity_count") or 0)
+    elif decision["action"] == "consult" and decision["consult_agents"]:
+        state_update["consult_agents"] = decision["consult_agents"]
         state_update["iteration_count"] = iteration_count + 1
-        state_update["history_cursor_at_last_delegate"] = len(state.get("history") or [])
+    elif budget_spent is not None:
+        state_update["loop_status"] = "guardrail_stop"
+        state_update["last_routing_error"] = f"budget_exhausted:{budget_spent}"
     else:
         state_update["loop_status"] = "stopped"
 
-    return state_update
+    return _with_budget(state_update, budget, budget_spent)
 
 
 subagents = [
@@ -199,6 +440,8 @@ subagents = [
     technical_lead,
 ]
 
+subagents_by_name = {subagent.name: subagent for subagent in subagents}
+
 normalized_subagent_map = {
     _normalize_agent_name(subagent.name): subagent.name for subagent in subagents
 }
@@ -220,21 +463,34 @@ Behavior
 - If delegation is not appropriate, provide a concise direct response.
 
 Delegation rules
-- Select one action: delegate, respond, or stop.
-- If delegating, choose exactly one specialist from the official roster.
+- Select one action: delegate, consult, respond, or stop.
+- If delegating, choose one specialist from the official roster as target_agent.
+- When the request needs edits from several specialists to different documents (e.g. "update the
+  GTM plan and the technical plan"), delegate to all of them at once with target_agents; they work
+  in parallel and each stages its own change set for the user to review.
+- Consult when the user wants several perspectives at once (e.g. "pressure-test this from every angle"):
+  the listed specialists answer in parallel, analysis only, without staging edits. You then see their
+  answers and can summarise, delegate one of them to make edits, or stop.
+- Do not consult again right after a consultation; summarise or delegate instead.
 - Refer to specialists only by exact roster names (exact casing).
 - Do not invent specialist names.
 
 Output contract
 - Return structured output with fields:
   - user_message: concise user-facing text
-  - action: "delegate", "respond", or "stop"
+  - action: "delegate", "consult", "respond", or "stop"
   - target_agent: specialist name when action is "delegate", otherwise null
+  - target_agents: list of specialist names when delegating to several in parallel, otherwise null
+  - consult_agents: list of specialist names when action is "consult", otherwise null
   - rationale: short internal reason for the action
+  - confidence: number from 0 to 1, how sure you are that the action and agents are right; use
+    a low value when the request is ambiguous or could fit several specialists
 
 Multi-agent orchestration constraints
-- Only one specialist should stage an edit at a time.
-- After a specialist stages edits, user approval is required before more staged edits.
+- Every staged edit needs user approval before it is applied.
+- Parallel specialists should work on different documents. Change sets are applied against the
+  latest version of each document: edits to separate sections are rebased automatically, and
+  overlapping edits come back as a conflict for the specialist to redo.
 
 # Specialist roster
 {subagents_descriptions}
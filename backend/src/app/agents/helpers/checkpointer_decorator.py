@@ -1,8 +1,5 @@
 from fastapi import Request
-from langgraph.checkpoint.postgres import PostgresSaver
-from app.db.checkpoint import checkpoint_db_url
-
-DB_URL = checkpoint_db_url()
+from app.db.checkpoint import open_checkpointer
 
 def checkpointer_route_decorator(func):
     """
@@ -14,7 +11,7 @@ def checkpointer_route_decorator(func):
     """
 
     async def wrapper(request: Request):
-        with PostgresSaver.from_conn_string(DB_URL) as checkpointer:
+        with open_checkpointer() as checkpointer:
             checkpointer.setup()
             request.state.checkpointer = checkpointer
             return await func(request)
@@ -0,0 +1,137 @@
+"""
+Speculative prefetch of a specialist's context during maestro routing.
+
+Each specialist's first model call usually starts with a `read_docs` round trip
+for the documents it owns. While maestro's decision is still streaming, maestro
+guesses the target (see `predict_agents`) and `prefetch_context` builds that
+specialist's "Prefetched context" prompt section in the background: the full
+bodies of its focus documents (loading them from Postgres in ref mode) and its
+still-cached recent searches. The specialist's prompt then includes the section,
+so it has no reason to read those documents first.
+
+A prefetch is keyed by (run, agent, focus doc versions). A wrong guess costs
+only the local work spent on it; a specialist with no usable prefetch builds the
+same section on demand. Nothing here calls a model.
+"""
+
+from __future__ import annotations
+
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Iterable, Mapping
+
+from app.agents.helpers.search_cache import search_cache
+from app.agents.state.doc_refs import load_docs
+from app.config import PREFETCH_MAX_DOC_CHARS, SPECULATIVE_PREFETCH
+from app.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+context_prefetch_total = registry.counter(
+    "context_prefetch_total",
+    "Specialist context prefetches by outcome: hit (prefetched in time for the specialist), "
+    "miss (built on demand) or wasted (prefetched for a specialist that did not run).",
+)
+
+PrefetchKey = tuple[str, tuple[tuple[str, int], ...]]
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="context-prefetch")
+_lock = Lock()
+# run_id -> (agent, focus doc versions) -> section; "used" holds the keys a specialist asked for.
+_prefetches: dict[str, dict[PrefetchKey, Future[str]]] = {}
+_used: dict[str, set[PrefetchKey]] = {}
+
+
+def predict_agents(text: str, roster: Iterable[str]) -> list[str]:
+    """Roster names mentioned in `text`, in order of first mention."""
+    lowered = text.lower()
+    positions = [(lowered.find(name.lower()), name) for name in roster]
+    return [name for position, name in sorted(positions) if position >= 0]
+
+
+def _key(state: Mapping, agent: str, focus_docs: Iterable[str]) -> PrefetchKey:
+    docs = state.get("docs") or {}
+    return agent, tuple((doc_id, int(docs[doc_id].get("version") or 0)) for doc_id in focus_docs if doc_id in docs)
+
+
+def build_context_section(state: Mapping, agent: str, focus_docs: Iterable[str]) -> str:
+    """The "Prefetched context" prompt section for `agent`, empty when there is nothing to add."""
+    docs = state.get("docs") or {}
+    doc_ids = [doc_id for doc_id in focus_docs if doc_id in docs]
+    parts: list[str] = []
+    for doc_id, doc in load_docs(state, doc_ids).items():
+        if len(doc["content"]) > PREFETCH_MAX_DOC_CHARS:
+            continue
+        parts.append(f"## {doc_id} ({doc['title']}, v{doc['version']})\n{doc['content'] or '(empty)'}\n")
+    for query, results in search_cache.recent_results(state["thread_id"], agent):
+        parts.append(f"## Search: {query}\n{results}\n")
+    if not parts:
+        return ""
+    return (
+        "\n# Prefetched context\n"
+        "Current full content of the documents you are most likely to work on, and results of your "
+        "recent searches. Do not call read_docs for these documents or repeat these searches.\n\n"
+        + "\n".join(parts)
+    )
+
+
+def prefetch_context(state: Mapping, agent: str, focus_docs: Iterable[str]) -> None:
+    """Start building `agent`'s context section in the background, unless already started."""
+    run_id = state.get("run_id")
+    if not SPECULATIVE_PREFETCH or not run_id:
+        return
+    focus_docs = tuple(focus_docs)
+    key = _key(state, agent, focus_docs)
+    snapshot = {"thread_id": state["thread_id"], "run_id": run_id, "docs": dict(state.get("docs") or {})}
+    with _lock:
+        prefetches = _prefetches.setdefault(run_id, {})
+        if key not in prefetches:
+            prefetches[key] = _executor.submit(build_context_section, snapshot, agent, focus_docs)
+
+
+def prefetched_context(state: Mapping, agent: str, focus_docs: Iterable[str]) -> str:
+    """
+    `agent`'s context section, from the prefetch when maestro guessed right and
+    built now otherwise. The result is kept for the rest of the run, so every
+    model call of the specialist sees the same prompt.
+    """
+    run_id = state.get("run_id")
+    if not SPECULATIVE_PREFETCH or not run_id:
+        return ""
+    focus_docs = tuple(focus_docs)
+    key = _key(state, agent, focus_docs)
+    with _lock:
+        future = _prefetches.get(run_id, {}).get(key)
+        first_use = key not in _used.setdefault(run_id, set())
+        _used[run_id].add(key)
+
+    if future is not None:
+        try:
+            section = future.result()
+            if first_use:
+                context_prefetch_total.inc(outcome="hit")
+            return section
+        except Exception:
+            logger.exception("Context prefetch for %s failed; building it now", agent)
+
+    section = build_context_section(state, agent, focus_docs)
+    if first_use:
+        context_prefetch_total.inc(outcome="miss")
+    done: Future[str] = Future()
+    done.set_result(section)
+    with _lock:
+        if run_id in _used:
+            _prefetches.setdefault(run_id, {})[key] = done
+    return section
+
+
+def release_run_prefetches(run_id: str) -> None:
+    """Drop a finished run's prefetches, counting the ones no specialist used."""
+    with _lock:
+        prefetches = _prefetches.pop(run_id, {})
+        used = _used.pop(run_id, set())
+    for key, future in prefetches.items():
+        if key not in used:
+            future.cancel()
+            context_prefetch_total.inc(outcome="wasted")
@@ -0,0 +1,104 @@
+"""
+Incremental extraction of one string field from a streamed JSON object.
+
+Structured output arrives as JSON text split across tokens. `JsonStringFieldStream`
+scans each token once and returns the decoded characters of a top-level string
+field as soon as they are known, so they can be shown while the rest of the
+object is still being generated. It is not a validator: the complete text is
+still parsed as usual once the model is done.
+"""
+
+from __future__ import annotations
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class JsonStringFieldStream:
+    def __init__(self, field: str):
+        self.field = field
+        self.value = ""
+        self.done = False
+
+        self._depth = 0
+        self._in_string = False
+        self._escape: str | None = None  # "" after a backslash, then the \u hex digits
+        self._high_surrogate: str | None = None
+        self._string = ""  # text of the string being read, unless it is the field value
+        self._last_string: str | None = None  # last depth-1 string, a key if ":" follows
+        self._key: str | None = None  # key whose value comes next
+        self._capturing = False
+
+    def feed(self, text: str) -> str:
+        """Consume the next chunk of JSON text; return what it added to the field value."""
+        if self.done:
+            return ""
+        added: list[str] = []
+        for char in text:
+            if self._in_string:
+                decoded = self._string_char(char)
+                if decoded is None:
+                    continue
+                if self._capturing:
+                    added.append(decoded)
+                elif self._depth == 1:
+                    self._string += decoded
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._capturing = self._depth == 1 and self._key == self.field
+                self._string = ""
+            elif char in "{[":
+                self._depth += 1
+                self._key = None
+            elif char in "}]":
+                self._depth -= 1
+            elif char == ":" and self._depth == 1:
+                self._key = self._last_string
+            elif char == ",":
+                self._key = None
+            elif not char.isspace() and self._depth == 1:
+                self._key = None  # a non-string value
+
+        value = "".join(added)
+        self.value += value
+        return value
+
+    def _string_char(self, char: str) -> str | None:
+        """Decoded text for `char` inside a string, None if it yields nothing (yet)."""
+        if self._escape is not None:
+            if self._escape == "" and char != "u":
+                self._escape = None
+                return self._with_surrogates(_ESCAPES.get(char, char))
+            self._escape += char
+            if len(self._escape) < 5:  # "u" + 4 hex digits
+                return None
+            code = int(self._escape[1:], 16)
+            self._escape = None
+            return self._with_surrogates(chr(code))
+
+        if char == "\\":
+            self._escape = ""
+            return None
+        if char == '"':
+            self._in_string = False
+            if self._capturing:
+                self._capturing = False
+                self.done = True
+            elif self._depth == 1:
+                self._last_string = self._string
+            self._key = None
+            return None
+        return self._with_surrogates(char)
+
+    def _with_surrogates(self, text: str) -> str | None:
+        # An escaped surrogate pair is one character; hold the first half.
+        if len(text) == 1 and 0xD800 <= ord(text) <= 0xDBFF:
+            self._high_surrogate = text
+            return None
+        if self._high_surrogate is not None:
+            high, self._high_surrogate = self._high_surrogate, None
+            if len(text) == 1 and 0xDC00 <= ord(text) <= 0xDFFF:
+                return (high + text).encode("utf-16", "surrogatepass").decode("utf-16")
+            return high + text
+        return text
@@ -0,0 +1,92 @@
+"""
+Process-local cache of web search results.
+
+`search_web` answers repeated queries from here instead of the network, and
+records which queries each specialist ran in a thread so the context prefetch
+can put that specialist's recent results straight into its next prompt. The
+prefetch only ever reads the cache: a miss there costs nothing.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+from threading import Lock
+from time import monotonic
+
+from app.config import PREFETCH_MAX_SEARCHES, SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_TTL_SECONDS
+from app.metrics import registry
+
+search_cache_lookups_total = registry.counter(
+    "search_cache_lookups_total",
+    "Web search cache lookups by result (hit, miss).",
+)
+
+# (thread, agent) pairs whose recent queries are remembered; the least recent is forgotten first.
+MAX_TRACKED_QUERY_LISTS = 1024
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class SearchCache:
+    """LRU of formatted results keyed by (normalized query, max_results), each valid for `ttl_seconds`."""
+
+    def __init__(self, *, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, int], tuple[float, str]] = OrderedDict()
+        self._recent: OrderedDict[tuple[str, str], deque[tuple[str, int]]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, query: str, max_results: int) -> str | None:
+        key = (_normalize_query(query), max_results)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        search_cache_lookups_total.inc(result="miss" if entry is None else "hit")
+        return None if entry is None else entry[1]
+
+    def put(self, query: str, max_results: int, results: str) -> None:
+        if self.max_entries <= 0:
+            return
+        key = (_normalize_query(query), max_results)
+        with self._lock:
+            self._entries[key] = (monotonic(), results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_query(self, thread_id: str, agent: str, query: str, max_results: int) -> None:
+        """Remember that `agent` ran `query` in `thread_id` (most recent last)."""
+        key = (thread_id, agent)
+        with self._lock:
+            queries = self._recent.get(key)
+            if queries is None:
+                queries = self._recent[key] = deque(maxlen=max(1, PREFETCH_MAX_SEARCHES))
+            self._recent.move_to_end(key)
+            entry = (_normalize_query(query), max_results)
+            if entry in queries:
+                queries.remove(entry)
+            queries.append(entry)
+            while len(self._recent) > MAX_TRACKED_QUERY_LISTS:
+                self._recent.popitem(last=False)
+
+    def recent_results(self, thread_id: str, agent: str) -> list[tuple[str, str]]:
+        """(query, results) for the agent's recent queries in the thread that are still cached, newest first."""
+        now = monotonic()
+        with self._lock:
+            queries = list(self._recent.get((thread_id, agent)) or ())
+            found: list[tuple[str, str]] = []
+            for key in reversed(queries):
+                entry = self._entries.get(key)
+                if entry is not None and now - entry[0] <= self.ttl_seconds:
+                    found.append((key[0], entry[1]))
+        return found
+
+
+search_cache = SearchCache(ttl_seconds=SEARCH_CACHE_TTL_SECONDS, max_entries=SEARCH_CACHE_MAX_ENTRIES)
@@ -0,0 +1,318 @@
+"""
+Admission control for model calls.
+
+Every open chat makes its model calls as soon as it needs them, so a spike of
+users runs into the provider's rate limits and every one of them degrades
+together. Calls are therefore admitted through a token bucket per model
+(LLM_RATE_LIMITS, in requests per minute); a call that finds the bucket empty
+waits in the model's queue, ordered by priority and then arrival:
+
+- `interactive`: a user is watching for this call right now: maestro's first
+  decision of a chat run and every call of an approval resume;
+- `background`: everything else (specialist tool loops, consultations, later
+  routing turns).
+
+A call is rejected at once with `LLMOverloadedError` instead of queueing when
+LLM_GOVERNOR_MAX_QUEUE calls already wait for its model, or when the calls ahead
+of it would take longer than LLM_GOVERNOR_MAX_WAIT_SECONDS to admit; `api_chat`
+checks the same before admitting a run and answers 429. Hedged requests never
+wait: without a spare token there is no hedge.
+
+With LLM_GOVERNOR_BACKEND=postgres the buckets live in `llm_rate_buckets` and
+are shared by every replica; each replica still orders its own waiters.
+
+The priority of a call comes from the run config (`configurable.llm_priority`,
+set per run in `graph_event_stream` and overridden by maestro's first turn).
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import math
+from collections.abc import Mapping
+from threading import Condition, Lock
+from time import monotonic
+
+from langchain_core.rate_limiters import BaseRateLimiter
+from langchain_core.runnables.config import ensure_config
+
+from app.config import (
+    LLM_DEFAULT_RPM,
+    LLM_GOVERNOR_BACKEND,
+    LLM_GOVERNOR_MAX_QUEUE,
+    LLM_GOVERNOR_MAX_WAIT_SECONDS,
+    LLM_RATE_LIMITS,
+)
+from app.metrics import registry
+from app.runs.cancellation import current_cancellation
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+PRIORITIES = (INTERACTIVE, BACKGROUND)
+
+# Burst size, in seconds of refill, for limits that do not set one.
+DEFAULT_BURST_SECONDS = 5.0
+# Longest a waiter sleeps before checking whether its run was cancelled.
+CANCEL_CHECK_SECONDS = 0.5
+
+queue_seconds = registry.histogram(
+    "llm_governor_queue_seconds",
+    "Time model calls waited for admission, by model and priority.",
+)
+admissions_total = registry.counter(
+    "llm_governor_admissions_total",
+    "Model call admission decisions by model, priority and outcome (admitted, rejected, "
+    "throttled: a hedge skipped for lack of a token).",
+)
+
+
+class LLMOverloadedError(RuntimeError):
+    """A model call was refused because its model's queue is too deep; retry after `retry_after`."""
+
+    status_code = 429
+
+    def __init__(self, model: str, retry_after: float):
+        super().__init__(f"Too many requests waiting for {model}; try again in {math.ceil(retry_after)}s")
+        self.model = model
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """In-process bucket; taken outside its queue's lock, so it has its own."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._refilled_at = monotonic()
+        self._lock = Lock()
+
+    def take(self) -> float:
+        """Take a token: 0 when taken, otherwise the seconds until one is due."""
+        with self._lock:
+            now = monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+            self._refilled_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+class PostgresTokenBucket(TokenBucket):
+    """
+    Bucket shared by every replica; falls back to this replica's own bucket if the database fails.
+
+    Takes go through one connection held for the bucket's lifetime (reopened after a
+    failure) rather than a new one per take: the queue's head polls it while it waits.
+    """
+
+    def __init__(self, model: str, rate: float, burst: float):
+        super().__init__(rate, burst)
+        self.model = model
+        self._conn = None
+        self._conn_lock = Lock()
+
+    def take(self) -> float:
+        from app.db.get_conn_factory import conn_factory
+        from app.db.llm_rate_repository import take_llm_rate_token
+
+        with self._conn_lock:
+            try:
+                if self._conn is None or self._conn.closed:
+                    self._conn = conn_factory()
+                return take_llm_rate_token(self._conn, self.model, rate=self.rate, burst=self.burst)
+            except Exception:
+                logger.warning("Shared LLM rate bucket for %s unavailable; using the local one", self.model, exc_info=True)
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+        return super().take()
+
+
+class ModelQueue:
+    """Waiters for one model's bucket, served by priority, then in arrival order."""
+
+    def __init__(self, model: str, bucket: TokenBucket):
+        self.model = model
+        self.bucket = bucket
+        self._waiters: list[tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._condition = Condition()
+
+    def _ahead(self, rank: int) -> int:
+        return sum(1 for waiter_rank, _ in self._waiters if waiter_rank <= rank)
+
+    def _rejection(self, rank: int) -> float | None:
+        if len(self._waiters) >= LLM_GOVERNOR_MAX_QUEUE:
+            return max(1.0, len(self._waiters) / self.bucket.rate)
+        wait = self._ahead(rank) / self.bucket.rate
+        return wait if wait > LLM_GOVERNOR_MAX_WAIT_SECONDS else None
+
+    def retry_after(self, priority: str) -> float | None:
+        """Seconds until a call of `priority` could be admitted, when it would be rejected now."""
+        with self._condition:
+            return self._rejection(PRIORITIES.index(priority))
+
+    def try_acquire(self) -> bool:
+        with self._condition:
+            if self._waiters:
+                return False
+        return self.bucket.take() == 0
+
+    def acquire(self, priority: str) -> None:
+        rank = PRIORITIES.index(priority)
+        cancellation = current_cancellation()
+        started = monotonic()
+        with self._condition:
+            retry_after = self._rejection(rank)
+            if retry_after is not None:
+                admissions_total.inc(model=self.model, priority=priority, outcome="rejected")
+                raise LLMOverloadedError(self.model, retry_after)
+
+            entry = (rank, next(self._sequence))
+            heapq.heappush(self._waiters, entry)
+        deadline = started + LLM_GOVERNOR_MAX_WAIT_SECONDS
+        try:
+            while True:
+                remaining = deadline - monotonic()
+                with self._condition:
+                    is_head = self._waiters[0] == entry
+                # Only the head takes, and outside the lock: a shared bucket is a
+                # database round trip that `retry_after` and the other waiters
+                # must not queue behind.
+                if is_head:
+                    wait = self.bucket.take()
+                    if wait == 0:
+                        break
+                else:
+                    wait = remaining
+                if remaining <= 0:
+                    # Overtaken by higher-priority calls for too long.
+                    admissions_total.inc(model=self.model, priority=priority, outcome="rejected")
+                    with self._condition:
+                        ahead = self._ahead(rank)
+                    raise LLMOverloadedError(self.model, ahead / self.bucket.rate or 1.0)
+                if cancellation is not None:
+                    cancellation.raise_if_cancelled()
+                with self._condition:
+                    # Skip the wait if the head changed since we looked.
+                    if (self._waiters[0] == entry) == is_head:
+                        self._condition.wait(min(wait, remaining, CANCEL_CHECK_SECONDS))
+        finally:
+            with self._condition:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+        queue_seconds.observe(monotonic() - started, model=self.model, priority=priority)
+        admissions_total.inc(model=self.model, priority=priority, outcome="admitted")
+
+    def depth(self) -> dict[str, int]:
+        with self._condition:
+            counts = dict.fromkeys(PRIORITIES, 0)
+            for rank, _ in self._waiters:
+                counts[PRIORITIES[rank]] += 1
+            return counts
+
+
+def _limit(model: str) -> tuple[float, float] | None:
+    """(tokens per second, burst) for `model`, None when it is unlimited."""
+    settings = LLM_RATE_LIMITS.get(model)
+    rpm = settings.get("rpm") if isinstance(settings, Mapping) else None
+    rpm = float(rpm) if isinstance(rpm, (int, float)) and not isinstance(rpm, bool) else LLM_DEFAULT_RPM
+    if rpm <= 0:
+        return None
+    rate = rpm / 60
+    burst = settings.get("burst") if isinstance(settings, Mapping) else None
+    if not isinstance(burst, (int, float)) or isinstance(burst, bool) or burst < 1:
+        burst = max(1.0, rate * DEFAULT_BURST_SECONDS)
+    return rate, float(burst)
+
+
+_queues_lock = Lock()
+_queues: dict[str, ModelQueue | None] = {}
+
+
+def model_queue(model: str) -> ModelQueue | None:
+    """The admission queue for `model`, None when the model is not rate limited."""
+    with _queues_lock:
+        if model not in _queues:
+            limit = _limit(model)
+            if limit is None:
+                _queues[model] = None
+            elif LLM_GOVERNOR_BACKEND == "postgres":
+                _queues[model] = ModelQueue(model, PostgresTokenBucket(model, *limit))
+            elif LLM_GOVERNOR_BACKEND == "local":
+                _queues[model] = ModelQueue(model, TokenBucket(*limit))
+            else:
+                raise RuntimeError(f"Unknown LLM_GOVERNOR_BACKEND: {LLM_GOVERNOR_BACKEND!r}")
+        return _queues[model]
+
+
+def current_priority() -> str:
+    """The running call's priority from the run config; background outside a run."""
+    priority = ensure_config().get("configurable", {}).get("llm_priority")
+    return priority if priority in PRIORITIES else BACKGROUND
+
+
+def acquire(model: str, priority: str | None = None) -> None:
+    """Wait until a call to `model` is admitted; raises `LLMOverloadedError` when it would wait too long."""
+    queue = model_queue(model)
+    if queue is not None:
+        queue.acquire(priority or current_priority())
+
+
+def try_acquire(model: str, priority: str | None = None) -> bool:
+    """Admit a call to `model` only if it need not wait (for hedges)."""
+    queue = model_queue(model)
+    if queue is None:
+        return True
+    if queue.try_acquire():
+        admissions_total.inc(model=model, priority=priority or current_priority(), outcome="admitted")
+        return True
+    admissions_total.inc(model=model, priority=priority or current_priority(), outcome="throttled")
+    return False
+
+
+def retry_after(model: str, priority: str = INTERACTIVE) -> float | None:
+    """Seconds to wait before calling `model` when a call of `priority` would be rejected now."""
+    queue = model_queue(model)
+    return None if queue is None else queue.retry_after(priority)
+
+
+class GovernedRateLimiter(BaseRateLimiter):
+    """Admits a plain chat model's calls through the governor (LLM_RESILIENCE off)."""
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        if not blocking:
+            return try_acquire(self.model)
+        acquire(self.model)
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        return self.acquire(blocking=blocking)
+
+
+def _queue_depths() -> dict:
+    with _queues_lock:
+        queues = [queue for queue in _queues.values() if queue is not None]
+    return {
+        (("model", queue.model), ("priority", priority)): float(count)
+        for queue in queues
+        for priority, count in queue.depth().items()
+    }
+
+
+registry.gauge(
+    "llm_governor_queue_depth",
+    "Model calls waiting for admission, by model and priority.",
+    callback=_queue_depths,
+)
@@ -0,0 +1,158 @@
+"""
+Chat models for the maestro and the specialists.
+
+Agents get their model from `get_chat_model(agent, model)` instead of constructing
+one inline, so the model is chosen in one place. `CHAT_MODEL_FACTORY` can point at
+a "module:callable" that takes the agent and model names and returns a chat model;
+the benchmarks use it to run the real workflow against a local fake model.
+
+Models are tiered. `agent_models` gives an agent's cascade, cheapest first: maestro
+routes with a small model and escalates to a large one (see `maestro`), the
+specialists use the first model of theirs. A thread's `model_settings`, passed in
+the run config, take precedence over AGENT_MODELS, which take precedence over the
+ROUTING_MODELS / SPECIALIST_MODELS defaults.
+
+With LLM_RESILIENCE on, the model is a `ResilientChatModel` racing the model and
+its LLM_FAILOVER candidates, possibly on other OpenAI-compatible providers
+(LLM_PROVIDERS); see `resilient_chat_model`. Either way its calls are admitted
+through the per-model rate limits of `llm_governor`.
+"""
+
+from __future__ import annotations
+
+import importlib
+import os
+from functools import lru_cache
+from typing import Any, Callable, Mapping
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables.config import ensure_config
+
+from app.agents.llm_governor import GovernedRateLimiter
+from app.agents.resilient_chat_model import Candidate, ResilientChatModel
+from app.config import (
+    AGENT_MODELS,
+    ALLOWED_MODELS,
+    CHAT_MODEL_FACTORY,
+    LLM_FAILOVER,
+    LLM_MAX_OUTPUT_TOKENS,
+    LLM_PROVIDERS,
+    LLM_RESILIENCE,
+    ROUTING_MIN_CONFIDENCE,
+    ROUTING_MODELS,
+    SPECIALIST_MODELS,
+)
+
+ROUTING_AGENT = "maestro"
+DEFAULT_PROVIDER = "openai"
+
+ChatModelFactory = Callable[[str, str], BaseChatModel]
+
+
+@lru_cache(maxsize=1)
+def _configured_factory() -> ChatModelFactory | None:
+    if not CHAT_MODEL_FACTORY:
+        return None
+    module_name, _, attribute = CHAT_MODEL_FACTORY.partition(":")
+    if not attribute:
+        raise RuntimeError(f"CHAT_MODEL_FACTORY must be 'module:callable', got {CHAT_MODEL_FACTORY!r}")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def _as_cascade(value: Any) -> list[str]:
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    return [name.strip() for name in value if isinstance(name, str) and name.strip()]
+
+
+def current_model_settings() -> Mapping[str, Any]:
+    """The running thread's `model_settings` from the run config, empty outside a run."""
+    settings = ensure_config().get("configurable", {}).get("model_settings")
+    return settings if isinstance(settings, Mapping) else {}
+
+
+def agent_models(agent: str, settings: Mapping[str, Any] | None = None) -> list[str]:
+    """`agent`'s model cascade, cheapest first: thread settings, then AGENT_MODELS, then its tier."""
+    for overrides in ((settings or {}).get("models"), AGENT_MODELS):
+        if isinstance(overrides, Mapping):
+            models = _as_cascade(overrides.get(agent))
+            if models:
+                return models
+    return list(ROUTING_MODELS if agent == ROUTING_AGENT else SPECIALIST_MODELS)
+
+
+def allowed_models() -> set[str]:
+    """Models a thread's `model_settings` may name: ALLOWED_MODELS, else every configured model."""
+    if ALLOWED_MODELS:
+        return set(ALLOWED_MODELS)
+    configured = {*ROUTING_MODELS, *SPECIALIST_MODELS, *LLM_MAX_OUTPUT_TOKENS}
+    for cascade in AGENT_MODELS.values():
+        configured.update(_as_cascade(cascade))
+    return configured
+
+
+def routing_min_confidence(settings: Mapping[str, Any] | None = None) -> float:
+    value = (settings or {}).get("routing_min_confidence")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return ROUTING_MIN_CONFIDENCE
+
+
+def failover_candidates(model: str) -> list[tuple[str, str]]:
+    """(provider, model) pairs tried after `model` fails, from LLM_FAILOVER."""
+    candidates = []
+    for spec in LLM_FAILOVER.get(model) or []:
+        if isinstance(spec, str):
+            candidates.append((DEFAULT_PROVIDER, spec))
+        elif isinstance(spec, Mapping) and spec.get("model"):
+            candidates.append((spec.get("provider") or DEFAULT_PROVIDER, spec["model"]))
+    return candidates
+
+
+def _build_model(agent: str, provider: str, model: str, *, max_retries: int | None) -> BaseChatModel:
+    factory = _configured_factory()
+    if factory is not None:
+        return factory(agent, model)
+    # Imported here: the OpenAI client is one of the slowest imports in the app.
+    from langchain_openai import ChatOpenAI
+
+    retries = {} if max_retries is None else {"max_retries": max_retries}
+    if provider == DEFAULT_PROVIDER:
+        # Requests with the same key are routed to the same prompt cache; one per agent,
+        # since each agent's prompts share its static prefix.
+        return ChatOpenAI(
+            model=model,
+            model_kwargs={"prompt_cache_key": f"idea-maestro:{agent}"},
+            **retries,
+        )
+    settings = LLM_PROVIDERS.get(provider)
+    if not isinstance(settings, Mapping) or not settings.get("base_url"):
+        raise RuntimeError(f"LLM provider {provider!r} needs a base_url in LLM_PROVIDERS")
+    api_key_env = settings.get("api_key_env")
+    return ChatOpenAI(
+        model=model,
+        base_url=settings["base_url"],
+        api_key=os.environ[api_key_env] if api_key_env else None,
+        **retries,
+    )
+
+
+@lru_cache(maxsize=64)
+def get_chat_model(agent: str, model: str | None = None) -> BaseChatModel:
+    """The chat model `agent` uses with `model`, by default the first of its configured cascade."""
+    model = model or agent_models(agent)[0]
+    if not LLM_RESILIENCE:
+        chat_model = _build_model(agent, DEFAULT_PROVIDER, model, max_retries=None)
+        return chat_model.model_copy(update={"rate_limiter": GovernedRateLimiter(model)})
+
+    candidates = [(DEFAULT_PROVIDER, model), *failover_candidates(model)]
+    # With somewhere to fail over to, the client's own retries would only delay it.
+    max_retries = 0 if len(candidates) > 1 else None
+    return ResilientChatModel(
+        candidates=[
+            Candidate(provider, name, _build_model(agent, provider, name, max_retries=max_retries))
+            for provider, name in candidates
+        ]
+    )
@@ -1,20 +1,37 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from difflib import unified_diff
+import logging
 import uuid
 
 from langgraph.types import Command, interrupt
 
 from app.agents.helpers.emit_event import emit_event
+from app.agents.state.doc_refs import (
+    load_change_set_edits,
+    load_docs,
+    to_change_set_edits,
+    to_state_docs,
+    use_doc_refs,
+)
 from app.agents.state.types import AgentState, ChangeSet, StagedEdit, Doc
+from app.config import DIFF_TIME_BUDGET_SECONDS
 from app.db.changeset_repository import (
     append_changeset_review,
     create_changeset,
     set_changeset_status,
 )
+from app.db.fetch_doc_bodies import fetch_changeset_bases
+from app.db.fetch_thread_docs import fetch_thread_doc
 from app.db.get_conn_factory import conn_factory
-from app.db.persist_docs_to_db import persist_docs_to_db
+from app.db.persist_docs_to_db import DocVersionConflictError, persist_docs_to_db
+from app.diff.engine import compute_diff
+from app.diff.merge import merge3
+
+logger = logging.getLogger(__name__)
+
+# Read-rebase-write rounds before giving up on a doc that keeps moving.
+APPLY_ATTEMPTS = 5
 
 
 def _now_iso() -> str:
@@ -32,26 +49,33 @@ def build_changeset_node(state: AgentState) -> dict:
 
     diffs: dict[str, str] = {}
     finalized_edits: list[StagedEdit] = []
-    persisted_docs: list[dict[str, str]] = []
+    persisted_docs: list[dict[str, object]] = []
+    known_doc_ids = [doc_id for doc_id in latest_by_doc if doc_id in (state.get("docs") or {})]
+    current_docs = load_docs(state, known_doc_ids)
 
     for doc_id, new_content in latest_by_doc.items():
-        old_content = state.get("docs", {}).get(doc_id, {}).get("content", "")
-        diff = "".join(
-            unified_diff(
-                old_content.splitlines(keepends=True),
-                new_content.splitlines(keepends=True),
-                fromfile=f"a/{doc_id}",
-                tofile=f"b/{doc_id}",
-            )
+        current_doc = current_docs.get(doc_id, {})
+        old_content = current_doc.get("content", "")
+        diff = compute_diff(
+            old_content,
+            new_content,
+            fromfile=f"a/{doc_id}",
+            tofile=f"b/{doc_id}",
+            time_budget_seconds=DIFF_TIME_BUDGET_SECONDS,
         )
-        diffs[doc_id] = diff
+        diffs[doc_id] = diff.text
         finalized_edits.append({"doc_id": doc_id, "new_content": new_content})
         persisted_docs.append(
             {
                 "doc_id": doc_id,
                 "before_content": old_content,
                 "after_content": new_content,
-                "diff": diff,
+                "diff": diff.text,
+                "hunks": diff.hunks,
+                "lines_added": diff.lines_added,
+                "lines_removed": diff.lines_removed,
+                # Checked against the stored version when the change set is applied.
+                "base_version": current_doc.get("version"),
             }
         )
 
@@ -62,8 +86,13 @@ def build_changeset_node(state: AgentState) -> dict:
         "created_by": created_by,
         "created_at": _now_iso(),
         "summary": state.get("staged_edits_summary", ""),
-        "edits": finalized_edits,
-        "diffs": diffs,
+        "edits": to_change_set_edits(
+            finalized_edits,
+            thread_id=state["thread_id"],
+            run_id=state["run_id"],
+        ),
+        # In ref mode diffs live only in change_set_docs.
+        "diffs": {} if use_doc_refs() else diffs,
         "status": "pending",
     }
 
@@ -107,7 +136,7 @@ def await_approval_node(state: AgentState):
             "change_set": {
                 "change_set_id": cs["change_set_id"],
                 "summary": cs["summary"],
-                "diffs": cs["diffs"],
+                "diffs": cs.get("diffs") or {},
                 "docs": [e["doc_id"] for e in cs["edits"]],
             },
         }
@@ -164,39 +193,138 @@ def await_approval_node(state: AgentState):
     return Command(goto="reject_changeset")
 
 
+def _plan_apply(
+    edits: list[StagedEdit],
+    stored: dict[str, dict],
+    bases: dict[str, tuple[int | None, str]],
+) -> tuple[dict[str, str], list[str], list[dict]]:
+    """
+    New content per doc for an apply against the `stored` docs: the change set's
+    content where a doc is still at its base version, a rebase of its edits onto
+    the stored content where it moved on. Returns (contents, rebased, conflicts).
+    """
+    contents: dict[str, str] = {}
+    rebased: list[str] = []
+    conflicts: list[dict] = []
+    for edit in edits:
+        doc_id = edit["doc_id"]
+        current = stored.get(doc_id)
+        if not current:
+            continue
+        base_version, base_content = bases.get(doc_id, (None, current["content"]))
+        if current["version"] == base_version or current["content"] == base_content:
+            contents[doc_id] = edit["new_content"]
+            continue
+
+        merge = merge3(
+            base_content,
+            current["content"],
+            edit["new_content"],
+            time_budget_seconds=DIFF_TIME_BUDGET_SECONDS,
+        )
+        if not merge.clean:
+            conflicts.append(
+                {
+                    "doc_id": doc_id,
+                    "base_version": base_version,
+                    "current_version": current["version"],
+                    "hunks": merge.conflicts,
+                }
+            )
+            continue
+        contents[doc_id] = merge.content
+        rebased.append(doc_id)
+    return contents, rebased, conflicts
+
+
 def apply_changeset_node(state: AgentState) -> dict:
+    """
+    Write an approved change set with a compare-and-swap on each doc's version.
+
+    Docs edited since the change set was built get its edits rebased on top when
+    they do not overlap. If any doc conflicts nothing is written: the change set
+    is marked `conflict` and state picks up the stored docs, so the next turn
+    works on current content.
+    """
     cs = state.get("pending_change_set")
     if not cs:
         return {}
 
-    updates: dict[str, Doc] = {}
-    docs = state.get("docs", {})
-    for edit in cs["edits"]:
-        doc_id = edit["doc_id"]
-        old = docs.get(doc_id)
-        if not old:
-            continue
-
-        new_doc = dict(old)
-        new_doc["content"] = edit["new_content"]
-        new_doc["description"] = cs.get("summary", "")
-        new_doc["updated_by"] = cs.get("created_by", "agent")
-        new_doc["updated_at"] = _now_iso()
-        new_doc["version"] = int(old.get("version", 1)) + 1
-        updates[doc_id] = new_doc
-
     thread_id = state.get("thread_id")
     if not thread_id:
         raise ValueError("thread_id is required")
 
-    with conn_factory() as conn:
-        persist_docs_to_db(
-            conn,
-            thread_id,
-            updates,
-            change_set_id=cs["change_set_id"],
-            summary=cs.get("summary", ""),
+    edits = load_change_set_edits(cs, thread_id=thread_id, run_id=state["run_id"])
+    doc_ids = [edit["doc_id"] for edit in edits]
+
+    updates: dict[str, Doc] = {}
+    rebased: list[str] = []
+    conflicts: list[dict] = []
+    for _ in range(APPLY_ATTEMPTS):
+        with conn_factory() as conn:
+            bases = fetch_changeset_bases(conn, cs["change_set_id"])
+            stored = {doc_id: fetch_thread_doc(conn, thread_id, doc_id) for doc_id in doc_ids}
+        stored = {doc_id: row for doc_id, row in stored.items() if row}
+
+        contents, rebased, conflicts = _plan_apply(edits, stored, bases)
+        if conflicts:
+            break
+
+        updates = {}
+        for doc_id, content in contents.items():
+            current = stored[doc_id]
+            updates[doc_id] = {
+                "title": current["title"],
+                "content": content,
+                "description": cs.get("summary", ""),
+                "version": current["version"] + (1 if content != current["content"] else 0),
+                "updated_by": cs.get("created_by", "agent"),
+                "updated_at": _now_iso(),
+            }
+        if not updates:
+            break
+        try:
+            with conn_factory() as conn:
+                persist_docs_to_db(
+                    conn,
+                    thread_id,
+                    updates,
+                    change_set_id=cs["change_set_id"],
+                    summary=cs.get("summary", ""),
+                    expected_versions={doc_id: stored[doc_id]["version"] for doc_id in updates},
+                )
+            break
+        except DocVersionConflictError as exc:
+            # Another change set landed between our read and write: re-read and rebase again.
+            logger.info("Change set %s raced on %s; retrying", cs["change_set_id"], exc.doc_id)
+            updates = {}
+    else:
+        conflicts = [{"doc_id": doc_id, "reason": "concurrent_updates"} for doc_id in doc_ids]
+
+    if conflicts:
+        set_changeset_status(cs["change_set_id"], status="conflict", decided=True)
+        emit_event(
+            "changeset.conflict",
+            {
+                "change_set_id": cs["change_set_id"],
+                "docs": conflicts,
+            },
         )
+        refreshed = {
+            doc_id: {
+                "title": row["title"],
+                "content": row["content"],
+                "description": row["description"],
+                "version": row["version"],
+                "updated_by": row["updated_by"],
+                "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
+            }
+            for doc_id, row in stored.items()
+        }
+        return {
+            "docs": to_state_docs(refreshed, thread_id=thread_id, run_id=state["run_id"]),
+            "pending_change_set": None,
+        }
 
     set_changeset_status(cs["change_set_id"], status="applied", decided=True)
 
@@ -205,14 +333,12 @@ def apply_changeset_node(state: AgentState) -> dict:
         {
             "change_set_id": cs["change_set_id"],
             "docs": list(updates.keys()),
+            "rebased": rebased,
         },
     )
 
-    merged_docs = dict(docs)
-    merged_docs.update(updates)
-
     return {
-        "docs": merged_docs,
+        "docs": to_state_docs(updates, thread_id=thread_id, run_id=state["run_id"]),
         "pending_change_set": None,
     }
 
@@ -0,0 +1,147 @@
+"""
+Parallel, analysis-only specialist consultations.
+
+When maestro picks the `consult` action, `consultation_sends` fans out one
+`consult` task per specialist (LangGraph `Send`); they run in the same superstep,
+at most MAX_PARALLEL_CONSULTATIONS at a time per run. Each task runs the
+specialist's consultant (no `stage_edits`) and appends a `Consultation`.
+`merge_consultations_node` runs once all of them are done: it turns the results
+into messages in the order maestro listed the specialists, whatever order they
+finished in, persists them and hands back to maestro.
+"""
+
+from __future__ import annotations
+
+import logging
+import uuid
+from threading import BoundedSemaphore, Lock
+from typing import Any, Callable, TypedDict
+from weakref import WeakValueDictionary
+
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.runnables import Runnable
+from langgraph.errors import GraphBubbleUp
+from langgraph.types import Send
+from psycopg import errors as psycopg_errors
+
+from app.agents.helpers.emit_event import emit_event
+from app.agents.state.types import AgentState, Consultation, Doc, DocRef
+from app.config import MAX_PARALLEL_CONSULTATIONS
+from app.db.get_conn_factory import conn_factory
+from app.db.lc_message_to_row import lc_message_to_row
+from app.db.persist_messages_to_db import persist_messages_to_db
+from app.runs.cancellation import RunCancelledError
+
+logger = logging.getLogger(__name__)
+
+CONSULT_NODE = "consult"
+MERGE_CONSULTATIONS_NODE = "merge_consultations"
+
+
+# Per-run consultation slots. Not the run config's `max_concurrency`: that is
+# inherited by every nested runnable (consultant graphs, tool nodes) and would
+# starve them. Entries disappear once no consult task of the run holds them.
+_slots_lock = Lock()
+_run_slots: WeakValueDictionary[str, BoundedSemaphore] = WeakValueDictionary()
+
+
+def _consultation_slots(run_id: str) -> BoundedSemaphore:
+    with _slots_lock:
+        slots = _run_slots.get(run_id)
+        if slots is None:
+            slots = BoundedSemaphore(max(1, MAX_PARALLEL_CONSULTATIONS))
+            _run_slots[run_id] = slots
+        return slots
+
+
+class ConsultInput(TypedDict):
+    consult_agent: str
+    thread_id: str
+    run_id: str
+    messages: list[BaseMessage]
+    docs: dict[str, Doc | DocRef]
+    docs_summary: dict[str, str]
+
+
+def consultation_sends(state: AgentState, agents: list[str]) -> list[Send]:
+    """One `consult` task per agent, carrying only what a consultant reads."""
+    shared = {
+        "thread_id": state["thread_id"],
+        "run_id": state.get("run_id"),
+        "messages": state.get("messages") or [],
+        "docs": state.get("docs") or {},
+        "docs_summary": state.get("docs_summary") or {},
+    }
+    return [Send(CONSULT_NODE, {**shared, "consult_agent": agent}) for agent in agents]
+
+
+def _final_text(messages: list[Any]) -> str:
+    for message in reversed(messages):
+        if isinstance(message, AIMessage) and not message.tool_calls:
+            return message.text.strip()
+    return ""
+
+
+def build_consult_node(consultants: dict[str, Runnable]) -> Callable[[ConsultInput], dict]:
+    def consult_node(state: ConsultInput) -> dict:
+        agent = state["consult_agent"]
+        consultant_input = {key: value for key, value in state.items() if key != "consult_agent"}
+        with _consultation_slots(state["run_id"]):
+            emit_event("consultation.started", {"agent": agent})
+            try:
+                result = consultants[agent].invoke(consultant_input)
+                content = _final_text(result.get("messages") or [])
+                status = "ok" if content else "error"
+            except (GraphBubbleUp, RunCancelledError):
+                raise
+            except Exception:
+                # One failing specialist must not sink the others' answers.
+                logger.exception("Consultation with %s failed", agent)
+                content, status = "", "error"
+        if status == "error":
+            content = content or f"{agent} could not be consulted this time."
+        emit_event("consultation.completed", {"agent": agent, "status": status})
+        consultation: Consultation = {"agent": agent, "content": content, "status": status}
+        return {"consultations": [consultation]}
+
+    return consult_node
+
+
+def _consultation_message_id(run_id: str, iteration: int, agent: str) -> str:
+    # Stable across retries of the merge node, so re-persisting is a no-op.
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"consultation:{run_id}:{iteration}:{agent}"))
+
+
+def merge_consultations_node(state: AgentState) -> dict:
+    requested = state.get("consult_agents") or []
+    position = {agent: index for index, agent in enumerate(requested)}
+    consultations = sorted(
+        state.get("consultations") or [],
+        key=lambda consultation: position.get(consultation["agent"], len(position)),
+    )
+
+    run_id = state.get("run_id") or ""
+    iteration = int(state.get("iteration_count") or 0)
+    messages = [
+        AIMessage(
+            id=_consultation_message_id(run_id, iteration, consultation["agent"]),
+            content=consultation["content"],
+            name=consultation["agent"],
+        )
+        for consultation in consultations
+    ]
+
+    if messages:
+        rows = [lc_message_to_row(message, message.name) for message in messages]
+        try:
+            with conn_factory() as conn:
+                persist_messages_to_db(conn, state["thread_id"], rows, run_id=run_id or None)
+        except psycopg_errors.UniqueViolation:
+            # Already persisted by an earlier attempt of this node.
+            pass
+
+    return {
+        "messages": messages,
+        "consultations": None,
+        "consult_agents": None,
+    }
@@ -0,0 +1,39 @@
+"""
+Prompt assembly that keeps provider prompt caches warm.
+
+Providers reuse the longest prefix of a request they have already seen: tool
+schemas, then the messages in order. A system prompt that embeds volatile text,
+such as the prefetched documents that change with every applied change set, turns
+everything after it, i.e. the whole conversation, into a cache miss.
+
+`cache_friendly_prompt` sends the static prompt (persona, personality guidance,
+shared documents) as the system message, the same bytes on every call, then the
+conversation, and appends the volatile context as a last system message. Each
+call then reuses the previous call's prompt up to that context: the next step
+of a specialist's tool loop, or its next turn in the thread, pays prefill only
+for the new messages and the context itself.
+"""
+
+from __future__ import annotations
+
+from typing import Callable
+
+from langchain.agents.middleware.types import AgentMiddleware, ModelRequest, wrap_model_call
+from langchain_core.messages import SystemMessage
+
+
+def cache_friendly_prompt(
+    static_prompt: str,
+    build_context: Callable[[ModelRequest], str],
+) -> AgentMiddleware:
+    system_message = SystemMessage(content=static_prompt)
+
+    @wrap_model_call
+    def cache_friendly_prompt_middleware(request: ModelRequest, handler):
+        messages = list(request.messages)
+        context = build_context(request)
+        if context:
+            messages.append(SystemMessage(content=context))
+        return handler(request.override(system_message=system_message, messages=messages))
+
+    return cache_friendly_prompt_middleware
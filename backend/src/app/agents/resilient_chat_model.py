@@ -0,0 +1,434 @@
+"""
+Hedged, failover-capable model calls.
+
+A provider now and then takes tens of seconds to send the first chunk of a
+response, and the run's event stream stalls with it. `get_chat_model` therefore
+wraps each agent's model and its failover candidates (LLM_FAILOVER) in a
+`ResilientChatModel`, which streams every call through a race:
+
+- the request goes to the first candidate whose provider's circuit breaker lets
+  it through, once the governor admits a call to its model (see `llm_governor`;
+  a candidate whose queue is too deep is skipped like an open circuit);
+- when no chunk has arrived after the model's hedge delay (LLM_HEDGE_PERCENTILE
+  of its recent first-chunk latencies), a duplicate request is sent to the same
+  model, unless too many recent calls were already hedged or the model has no
+  spare rate-limit token;
+- on an error, or no chunk within LLM_FIRST_CHUNK_TIMEOUT_SECONDS, the next
+  candidate is tried;
+- the first request to produce a chunk wins and the others are cancelled: their
+  streams are closed as soon as they hand back control (a request still waiting
+  for its first byte is abandoned to its client timeout).
+
+Only the winner's chunks go through this model's callbacks, so message
+streaming, spans and token counts see a single call. Once a chunk has been
+streamed the call is committed: a later error, or LLM_CHUNK_IDLE_TIMEOUT_SECONDS
+without a chunk, fails it. Cancelling the run fails it at once, whether it is
+waiting for a first chunk or streaming.
+
+Every request is sent with what is left of the run's budget as its timeout and,
+once that is below the candidate model's output limit, `max_tokens` (see
+`run_budget.request_limits`); a caller's own values take precedence.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import deque
+from dataclasses import dataclass, replace
+from queue import Empty, Queue
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import Any, Iterator
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.language_models.chat_models import generate_from_stream
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable, RunnableSequence
+from pydantic import ConfigDict
+
+from app.config import (
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET_SECONDS,
+    LLM_CHUNK_IDLE_TIMEOUT_SECONDS,
+    LLM_FIRST_CHUNK_TIMEOUT_SECONDS,
+    LLM_HEDGE_MAX_DELAY_SECONDS,
+    LLM_HEDGE_MAX_SHARE,
+    LLM_HEDGE_MIN_DELAY_SECONDS,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGING,
+)
+from app.agents import llm_governor, run_budget
+from app.agents.llm_governor import LLMOverloadedError
+from app.metrics import registry
+from app.runs.cancellation import current_cancellation
+
+logger = logging.getLogger(__name__)
+
+llm_requests_total = registry.counter(
+    "llm_requests_total",
+    "Model requests sent by the resilience layer, by provider, model, kind (primary, hedge, "
+    "failover) and outcome (won, lost, error, timeout, circuit_open, rejected, cancelled).",
+)
+llm_circuit_open = registry.gauge(
+    "llm_circuit_open",
+    "1 while a provider's circuit breaker is open (its requests fail over without being sent).",
+)
+
+# Recent calls per model kept for the hedge delay and the hedged share.
+LATENCY_WINDOW = 200
+# HTTP statuses that mean the request itself is wrong: another provider would refuse it too.
+REQUEST_ERROR_STATUSES = frozenset({400, 413, 422})
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed, then open (fail fast), then half-open (one trial request)."""
+
+    def __init__(self, provider: str, *, failures: int, reset_seconds: float):
+        self.provider = provider
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self._consecutive_failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self._lock = Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_in_flight or monotonic() - self._opened_at < self.reset_seconds:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+        llm_circuit_open.set(0, provider=self.provider)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is None and self._consecutive_failures < self.failures:
+                return
+            if self._opened_at is None:
+                logger.warning("Circuit breaker for LLM provider %s opened", self.provider)
+            self._opened_at = monotonic()
+        llm_circuit_open.set(1, provider=self.provider)
+
+    def release(self) -> None:
+        """A request let through ended without an outcome (e.g. it lost a hedge race)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+_breakers_lock = Lock()
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def circuit_breaker(provider: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = _breakers[provider] = CircuitBreaker(
+                provider,
+                failures=max(1, LLM_BREAKER_FAILURES),
+                reset_seconds=LLM_BREAKER_RESET_SECONDS,
+            )
+        return breaker
+
+
+class LatencyTracker:
+    """Recent first-chunk latencies and hedging decisions per model."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._latencies: dict[str, deque[float]] = {}
+        self._hedged: dict[str, deque[bool]] = {}
+        self._lock = Lock()
+
+    def observe(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def record_call(self, key: str, *, hedged: bool) -> None:
+        with self._lock:
+            self._hedged.setdefault(key, deque(maxlen=self.window)).append(hedged)
+
+    def hedge_delay(self, key: str) -> float:
+        with self._lock:
+            samples = sorted(self._latencies.get(key) or ())
+        if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_MAX_DELAY_SECONDS
+        percentile = samples[min(len(samples) - 1, int(LLM_HEDGE_PERCENTILE / 100 * len(samples)))]
+        return min(max(percentile, LLM_HEDGE_MIN_DELAY_SECONDS), LLM_HEDGE_MAX_DELAY_SECONDS)
+
+    def may_hedge(self, key: str) -> bool:
+        with self._lock:
+            hedged = self._hedged.get(key) or ()
+            return not hedged or sum(hedged) / len(hedged) < LLM_HEDGE_MAX_SHARE
+
+
+latency_tracker = LatencyTracker()
+
+
+@dataclass(frozen=True)
+class Candidate:
+    provider: str
+    model: str
+    # The chat model, possibly with tools or a response format bound.
+    runnable: Runnable
+
+    @property
+    def key(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+
+class _Attempt:
+    """One request to one candidate, streamed into the race's queue from its own thread."""
+
+    def __init__(self, candidate: Candidate, kind: str):
+        self.candidate = candidate
+        self.kind = kind
+        self.started = monotonic()
+        self.finished = False
+        self._cancelled = Event()
+
+    def start(self, events: Queue, messages: list, stop: list[str] | None, kwargs: dict[str, Any]) -> None:
+        Thread(target=self._run, args=(events, messages, stop, kwargs), daemon=True, name=f"llm-{self.kind}").start()
+
+    def _run(self, events: Queue, messages: list, stop: list[str] | None, kwargs: dict[str, Any]) -> None:
+        # No callbacks: only the winning chunks are reported, by the wrapper.
+        stream = self.candidate.runnable.stream(messages, {"callbacks": []}, stop=stop, **kwargs)
+        try:
+            for chunk in stream:
+                if self._cancelled.is_set():
+                    return
+                events.put((self, "chunk", chunk))
+            events.put((self, "done", None))
+        except Exception as exc:
+            events.put((self, "error", exc))
+        finally:
+            stream.close()
+
+    def finish(self, outcome: str) -> None:
+        self.finished = True
+        self._cancelled.set()
+        llm_requests_total.inc(
+            provider=self.candidate.provider,
+            model=self.candidate.model,
+            kind=self.kind,
+            outcome=outcome,
+        )
+
+
+def _is_request_error(exc: BaseException) -> bool:
+    return getattr(exc, "status_code", None) in REQUEST_ERROR_STATUSES
+
+
+def _as_generation_chunk(chunk: Any) -> ChatGenerationChunk:
+    # Let the wrapper's own run id name the message, as for any other model.
+    return ChatGenerationChunk(message=chunk.model_copy(update={"id": None}))
+
+
+class ResilientChatModel(BaseChatModel):
+    """Streams each call from the fastest healthy candidate; see the module docstring."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    candidates: list[Candidate]
+    hedging: bool = LLM_HEDGING
+
+    @property
+    def _llm_type(self) -> str:
+        return "resilient"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return {"candidates": [candidate.key for candidate in self.candidates]}
+
+    def _get_ls_params(self, stop=None, **kwargs):
+        params = super()._get_ls_params(stop=stop, **kwargs)
+        params["ls_provider"] = self.candidates[0].provider
+        params["ls_model_name"] = self.candidates[0].model
+        return params
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(
+            update={
+                "candidates": [
+                    replace(candidate, runnable=candidate.runnable.bind_tools(tools, **kwargs))
+                    for candidate in self.candidates
+                ]
+            }
+        )
+
+    def with_structured_output(self, schema, **kwargs):
+        # Race the raw model output, then parse it once.
+        structured = [candidate.runnable.with_structured_output(schema, **kwargs) for candidate in self.candidates]
+        if not all(isinstance(runnable, RunnableSequence) and len(runnable.steps) == 2 for runnable in structured):
+            raise NotImplementedError("ResilientChatModel supports structured output parsed from the model's message only")
+        candidates = [replace(candidate, runnable=runnable.first) for candidate, runnable in zip(self.candidates, structured)]
+        return self.model_copy(update={"candidates": candidates}) | structured[0].last
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return generate_from_stream(self._stream(messages, stop=stop, run_manager=run_manager, **kwargs))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        events: Queue = Queue()
+        attempts: list[_Attempt] = []
+        remaining = list(self.candidates)
+        call_key = self.candidates[0].key
+        hedge_at: float | None = None
+        hedged = False
+        last_error: BaseException | None = None
+        priority = llm_governor.current_priority()
+        cancellation = current_cancellation()
+
+        def request_kwargs(candidate: Candidate) -> dict[str, Any]:
+            return {**run_budget.request_limits(candidate.model, messages), **kwargs}
+
+        def launch(kind: str) -> _Attempt | None:
+            nonlocal hedge_at, last_error
+            while remaining:
+                candidate = remaining.pop(0)
+                breaker = circuit_breaker(candidate.provider)
+                if not breaker.allow():
+                    llm_requests_total.inc(
+                        provider=candidate.provider, model=candidate.model, kind=kind, outcome="circuit_open"
+                    )
+                    kind = "failover"
+                    continue
+                try:
+                    llm_governor.acquire(candidate.model, priority)
+                except LLMOverloadedError as exc:
+                    breaker.release()
+                    llm_requests_total.inc(
+                        provider=candidate.provider, model=candidate.model, kind=kind, outcome="rejected"
+                    )
+                    last_error = exc
+                    kind = "failover"
+                    continue
+                if cancellation is not None and cancellation.cancelled:
+                    breaker.release()
+                    cancellation.raise_if_cancelled()
+                attempt = _Attempt(candidate, kind)
+                attempts.append(attempt)
+                attempt.start(events, messages, stop, request_kwargs(candidate))
+                if self.hedging and not hedged and latency_tracker.may_hedge(candidate.key):
+                    hedge_at = attempt.started + latency_tracker.hedge_delay(candidate.key)
+                return attempt
+            return None
+
+        def fail(attempt: _Attempt, outcome: str) -> None:
+            attempt.finish(outcome)
+            circuit_breaker(attempt.candidate.provider).record_failure()
+
+        if launch("primary") is None:
+            raise last_error or CircuitOpenError(
+                f"Every provider for {self.candidates[0].model} is failing; try again shortly"
+            )
+
+        def wake_on_cancel() -> None:
+            events.put((None, "cancelled", None))
+
+        if cancellation is not None:
+            cancellation.add_callback(wake_on_cancel)
+        winner: _Attempt | None = None
+        first_chunk = None
+        try:
+            while winner is None:
+                live = [attempt for attempt in attempts if not attempt.finished]
+                if not live:
+                    if launch("failover") is None:
+                        raise last_error or TimeoutError(f"No response from {self.candidates[0].model}")
+                    continue
+                wake_at = min(attempt.started + LLM_FIRST_CHUNK_TIMEOUT_SECONDS for attempt in live)
+                if hedge_at is not None:
+                    wake_at = min(wake_at, hedge_at)
+                try:
+                    attempt, kind, payload = events.get(timeout=max(0.0, wake_at - monotonic()))
+                except Empty:
+                    now = monotonic()
+                    if hedge_at is not None and now >= hedge_at:
+                        hedge_at = None
+                        latest = live[-1]
+                        breaker = circuit_breaker(latest.candidate.provider)
+                        if breaker.allow():
+                            if llm_governor.try_acquire(latest.candidate.model, priority):
+                                hedged = True
+                                duplicate = _Attempt(latest.candidate, "hedge")
+                                attempts.append(duplicate)
+                                duplicate.start(events, messages, stop, request_kwargs(latest.candidate))
+                            else:
+                                breaker.release()
+                    for attempt in live:
+                        if now >= attempt.started + LLM_FIRST_CHUNK_TIMEOUT_SECONDS:
+                            fail(attempt, "timeout")
+                            last_error = TimeoutError(
+                                f"No response from {attempt.candidate.key} "
+                                f"within {LLM_FIRST_CHUNK_TIMEOUT_SECONDS:g}s"
+                            )
+                    continue
+
+                if kind == "cancelled":
+                    cancellation.raise_if_cancelled()
+                if attempt.finished:
+                    continue  # a cancelled or timed-out request reporting late
+                if kind == "error":
+                    if _is_request_error(payload):
+                        attempt.finish("error")
+                        circuit_breaker(attempt.candidate.provider).release()
+                        raise payload
+                    logger.warning("LLM request to %s failed: %r", attempt.candidate.key, payload)
+                    fail(attempt, "error")
+                    last_error = payload
+                    continue
+                winner, first_chunk = attempt, payload
+
+            latency_tracker.observe(winner.candidate.key, monotonic() - winner.started)
+            latency_tracker.record_call(call_key, hedged=hedged)
+            circuit_breaker(winner.candidate.provider).record_success()
+            for attempt in attempts:
+                if attempt is not winner and not attempt.finished:
+                    attempt.finish("lost")
+                    circuit_breaker(attempt.candidate.provider).release()
+
+            if first_chunk is not None:
+                yield _as_generation_chunk(first_chunk)
+            kind = "chunk" if first_chunk is not None else "done"
+            while kind == "chunk":
+                try:
+                    attempt, kind, payload = events.get(timeout=LLM_CHUNK_IDLE_TIMEOUT_SECONDS)
+                except Empty:
+                    fail(winner, "timeout")
+                    raise TimeoutError(
+                        f"{winner.candidate.key} sent nothing for {LLM_CHUNK_IDLE_TIMEOUT_SECONDS:g}s mid-response"
+                    ) from None
+                if kind == "cancelled":
+                    cancellation.raise_if_cancelled()
+                if attempt is not winner:
+                    kind = "chunk"
+                    continue
+                if kind == "error":
+                    fail(winner, "error")
+                    raise payload
+                if kind == "chunk":
+                    yield _as_generation_chunk(payload)
+            winner.finish("won")
+        finally:
+            # The caller stopped reading, the call failed or the run was cancelled.
+            if cancellation is not None:
+                cancellation.remove_callback(wake_on_cancel)
+            for attempt in attempts:
+                if not attempt.finished:
+                    attempt.finish("cancelled")
+                    circuit_breaker(attempt.candidate.provider).release()
@@ -0,0 +1,261 @@
+"""
+Per-run budgets: a wall-clock deadline, total tokens and total tool calls.
+
+A fixed number of routing turns says little about what a run costs: one
+specialist turn can be a single short answer or a dozen searches and a long
+document. Each run therefore gets a `RunBudget` when it starts
+(RUN_BUDGET_SECONDS, RUN_BUDGET_TOKENS, RUN_BUDGET_TOOL_CALLS), carried in
+`AgentState["budget"]` and, while the run executes, in a `RunBudgetTracker`
+that every model call and tool call of the run reports to
+(`BudgetCallbackHandler`, added to the run's callbacks):
+
+- maestro stops the run once a limit is spent, and does not hand out another
+  specialist or consultation turn with less than RUN_BUDGET_MIN_TURN_SECONDS
+  left;
+- specialists and consultants end their tool loop with what they have (staged
+  edits still go to approval) instead of starting a model call with less than
+  RUN_BUDGET_MIN_CALL_SECONDS left (`budget_middleware`);
+- every model call is sent with the time left as its request timeout, and with
+  the tokens left after its prompt as `max_tokens` once that is less than the
+  model can write anyway (`request_limits`, applied by `ResilientChatModel`);
+- maestro and the specialists report usage to the client as `budget.usage`
+  events.
+
+Limits are checked between calls, so a run can overshoot them by the model or
+tool call in flight; RUN_MAX_ITERATIONS stays as a backstop.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Any, Iterator, Literal
+
+from langchain.agents.middleware.types import AgentMiddleware, after_model, before_model
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage
+
+from app.agents.helpers.emit_event import emit_event
+from app.agents.state.types import RunBudget
+from app.config import (
+    LLM_DEFAULT_MAX_OUTPUT_TOKENS,
+    LLM_MAX_OUTPUT_TOKENS,
+    RUN_BUDGET_MIN_CALL_SECONDS,
+    RUN_BUDGET_SECONDS,
+    RUN_BUDGET_TOKENS,
+    RUN_BUDGET_TOOL_CALLS,
+)
+from app.metrics import registry
+from app.observability.spans import usage_from_llm_result
+
+BudgetLimit = Literal["deadline", "tokens", "tool_calls"]
+
+# Rough size of a token, for estimating a prompt before it is sent.
+CHARS_PER_TOKEN = 4
+
+budget_stops_total = registry.counter(
+    "run_budget_stops_total",
+    "Agent turns cut short because the run's budget was spent, by agent and limit "
+    "(deadline, tokens, tool_calls).",
+)
+
+WRAP_UP_MESSAGES: dict[str, str] = {
+    "deadline": "I ran out of time for this run, so I am stopping here with what I have so far.",
+    "tokens": "This run used up its token budget, so I am stopping here with what I have so far.",
+    "tool_calls": "This run used up its tool call budget, so I am stopping here with what I have so far.",
+}
+
+
+def new_run_budget(run_id: str) -> RunBudget:
+    """The configured limits for a run starting now."""
+    started_at = time.time()
+    return {
+        "run_id": run_id,
+        "started_at": started_at,
+        "deadline_at": started_at + RUN_BUDGET_SECONDS if RUN_BUDGET_SECONDS > 0 else None,
+        "max_tokens": RUN_BUDGET_TOKENS if RUN_BUDGET_TOKENS > 0 else None,
+        "max_tool_calls": RUN_BUDGET_TOOL_CALLS if RUN_BUDGET_TOOL_CALLS > 0 else None,
+        "tokens_used": 0,
+        "tool_calls_used": 0,
+    }
+
+
+class RunBudgetTracker:
+    """Live usage of one run's budget, shared by its parallel branches."""
+
+    def __init__(self, budget: RunBudget):
+        self.budget = budget
+        self._tokens_used = int(budget.get("tokens_used") or 0)
+        self._tool_calls_used = int(budget.get("tool_calls_used") or 0)
+        self._lock = Lock()
+
+    def add_tokens(self, tokens: int) -> None:
+        with self._lock:
+            self._tokens_used += tokens
+
+    def add_tool_call(self) -> None:
+        with self._lock:
+            self._tool_calls_used += 1
+
+    def remaining_seconds(self) -> float | None:
+        deadline_at = self.budget.get("deadline_at")
+        return None if deadline_at is None else deadline_at - time.time()
+
+    def remaining_tokens(self) -> int | None:
+        max_tokens = self.budget.get("max_tokens")
+        with self._lock:
+            return None if max_tokens is None else max_tokens - self._tokens_used
+
+    def remaining_tool_calls(self) -> int | None:
+        max_tool_calls = self.budget.get("max_tool_calls")
+        with self._lock:
+            return None if max_tool_calls is None else max_tool_calls - self._tool_calls_used
+
+    def exhausted(self, min_seconds: float = 0.0) -> BudgetLimit | None:
+        """The first spent limit, counting less than `min_seconds` left as out of time."""
+        seconds = self.remaining_seconds()
+        if seconds is not None and seconds <= max(min_seconds, 0.0):
+            return "deadline"
+        tokens = self.remaining_tokens()
+        if tokens is not None and tokens <= 0:
+            return "tokens"
+        tool_calls = self.remaining_tool_calls()
+        if tool_calls is not None and tool_calls <= 0:
+            return "tool_calls"
+        return None
+
+    def request_limits(self, max_output_tokens: int, prompt_tokens: int = 0) -> dict[str, Any]:
+        """
+        Request timeout and `max_tokens` for a model call, from what is left.
+
+        The budget counts prompt and response tokens together, while `max_tokens`
+        bounds the response alone and is refused above what the model can write
+        (`max_output_tokens`), so it is only sent once the tokens left after the
+        prompt fall under that.
+        """
+        limits: dict[str, Any] = {}
+        seconds = self.remaining_seconds()
+        if seconds is not None:
+            limits["timeout"] = max(seconds, 1.0)
+        tokens = self.remaining_tokens()
+        if tokens is not None and tokens - prompt_tokens < max_output_tokens:
+            limits["max_tokens"] = max(tokens - prompt_tokens, 1)
+        return limits
+
+    def snapshot(self) -> RunBudget:
+        with self._lock:
+            return {**self.budget, "tokens_used": self._tokens_used, "tool_calls_used": self._tool_calls_used}
+
+    def usage(self, exhausted: BudgetLimit | None = None) -> dict[str, Any]:
+        """Payload of a `budget.usage` event; `exhausted` is the limit an agent just stopped on."""
+        snapshot = self.snapshot()
+        return {
+            "elapsed_seconds": round(time.time() - snapshot["started_at"], 3),
+            "deadline_seconds": (
+                None
+                if snapshot["deadline_at"] is None
+                else round(snapshot["deadline_at"] - snapshot["started_at"], 3)
+            ),
+            "tokens_used": snapshot["tokens_used"],
+            "max_tokens": snapshot["max_tokens"],
+            "tool_calls_used": snapshot["tool_calls_used"],
+            "max_tool_calls": snapshot["max_tool_calls"],
+            "exhausted": exhausted or self.exhausted(),
+        }
+
+
+_current_budget: ContextVar[RunBudgetTracker | None] = ContextVar("run_budget", default=None)
+
+
+def current_run_budget() -> RunBudgetTracker | None:
+    return _current_budget.get()
+
+
+@contextmanager
+def run_budget_scope(tracker: RunBudgetTracker) -> Iterator[RunBudgetTracker]:
+    """Make `tracker` the current run's for everything executed in this context."""
+    token = _current_budget.set(tracker)
+    try:
+        yield tracker
+    finally:
+        try:
+            _current_budget.reset(token)
+        except ValueError:
+            # Generator-based runs can be closed from another context.
+            pass
+
+
+def max_output_tokens(model: str) -> int:
+    """Most tokens `model` can write in one response (LLM_MAX_OUTPUT_TOKENS)."""
+    value = LLM_MAX_OUTPUT_TOKENS.get(model)
+    if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+        return value
+    return LLM_DEFAULT_MAX_OUTPUT_TOKENS
+
+
+def estimate_tokens(messages: list[Any]) -> int:
+    """Rough token count of a prompt, from its length."""
+    chars = 0
+    for message in messages:
+        content = getattr(message, "content", message)
+        chars += len(content) if isinstance(content, str) else len(json.dumps(content, default=str))
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            chars += len(json.dumps(tool_calls, default=str))
+    return chars // CHARS_PER_TOKEN
+
+
+def request_limits(model: str, messages: list[Any]) -> dict[str, Any]:
+    """The current run's `RunBudgetTracker.request_limits` for a call to `model`; nothing outside a run."""
+    tracker = _current_budget.get()
+    if tracker is None:
+        return {}
+    return tracker.request_limits(max_output_tokens(model), estimate_tokens(messages))
+
+
+def emit_budget_usage(tracker: RunBudgetTracker, agent: str, exhausted: BudgetLimit | None = None) -> None:
+    emit_event("budget.usage", {"agent": agent, **tracker.usage(exhausted)})
+
+
+class BudgetCallbackHandler(BaseCallbackHandler):
+    """Counts the run's model tokens and tool calls against its budget."""
+
+    def __init__(self, tracker: RunBudgetTracker):
+        self.tracker = tracker
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        usage = usage_from_llm_result(response)
+        tokens = usage.get("total_tokens") or usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+        if tokens:
+            self.tracker.add_tokens(tokens)
+
+    def on_tool_start(self, serialized: dict[str, Any], input_str: str, **kwargs: Any) -> None:
+        self.tracker.add_tool_call()
+
+
+def budget_middleware(agent: str) -> list[AgentMiddleware]:
+    """Ends `agent`'s tool loop once the run's budget is spent, and reports usage after each model call."""
+
+    @before_model(can_jump_to=["end"])
+    def run_budget_check(state, runtime) -> dict[str, Any] | None:
+        tracker = _current_budget.get()
+        if tracker is None:
+            return None
+        reason = tracker.exhausted(min_seconds=RUN_BUDGET_MIN_CALL_SECONDS)
+        if reason is None:
+            return None
+        budget_stops_total.inc(agent=agent, reason=reason)
+        emit_budget_usage(tracker, agent, reason)
+        return {"messages": [AIMessage(content=WRAP_UP_MESSAGES[reason])], "jump_to": "end"}
+
+    @after_model
+    def run_budget_usage(state, runtime) -> None:
+        tracker = _current_budget.get()
+        if tracker is not None:
+            emit_budget_usage(tracker, agent)
+        return None
+
+    return [run_budget_check, run_budget_usage]
@@ -0,0 +1,169 @@
+"""
+Document references for graph state.
+
+With `STATE_DOC_MODE=ref`, `AgentState.docs` holds `DocRef` handles instead of
+full `Doc`s and a pending change set keeps only content hashes of its edits.
+Bodies are loaded from `docs`/`doc_versions`/`change_set_docs` on first use and
+memoised in a per-run cache, so checkpoints stay small no matter how large the
+documents grow. Inline docs are passed through untouched, which keeps
+checkpoints written before the switch readable.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from threading import Lock
+from typing import Mapping
+
+from app.agents.state.types import ChangeSet, Doc, DocRef, StagedEdit
+from app.config import STATE_DOC_MODE
+from app.db.fetch_doc_bodies import fetch_changeset_after_contents, fetch_doc_body
+from app.db.get_conn_factory import conn_factory
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+_EMPTY_HASH = content_hash("")
+
+
+def use_doc_refs() -> bool:
+    return STATE_DOC_MODE == "ref"
+
+
+def is_doc_ref(doc: Mapping) -> bool:
+    return "content" not in doc and "content_hash" in doc
+
+
+class RunDocCache:
+    """Bodies keyed by (thread_id, content_hash); a body never changes for a hash."""
+
+    def __init__(self):
+        self._bodies: dict[tuple[str, str], str] = {}
+        self._lock = Lock()
+
+    def get(self, thread_id: str, digest: str) -> str | None:
+        if digest == _EMPTY_HASH:
+            return ""
+        with self._lock:
+            return self._bodies.get((thread_id, digest))
+
+    def put(self, thread_id: str, content: str) -> str:
+        digest = content_hash(content)
+        with self._lock:
+            self._bodies[(thread_id, digest)] = content
+        return digest
+
+
+_run_caches: dict[str, RunDocCache] = {}
+_run_caches_lock = Lock()
+
+
+def get_run_doc_cache(run_id: str) -> RunDocCache:
+    with _run_caches_lock:
+        cache = _run_caches.get(run_id)
+        if cache is None:
+            cache = _run_caches[run_id] = RunDocCache()
+        return cache
+
+
+def release_run_doc_cache(run_id: str) -> None:
+    with _run_caches_lock:
+        _run_caches.pop(run_id, None)
+
+
+def to_state_docs(docs: Mapping[str, Doc], *, thread_id: str, run_id: str) -> dict[str, Doc | DocRef]:
+    """Docs as they should be stored in state for the configured mode."""
+    if not use_doc_refs():
+        return dict(docs)
+
+    cache = get_run_doc_cache(run_id)
+    state_docs: dict[str, Doc | DocRef] = {}
+    for doc_id, doc in docs.items():
+        if is_doc_ref(doc):
+            state_docs[doc_id] = doc
+            continue
+        state_docs[doc_id] = {
+            "doc_id": doc_id,
+            "title": doc["title"],
+            "description": doc["description"],
+            "version": doc["version"],
+            "content_hash": cache.put(thread_id, doc["content"]),
+            "updated_by": doc.get("updated_by"),
+            "updated_at": doc.get("updated_at"),
+        }
+    return state_docs
+
+
+def load_doc(doc_id: str, doc: Doc | DocRef, *, thread_id: str, run_id: str) -> Doc:
+    if not is_doc_ref(doc):
+        return doc
+
+    cache = get_run_doc_cache(run_id)
+    content = cache.get(thread_id, doc["content_hash"])
+    if content is None:
+        with conn_factory() as conn:
+            content = fetch_doc_body(
+                conn,
+                thread_id,
+                doc_id,
+                version=doc["version"],
+                content_hash=doc["content_hash"],
+            )
+        if content is None:
+            raise LookupError(f"No stored body for doc {doc_id!r} v{doc['version']}")
+        cache.put(thread_id, content)
+
+    return {
+        "title": doc["title"],
+        "content": content,
+        "description": doc["description"],
+        "version": doc["version"],
+        "updated_by": doc.get("updated_by"),
+        "updated_at": doc.get("updated_at"),
+    }
+
+
+def load_docs(state: Mapping, doc_ids: list[str] | None = None) -> dict[str, Doc]:
+    """Full docs from state, resolving references. Unknown ids raise KeyError."""
+    docs = state.get("docs") or {}
+    selected = docs.keys() if doc_ids is None else doc_ids
+    return {
+        doc_id: load_doc(doc_id, docs[doc_id], thread_id=state["thread_id"], run_id=state["run_id"])
+        for doc_id in selected
+    }
+
+
+def to_change_set_edits(edits: list[StagedEdit], *, thread_id: str, run_id: str) -> list[dict]:
+    if not use_doc_refs():
+        return list(edits)
+
+    cache = get_run_doc_cache(run_id)
+    return [
+        {"doc_id": edit["doc_id"], "content_hash": cache.put(thread_id, edit["new_content"])}
+        for edit in edits
+    ]
+
+
+def load_change_set_edits(change_set: ChangeSet, *, thread_id: str, run_id: str) -> list[StagedEdit]:
+    edits = change_set["edits"]
+    if all("new_content" in edit for edit in edits):
+        return list(edits)
+
+    cache = get_run_doc_cache(run_id)
+    resolved: list[StagedEdit] = []
+    stored: dict[str, str] | None = None
+    for edit in edits:
+        if "new_content" in edit:
+            resolved.append(edit)
+            continue
+        content = cache.get(thread_id, edit["content_hash"])
+        if content is None:
+            if stored is None:
+                with conn_factory() as conn:
+                    stored = fetch_changeset_after_contents(conn, change_set["change_set_id"])
+            content = stored[edit["doc_id"]]
+            cache.put(thread_id, content)
+        resolved.append({"doc_id": edit["doc_id"], "new_content": content})
+    return resolved
@@ -2,23 +2,24 @@ from __future__ import annotations
 
 from langchain_core.messages import HumanMessage
 
-from app.agents.state.types import AgentState, Doc
+from app.agents.state.types import AgentState, Doc, DocRef, RunBudget
+from app.config import RUN_MAX_ITERATIONS
 
 
 def get_initial_state_update(
     *,
     thread_id: str,
     run_id: str,
-    user_message: HumanMessage,
-    docs: dict[str, Doc],
+    user_messages: list[HumanMessage],
+    docs: dict[str, Doc | DocRef],
+    budget: RunBudget | None = None,
 ) -> AgentState:
-    default_max_iterations = 4
     return {
         "thread_id": thread_id,
         "run_id": run_id,
         "next_agent": None,
-        "messages": [user_message],
-        "history": [],
+        "messages": list(user_messages),
+        "activity_count": 0,
         "docs": docs,
         "docs_summary": {
             doc_id: (doc.get("description") or "no content yet")
@@ -29,10 +30,14 @@ def get_initial_state_update(
         "staged_edits_by": "",
         "pending_change_set": None,
         "iteration_count": 0,
-        "max_iterations": default_max_iterations,
+        "max_iterations": RUN_MAX_ITERATIONS,
+        "budget": budget,
         "loop_status": "running",
         "last_routing_error": None,
         "consecutive_noop_count": 0,
         "last_supervisor_action": None,
-        "history_cursor_at_last_delegate": 0,
+        "activity_cursor_at_last_delegate": 0,
+        "delegate_agents": None,
+        "consult_agents": None,
+        "consultations": None,
     }
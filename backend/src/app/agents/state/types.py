@@ -1,16 +1,12 @@
 from __future__ import annotations
 
-from typing import Annotated, Any, TypedDict
+from typing import Annotated, TypedDict
 from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
 
 
 # --- Reducers ---
 
-def append_history(old: list[Any] | None, new: list[Any] | None) -> list[Any]:
-    """Accumulate history entries."""
-    return (old or []) + (new or [])
-
 def append_staged_edits(
     old: list["StagedEdit"] | None,
     new: list["StagedEdit"] | None,
@@ -22,11 +18,16 @@ def merge_docs(
     new: dict[str, "Doc"] | None,
 ) -> dict[str, "Doc"]:
     """
-    Merge docs by doc_id. New keys overwrite old keys; others preserved.
+    Merge docs by doc_id. New keys overwrite old keys, except that a doc never
+    goes back to a lower version: specialists delegated in parallel each return
+    their whole copy of the docs, including ones another of them has updated.
     """
     merged = dict(old or {})
-    if new:
-        merged.update(new)
+    for doc_id, doc in (new or {}).items():
+        previous = merged.get(doc_id)
+        if previous and int(previous.get("version") or 0) > int(doc.get("version") or 0):
+            continue
+        merged[doc_id] = doc
     return merged
 
 def merge_docs_mental_model(
@@ -95,6 +96,33 @@ def set_loop_status(
     return new
 
 
+def set_delegate_agents(
+    old: list[str] | None,
+    new: list[str] | None,
+) -> list[str] | None:
+    return new
+
+
+def set_consult_agents(
+    old: list[str] | None,
+    new: list[str] | None,
+) -> list[str] | None:
+    return new
+
+
+def append_consultations(
+    old: list["Consultation"] | None,
+    new: list["Consultation"] | None,
+) -> list["Consultation"]:
+    """
+    Parallel consult branches each append their result. Writing None clears the
+    list (done by the merge node once the results are in messages).
+    """
+    if new is None:
+        return []
+    return (old or []) + new
+
+
 def set_optional_text(
     old: str | None,
     new: str | None,
@@ -102,6 +130,24 @@ def set_optional_text(
     return new
 
 
+def merge_run_budget(
+    old: "RunBudget | None",
+    new: "RunBudget | None",
+) -> "RunBudget | None":
+    """
+    A new run's budget replaces the previous one. Within a run, usage never goes
+    back: parallel specialist branches return the snapshot they started with.
+    """
+    if not old or not new or old.get("run_id") != new.get("run_id"):
+        return new
+    if (new.get("tokens_used") or 0, new.get("tool_calls_used") or 0) < (
+        old.get("tokens_used") or 0,
+        old.get("tool_calls_used") or 0,
+    ):
+        return old
+    return new
+
+
 # --- State ---
 
 class Doc(TypedDict):
@@ -112,27 +158,59 @@ class Doc(TypedDict):
     updated_by: str | None
     updated_at: str | None
 
+class DocRef(TypedDict):
+    """A Doc without its body; see app/agents/state/doc_refs.py."""
+    doc_id: str
+    title: str
+    description: str
+    version: int
+    content_hash: str
+    updated_by: str | None
+    updated_at: str | None
+
 class StagedEdit(TypedDict):
     doc_id: str
     new_content : str
 
+class StagedEditRef(TypedDict):
+    doc_id: str
+    content_hash: str
+
 class ChangeSet(TypedDict):
     change_set_id: str
     created_by: str
     created_at: str
-    edits: list[StagedEdit]
+    edits: list[StagedEdit | StagedEditRef]
     diffs: dict[str, str]
     summary: str
     status: str
 
 
-class AgentState(TypedDict):
-    thread_id: str
+class Consultation(TypedDict):
+    agent: str
+    content: str
+    status: str  # "ok" | "error"
+
+
+class RunBudget(TypedDict):
+    """Limits of one run and its usage when last recorded; see app/agents/run_budget.py."""
     run_id: str
+    started_at: float  # epoch seconds
+    deadline_at: float | None
+    max_tokens: int | None
+    max_tool_calls: int | None
+    tokens_used: int
+    tool_calls_used: int
+
+
+class AgentState(TypedDict):
+    # Reducers rather than plain values: parallel specialist branches all write them back.
+    thread_id: Annotated[str, set_optional_text]
+    run_id: Annotated[str, set_optional_text]
     next_agent: Annotated[str | None, set_next_agent]
     messages: Annotated[list[BaseMessage], add_messages]
-    history: Annotated[list[Any], append_history]
-    docs: Annotated[dict[str, Doc], merge_docs]
+    activity_count: Annotated[int | None, set_int] # seq of the thread's latest agent_activity row
+    docs: Annotated[dict[str, Doc | DocRef], merge_docs]
     docs_summary: Annotated[dict[str, str], merge_docs_mental_model] # summary of the docs for the agent to use in the prompt, so we don't load the entire prompt into memory
     staged_edits: Annotated[list[StagedEdit], append_staged_edits]
     staged_edits_summary: Annotated[str | None, set_staged_edits_summary]
@@ -140,8 +218,12 @@ class AgentState(TypedDict):
     pending_change_set: Annotated[ChangeSet | None, set_pending_change_set]
     iteration_count: Annotated[int | None, set_int]
     max_iterations: Annotated[int | None, set_int]
+    budget: Annotated[RunBudget | None, merge_run_budget]
     loop_status: Annotated[str | None, set_loop_status]
     last_routing_error: Annotated[str | None, set_optional_text]
     consecutive_noop_count: Annotated[int | None, set_int]
     last_supervisor_action: Annotated[str | None, set_optional_text]
-    history_cursor_at_last_delegate: Annotated[int | None, set_int]
+    activity_cursor_at_last_delegate: Annotated[int | None, set_int]
+    delegate_agents: Annotated[list[str] | None, set_delegate_agents] # specialists maestro delegated to in parallel
+    consult_agents: Annotated[list[str] | None, set_consult_agents] # specialists maestro asked to consult in parallel
+    consultations: Annotated[list[Consultation], append_consultations]
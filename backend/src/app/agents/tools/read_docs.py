@@ -6,6 +6,7 @@ from langchain_core.tools import tool
 from langchain.tools import ToolRuntime
 from pydantic import BaseModel, Field
 
+from app.agents.state.doc_refs import load_docs
 from app.agents.state.types import AgentState
 
 class ReadDocsInput(BaseModel):
@@ -20,6 +21,4 @@ def read_docs(doc_ids: list[str], runtime: ToolRuntime):
         doc_ids: The IDs of the documents to read.
     """
     state: AgentState = runtime.state
-    docs = state.get("docs") or {}
-    docs_subset = {doc_id: docs[doc_id] for doc_id in doc_ids}
-    return docs_subset
+    return load_docs(state, doc_ids)
@@ -6,7 +6,8 @@ from langchain_core.tools import tool
 from langchain.tools import ToolRuntime
 from pydantic import BaseModel, Field
 
-from ddgs import DDGS
+from app.agents.helpers.search_cache import search_cache
+from app.runs.cancellation import RunCancelledError, run_cancellable
 
 
 class SearchWebInput(BaseModel):
@@ -15,7 +16,7 @@ class SearchWebInput(BaseModel):
 
 
 @tool(args_schema=SearchWebInput)
-def search_web(query: str, max_results: int = 5):
+def search_web(query: str, runtime: ToolRuntime, max_results: int = 5):
     """
     Search the web for information using DuckDuckGo search engine.
     Use this tool when you need to find current information, market data, competitor analysis,
@@ -25,12 +26,26 @@ def search_web(query: str, max_results: int = 5):
         query: The search query to look up on the web.
         max_results: Maximum number of search results to return (default: 5).
     """
-    if DDGS is None:
-        return "Error: duckduckgo-search library is not installed. Please install it with: pip install duckduckgo-search"
+    # Top-level graph node, i.e. the specialist whose subgraph made the call.
+    metadata = (runtime.config or {}).get("metadata") or {}
+    agent = (metadata.get("langgraph_checkpoint_ns") or "").split(":", 1)[0] or metadata.get("langgraph_node")
+    thread_id = (runtime.state or {}).get("thread_id")
+    if thread_id and agent:
+        search_cache.record_query(thread_id, agent, query, max_results)
+
+    cached = search_cache.get(query, max_results)
+    if cached is not None:
+        return cached
+
+    try:
+        from ddgs import DDGS
+    except ImportError:
+        return "Error: the ddgs library is not installed. Please install it with: pip install ddgs"
     
     try:
         with DDGS() as ddgs:
-            results = list(ddgs.text(query, max_results=max_results))
+            # Stop waiting on a slow search as soon as the run is cancelled.
+            results = run_cancellable(lambda: list(ddgs.text(query, max_results=max_results)))
             
             if not results:
                 return f"No results found for query: {query}"
@@ -42,7 +57,11 @@ def search_web(query: str, max_results: int = 5):
                 href = result.get("href", "")
                 formatted_results.append(f"{i}. {title}\n   {body}\n   Source: {href}\n")
             
-            return "\n".join(formatted_results)
+            results_text = "\n".join(formatted_results)
+            search_cache.put(query, max_results, results_text)
+            return results_text
+    except RunCancelledError:
+        raise
     except Exception as e:
         return f"Error searching the web: {str(e)}"
 
@@ -6,6 +6,7 @@ from pydantic import BaseModel, Field
 
 from app.agents.helpers.emit_event import emit_event
 from app.agents.state.types import AgentState
+from app.db.activity_repository import record_activity
 
 
 class StagedEdit(BaseModel):
@@ -47,19 +48,20 @@ def stage_edits(edits: list[StagedEdit], summary: str, by: str, runtime: ToolRun
         },
     )
 
+    activity = record_activity(
+        thread_id=state["thread_id"],
+        run_id=state["run_id"],
+        agent=by,
+        activity="edits_staged",
+        payload={"docs": [e["doc_id"] for e in normalized_edits], "summary": summary},
+    )
+
     return Command(
         update={
             "staged_edits": normalized_edits,
             "staged_edits_summary": summary,
             "staged_edits_by": by,
-            "history": [
-                {
-                    "type": "specialist_activity",
-                    "activity": "edits_staged",
-                    "by": by,
-                    "docs": [e["doc_id"] for e in normalized_edits],
-                }
-            ],
+            "activity_count": activity["seq"],
             "messages": [
                 ToolMessage("Successfully staged edits", tool_call_id=runtime.tool_call_id)
             ]
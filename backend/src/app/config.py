@@ -0,0 +1,227 @@
+import json
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    return int(raw)
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    return float(raw)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    return raw.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _env_list(name: str, default: list[str]) -> list[str]:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    return [item.strip() for item in raw.split(",") if item.strip()]
+
+
+def _env_json(name: str, default: dict) -> dict:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    return json.loads(raw)
+
+
+# --- Run executor ---
+
+RUN_EXECUTOR_MAX_WORKERS = _env_int("RUN_EXECUTOR_MAX_WORKERS", 8)
+RUN_EXECUTOR_MAX_QUEUED = _env_int("RUN_EXECUTOR_MAX_QUEUED", 256)
+RUN_EXECUTOR_DRAIN_SECONDS = _env_float("RUN_EXECUTOR_DRAIN_SECONDS", 30.0)
+RUN_EVENT_LOG_TTL_SECONDS = _env_float("RUN_EVENT_LOG_TTL_SECONDS", 300.0)
+# A replica renews the lease of the runs it owns every third of this. Queued or running
+# runs whose lease ran out (their replica crashed or was killed) are failed by the reaper
+# every replica runs on the same schedule, starting at startup.
+RUN_LEASE_SECONDS = _env_float("RUN_LEASE_SECONDS", 60.0)
+
+# What to do with a chat message for a thread that already has a queued or running run:
+# "queue" runs it afterwards, "reject" answers 409, "coalesce" folds it into a queued run.
+RUN_ADMISSION_POLICY = os.getenv("RUN_ADMISSION_POLICY", "queue").strip().lower()
+
+# --- Run cancellation ---
+
+# A cancelled run's graph gets this long to stop at a step boundary before the run is
+# reported cancelled anyway.
+RUN_CANCEL_GRACE_SECONDS = _env_float("RUN_CANCEL_GRACE_SECONDS", 10.0)
+# Cancel a run once nobody has followed its event stream on the owning replica for the
+# grace period (clients that reconnect within it keep the run). A dropped stream is
+# noticed at its next frame or keepalive. Runs never followed, or followed through
+# another replica, are not cancelled.
+RUN_CANCEL_ON_DISCONNECT = _env_bool("RUN_CANCEL_ON_DISCONNECT", False)
+RUN_CANCEL_ON_DISCONNECT_GRACE_SECONDS = _env_float("RUN_CANCEL_ON_DISCONNECT_GRACE_SECONDS", 15.0)
+
+# --- Run budgets ---
+
+# Limits of one run (a chat message or an approval resume), counted from when it starts;
+# 0 disables a limit. Maestro stops the run and specialists wrap up once one is spent.
+RUN_BUDGET_SECONDS = _env_float("RUN_BUDGET_SECONDS", 180.0)
+RUN_BUDGET_TOKENS = _env_int("RUN_BUDGET_TOKENS", 500_000)
+RUN_BUDGET_TOOL_CALLS = _env_int("RUN_BUDGET_TOOL_CALLS", 40)
+# Maestro does not hand out another specialist turn with less time left than this, and
+# specialists do not start another model call with less than RUN_BUDGET_MIN_CALL_SECONDS.
+RUN_BUDGET_MIN_TURN_SECONDS = _env_float("RUN_BUDGET_MIN_TURN_SECONDS", 20.0)
+RUN_BUDGET_MIN_CALL_SECONDS = _env_float("RUN_BUDGET_MIN_CALL_SECONDS", 5.0)
+# Most tokens each model can write in one response, as JSON: {"gpt-5.2": 128000}. Models
+# without an entry use LLM_DEFAULT_MAX_OUTPUT_TOKENS. A model call is sent a `max_tokens`
+# only once the run's tokens left, less its prompt, fall under this.
+LLM_MAX_OUTPUT_TOKENS = _env_json("LLM_MAX_OUTPUT_TOKENS", {})
+LLM_DEFAULT_MAX_OUTPUT_TOKENS = _env_int("LLM_DEFAULT_MAX_OUTPUT_TOKENS", 16_384)
+# Routing turns per run, a backstop to the limits above; 0 disables it.
+RUN_MAX_ITERATIONS = _env_int("RUN_MAX_ITERATIONS", 4)
+
+# --- Event bus ---
+
+# "memory" reaches subscribers in this process only; "postgres" fans out to every
+# replica through LISTEN/NOTIFY and is required when running more than one replica.
+EVENT_BUS_BACKEND = os.getenv("EVENT_BUS_BACKEND", "memory").strip().lower()
+# Events waiting to be sent to the other replicas (postgres backend); beyond this, while
+# the database is slow or unreachable, new events are dropped and counted.
+EVENT_BUS_MAX_OUTBOX = _env_int("EVENT_BUS_MAX_OUTBOX", 10_000)
+
+# Bursts of thread events (doc bumps, status transitions) arriving within this window
+# are merged into one frame per entity on `GET /api/threads/{thread_id}/events`.
+THREAD_EVENTS_COALESCE_SECONDS = _env_float("THREAD_EVENTS_COALESCE_SECONDS", 0.25)
+
+# --- Change sets ---
+
+# Per-document budget for computing a minimal diff; past it the remaining regions
+# are emitted as whole-block replacements.
+DIFF_TIME_BUDGET_SECONDS = _env_float("DIFF_TIME_BUDGET_SECONDS", 0.5)
+
+# --- Agent state ---
+
+# "inline" keeps document bodies in graph state (and so in every checkpoint);
+# "ref" keeps (doc_id, version, content_hash) handles and loads bodies on demand.
+STATE_DOC_MODE = os.getenv("STATE_DOC_MODE", "inline").strip().lower()
+
+# --- Checkpoint compaction ---
+
+# Checkpoints kept per (thread_id, checkpoint_ns); older ones are pruned. Subgraph
+# namespaces that finished before the thread's latest root checkpoint are pruned whole.
+CHECKPOINT_RETAIN_PER_NAMESPACE = _env_int("CHECKPOINT_RETAIN_PER_NAMESPACE", 1)
+# Checkpoints younger than this are never pruned.
+CHECKPOINT_RETAIN_MIN_AGE_SECONDS = _env_float("CHECKPOINT_RETAIN_MIN_AGE_SECONDS", 3600.0)
+# Background compaction period; 0 disables the background task (the CLI still works).
+CHECKPOINT_COMPACTION_INTERVAL_SECONDS = _env_float("CHECKPOINT_COMPACTION_INTERVAL_SECONDS", 900.0)
+CHECKPOINT_COMPACTION_BATCH_THREADS = _env_int("CHECKPOINT_COMPACTION_BATCH_THREADS", 100)
+# Rows deleted per statement; each batch commits on its own to keep lock time short.
+CHECKPOINT_COMPACTION_BATCH_ROWS = _env_int("CHECKPOINT_COMPACTION_BATCH_ROWS", 500)
+CHECKPOINT_COMPACTION_LOCK_TIMEOUT_MS = _env_int("CHECKPOINT_COMPACTION_LOCK_TIMEOUT_MS", 2000)
+
+# --- Checkpoint serialization ---
+
+# "default" is LangGraph's msgpack serializer; "compact" adds zstd compression of
+# large values on top of it. Both read blobs written by either setting.
+CHECKPOINT_SERDE = os.getenv("CHECKPOINT_SERDE", "default").strip().lower()
+CHECKPOINT_SERDE_COMPRESS_MIN_BYTES = _env_int("CHECKPOINT_SERDE_COMPRESS_MIN_BYTES", 2048)
+CHECKPOINT_SERDE_ZSTD_LEVEL = _env_int("CHECKPOINT_SERDE_ZSTD_LEVEL", 3)
+
+# --- Observability ---
+
+# Per-run spans (graph nodes, LLM and tool calls, checkpoint and repository calls)
+# written to run_spans and summarised on /metrics. When disabled every hook is a no-op.
+OBSERVABILITY_ENABLED = _env_bool("OBSERVABILITY_ENABLED", True)
+# Spans beyond this are counted but not stored, bounding memory for runaway runs.
+OBSERVABILITY_MAX_SPANS_PER_RUN = _env_int("OBSERVABILITY_MAX_SPANS_PER_RUN", 2000)
+
+# --- Models ---
+
+# Optional "module:callable" taking an agent name and a model name and returning a chat
+# model; when set it replaces the OpenAI models for every agent (used by the benchmarks).
+CHAT_MODEL_FACTORY = os.getenv("CHAT_MODEL_FACTORY", "").strip()
+# Model cascades, as comma-separated model names. Maestro's routing decision is made by
+# the first (small, fast) model and retried on the next one when it fails validation or
+# its confidence is below ROUTING_MIN_CONFIDENCE. Specialists use their first model.
+ROUTING_MODELS = _env_list("ROUTING_MODELS", ["gpt-5-mini", "gpt-5.2"])
+SPECIALIST_MODELS = _env_list("SPECIALIST_MODELS", ["gpt-5.2"])
+ROUTING_MIN_CONFIDENCE = _env_float("ROUTING_MIN_CONFIDENCE", 0.6)
+# Per-agent cascades overriding the two above, as JSON: {"Growth Lead": ["gpt-5-mini"]}.
+# A thread's `model_settings` override these in turn.
+AGENT_MODELS = _env_json("AGENT_MODELS", {})
+# Models a thread's `model_settings` may name, as comma-separated model names. Empty: the
+# models configured above and those with an LLM_MAX_OUTPUT_TOKENS entry.
+ALLOWED_MODELS = _env_list("ALLOWED_MODELS", [])
+
+# --- Startup ---
+# Dev-only routes (`/api/test`, `/api/approve`) are mounted only when enabled.
+ENABLE_DEBUG_ROUTES = _env_bool("ENABLE_DEBUG_ROUTES", False)
+# Compile the agent workflow in a background thread after startup, so the first
+# run does not pay for importing the agent stack. Off: compile on first run.
+PRELOAD_WORKFLOW = _env_bool("PRELOAD_WORKFLOW", True)
+
+# --- Consultations ---
+# Specialists consulted at the same time within one run when maestro fans out;
+# the rest wait for a free slot.
+MAX_PARALLEL_CONSULTATIONS = _env_int("MAX_PARALLEL_CONSULTATIONS", 4)
+
+# --- Speculative prefetch ---
+# While maestro's decision streams, load the focus documents (and cached searches)
+# of the specialist it is likely to pick, and put them in that specialist's prompt.
+# A wrong guess only wastes local work; off: specialists read documents themselves.
+SPECULATIVE_PREFETCH = _env_bool("SPECULATIVE_PREFETCH", True)
+# Documents longer than this are left out of the prompt; the specialist reads them on demand.
+PREFETCH_MAX_DOC_CHARS = _env_int("PREFETCH_MAX_DOC_CHARS", 8000)
+# Most recent cached searches of the specialist included in its prompt.
+PREFETCH_MAX_SEARCHES = _env_int("PREFETCH_MAX_SEARCHES", 3)
+SEARCH_CACHE_TTL_SECONDS = _env_float("SEARCH_CACHE_TTL_SECONDS", 900.0)
+SEARCH_CACHE_MAX_ENTRIES = _env_int("SEARCH_CACHE_MAX_ENTRIES", 256)
+
+# --- LLM resilience ---
+# Model calls go through a wrapper that hedges slow first chunks, fails over on errors
+# and trips per-provider circuit breakers. Off: agents call their model directly.
+LLM_RESILIENCE = _env_bool("LLM_RESILIENCE", True)
+# OpenAI-compatible providers besides the default one, as JSON:
+# {"backup": {"base_url": "https://...", "api_key_env": "BACKUP_API_KEY"}}.
+LLM_PROVIDERS = _env_json("LLM_PROVIDERS", {})
+# Candidates tried, in order, when a model fails, as JSON. Each is a model name on the
+# default provider or {"provider": ..., "model": ...}:
+# {"gpt-5.2": [{"provider": "backup", "model": "gpt-5.2"}]}.
+LLM_FAILOVER = _env_json("LLM_FAILOVER", {})
+# A duplicate request is sent when the first chunk takes longer than this percentile of
+# recent first-chunk latencies, clamped to [MIN, MAX] (MAX until MIN_SAMPLES are seen).
+LLM_HEDGING = _env_bool("LLM_HEDGING", True)
+LLM_HEDGE_PERCENTILE = _env_float("LLM_HEDGE_PERCENTILE", 95.0)
+LLM_HEDGE_MIN_DELAY_SECONDS = _env_float("LLM_HEDGE_MIN_DELAY_SECONDS", 0.5)
+LLM_HEDGE_MAX_DELAY_SECONDS = _env_float("LLM_HEDGE_MAX_DELAY_SECONDS", 8.0)
+LLM_HEDGE_MIN_SAMPLES = _env_int("LLM_HEDGE_MIN_SAMPLES", 20)
+# Hedging backs off when more than this share of recent calls were hedged (the provider
+# is slow for everyone, and duplicates would only add load).
+LLM_HEDGE_MAX_SHARE = _env_float("LLM_HEDGE_MAX_SHARE", 0.1)
+# A request with no first chunk after this long counts as failed and fails over; a
+# stream that goes quiet this long mid-response fails the call. Both are below the
+# SSE stream's 45s idle timeout.
+LLM_FIRST_CHUNK_TIMEOUT_SECONDS = _env_float("LLM_FIRST_CHUNK_TIMEOUT_SECONDS", 20.0)
+LLM_CHUNK_IDLE_TIMEOUT_SECONDS = _env_float("LLM_CHUNK_IDLE_TIMEOUT_SECONDS", 30.0)
+# A provider's breaker opens after this many consecutive failures; after the reset
+# time one trial request is let through (half-open) and closes it again on success.
+LLM_BREAKER_FAILURES = _env_int("LLM_BREAKER_FAILURES", 5)
+LLM_BREAKER_RESET_SECONDS = _env_float("LLM_BREAKER_RESET_SECONDS", 30.0)
+
+# --- LLM governor ---
+# Model calls are admitted through a per-model token bucket, interactive calls first.
+# Limits per model as JSON, in requests per minute with an optional burst (default:
+# 5 seconds' worth): {"gpt-5.2": {"rpm": 500, "burst": 20}}. Models without an entry
+# use LLM_DEFAULT_RPM; 0 leaves them unlimited.
+LLM_RATE_LIMITS = _env_json("LLM_RATE_LIMITS", {})
+LLM_DEFAULT_RPM = _env_float("LLM_DEFAULT_RPM", 0.0)
+# A call is rejected at once (like a 429) when this many calls already wait for its
+# model, or when the calls ahead of it would take longer than MAX_WAIT to admit.
+LLM_GOVERNOR_MAX_QUEUE = _env_int("LLM_GOVERNOR_MAX_QUEUE", 64)
+LLM_GOVERNOR_MAX_WAIT_SECONDS = _env_float("LLM_GOVERNOR_MAX_WAIT_SECONDS", 15.0)
+# "local": each replica enforces the limits on its own (set them per replica);
+# "postgres": replicas take tokens from shared buckets (llm_rate_buckets).
+LLM_GOVERNOR_BACKEND = os.getenv("LLM_GOVERNOR_BACKEND", "local").strip().lower()
@@ -0,0 +1,120 @@
+"""
+Append-only specialist activity log (`agent_activity`).
+
+Graph state only carries the thread's latest `seq` (`activity_count`); the
+entries themselves live here and are queried by run or agent. `seq` grows across
+the thread's runs, so maestro's no-op check (`activity_count` against the cursor
+taken when it delegated) also holds when an approval resume, a new run, carries
+on from the run that delegated.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from psycopg.rows import dict_row
+
+from app.db.get_conn_factory import conn_factory
+from app.events.thread_events import publish_thread_event
+from app.observability.spans import timed
+
+
+@timed("db")
+def record_activity(
+    *,
+    thread_id: str,
+    run_id: str,
+    agent: str,
+    activity: str,
+    payload: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """Append an entry; `seq` counts from 1 within the thread."""
+    with conn_factory() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            # Parallel specialists of a run append at the same time; without the lock
+            # both would read the same MAX(seq). Released at commit.
+            cur.execute("SELECT pg_advisory_xact_lock(hashtextextended(%s, 0))", (f"agent_activity:{thread_id}",))
+            cur.execute(
+                """
+                INSERT INTO agent_activity (thread_id, run_id, seq, agent, activity, payload)
+                SELECT %s, %s, COALESCE(MAX(seq), 0) + 1, %s, %s, %s::jsonb
+                FROM agent_activity
+                WHERE thread_id = %s
+                RETURNING id, thread_id, run_id, seq, agent, activity, payload, created_at
+                """,
+                (
+                    thread_id,
+                    run_id,
+                    agent,
+                    activity,
+                    json.dumps(payload or {}),
+                    thread_id,
+                ),
+            )
+            row = cur.fetchone()
+        conn.commit()
+
+    publish_thread_event(
+        thread_id,
+        "agent.activity",
+        {
+            "run_id": run_id,
+            "seq": row["seq"],
+            "agent": agent,
+            "activity": activity,
+            "payload": row["payload"],
+        },
+    )
+    return row
+
+
+def fetch_activity(
+    thread_id: str,
+    *,
+    run_id: str | None = None,
+    agent: str | None = None,
+    after_id: int = 0,
+    limit: int = 100,
+) -> list[dict[str, Any]]:
+    """Oldest first, keyset-paginated on `id`."""
+    conditions = ["thread_id = %s", "id > %s"]
+    params: list[Any] = [thread_id, after_id]
+    if run_id is not None:
+        conditions.append("run_id = %s")
+        params.append(run_id)
+    if agent is not None:
+        conditions.append("agent = %s")
+        params.append(agent)
+    params.append(limit)
+
+    with conn_factory() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                f"""
+                SELECT id, thread_id, run_id, seq, agent, activity, payload, created_at
+                FROM agent_activity
+                WHERE {" AND ".join(conditions)}
+                ORDER BY id ASC
+                LIMIT %s
+                """,
+                params,
+            )
+            return cur.fetchall()
+
+
+def fetch_run_activity(run_id: str, *, after_seq: int = 0, limit: int = 100) -> list[dict[str, Any]]:
+    with conn_factory() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                """
+                SELECT a.id, a.thread_id, a.run_id, a.seq, a.agent, a.activity, a.payload, a.created_at
+                FROM runs r
+                JOIN agent_activity a ON a.thread_id = r.thread_id AND a.run_id = r.run_id
+                WHERE r.run_id = %s AND a.seq > %s
+                ORDER BY a.seq ASC
+                LIMIT %s
+                """,
+                (run_id, after_seq, limit),
+            )
+            return cur.fetchall()
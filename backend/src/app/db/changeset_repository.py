@@ -1,12 +1,17 @@
 from __future__ import annotations
 
+import json
+from datetime import datetime
 from typing import Any
 
 from psycopg.rows import dict_row
 
 from app.db.get_conn_factory import conn_factory
+from app.events.thread_events import publish_thread_event
+from app.observability.spans import timed
 
 
+@timed("db")
 def create_changeset(
     *,
     change_set_id: str,
@@ -14,7 +19,7 @@ def create_changeset(
     run_id: str | None,
     created_by: str,
     summary: str,
-    docs: list[dict[str, str]],
+    docs: list[dict[str, Any]],
     status: str = "pending",
 ) -> None:
     with conn_factory() as conn:
@@ -44,13 +49,21 @@ def create_changeset(
                           doc_id,
                           before_content,
                           after_content,
-                          diff
-                        ) VALUES (%s, %s, %s, %s, %s, %s)
+                          diff,
+                          hunks,
+                          lines_added,
+                          lines_removed,
+                          base_version
+                        ) VALUES (%s, %s, %s, %s, %s, %s, %s::jsonb, %s, %s, %s)
                         ON CONFLICT (change_set_id, doc_id)
                         DO UPDATE SET
                           before_content = EXCLUDED.before_content,
                           after_content = EXCLUDED.after_content,
-                          diff = EXCLUDED.diff
+                          diff = EXCLUDED.diff,
+                          hunks = EXCLUDED.hunks,
+                          lines_added = EXCLUDED.lines_added,
+                          lines_removed = EXCLUDED.lines_removed,
+                          base_version = EXCLUDED.base_version
                         """,
                         (
                             change_set_id,
@@ -59,10 +72,27 @@ def create_changeset(
                             doc["before_content"],
                             doc["after_content"],
                             doc["diff"],
+                            json.dumps(doc.get("hunks", [])),
+                            doc.get("lines_added", 0),
+                            doc.get("lines_removed", 0),
+                            doc.get("base_version"),
                         ),
                     )
 
+    publish_thread_event(
+        thread_id,
+        "changeset.status",
+        {
+            "change_set_id": change_set_id,
+            "run_id": run_id,
+            "created_by": created_by,
+            "status": status,
+            "docs": [doc["doc_id"] for doc in docs],
+        },
+    )
 
+
+@timed("db")
 def set_changeset_status(
     change_set_id: str,
     *,
@@ -80,11 +110,20 @@ def set_changeset_status(
                   decision_note = COALESCE(%s, decision_note),
                   decided_at = CASE WHEN %s THEN NOW() ELSE decided_at END
                 WHERE change_set_id = %s
+                RETURNING thread_id
                 """,
                 (status, decision_note, decided, change_set_id),
             )
+            row = cur.fetchone()
         conn.commit()
 
+    if row:
+        publish_thread_event(
+            row[0],
+            "changeset.status",
+            {"change_set_id": change_set_id, "status": status},
+        )
+
 
 def append_changeset_review(
     change_set_id: str,
@@ -145,6 +184,108 @@ def fetch_changesets(thread_id: str) -> list[dict[str, Any]]:
             return changesets
 
 
+def fetch_changeset_summaries(
+    thread_id: str,
+    *,
+    status: str | None = None,
+    before: tuple[datetime, str] | None = None,
+    limit: int | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Newest-first change sets with per-doc line counts but no contents or diffs.
+    `before` is a `(created_at, change_set_id)` keyset cursor from the previous page.
+    """
+    conditions = ["cs.thread_id = %s"]
+    params: list[Any] = [thread_id]
+    if status is not None:
+        conditions.append("cs.status = %s")
+        params.append(status)
+    if before is not None:
+        conditions.append("(cs.created_at, cs.change_set_id) < (%s, %s)")
+        params.extend(before)
+    limit_clause = ""
+    if limit is not None:
+        limit_clause = "LIMIT %s"
+        params.append(limit)
+
+    with conn_factory() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                f"""
+                WITH page AS (
+                  SELECT
+                    cs.change_set_id,
+                    cs.thread_id,
+                    cs.run_id,
+                    cs.created_by,
+                    cs.summary,
+                    cs.status,
+                    cs.created_at,
+                    cs.decided_at,
+                    cs.decision_note
+                  FROM change_sets cs
+                  WHERE {" AND ".join(conditions)}
+                  ORDER BY cs.created_at DESC, cs.change_set_id DESC
+                  {limit_clause}
+                )
+                SELECT
+                  page.*,
+                  COALESCE(
+                    json_agg(
+                      json_build_object(
+                        'doc_id', d.doc_id,
+                        'lines_added', d.lines_added,
+                        'lines_removed', d.lines_removed
+                      )
+                      ORDER BY d.doc_id
+                    ) FILTER (WHERE d.doc_id IS NOT NULL),
+                    '[]'::json
+                  ) AS doc_stats
+                FROM page
+                LEFT JOIN change_set_docs d ON d.change_set_id = page.change_set_id
+                GROUP BY
+                  page.change_set_id,
+                  page.thread_id,
+                  page.run_id,
+                  page.created_by,
+                  page.summary,
+                  page.status,
+                  page.created_at,
+                  page.decided_at,
+                  page.decision_note
+                ORDER BY page.created_at DESC, page.change_set_id DESC
+                """,
+                params,
+            )
+            changesets = cur.fetchall()
+
+    for changeset in changesets:
+        changeset["docs"] = [doc["doc_id"] for doc in changeset["doc_stats"]]
+    return changesets
+
+
+def fetch_changeset_doc(thread_id: str, change_set_id: str, doc_id: str) -> dict[str, Any] | None:
+    with conn_factory() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                """
+                SELECT
+                  doc_id,
+                  before_content,
+                  after_content,
+                  diff,
+                  hunks,
+                  lines_added,
+                  lines_removed,
+                  base_version
+                FROM change_set_docs
+                WHERE thread_id = %s AND change_set_id = %s AND doc_id = %s
+                """,
+                (thread_id, change_set_id, doc_id),
+            )
+            return cur.fetchone()
+
+
 def fetch_changeset_detail(thread_id: str, change_set_id: str) -> dict[str, Any] | None:
     with conn_factory() as conn:
         with conn.cursor(row_factory=dict_row) as cur:
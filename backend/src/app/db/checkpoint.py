@@ -1,10 +1,17 @@
 from __future__ import annotations
 
+from contextlib import contextmanager
+from typing import Iterator
 from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
 
 from langgraph.checkpoint.postgres import PostgresSaver
+from psycopg import Connection, errors as psycopg_errors
+from psycopg.rows import dict_row
 
+from app.db.checkpoint_serde import get_checkpoint_serde
+from app.db.migrations import migration_lock
 from app.db.URL import DB_URL
+from app.observability.spans import span
 
 
 def checkpoint_db_url() -> str:
@@ -18,6 +25,54 @@ def checkpoint_db_url() -> str:
     return urlunparse(parsed._replace(query=query))
 
 
+class ProfiledPostgresSaver(PostgresSaver):
+    """PostgresSaver whose reads and writes show up as `checkpoint` spans in run profiles."""
+
+    def get_tuple(self, config):
+        with span("checkpoint", "get_tuple"):
+            return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        with span("checkpoint", "put"):
+            return super().put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        with span("checkpoint", "put_writes"):
+            return super().put_writes(config, writes, task_id, task_path)
+
+
+@contextmanager
+def open_checkpointer() -> Iterator[PostgresSaver]:
+    """
+    PostgresSaver on its own connection, using the serializer selected by
+    CHECKPOINT_SERDE. Same connection settings as `PostgresSaver.from_conn_string`,
+    which does not accept a serializer.
+    """
+    with Connection.connect(
+        checkpoint_db_url(),
+        autocommit=True,
+        prepare_threshold=0,
+        row_factory=dict_row,
+    ) as conn:
+        yield ProfiledPostgresSaver(conn, serde=get_checkpoint_serde())
+
+
+def _checkpoint_schema_version(conn: Connection) -> int:
+    try:
+        row = conn.execute("SELECT MAX(v) AS v FROM checkpoint_migrations").fetchone()
+    except psycopg_errors.UndefinedTable:
+        return -1
+    return -1 if row["v"] is None else row["v"]
+
+
 def ensure_checkpoint_schema() -> None:
-    with PostgresSaver.from_conn_string(checkpoint_db_url()) as checkpointer:
-        checkpointer.setup()
+    """
+    Create or upgrade the checkpoint tables. A single query when they are
+    current; otherwise `setup()` runs under the schema migration lock so workers
+    booting together do not race on the DDL.
+    """
+    with open_checkpointer() as checkpointer:
+        if _checkpoint_schema_version(checkpointer.conn) >= len(PostgresSaver.MIGRATIONS) - 1:
+            return
+        with migration_lock(checkpointer.conn):
+            checkpointer.setup()
@@ -0,0 +1,376 @@
+"""
+Checkpoint retention and compaction.
+
+Resuming a thread (including a pending `await_approval_node` interrupt) only
+needs the latest checkpoint of each live namespace plus its pending writes.
+Everything else in `checkpoints`, `checkpoint_writes` and `checkpoint_blobs`
+is history that this module prunes:
+
+- per (thread_id, checkpoint_ns), all but the newest `retain` checkpoints;
+- subgraph namespaces whose newest checkpoint predates the thread's newest
+  root checkpoint (the subgraph finished and the parent moved on);
+- writes of deleted checkpoints, and blobs no remaining checkpoint references.
+
+Checkpoints younger than `min_age_seconds` are always kept. A thread is only
+compacted while no run holds its `thread_run_lock`, and every batch of at most
+`batch_rows` rows commits on its own under `lock_timeout`.
+
+CLI (from backend/src):
+
+    python -m app.db.checkpoint_compaction [--dry-run] [--thread-id ID] [--retain N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+from dataclasses import dataclass, field
+from threading import Event, Thread
+
+import psycopg
+
+from app.config import (
+    CHECKPOINT_COMPACTION_BATCH_ROWS,
+    CHECKPOINT_COMPACTION_BATCH_THREADS,
+    CHECKPOINT_COMPACTION_INTERVAL_SECONDS,
+    CHECKPOINT_COMPACTION_LOCK_TIMEOUT_MS,
+    CHECKPOINT_RETAIN_MIN_AGE_SECONDS,
+    CHECKPOINT_RETAIN_PER_NAMESPACE,
+)
+from app.db.get_conn_factory import conn_factory
+from app.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+rows_deleted_total = registry.counter(
+    "checkpoint_compaction_rows_deleted_total",
+    "Checkpoint rows deleted by compaction, by table.",
+)
+bytes_reclaimed_total = registry.counter(
+    "checkpoint_compaction_bytes_reclaimed_total",
+    "Approximate bytes of checkpoint data deleted by compaction, by table.",
+)
+threads_compacted_total = registry.counter(
+    "checkpoint_compaction_threads_total",
+    "Threads visited by compaction, by outcome (compacted, busy).",
+)
+
+_DELETE_CHECKPOINTS_SQL = """
+WITH ranked AS (
+  SELECT
+    checkpoint_ns,
+    checkpoint_id,
+    (checkpoint->>'ts')::timestamptz AS ts,
+    row_number() OVER (PARTITION BY checkpoint_ns ORDER BY checkpoint_id DESC) AS rank,
+    MAX(checkpoint_id) OVER (PARTITION BY checkpoint_ns) AS ns_latest
+  FROM checkpoints
+  WHERE thread_id = %(thread_id)s
+),
+root AS (
+  SELECT MAX(checkpoint_id) AS latest
+  FROM checkpoints
+  WHERE thread_id = %(thread_id)s AND checkpoint_ns = ''
+),
+doomed AS (
+  SELECT ranked.checkpoint_ns, ranked.checkpoint_id
+  FROM ranked, root
+  WHERE
+    (ranked.rank > %(retain)s OR (ranked.checkpoint_ns <> '' AND ranked.ns_latest < root.latest))
+    AND ranked.ts < NOW() - make_interval(secs => %(min_age_seconds)s)
+  LIMIT %(batch_rows)s
+),
+deleted AS (
+  DELETE FROM checkpoints c
+  USING doomed
+  WHERE
+    c.thread_id = %(thread_id)s
+    AND c.checkpoint_ns = doomed.checkpoint_ns
+    AND c.checkpoint_id = doomed.checkpoint_id
+  RETURNING pg_column_size(c.checkpoint) + pg_column_size(c.metadata) AS bytes
+)
+SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM deleted
+"""
+
+_DELETE_WRITES_SQL = """
+WITH doomed AS (
+  SELECT w.ctid
+  FROM checkpoint_writes w
+  WHERE
+    w.thread_id = %(thread_id)s
+    AND NOT EXISTS (
+      SELECT 1
+      FROM checkpoints c
+      WHERE
+        c.thread_id = w.thread_id
+        AND c.checkpoint_ns = w.checkpoint_ns
+        AND c.checkpoint_id = w.checkpoint_id
+    )
+  LIMIT %(batch_rows)s
+),
+deleted AS (
+  DELETE FROM checkpoint_writes w
+  USING doomed
+  WHERE w.ctid = doomed.ctid
+  RETURNING octet_length(w.blob) AS bytes
+)
+SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM deleted
+"""
+
+_DELETE_BLOBS_SQL = """
+WITH doomed AS (
+  SELECT b.ctid
+  FROM checkpoint_blobs b
+  WHERE
+    b.thread_id = %(thread_id)s
+    AND NOT EXISTS (
+      SELECT 1
+      FROM checkpoints c, jsonb_each_text(c.checkpoint->'channel_versions') AS v(channel, version)
+      WHERE
+        c.thread_id = b.thread_id
+        AND c.checkpoint_ns = b.checkpoint_ns
+        AND v.channel = b.channel
+        AND v.version = b.version
+    )
+  LIMIT %(batch_rows)s
+),
+deleted AS (
+  DELETE FROM checkpoint_blobs b
+  USING doomed
+  WHERE b.ctid = doomed.ctid
+  RETURNING COALESCE(octet_length(b.blob), 0) AS bytes
+)
+SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM deleted
+"""
+
+_TABLE_STATEMENTS = (
+    ("checkpoints", _DELETE_CHECKPOINTS_SQL),
+    ("checkpoint_writes", _DELETE_WRITES_SQL),
+    ("checkpoint_blobs", _DELETE_BLOBS_SQL),
+)
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    retain: int = CHECKPOINT_RETAIN_PER_NAMESPACE
+    min_age_seconds: float = CHECKPOINT_RETAIN_MIN_AGE_SECONDS
+    batch_rows: int = CHECKPOINT_COMPACTION_BATCH_ROWS
+    lock_timeout_ms: int = CHECKPOINT_COMPACTION_LOCK_TIMEOUT_MS
+
+
+@dataclass
+class CompactionStats:
+    threads_compacted: int = 0
+    threads_busy: int = 0
+    rows: dict[str, int] = field(default_factory=dict)
+    bytes: dict[str, int] = field(default_factory=dict)
+
+    def add(self, table: str, rows: int, size: int) -> None:
+        self.rows[table] = self.rows.get(table, 0) + rows
+        self.bytes[table] = self.bytes.get(table, 0) + size
+
+
+def _compact_batch(
+    conn: psycopg.Connection,
+    thread_id: str,
+    policy: RetentionPolicy,
+    *,
+    dry_run: bool,
+) -> dict[str, tuple[int, int]] | None:
+    """One short transaction. Returns None when a run currently holds the thread."""
+    params = {
+        "thread_id": thread_id,
+        "retain": max(policy.retain, 1),
+        "min_age_seconds": policy.min_age_seconds,
+        "batch_rows": policy.batch_rows,
+    }
+    deleted: dict[str, tuple[int, int]] = {}
+    with conn.transaction(force_rollback=dry_run):
+        with conn.cursor() as cur:
+            cur.execute(f"SET LOCAL lock_timeout = {int(policy.lock_timeout_ms)}")
+            # Conflicts with the session lock taken by thread_run_lock for the whole run.
+            cur.execute("SELECT pg_try_advisory_xact_lock(hashtextextended(%s, 0))", (thread_id,))
+            if not cur.fetchone()[0]:
+                return None
+            for table, sql in _TABLE_STATEMENTS:
+                cur.execute(sql, params)
+                rows, size = cur.fetchone()
+                deleted[table] = (int(rows), int(size))
+    return deleted
+
+
+def compact_thread(
+    thread_id: str,
+    policy: RetentionPolicy | None = None,
+    *,
+    dry_run: bool = False,
+    stats: CompactionStats | None = None,
+) -> CompactionStats:
+    policy = policy or RetentionPolicy()
+    stats = stats or CompactionStats()
+    with conn_factory() as conn:
+        while True:
+            try:
+                deleted = _compact_batch(conn, thread_id, policy, dry_run=dry_run)
+            except psycopg.errors.LockNotAvailable:
+                deleted = None
+            if deleted is None:
+                stats.threads_busy += 1
+                threads_compacted_total.inc(outcome="busy")
+                return stats
+
+            for table, (rows, size) in deleted.items():
+                stats.add(table, rows, size)
+                if not dry_run and rows:
+                    rows_deleted_total.inc(rows, table=table)
+                    bytes_reclaimed_total.inc(size, table=table)
+
+            # A dry run rolls back, so repeating it would count the same rows again.
+            if dry_run or all(rows < policy.batch_rows for rows, _ in deleted.values()):
+                break
+
+    stats.threads_compacted += 1
+    threads_compacted_total.inc(outcome="compacted")
+    return stats
+
+
+def _candidate_threads(retain: int, *, after: str, limit: int) -> list[str]:
+    with conn_factory() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT thread_id
+                FROM checkpoints
+                WHERE thread_id > %s
+                GROUP BY thread_id
+                HAVING COUNT(*) > %s
+                ORDER BY thread_id
+                LIMIT %s
+                """,
+                (after, max(retain, 1), limit),
+            )
+            return [row[0] for row in cur.fetchall()]
+
+
+def compact_all(
+    policy: RetentionPolicy | None = None,
+    *,
+    dry_run: bool = False,
+    batch_threads: int = CHECKPOINT_COMPACTION_BATCH_THREADS,
+    should_stop: Event | None = None,
+) -> CompactionStats:
+    policy = policy or RetentionPolicy()
+    stats = CompactionStats()
+    cursor = ""
+    while not (should_stop and should_stop.is_set()):
+        thread_ids = _candidate_threads(policy.retain, after=cursor, limit=batch_threads)
+        if not thread_ids:
+            break
+        for thread_id in thread_ids:
+            if should_stop and should_stop.is_set():
+                break
+            compact_thread(thread_id, policy, dry_run=dry_run, stats=stats)
+        cursor = thread_ids[-1]
+    return stats
+
+
+class CheckpointCompactor:
+    """
+    Background compaction loop. Replicas coordinate through a global advisory
+    lock so only one of them compacts at a time.
+    """
+
+    LOCK_KEY = "idea_maestro:checkpoint_compaction"
+
+    def __init__(self, *, interval_seconds: float, policy: RetentionPolicy | None = None):
+        self._interval_seconds = interval_seconds
+        self._policy = policy or RetentionPolicy()
+        self._stopped = Event()
+        self._thread = Thread(target=self._run_forever, name="checkpoint-compactor", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopped.set()
+        self._thread.join(timeout=timeout)
+
+    def _run_forever(self) -> None:
+        while not self._stopped.wait(self._interval_seconds):
+            try:
+                self._run_once()
+            except Exception:
+                logger.exception("Checkpoint compaction failed")
+
+    def _run_once(self) -> None:
+        with conn_factory() as conn:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_try_advisory_lock(hashtextextended(%s, 0))", (self.LOCK_KEY,))
+                if not cur.fetchone()[0]:
+                    return
+            try:
+                stats = compact_all(self._policy, should_stop=self._stopped)
+            finally:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT pg_advisory_unlock(hashtextextended(%s, 0))", (self.LOCK_KEY,))
+        logger.info(
+            "Checkpoint compaction: %s thread(s) compacted, %s busy, rows=%s bytes=%s",
+            stats.threads_compacted,
+            stats.threads_busy,
+            stats.rows,
+            stats.bytes,
+        )
+
+
+_compactor: CheckpointCompactor | None = None
+
+
+def start_checkpoint_compactor() -> None:
+    global _compactor
+    if CHECKPOINT_COMPACTION_INTERVAL_SECONDS <= 0 or _compactor is not None:
+        return
+    _compactor = CheckpointCompactor(interval_seconds=CHECKPOINT_COMPACTION_INTERVAL_SECONDS)
+    _compactor.start()
+
+
+def stop_checkpoint_compactor() -> None:
+    global _compactor
+    if _compactor is not None:
+        _compactor.stop()
+        _compactor = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prune superseded LangGraph checkpoints.")
+    parser.add_argument("--thread-id", help="Compact a single thread")
+    parser.add_argument("--retain", type=int, default=CHECKPOINT_RETAIN_PER_NAMESPACE)
+    parser.add_argument("--min-age-seconds", type=float, default=CHECKPOINT_RETAIN_MIN_AGE_SECONDS)
+    parser.add_argument("--batch-rows", type=int, default=CHECKPOINT_COMPACTION_BATCH_ROWS)
+    parser.add_argument("--batch-threads", type=int, default=CHECKPOINT_COMPACTION_BATCH_THREADS)
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report what one batch per thread would delete, then roll back",
+    )
+    args = parser.parse_args()
+
+    policy = RetentionPolicy(
+        retain=args.retain,
+        min_age_seconds=args.min_age_seconds,
+        batch_rows=args.batch_rows,
+    )
+    if args.thread_id:
+        stats = compact_thread(args.thread_id, policy, dry_run=args.dry_run)
+    else:
+        stats = compact_all(policy, dry_run=args.dry_run, batch_threads=args.batch_threads)
+
+    prefix = "Would delete" if args.dry_run else "Deleted"
+    print(f"Threads compacted: {stats.threads_compacted}, skipped (run in progress): {stats.threads_busy}")
+    for table, _ in _TABLE_STATEMENTS:
+        rows = stats.rows.get(table, 0)
+        size = stats.bytes.get(table, 0)
+        print(f"{prefix} {rows} row(s) from {table} (~{size / 1024:.1f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
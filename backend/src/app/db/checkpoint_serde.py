@@ -0,0 +1,79 @@
+"""
+Checkpoint serializers.
+
+`CompactSerializer` wraps LangGraph's default `JsonPlusSerializer` (msgpack
+with LangChain/pydantic extension types) and zstd-compresses any encoded value
+above a size threshold, tagging it `<type>+zstd`. Decoding strips the tag and
+hands the original bytes back to the inner serializer, so every type it
+supports (including all LangChain message classes) round-trips unchanged, and
+blobs written by the default serializer stay readable.
+"""
+
+from __future__ import annotations
+
+from threading import local
+from typing import Any
+
+import zstandard
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from app.config import (
+    CHECKPOINT_SERDE,
+    CHECKPOINT_SERDE_COMPRESS_MIN_BYTES,
+    CHECKPOINT_SERDE_ZSTD_LEVEL,
+)
+
+ZSTD_SUFFIX = "+zstd"
+
+
+class CompactSerializer(SerializerProtocol):
+    def __init__(
+        self,
+        *,
+        min_compress_bytes: int = CHECKPOINT_SERDE_COMPRESS_MIN_BYTES,
+        level: int = CHECKPOINT_SERDE_ZSTD_LEVEL,
+        inner: SerializerProtocol | None = None,
+    ):
+        self._inner = inner or JsonPlusSerializer()
+        self._min_compress_bytes = min_compress_bytes
+        self._level = level
+        # zstandard (de)compressor objects must not be shared between threads.
+        self._local = local()
+
+    def _compressor(self) -> zstandard.ZstdCompressor:
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = self._local.compressor = zstandard.ZstdCompressor(level=self._level)
+        return compressor
+
+    def _decompressor(self) -> zstandard.ZstdDecompressor:
+        decompressor = getattr(self._local, "decompressor", None)
+        if decompressor is None:
+            decompressor = self._local.decompressor = zstandard.ZstdDecompressor()
+        return decompressor
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        type_, data = self._inner.dumps_typed(obj)
+        if len(data) < self._min_compress_bytes:
+            return type_, data
+        compressed = self._compressor().compress(data)
+        if len(compressed) >= len(data):
+            return type_, data
+        return type_ + ZSTD_SUFFIX, compressed
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith(ZSTD_SUFFIX):
+            return self._inner.loads_typed(
+                (type_[: -len(ZSTD_SUFFIX)], self._decompressor().decompress(payload))
+            )
+        return self._inner.loads_typed(data)
+
+
+def get_checkpoint_serde() -> SerializerProtocol:
+    if CHECKPOINT_SERDE == "compact":
+        return CompactSerializer()
+    if CHECKPOINT_SERDE == "default":
+        return JsonPlusSerializer()
+    raise RuntimeError(f"Unknown CHECKPOINT_SERDE: {CHECKPOINT_SERDE!r}")
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from app.observability.spans import timed
+
+
+@timed("db")
+def fetch_doc_body(
+    conn,
+    thread_id: str,
+    doc_id: str,
+    *,
+    version: int,
+    content_hash: str,
+) -> str | None:
+    """
+    Body of a doc at `version`, checked against `content_hash` (sha256 hex).
+
+    The version recorded in state can drift from the stored one (e.g. an apply
+    that did not change the content keeps the old version), so on a mismatch
+    any stored revision with the same hash is accepted.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT content, encode(sha256(convert_to(content, 'UTF8')), 'hex')
+            FROM doc_versions
+            WHERE thread_id = %s AND doc_id = %s AND version = %s
+            """,
+            (thread_id, doc_id, version),
+        )
+        row = cur.fetchone()
+        if row and row[1] == content_hash:
+            return row[0]
+
+        cur.execute(
+            """
+            SELECT content
+            FROM (
+              SELECT content FROM docs WHERE thread_id = %(thread_id)s AND doc_id = %(doc_id)s
+              UNION ALL
+              SELECT content FROM doc_versions WHERE thread_id = %(thread_id)s AND doc_id = %(doc_id)s
+            ) revisions
+            WHERE encode(sha256(convert_to(content, 'UTF8')), 'hex') = %(content_hash)s
+            LIMIT 1
+            """,
+            {"thread_id": thread_id, "doc_id": doc_id, "content_hash": content_hash},
+        )
+        row = cur.fetchone()
+        return row[0] if row else None
+
+
+@timed("db")
+def fetch_changeset_after_contents(conn, change_set_id: str) -> dict[str, str]:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT doc_id, after_content
+            FROM change_set_docs
+            WHERE change_set_id = %s
+            """,
+            (change_set_id,),
+        )
+        return {doc_id: content for doc_id, content in cur.fetchall()}
+
+
+@timed("db")
+def fetch_changeset_bases(conn, change_set_id: str) -> dict[str, tuple[int | None, str]]:
+    """(base_version, before_content) per doc: what the change set was diffed against."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT doc_id, base_version, before_content
+            FROM change_set_docs
+            WHERE change_set_id = %s
+            """,
+            (change_set_id,),
+        )
+        return {doc_id: (base_version, before) for doc_id, base_version, before in cur.fetchall()}
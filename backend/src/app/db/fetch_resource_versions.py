@@ -0,0 +1,100 @@
+"""
+Small metadata queries used to derive ETags. None of these touch document
+bodies, diffs or messages, so a `304 Not Modified` costs one cheap round trip.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+
+def fetch_docs_version(conn, thread_id: str) -> tuple[Any, ...]:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT COUNT(*), COALESCE(SUM(version), 0), MAX(updated_at)
+            FROM docs
+            WHERE thread_id = %s
+            """,
+            (thread_id,),
+        )
+        return tuple(cur.fetchone())
+
+
+def fetch_doc_version(conn, thread_id: str, doc_id: str) -> tuple[Any, ...] | None:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT version, updated_at
+            FROM docs
+            WHERE thread_id = %s AND doc_id = %s
+            """,
+            (thread_id, doc_id),
+        )
+        row = cur.fetchone()
+        return tuple(row) if row else None
+
+
+def fetch_changesets_version(conn, thread_id: str) -> tuple[Any, ...]:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT
+              COUNT(*),
+              MAX(created_at),
+              MAX(decided_at),
+              md5(COALESCE(string_agg(change_set_id || ':' || status, ',' ORDER BY change_set_id), ''))
+            FROM change_sets
+            WHERE thread_id = %s
+            """,
+            (thread_id,),
+        )
+        return tuple(cur.fetchone())
+
+
+def fetch_changeset_version(conn, thread_id: str, change_set_id: str) -> tuple[Any, ...] | None:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT
+              cs.status,
+              cs.decided_at,
+              cs.decision_note,
+              (SELECT COUNT(*) FROM change_set_reviews r WHERE r.change_set_id = cs.change_set_id)
+            FROM change_sets cs
+            WHERE cs.thread_id = %s AND cs.change_set_id = %s
+            """,
+            (thread_id, change_set_id),
+        )
+        row = cur.fetchone()
+        return tuple(row) if row else None
+
+
+def fetch_snapshot_version(conn, thread_id: str) -> tuple[Any, ...]:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT
+              (SELECT updated_at FROM chat_threads WHERE thread_id = %(thread_id)s),
+              (SELECT next_seq FROM chat_threads WHERE thread_id = %(thread_id)s),
+              (SELECT title || ':' || status FROM chat_threads WHERE thread_id = %(thread_id)s),
+              (
+                SELECT COUNT(*) || ':' || COALESCE(SUM(version), 0) || ':' || COALESCE(MAX(updated_at)::text, '')
+                FROM docs
+                WHERE thread_id = %(thread_id)s
+              ),
+              (
+                SELECT md5(COALESCE(string_agg(run_id || ':' || status, ',' ORDER BY run_id), ''))
+                FROM runs
+                WHERE thread_id = %(thread_id)s
+              ),
+              (SELECT MAX(id) FROM agent_status_events WHERE thread_id = %(thread_id)s),
+              (
+                SELECT md5(COALESCE(string_agg(change_set_id || ':' || status, ',' ORDER BY change_set_id), ''))
+                FROM change_sets
+                WHERE thread_id = %(thread_id)s
+              )
+            """,
+            {"thread_id": thread_id},
+        )
+        return tuple(cur.fetchone())
@@ -4,7 +4,10 @@ from typing import Any
 
 from psycopg.rows import dict_row
 
+from app.observability.spans import timed
 
+
+@timed("db")
 def fetch_thread_docs(conn, thread_id: str) -> list[dict[str, Any]]:
     with conn.cursor(row_factory=dict_row) as cur:
         cur.execute(
@@ -51,6 +54,7 @@ def fetch_thread_doc(conn, thread_id: str, doc_id: str) -> dict[str, Any] | None
         return cur.fetchone()
 
 
+@timed("db")
 def fetch_thread_docs_map(conn, thread_id: str) -> dict[str, dict[str, Any]]:
     rows = fetch_thread_docs(conn, thread_id)
     mapped: dict[str, dict[str, Any]] = {}
@@ -2,8 +2,10 @@ from typing import List, Dict, Any
 import json
 import psycopg
 from psycopg.rows import dict_row
+from app.observability.spans import timed
 
 
+@timed("db")
 def fetch_thread_messages(conn: psycopg.Connection, thread_id: str) -> List[Dict[str, Any]]:
     with conn.cursor(row_factory=dict_row) as cur:
         cur.execute(
@@ -5,7 +5,7 @@ from typing import Any
 from app.db.fetch_thread_docs import fetch_thread_docs
 from app.db.fetch_thread_messages import fetch_thread_messages
 from app.db.run_repository import fetch_latest_agent_statuses, fetch_runs
-from app.db.changeset_repository import fetch_changesets
+from app.db.changeset_repository import fetch_changeset_summaries
 from app.db.thread_repository import fetch_thread
 
 
@@ -28,7 +28,7 @@ def fetch_thread_snapshot(conn, thread_id: str) -> dict[str, Any]:
     docs = fetch_thread_docs(conn, thread_id)
     runs = fetch_runs(thread_id)
     agent_statuses = fetch_latest_agent_statuses(thread_id)
-    changesets = fetch_changesets(thread_id)
+    changesets = fetch_changeset_summaries(thread_id)
 
     return {
         "thread": _serialize_timestamps([thread])[0] if thread else None,
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import psycopg
+
+from app.observability.spans import timed
+
+
+@timed("db")
+def take_llm_rate_token(conn: psycopg.Connection, model: str, *, rate: float, burst: float) -> float:
+    """
+    Take one token from `model`'s shared bucket, refilled at `rate` per second up to
+    `burst`. Returns 0 when a token was taken, otherwise the seconds until one is due.
+
+    The refill is computed from the database clock, so every replica sees the same
+    bucket; the row lock serializes concurrent takes. Commits on `conn`, which the
+    caller keeps open between takes.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO llm_rate_buckets (model, tokens)
+            VALUES (%s, %s)
+            ON CONFLICT (model) DO NOTHING
+            """,
+            (model, burst),
+        )
+        cur.execute(
+            """
+            WITH current AS (
+              SELECT LEAST(
+                %(burst)s,
+                tokens + %(rate)s * EXTRACT(EPOCH FROM clock_timestamp() - refilled_at)::float8
+              ) AS available
+              FROM llm_rate_buckets
+              WHERE model = %(model)s
+              FOR UPDATE
+            )
+            UPDATE llm_rate_buckets AS bucket
+            SET
+              tokens = current.available - CASE WHEN current.available >= 1 THEN 1 ELSE 0 END,
+              refilled_at = clock_timestamp()
+            FROM current
+            WHERE bucket.model = %(model)s
+            RETURNING current.available
+            """,
+            {"model": model, "rate": rate, "burst": burst},
+        )
+        (available,) = cur.fetchone()
+    conn.commit()
+    return 0.0 if available >= 1 else (1 - available) / rate
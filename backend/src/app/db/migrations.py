@@ -1,10 +1,38 @@
+"""
+Startup schema migrations.
+
+`run_migrations` applies the SQL files in `migrations/` in name order, each in
+its own transaction, and records them in `schema_migrations`. Everything runs on
+one connection:
+
+- a single query checks which files are recorded; when all are, it returns;
+- otherwise it takes the `MIGRATION_LOCK_KEY` advisory lock, so workers booting
+  together apply each file once while the others wait, re-reads what is applied
+  and applies the rest.
+
+`ensure_checkpoint_schema` (`app/db/checkpoint.py`) uses the same lock.
+"""
+
 from __future__ import annotations
 
-from dataclasses import dataclass
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
+from time import perf_counter
+from typing import Iterator
+
+from psycopg import Connection, errors as psycopg_errors
+from psycopg.rows import tuple_row
 
 from app.db.get_conn_factory import conn_factory
 
+logger = logging.getLogger(__name__)
+
+MIGRATION_LOCK_KEY = "idea_maestro:schema_migrations"
+LOCK_POLL_SECONDS = 0.05
+
 
 @dataclass(frozen=True)
 class MigrationFile:
@@ -12,6 +40,14 @@ class MigrationFile:
     sql: str
 
 
+@dataclass
+class MigrationReport:
+    up_to_date: bool = False
+    applied: list[tuple[str, float]] = field(default_factory=list)  # (name, ms)
+    lock_wait_ms: float = 0.0
+    total_ms: float = 0.0
+
+
 def _migration_dir() -> Path:
     return Path(__file__).resolve().parent / "migrations"
 
@@ -24,41 +60,90 @@ def _load_migrations() -> list[MigrationFile]:
     return migrations
 
 
-def _ensure_schema_migrations_table() -> None:
-    with conn_factory() as conn:
+@contextmanager
+def migration_lock(conn: Connection) -> Iterator[None]:
+    """
+    Hold the schema advisory lock on an autocommit connection.
+
+    Waiters poll `pg_try_advisory_lock` instead of blocking in `pg_advisory_lock`:
+    a blocked statement is an open transaction, and `CREATE INDEX CONCURRENTLY`
+    in the checkpoint schema waits for every open transaction, so the lock holder
+    would deadlock with the workers queued behind it.
+    """
+    with conn.cursor(row_factory=tuple_row) as cur:
+        while True:
+            cur.execute("SELECT pg_try_advisory_lock(hashtextextended(%s, 0))", (MIGRATION_LOCK_KEY,))
+            if cur.fetchone()[0]:
+                break
+            time.sleep(LOCK_POLL_SECONDS)
+    try:
+        yield
+    finally:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS schema_migrations (
-                  name TEXT PRIMARY KEY,
-                  applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                )
-                """
-            )
-        conn.commit()
+            cur.execute("SELECT pg_advisory_unlock(hashtextextended(%s, 0))", (MIGRATION_LOCK_KEY,))
 
 
-def _applied_migrations() -> set[str]:
-    with conn_factory() as conn:
+def _pending_migrations(conn: Connection, migrations: list[MigrationFile]) -> list[MigrationFile]:
+    try:
         with conn.cursor() as cur:
-            cur.execute("SELECT name FROM schema_migrations")
-            rows = cur.fetchall()
-    return {row[0] for row in rows}
+            cur.execute(
+                "SELECT name FROM schema_migrations WHERE name = ANY(%s)",
+                ([migration.name for migration in migrations],),
+            )
+            applied = {row[0] for row in cur.fetchall()}
+    except psycopg_errors.UndefinedTable:
+        applied = set()
+    return [migration for migration in migrations if migration.name not in applied]
+
+
+def _ensure_schema_migrations_table(conn: Connection) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+              name TEXT PRIMARY KEY,
+              applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+            """
+        )
 
 
-def _apply_migration(name: str, sql: str) -> None:
-    with conn_factory() as conn:
-        with conn.transaction():
-            with conn.cursor() as cur:
-                cur.execute(sql)
-                cur.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+def _apply_migration(conn: Connection, migration: MigrationFile) -> None:
+    with conn.transaction():
+        with conn.cursor() as cur:
+            cur.execute(migration.sql)
+            cur.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (migration.name,))
 
 
-def run_migrations() -> None:
-    _ensure_schema_migrations_table()
-    applied = _applied_migrations()
+def run_migrations() -> MigrationReport:
+    started = perf_counter()
+    report = MigrationReport()
+    migrations = _load_migrations()
 
-    for migration in _load_migrations():
-        if migration.name in applied:
-            continue
-        _apply_migration(migration.name, migration.sql)
+    with conn_factory() as conn:
+        conn.autocommit = True
+        if not _pending_migrations(conn, migrations):
+            report.up_to_date = True
+        else:
+            lock_started = perf_counter()
+            with migration_lock(conn):
+                report.lock_wait_ms = (perf_counter() - lock_started) * 1000
+                _ensure_schema_migrations_table(conn)
+                # Another worker may have applied some while we waited for the lock.
+                for migration in _pending_migrations(conn, migrations):
+                    applied_started = perf_counter()
+                    _apply_migration(conn, migration)
+                    report.applied.append((migration.name, (perf_counter() - applied_started) * 1000))
+
+    report.total_ms = (perf_counter() - started) * 1000
+    if report.applied:
+        logger.info(
+            "Applied %s migration(s) in %.0f ms (waited %.0f ms for the lock): %s",
+            len(report.applied),
+            report.total_ms,
+            report.lock_wait_ms,
+            ", ".join(f"{name} {ms:.0f} ms" for name, ms in report.applied),
+        )
+    else:
+        logger.info("Schema up to date (%.0f ms)", report.total_ms)
+    return report
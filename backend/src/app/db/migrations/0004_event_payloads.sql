@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS event_payloads (
+  id BIGSERIAL PRIMARY KEY,
+  topic TEXT NOT NULL,
+  payload TEXT NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS event_payloads_created_idx ON event_payloads(created_at);
@@ -0,0 +1,21 @@
+ALTER TABLE change_set_docs ADD COLUMN IF NOT EXISTS lines_added INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE change_set_docs ADD COLUMN IF NOT EXISTS lines_removed INTEGER NOT NULL DEFAULT 0;
+
+-- Backfill counts for change sets created before they were precomputed.
+UPDATE change_set_docs
+SET
+  lines_added = (
+    SELECT COUNT(*)
+    FROM regexp_split_to_table(diff, E'\n') AS line
+    WHERE line LIKE '+%' AND line NOT LIKE '+++%'
+  ),
+  lines_removed = (
+    SELECT COUNT(*)
+    FROM regexp_split_to_table(diff, E'\n') AS line
+    WHERE line LIKE '-%' AND line NOT LIKE '---%'
+  )
+WHERE diff <> '';
+
+CREATE INDEX IF NOT EXISTS change_sets_thread_pending_idx
+  ON change_sets(thread_id, created_at DESC, change_set_id DESC)
+  WHERE status = 'pending';
@@ -0,0 +1 @@
+ALTER TABLE change_set_docs ADD COLUMN IF NOT EXISTS hunks JSONB NOT NULL DEFAULT '[]'::JSONB;
@@ -0,0 +1,13 @@
+CREATE TABLE IF NOT EXISTS agent_activity (
+  id BIGSERIAL PRIMARY KEY,
+  thread_id TEXT NOT NULL REFERENCES chat_threads(thread_id) ON DELETE CASCADE,
+  run_id TEXT NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+  seq INTEGER NOT NULL,
+  agent TEXT NOT NULL,
+  activity TEXT NOT NULL,
+  payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  UNIQUE (thread_id, run_id, seq)
+);
+
+CREATE INDEX IF NOT EXISTS agent_activity_thread_agent_idx ON agent_activity(thread_id, agent, id);
@@ -0,0 +1,15 @@
+CREATE TABLE IF NOT EXISTS run_spans (
+  id BIGSERIAL PRIMARY KEY,
+  run_id TEXT NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+  thread_id TEXT NOT NULL REFERENCES chat_threads(thread_id) ON DELETE CASCADE,
+  span_id TEXT NOT NULL,
+  parent_span_id TEXT,
+  kind TEXT NOT NULL,
+  name TEXT NOT NULL,
+  start_ms DOUBLE PRECISION NOT NULL,
+  duration_ms DOUBLE PRECISION NOT NULL,
+  status TEXT NOT NULL DEFAULT 'ok',
+  attributes JSONB NOT NULL DEFAULT '{}'::jsonb
+);
+
+CREATE INDEX IF NOT EXISTS run_spans_run_start_idx ON run_spans(run_id, start_ms);
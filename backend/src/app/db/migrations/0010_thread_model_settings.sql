@@ -0,0 +1 @@
+ALTER TABLE chat_threads ADD COLUMN IF NOT EXISTS model_settings JSONB NOT NULL DEFAULT '{}'::jsonb;
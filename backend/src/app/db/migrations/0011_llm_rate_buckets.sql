@@ -0,0 +1,5 @@
+CREATE TABLE IF NOT EXISTS llm_rate_buckets (
+  model TEXT PRIMARY KEY,
+  tokens DOUBLE PRECISION NOT NULL,
+  refilled_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+);
@@ -0,0 +1,2 @@
+-- `seq` now counts per thread rather than per run: appends read MAX(seq) for the thread.
+CREATE INDEX IF NOT EXISTS agent_activity_thread_seq_idx ON agent_activity(thread_id, seq);
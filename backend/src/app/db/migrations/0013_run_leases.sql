@@ -0,0 +1,5 @@
+-- Queued and running runs are leased by the replica that executes them, which renews
+-- the lease while it owns the run; runs whose lease expired are failed by the reaper.
+ALTER TABLE runs ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+CREATE INDEX IF NOT EXISTS runs_active_lease_idx ON runs(lease_expires_at)
+  WHERE status IN ('queued', 'running');
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
-from typing import Dict, Optional, TypedDict
+from typing import Dict, Mapping, Optional, TypedDict
 
 import psycopg
 
+from app.events.thread_events import publish_thread_event
+from app.observability.spans import timed
+
 
 class PersistedDoc(TypedDict, total=False):
     title: str
@@ -14,6 +17,17 @@ class PersistedDoc(TypedDict, total=False):
     updated_at: Optional[str]
 
 
+class DocVersionConflictError(RuntimeError):
+    """A doc is no longer at the version the caller expected; nothing was written."""
+
+    def __init__(self, doc_id: str, expected: int, actual: int | None):
+        super().__init__(f"doc {doc_id!r} is at version {actual}, expected {expected}")
+        self.doc_id = doc_id
+        self.expected = expected
+        self.actual = actual
+
+
+@timed("db")
 def persist_docs_to_db(
     conn: psycopg.Connection,
     thread_id: str,
@@ -21,13 +35,22 @@ def persist_docs_to_db(
     *,
     change_set_id: str | None = None,
     summary: str = "",
+    expected_versions: Mapping[str, int] | None = None,
 ) -> int:
+    """
+    Upsert docs and record a `doc_versions` row for each changed one, in one
+    transaction. With `expected_versions`, every listed doc is locked and must
+    still be at that version (compare-and-swap); otherwise
+    `DocVersionConflictError` is raised and nothing is written.
+    """
     if not docs:
         raise ValueError("docs is empty")
 
+    bumped: list[dict[str, object]] = []
     with conn.transaction():
         with conn.cursor() as cur:
-            for doc_id, payload in docs.items():
+            # Doc id order, so concurrent compare-and-swap writers lock rows in the same order.
+            for doc_id, payload in sorted(docs.items()):
                 try:
                     content = payload["content"]
                     description = payload.get("description", "")
@@ -38,15 +61,20 @@ def persist_docs_to_db(
                 updated_by = payload.get("updated_by")
                 updated_at = payload.get("updated_at")
 
+                expected_version = (expected_versions or {}).get(doc_id)
+                lock_clause = "FOR UPDATE" if expected_version is not None else ""
                 cur.execute(
-                    """
+                    f"""
                     SELECT content, version
                     FROM docs
                     WHERE thread_id = %s AND doc_id = %s
+                    {lock_clause}
                     """,
                     (thread_id, doc_id),
                 )
                 existing = cur.fetchone()
+                if expected_version is not None and (not existing or existing[1] != expected_version):
+                    raise DocVersionConflictError(doc_id, expected_version, existing[1] if existing else None)
 
                 if existing:
                     old_content, old_version = existing
@@ -77,6 +105,7 @@ def persist_docs_to_db(
                     )
 
                     if content_changed:
+                        bumped.append({"doc_id": doc_id, "version": next_version})
                         cur.execute(
                             """
                             INSERT INTO doc_versions (
@@ -126,6 +155,7 @@ def persist_docs_to_db(
                         updated_at,
                     ),
                 )
+                bumped.append({"doc_id": doc_id, "version": initial_version})
                 cur.execute(
                     """
                     INSERT INTO doc_versions (
@@ -149,5 +179,12 @@ def persist_docs_to_db(
                     ),
                 )
 
+    if bumped:
+        publish_thread_event(
+            thread_id,
+            "docs.updated",
+            {"docs": bumped, "change_set_id": change_set_id},
+        )
+
     return len(docs)
 
@@ -5,6 +5,8 @@ from typing import Any, Dict, List, Tuple
 
 import psycopg
 
+from app.observability.spans import timed
+
 DEFAULT_THREAD_TITLE = "Untitled Thread"
 MAX_AUTO_TITLE_LENGTH = 72
 
@@ -46,6 +48,7 @@ def _derive_auto_title(messages: List[Dict[str, Any]]) -> str | None:
     return None
 
 
+@timed("db")
 def persist_messages_to_db(
     conn: psycopg.Connection,
     thread_id: str,
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.db.get_conn_factory import conn_factory
+
+
+@contextmanager
+def thread_run_lock(thread_id: str) -> Iterator[None]:
+    """
+    Hold a session-level Postgres advisory lock for a thread while its graph runs.
+
+    Every replica takes the same lock before calling `graph.stream` for a thread,
+    so at most one graph execution touches a thread's checkpoint and `next_seq`
+    at a time across the whole deployment. Waiters block in arrival order.
+    """
+    with conn_factory() as conn:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(hashtextextended(%s, 0))", (thread_id,))
+        try:
+            yield
+        finally:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_unlock(hashtextextended(%s, 0))", (thread_id,))
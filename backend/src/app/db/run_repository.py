@@ -5,9 +5,12 @@ from typing import Any, Literal
 
 from psycopg.rows import dict_row
 
+from app.config import RUN_LEASE_SECONDS
 from app.db.get_conn_factory import conn_factory
+from app.events.thread_events import publish_thread_event
+from app.observability.spans import timed
 
-RunStatus = Literal["queued", "running", "waiting_approval", "completed", "error"]
+RunStatus = Literal["queued", "running", "waiting_approval", "completed", "error", "cancelled"]
 AgentStatus = Literal[
     "queued",
     "thinking",
@@ -33,15 +36,24 @@ def create_run(
         with conn.cursor() as cur:
             cur.execute(
                 """
-                INSERT INTO runs (run_id, thread_id, trigger, status)
-                VALUES (%s, %s, %s, %s)
+                INSERT INTO runs (run_id, thread_id, trigger, status, lease_expires_at)
+                VALUES (%s, %s, %s, %s, NOW() + make_interval(secs => %s))
                 ON CONFLICT (run_id) DO NOTHING
                 """,
-                (run_id, thread_id, trigger, status),
+                (run_id, thread_id, trigger, status, RUN_LEASE_SECONDS),
             )
+            created = cur.rowcount > 0
         conn.commit()
 
+    if created:
+        publish_thread_event(
+            thread_id,
+            "run.status",
+            {"run_id": run_id, "trigger": trigger, "status": status},
+        )
 
+
+@timed("db")
 def set_run_status(
     run_id: str,
     *,
@@ -59,12 +71,66 @@ def set_run_status(
                   error = COALESCE(%s, error),
                   completed_at = CASE WHEN %s THEN NOW() ELSE completed_at END
                 WHERE run_id = %s
+                RETURNING thread_id
                 """,
                 (status, error, completed, run_id),
             )
+            row = cur.fetchone()
+        conn.commit()
+
+    if row:
+        publish_thread_event(
+            row[0],
+            "run.status",
+            {"run_id": run_id, "status": status, "error": error},
+        )
+
+
+@timed("db")
+def renew_run_leases(run_ids: list[str]) -> None:
+    """Extend the lease of this replica's queued and running runs by RUN_LEASE_SECONDS."""
+    if not run_ids:
+        return
+    with conn_factory() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE runs
+                SET lease_expires_at = NOW() + make_interval(secs => %s)
+                WHERE run_id = ANY(%s) AND status IN ('queued', 'running')
+                """,
+                (RUN_LEASE_SECONDS, run_ids),
+            )
         conn.commit()
 
 
+@timed("db")
+def fail_expired_runs(reason: str) -> list[str]:
+    """Mark queued and running runs whose lease ran out as errored; returns their ids."""
+    with conn_factory() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE runs
+                SET status = 'error', error = %s, completed_at = NOW()
+                WHERE status IN ('queued', 'running') AND lease_expires_at < NOW()
+                RETURNING run_id, thread_id
+                """,
+                (reason,),
+            )
+            rows = cur.fetchall()
+        conn.commit()
+
+    for run_id, thread_id in rows:
+        publish_thread_event(
+            thread_id,
+            "run.status",
+            {"run_id": run_id, "status": "error", "error": reason},
+        )
+    return [run_id for run_id, _ in rows]
+
+
+@timed("db")
 def append_agent_status(
     *,
     run_id: str,
@@ -85,7 +151,7 @@ def append_agent_status(
             )
         conn.commit()
 
-    return {
+    persisted = {
         "run_id": run_id,
         "thread_id": thread_id,
         "agent": agent,
@@ -93,6 +159,8 @@ def append_agent_status(
         "note": note,
         "at": created_at,
     }
+    publish_thread_event(thread_id, "agent.status", persisted)
+    return persisted
 
 
 def fetch_runs(thread_id: str) -> list[dict[str, Any]]:
@@ -110,6 +178,22 @@ def fetch_runs(thread_id: str) -> list[dict[str, Any]]:
             return cur.fetchall()
 
 
+def fetch_active_runs(thread_id: str) -> list[dict[str, Any]]:
+    """Queued and running runs of the thread whose replica still holds their lease."""
+    with conn_factory() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                """
+                SELECT run_id, thread_id, trigger, status, started_at
+                FROM runs
+                WHERE thread_id = %s AND status IN ('queued', 'running') AND lease_expires_at > NOW()
+                ORDER BY started_at ASC
+                """,
+                (thread_id,),
+            )
+            return cur.fetchall()
+
+
 def fetch_latest_agent_statuses(thread_id: str) -> list[dict[str, Any]]:
     with conn_factory() as conn:
         with conn.cursor(row_factory=dict_row) as cur:
@@ -129,3 +213,17 @@ def fetch_latest_agent_statuses(thread_id: str) -> list[dict[str, Any]]:
                 (thread_id,),
             )
             return cur.fetchall()
+
+
+def fetch_run(run_id: str) -> dict[str, Any] | None:
+    with conn_factory() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                """
+                SELECT run_id, thread_id, trigger, status, started_at, completed_at, error
+                FROM runs
+                WHERE run_id = %s
+                """,
+                (run_id,),
+            )
+            return cur.fetchone()
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Iterable
+
+from psycopg.rows import dict_row
+
+from app.db.get_conn_factory import conn_factory
+
+
+def insert_run_spans(*, run_id: str, thread_id: str, spans: Iterable[dict[str, Any]]) -> None:
+    rows = [
+        (
+            run_id,
+            thread_id,
+            span["span_id"],
+            span["parent_span_id"],
+            span["kind"],
+            span["name"],
+            span["start_ms"],
+            span["duration_ms"],
+            span["status"],
+            json.dumps(span["attributes"]),
+        )
+        for span in spans
+    ]
+    if not rows:
+        return
+
+    with conn_factory() as conn:
+        with conn.cursor() as cur:
+            cur.executemany(
+                """
+                INSERT INTO run_spans (
+                  run_id, thread_id, span_id, parent_span_id, kind, name,
+                  start_ms, duration_ms, status, attributes
+                )
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb)
+                """,
+                rows,
+            )
+        conn.commit()
+
+
+def fetch_run_spans(run_id: str) -> list[dict[str, Any]]:
+    with conn_factory() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                """
+                SELECT span_id, parent_span_id, kind, name, start_ms, duration_ms, status, attributes
+                FROM run_spans
+                WHERE run_id = %s
+                ORDER BY start_ms ASC, id ASC
+                """,
+                (run_id,),
+            )
+            return cur.fetchall()
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
+import json
 from functools import lru_cache
 from typing import Any
 
 from psycopg.rows import dict_row
 
 from app.db.get_conn_factory import conn_factory
+from app.observability.spans import timed
 
 
+@timed("db")
 def ensure_thread(thread_id: str) -> None:
     with conn_factory() as conn:
         with conn.cursor() as cur:
@@ -52,6 +55,7 @@ def fetch_thread(thread_id: str) -> dict[str, Any] | None:
             return cur.fetchone()
 
 
+@timed("db")
 def touch_thread(
     thread_id: str,
     *,
@@ -155,6 +159,38 @@ def update_thread(
     return row
 
 
+@timed("db")
+def fetch_thread_model_settings(thread_id: str) -> dict[str, Any]:
+    with conn_factory() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT model_settings FROM chat_threads WHERE thread_id = %s",
+                (thread_id,),
+            )
+            row = cur.fetchone()
+            return row[0] if row and row[0] else {}
+
+
+def update_thread_model_settings(thread_id: str, settings: dict[str, Any]) -> dict[str, Any] | None:
+    with conn_factory() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE chat_threads
+                SET
+                  model_settings = %s::jsonb,
+                  updated_at = NOW()
+                WHERE thread_id = %s
+                RETURNING model_settings
+                """,
+                (json.dumps(settings), thread_id),
+            )
+            row = cur.fetchone()
+        conn.commit()
+    return row[0] if row else None
+
+
+@timed("db")
 def needs_docs_bootstrap(thread_id: str) -> bool:
     if not _has_docs_initialized_column():
         return _needs_docs_bootstrap_without_column(thread_id)
@@ -175,6 +211,7 @@ def needs_docs_bootstrap(thread_id: str) -> bool:
             return not row[0]
 
 
+@timed("db")
 def mark_docs_bootstrapped(thread_id: str) -> None:
     if not _has_docs_initialized_column():
         return
@@ -0,0 +1,317 @@
+"""
+Line diff engine for change sets.
+
+Linear-space Myers (divide and conquer on the middle snake) over interned lines.
+Before diffing, common prefix/suffix lines are trimmed and lines that occur on
+only one side are set aside: they can never be part of a match, so dropping
+them keeps the result minimal while making rewrites of large docs cheap.
+
+Each diff runs under a time budget. Once it is spent, remaining sub-problems
+are anchored patience-style on lines unique to both sides, and whatever the
+anchors cannot explain becomes a replacement: the diff stays correct, just not
+minimal.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import Any, Literal
+
+DEFAULT_TIME_BUDGET_SECONDS = 0.5
+DEFAULT_CONTEXT_LINES = 3
+
+OpTag = Literal["equal", "replace", "delete", "insert"]
+Opcode = tuple[OpTag, int, int, int, int]
+
+
+@dataclass
+class DiffResult:
+    text: str
+    hunks: list[dict[str, Any]] = field(default_factory=list)
+    lines_added: int = 0
+    lines_removed: int = 0
+    # False when the time budget ran out and part of the diff is not minimal.
+    exact: bool = True
+
+
+def compute_diff(
+    old: str,
+    new: str,
+    *,
+    fromfile: str = "a",
+    tofile: str = "b",
+    context: int = DEFAULT_CONTEXT_LINES,
+    time_budget_seconds: float = DEFAULT_TIME_BUDGET_SECONDS,
+) -> DiffResult:
+    """Unified diff text (difflib-compatible), structured hunks and line counts."""
+    a = old.splitlines(keepends=True)
+    b = new.splitlines(keepends=True)
+    matcher = _Matcher(a, b, deadline=monotonic() + time_budget_seconds)
+    opcodes = matcher.get_opcodes()
+
+    lines_added = sum(j2 - j1 for tag, _, _, j1, j2 in opcodes if tag in ("replace", "insert"))
+    lines_removed = sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag in ("replace", "delete"))
+
+    hunks: list[dict[str, Any]] = []
+    text_parts: list[str] = []
+    for group in _group_opcodes(opcodes, context):
+        if not text_parts:
+            text_parts.append(f"--- {fromfile}\n+++ {tofile}\n")
+        hunk = _build_hunk(a, b, group)
+        hunks.append(hunk)
+        text_parts.append(
+            f"@@ -{_format_range(hunk['old_start'], hunk['old_lines'])} "
+            f"+{_format_range(hunk['new_start'], hunk['new_lines'])} @@\n"
+        )
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                text_parts.extend(" " + line for line in a[i1:i2])
+                continue
+            if tag in ("replace", "delete"):
+                text_parts.extend("-" + line for line in a[i1:i2])
+            if tag in ("replace", "insert"):
+                text_parts.extend("+" + line for line in b[j1:j2])
+
+    return DiffResult(
+        text="".join(text_parts),
+        hunks=hunks,
+        lines_added=lines_added,
+        lines_removed=lines_removed,
+        exact=not matcher.budget_exceeded,
+    )
+
+
+def line_opcodes(
+    a: list[str],
+    b: list[str],
+    *,
+    time_budget_seconds: float = DEFAULT_TIME_BUDGET_SECONDS,
+) -> list[Opcode]:
+    """difflib-style opcodes turning lines `a` into lines `b`."""
+    return _Matcher(a, b, deadline=monotonic() + time_budget_seconds).get_opcodes()
+
+
+class _Matcher:
+    def __init__(self, a: list[str], b: list[str], *, deadline: float):
+        self.a_len = len(a)
+        self.b_len = len(b)
+        self.deadline = deadline
+        self.budget_exceeded = False
+
+        ids: dict[str, int] = {}
+        a_ids = [ids.setdefault(line, len(ids)) for line in a]
+        b_ids = [ids.setdefault(line, len(ids)) for line in b]
+
+        # Only lines present on both sides can match.
+        shared = set(a_ids) & set(b_ids)
+        self.a_index = [i for i, line in enumerate(a_ids) if line in shared]
+        self.b_index = [j for j, line in enumerate(b_ids) if line in shared]
+        self.a = [a_ids[i] for i in self.a_index]
+        self.b = [b_ids[j] for j in self.b_index]
+
+    def get_opcodes(self) -> list[Opcode]:
+        opcodes: list[Opcode] = []
+        i = j = 0
+        for ai, bj in self._matches() + [(self.a_len, self.b_len)]:
+            if i < ai and j < bj:
+                opcodes.append(("replace", i, ai, j, bj))
+            elif i < ai:
+                opcodes.append(("delete", i, ai, j, j))
+            elif j < bj:
+                opcodes.append(("insert", i, i, j, bj))
+            if ai < self.a_len:
+                if opcodes and opcodes[-1][0] == "equal" and opcodes[-1][2] == ai:
+                    tag, i1, _, j1, _ = opcodes.pop()
+                    opcodes.append(("equal", i1, ai + 1, j1, bj + 1))
+                else:
+                    opcodes.append(("equal", ai, ai + 1, bj, bj + 1))
+            i, j = ai + 1, bj + 1
+        return opcodes
+
+    def _matches(self) -> list[tuple[int, int]]:
+        """Matched (old, new) line index pairs in the original sequences, ascending."""
+        pairs: list[tuple[int, int]] = []
+        stack = [(0, len(self.a), 0, len(self.b))]
+        a, b = self.a, self.b
+        while stack:
+            a0, a1, b0, b1 = stack.pop()
+            while a0 < a1 and b0 < b1 and a[a0] == b[b0]:
+                pairs.append((a0, b0))
+                a0 += 1
+                b0 += 1
+            while a0 < a1 and b0 < b1 and a[a1 - 1] == b[b1 - 1]:
+                a1 -= 1
+                b1 -= 1
+                pairs.append((a1, b1))
+            if a0 == a1 or b0 == b1:
+                continue
+            snake = None
+            if monotonic() <= self.deadline:
+                snake = self._middle_snake(a0, a1, b0, b1)
+            if snake is None:
+                # Out of budget: anchor on unique lines and keep trimming the gaps between anchors.
+                self.budget_exceeded = True
+                anchors = self._patience_matches(a0, a1, b0, b1)
+                if not anchors:
+                    continue
+                pairs.extend(anchors)
+                starts = [(a0, b0)] + [(i + 1, j + 1) for i, j in anchors]
+                ends = anchors + [(a1, b1)]
+                stack.extend((i0, i1, j0, j1) for (i0, j0), (i1, j1) in zip(starts, ends))
+                continue
+            x1, y1, x2, y2 = snake
+            pairs.extend((a0 + x1 + offset, b0 + y1 + offset) for offset in range(x2 - x1))
+            stack.append((a0, a0 + x1, b0, b0 + y1))
+            stack.append((a0 + x2, a1, b0 + y2, b1))
+
+        pairs.sort()
+        return [(self.a_index[i], self.b_index[j]) for i, j in pairs]
+
+    def _patience_matches(self, a0: int, a1: int, b0: int, b1: int) -> list[tuple[int, int]]:
+        """Longest increasing run of lines that occur exactly once on each side."""
+        a_counts: dict[int, int] = {}
+        for line in self.a[a0:a1]:
+            a_counts[line] = a_counts.get(line, 0) + 1
+        b_positions: dict[int, int] = {}
+        b_counts: dict[int, int] = {}
+        for j in range(b0, b1):
+            line = self.b[j]
+            b_counts[line] = b_counts.get(line, 0) + 1
+            b_positions[line] = j
+        candidates = [
+            (i, b_positions[line])
+            for i, line in enumerate(self.a[a0:a1], start=a0)
+            if a_counts[line] == 1 and b_counts.get(line) == 1
+        ]
+
+        # Patience sorting: tails[k] is the smallest b index ending an increasing run of length k + 1.
+        tails: list[int] = []
+        tail_index: list[int] = []
+        previous: list[int] = []
+        for index, (_, j) in enumerate(candidates):
+            k = bisect_left(tails, j)
+            if k == len(tails):
+                tails.append(j)
+                tail_index.append(index)
+            else:
+                tails[k] = j
+                tail_index[k] = index
+            previous.append(tail_index[k - 1] if k else -1)
+
+        anchors: list[tuple[int, int]] = []
+        index = tail_index[-1] if tail_index else -1
+        while index >= 0:
+            anchors.append(candidates[index])
+            index = previous[index]
+        anchors.reverse()
+        return anchors
+
+    def _middle_snake(self, a0: int, a1: int, b0: int, b1: int) -> tuple[int, int, int, int] | None:
+        """
+        Middle snake of the shortest edit script for a[a0:a1] -> b[b0:b1], as
+        local (x_start, y_start, x_end, y_end). None when the budget runs out.
+        """
+        a, b = self.a, self.b
+        n = a1 - a0
+        m = b1 - b0
+        delta = n - m
+        odd = delta % 2 == 1
+        max_d = (n + m + 1) // 2
+        offset = max_d + 1
+        forward = [0] * (2 * offset + 1)
+        backward = [0] * (2 * offset + 1)
+
+        for d in range(max_d + 1):
+            if d % 64 == 0 and monotonic() > self.deadline:
+                self.budget_exceeded = True
+                return None
+
+            for k in range(-d, d + 1, 2):
+                if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                    x = forward[offset + k + 1]
+                else:
+                    x = forward[offset + k - 1] + 1
+                y = x - k
+                x_start, y_start = x, y
+                while x < n and y < m and a[a0 + x] == b[b0 + y]:
+                    x += 1
+                    y += 1
+                forward[offset + k] = x
+                reverse_k = delta - k
+                if odd and -(d - 1) <= reverse_k <= d - 1 and x + backward[offset + reverse_k] >= n:
+                    return x_start, y_start, x, y
+
+            for k in range(-d, d + 1, 2):
+                if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                    x = backward[offset + k + 1]
+                else:
+                    x = backward[offset + k - 1] + 1
+                y = x - k
+                x_start, y_start = x, y
+                while x < n and y < m and a[a1 - 1 - x] == b[b1 - 1 - y]:
+                    x += 1
+                    y += 1
+                backward[offset + k] = x
+                forward_k = delta - k
+                if not odd and -d <= forward_k <= d and x + forward[offset + forward_k] >= n:
+                    return n - x, m - y, n - x_start, m - y_start
+
+        return None
+
+
+def _group_opcodes(opcodes: list[Opcode], context: int) -> list[list[Opcode]]:
+    """Split opcodes into hunks with `context` lines around each change (as difflib)."""
+    if not any(tag != "equal" for tag, *_ in opcodes):
+        return []
+
+    codes = list(opcodes)
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+
+    groups: list[list[Opcode]] = []
+    group: list[Opcode] = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == "equal" and i2 - i1 > context * 2:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            groups.append(group)
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        groups.append(group)
+    return groups
+
+
+def _build_hunk(a: list[str], b: list[str], group: list[Opcode]) -> dict[str, Any]:
+    first, last = group[0], group[-1]
+    lines: list[str] = []
+    for tag, i1, i2, j1, j2 in group:
+        if tag == "equal":
+            lines.extend(" " + line.rstrip("\r\n") for line in a[i1:i2])
+            continue
+        if tag in ("replace", "delete"):
+            lines.extend("-" + line.rstrip("\r\n") for line in a[i1:i2])
+        if tag in ("replace", "insert"):
+            lines.extend("+" + line.rstrip("\r\n") for line in b[j1:j2])
+    return {
+        "old_start": first[1],
+        "old_lines": last[2] - first[1],
+        "new_start": first[3],
+        "new_lines": last[4] - first[3],
+        "lines": lines,
+    }
+
+
+def _format_range(start: int, length: int) -> str:
+    beginning = start + 1
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
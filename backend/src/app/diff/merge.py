@@ -0,0 +1,116 @@
+"""
+Three-way line merge for rebasing change sets.
+
+A change set is diffed against the version of each doc its author saw (the
+base). If the doc moved on before the change set is applied, `merge3` replays
+the change set's edits on top of the current content: both sides are diffed
+against the base, and changed base ranges that overlap or touch are grouped.
+A group changed by one side only takes that side's lines; a group changed by
+both sides merges only if both made the same change, otherwise it is a
+conflict. Touching ranges conflict on purpose, as in git: two edits to
+adjacent lines are rarely independent.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.diff.engine import DEFAULT_TIME_BUDGET_SECONDS, Opcode, line_opcodes
+
+
+@dataclass
+class MergeResult:
+    content: str
+    # One entry per conflicting base range; empty when the merge is clean.
+    conflicts: list[dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def clean(self) -> bool:
+        return not self.conflicts
+
+
+def merge3(
+    base: str,
+    current: str,
+    proposed: str,
+    *,
+    time_budget_seconds: float = DEFAULT_TIME_BUDGET_SECONDS,
+) -> MergeResult:
+    """
+    Apply the `base` -> `proposed` edits on top of `current`.
+
+    When there are conflicts, `content` keeps the current lines for those
+    ranges; callers are expected not to write it.
+    """
+    if current == base or current == proposed:
+        return MergeResult(content=proposed)
+    if proposed == base:
+        return MergeResult(content=current)
+
+    base_lines = base.splitlines(keepends=True)
+    current_lines = current.splitlines(keepends=True)
+    proposed_lines = proposed.splitlines(keepends=True)
+    current_ops = line_opcodes(base_lines, current_lines, time_budget_seconds=time_budget_seconds)
+    proposed_ops = line_opcodes(base_lines, proposed_lines, time_budget_seconds=time_budget_seconds)
+
+    regions = sorted(
+        [(i1, i2, "current") for tag, i1, i2, _, _ in current_ops if tag != "equal"]
+        + [(i1, i2, "proposed") for tag, i1, i2, _, _ in proposed_ops if tag != "equal"]
+    )
+
+    merged: list[str] = []
+    conflicts: list[dict[str, Any]] = []
+    position = 0
+    index = 0
+    while index < len(regions):
+        start, end, side = regions[index]
+        sides = {side}
+        index += 1
+        while index < len(regions) and regions[index][0] <= end:
+            end = max(end, regions[index][1])
+            sides.add(regions[index][2])
+            index += 1
+
+        merged.extend(base_lines[position:start])
+        position = end
+
+        current_part = current_lines[_map_line(current_ops, start) : _map_line(current_ops, end, end=True)]
+        proposed_part = proposed_lines[_map_line(proposed_ops, start) : _map_line(proposed_ops, end, end=True)]
+        if sides == {"proposed"} or current_part == proposed_part:
+            merged.extend(proposed_part)
+        elif sides == {"current"}:
+            merged.extend(current_part)
+        else:
+            merged.extend(current_part)
+            conflicts.append(
+                {
+                    "base_start": start + 1,
+                    "base_lines": end - start,
+                    "current": "".join(current_part),
+                    "proposed": "".join(proposed_part),
+                }
+            )
+
+    merged.extend(base_lines[position:])
+    return MergeResult(content="".join(merged), conflicts=conflicts)
+
+
+def _map_line(opcodes: list[Opcode], line: int, *, end: bool = False) -> int:
+    """
+    Position in the other sequence of base line boundary `line`, which is never
+    inside a changed range. Lines inserted exactly at `line` fall inside the
+    group: a start boundary maps before them, an end boundary after them.
+    """
+    positions: list[int] = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            if i1 <= line <= i2:
+                positions.append(j1 + (line - i1))
+        elif line == i1 or line == i2:
+            positions.append(j1 if line == i1 else j2)
+            if line == i1 == i2:
+                positions.append(j2)
+    if not positions:
+        return 0
+    return max(positions) if end else min(positions)
@@ -0,0 +1,340 @@
+"""
+Pluggable publish/subscribe bus for live events.
+
+`InMemoryEventBus` only reaches subscribers in the current process (tests, single
+replica). `PostgresEventBus` fans events out to every replica through
+`LISTEN/NOTIFY`, so any replica can serve any run's or thread's live stream.
+Run frames (one per streamed token) are only sent while some replica follows
+the run through the bus.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import uuid
+from abc import ABC, abstractmethod
+from queue import Empty, Full, Queue
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import Any
+
+import psycopg
+
+from app.config import EVENT_BUS_BACKEND, EVENT_BUS_MAX_OUTBOX
+from app.db.URL import DB_URL
+from app.db.get_conn_factory import conn_factory
+from app.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+dropped_events_total = registry.counter(
+    "event_bus_dropped_events_total",
+    "Events not sent to the other replicas because the bus outbox was full.",
+)
+
+
+class Subscription:
+    def __init__(self, bus: EventBus, topic: str):
+        self.topic = topic
+        self._bus = bus
+        self._queue: Queue[dict[str, Any]] = Queue()
+        self.closed = False
+
+    def deliver(self, event: dict[str, Any]) -> None:
+        self._queue.put(event)
+
+    def get(self, *, timeout: float) -> dict[str, Any] | None:
+        try:
+            return self._queue.get(timeout=timeout)
+        except Empty:
+            return None
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._bus.unsubscribe(self)
+
+    def __enter__(self) -> Subscription:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class EventBus(ABC):
+    def __init__(self):
+        self._subscriptions: dict[str, set[Subscription]] = {}
+        self._lock = Lock()
+
+    @abstractmethod
+    def publish(self, topic: str, event: dict[str, Any]) -> None:
+        ...
+
+    def subscribe(self, topic: str) -> Subscription:
+        subscription = Subscription(self, topic)
+        with self._lock:
+            self._subscriptions.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.topic)
+            if not subscribers:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscriptions[subscription.topic]
+
+    def close(self) -> None:
+        pass
+
+    def _has_subscribers(self, topic: str) -> bool:
+        with self._lock:
+            return bool(self._subscriptions.get(topic))
+
+    def _dispatch(self, topic: str, event: dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscriptions.get(topic, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+
+class InMemoryEventBus(EventBus):
+    def publish(self, topic: str, event: dict[str, Any]) -> None:
+        self._dispatch(topic, event)
+
+
+class PostgresEventBus(EventBus):
+    """
+    One LISTEN connection and one NOTIFY connection per process.
+
+    `publish` only enqueues, so run workers never wait on the database; the
+    publisher thread sends queued events in order, batching them per transaction.
+    NOTIFY payloads are capped at 8000 bytes, so larger envelopes are written to
+    `event_payloads` and only their row id is sent; listeners load the body on
+    receipt. Offloaded rows are pruned after `PAYLOAD_RETENTION_SECONDS`. At most
+    EVENT_BUS_MAX_OUTBOX events wait to be sent; further ones are dropped.
+
+    Topics under `ON_DEMAND_PREFIXES` (run frames) are only sent while a replica
+    subscribes to them: each replica announces its subscriptions on
+    `SUBSCRIPTIONS_TOPIC`, and again every third of `SUBSCRIPTION_TTL_SECONDS`
+    (an announcement that is not renewed lapses). A new subscriber sees frames
+    from when the publishing replica hears of it.
+    """
+
+    CHANNEL = "idea_maestro_events"
+    SUBSCRIPTIONS_TOPIC = "bus:subscriptions"
+    ON_DEMAND_PREFIXES = ("run:",)
+    SUBSCRIPTION_TTL_SECONDS = 30.0
+    MAX_INLINE_PAYLOAD_BYTES = 7500
+    MAX_PUBLISH_BATCH = 200
+    PAYLOAD_RETENTION_SECONDS = 3600
+    PRUNE_INTERVAL_SECONDS = 300
+    RECONNECT_DELAY_SECONDS = 1.0
+
+    def __init__(self):
+        super().__init__()
+        self.replica_id = uuid.uuid4().hex
+        self._stopped = Event()
+        self._outbox: Queue[tuple[str, str]] = Queue(maxsize=EVENT_BUS_MAX_OUTBOX)
+        # On-demand topic -> replica id -> when its announced subscription lapses.
+        self._watchers: dict[str, dict[str, float]] = {}
+        self._watchers_lock = Lock()
+        self._listener = Thread(target=self._listen_forever, name="event-bus-listener", daemon=True)
+        self._publisher = Thread(target=self._publish_forever, name="event-bus-publisher", daemon=True)
+        self._listener.start()
+        self._publisher.start()
+
+    def publish(self, topic: str, event: dict[str, Any]) -> None:
+        if topic.startswith(self.ON_DEMAND_PREFIXES) and not self._watched(topic):
+            return
+        envelope = json.dumps({"topic": topic, "event": event}, ensure_ascii=False, default=str)
+        try:
+            self._outbox.put_nowait((topic, envelope))
+        except Full:
+            dropped_events_total.inc()
+
+    def subscribe(self, topic: str) -> Subscription:
+        subscription = super().subscribe(topic)
+        if topic.startswith(self.ON_DEMAND_PREFIXES):
+            self._announce(topic, subscribed=True)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        super().unsubscribe(subscription)
+        topic = subscription.topic
+        if topic.startswith(self.ON_DEMAND_PREFIXES) and not self._has_subscribers(topic):
+            self._announce(topic, subscribed=False)
+
+    def _announce(self, topic: str, *, subscribed: bool) -> None:
+        self.publish(self.SUBSCRIPTIONS_TOPIC, {"topic": topic, "replica": self.replica_id, "subscribed": subscribed})
+
+    def _announce_subscriptions(self) -> None:
+        with self._lock:
+            topics = [topic for topic in self._subscriptions if topic.startswith(self.ON_DEMAND_PREFIXES)]
+        for topic in topics:
+            self._announce(topic, subscribed=True)
+        now = monotonic()
+        with self._watchers_lock:
+            for topic, replicas in list(self._watchers.items()):
+                for replica, lapses_at in list(replicas.items()):
+                    if lapses_at <= now:
+                        del replicas[replica]
+                if not replicas:
+                    del self._watchers[topic]
+
+    def _track_subscription(self, announcement: dict[str, Any]) -> None:
+        topic, replica = announcement["topic"], announcement["replica"]
+        with self._watchers_lock:
+            replicas = self._watchers.setdefault(topic, {})
+            if announcement["subscribed"]:
+                replicas[replica] = monotonic() + self.SUBSCRIPTION_TTL_SECONDS
+            else:
+                replicas.pop(replica, None)
+            if not replicas:
+                del self._watchers[topic]
+
+    def _watched(self, topic: str) -> bool:
+        now = monotonic()
+        with self._watchers_lock:
+            return any(lapses_at > now for lapses_at in self._watchers.get(topic, {}).values())
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._publisher.join(timeout=5)
+        self._listener.join(timeout=5)
+
+    def _publish_forever(self) -> None:
+        while not (self._stopped.is_set() and self._outbox.empty()):
+            try:
+                with psycopg.connect(DB_URL) as conn:
+                    self._drain_outbox(conn)
+            except Exception:
+                logger.exception("Event bus publisher failed; reconnecting")
+                self._stopped.wait(self.RECONNECT_DELAY_SECONDS)
+
+    def _drain_outbox(self, conn: psycopg.Connection) -> None:
+        while not (self._stopped.is_set() and self._outbox.empty()):
+            try:
+                batch = [self._outbox.get(timeout=1.0)]
+            except Empty:
+                continue
+            while len(batch) < self.MAX_PUBLISH_BATCH:
+                try:
+                    batch.append(self._outbox.get_nowait())
+                except Empty:
+                    break
+
+            # Notifications sent in one transaction are delivered together, in order.
+            with conn.transaction():
+                with conn.cursor() as cur:
+                    for topic, envelope in batch:
+                        if len(envelope.encode("utf-8")) > self.MAX_INLINE_PAYLOAD_BYTES:
+                            cur.execute(
+                                "INSERT INTO event_payloads (topic, payload) VALUES (%s, %s) RETURNING id",
+                                (topic, envelope),
+                            )
+                            payload_id = cur.fetchone()[0]
+                            envelope = json.dumps({"topic": topic, "payload_id": payload_id})
+                        cur.execute("SELECT pg_notify(%s, %s)", (self.CHANNEL, envelope))
+
+    def _listen_forever(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("Event bus listener failed; reconnecting")
+                self._stopped.wait(self.RECONNECT_DELAY_SECONDS)
+
+    def _listen(self) -> None:
+        last_prune = 0.0
+        # Announced right after (re)connecting, as announcements may have been missed.
+        last_announce = 0.0
+        with psycopg.connect(DB_URL, autocommit=True) as conn:
+            conn.execute(f"LISTEN {self.CHANNEL}")
+            while not self._stopped.is_set():
+                if monotonic() - last_announce > self.SUBSCRIPTION_TTL_SECONDS / 3:
+                    self._announce_subscriptions()
+                    last_announce = monotonic()
+                for notify in conn.notifies(timeout=1.0):
+                    self._handle(notify.payload)
+                if monotonic() - last_prune > self.PRUNE_INTERVAL_SECONDS:
+                    self._prune_payloads()
+                    last_prune = monotonic()
+
+    def _handle(self, raw: str) -> None:
+        try:
+            envelope = json.loads(raw)
+            if envelope["topic"] == self.SUBSCRIPTIONS_TOPIC:
+                self._track_subscription(envelope["event"])
+                return
+            if not self._has_subscribers(envelope["topic"]):
+                return
+            payload_id = envelope.get("payload_id")
+            if payload_id is not None:
+                envelope = self._load_payload(payload_id)
+                if envelope is None:
+                    return
+            self._dispatch(envelope["topic"], envelope["event"])
+        except Exception:
+            logger.exception("Dropping malformed event bus notification")
+
+    def _load_payload(self, payload_id: int) -> dict[str, Any] | None:
+        with conn_factory() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT payload FROM event_payloads WHERE id = %s", (payload_id,))
+                row = cur.fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _prune_payloads(self) -> None:
+        with conn_factory() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    DELETE FROM event_payloads
+                    WHERE created_at < NOW() - make_interval(secs => %s)
+                    """,
+                    (self.PAYLOAD_RETENTION_SECONDS,),
+                )
+            conn.commit()
+
+
+_event_bus: EventBus | None = None
+_event_bus_lock = Lock()
+
+
+def get_event_bus() -> EventBus:
+    global _event_bus
+    with _event_bus_lock:
+        if _event_bus is None:
+            if EVENT_BUS_BACKEND == "postgres":
+                _event_bus = PostgresEventBus()
+            elif EVENT_BUS_BACKEND == "memory":
+                _event_bus = InMemoryEventBus()
+            else:
+                raise RuntimeError(f"Unknown EVENT_BUS_BACKEND: {EVENT_BUS_BACKEND!r}")
+        return _event_bus
+
+
+def set_event_bus(bus: EventBus) -> None:
+    """Install a specific bus implementation, e.g. an InMemoryEventBus in tests."""
+    global _event_bus
+    with _event_bus_lock:
+        _event_bus = bus
+
+
+def publish_event(topic: str, event: dict[str, Any]) -> None:
+    """Best-effort publish: a bus outage must never fail the run that emits the event."""
+    try:
+        get_event_bus().publish(topic, event)
+    except Exception:
+        logger.exception("Failed to publish event on topic %s", topic)
+
+
+def run_topic(run_id: str) -> str:
+    return f"run:{run_id}"
+
+
+# Requests for whichever replica owns a run, e.g. {"action": "cancel", "run_id": ...}.
+RUN_CONTROL_TOPIC = "runs:control"
@@ -0,0 +1,82 @@
+"""
+Thread-scoped live events: doc version bumps, change-set status transitions,
+run lifecycle and agent status. Published on `thread:{thread_id}` and served by
+`GET /api/threads/{thread_id}/events`.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any
+
+from app.events.bus import publish_event
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def thread_topic(thread_id: str) -> str:
+    return f"thread:{thread_id}"
+
+
+def publish_thread_event(thread_id: str, event_type: str, payload: dict[str, Any]) -> None:
+    publish_event(
+        thread_topic(thread_id),
+        {
+            "type": event_type,
+            "thread_id": thread_id,
+            "emitted_at": _now_iso(),
+            **payload,
+        },
+    )
+
+
+def _coalesce_key(event: dict[str, Any]) -> tuple[Any, ...]:
+    event_type = event.get("type")
+    if event_type == "docs.updated":
+        return (event_type,)
+    if event_type == "changeset.status":
+        return (event_type, event.get("change_set_id"))
+    if event_type == "run.status":
+        return (event_type, event.get("run_id"))
+    if event_type == "agent.status":
+        return (event_type, event.get("run_id"), event.get("agent"))
+    return (event_type, id(event))
+
+
+class ThreadEventCoalescer:
+    """
+    Collapse a burst of thread events into the latest state per entity.
+
+    Doc bumps are merged into one `docs.updated` carrying the highest version per
+    doc; status events keep only the most recent transition per change set, run
+    or (run, agent). Output keeps the order in which each entity first appeared.
+    """
+
+    def __init__(self):
+        self._events: dict[tuple[Any, ...], dict[str, Any]] = {}
+
+    def add(self, event: dict[str, Any]) -> None:
+        key = _coalesce_key(event)
+        existing = self._events.get(key)
+        if existing is None:
+            self._events[key] = dict(event)
+            return
+        if event.get("type") != "docs.updated":
+            # Later fields win; earlier ones (e.g. a change set's doc list) survive.
+            existing.update(event)
+            return
+
+        versions = {doc["doc_id"]: doc for doc in existing.get("docs", [])}
+        for doc in event.get("docs", []):
+            current = versions.get(doc["doc_id"])
+            if current is None or doc.get("version", 0) >= current.get("version", 0):
+                versions[doc["doc_id"]] = doc
+        existing.update({key: value for key, value in event.items() if key != "docs"})
+        existing["docs"] = list(versions.values())
+
+    def drain(self) -> list[dict[str, Any]]:
+        events = list(self._events.values())
+        self._events.clear()
+        return events
@@ -1,14 +1,38 @@
+import asyncio
+import logging
+from time import perf_counter
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
+from app.agents.build_workflow import preload_workflow
+from app.config import ENABLE_DEBUG_ROUTES, PRELOAD_WORKFLOW, RUN_EXECUTOR_DRAIN_SECONDS
 from app.db.checkpoint import ensure_checkpoint_schema
+from app.db.checkpoint_compaction import start_checkpoint_compactor, stop_checkpoint_compactor
 from app.db.migrations import run_migrations
-from app.routes.test import router as test_router
+from app.events.bus import get_event_bus
+from app.metrics import registry as metrics_registry
 from app.routes.chat import router as chat_router
 from app.routes.threads import router as threads_router
 from app.routes.docs import router as docs_router
 from app.routes.reviews import router as reviews_router
+from app.routes.runs import router as runs_router
+from app.runs.executor import (
+    get_run_executor,
+    start_run_control_listener,
+    start_run_lease_keeper,
+    stop_run_control_listener,
+    stop_run_lease_keeper,
+)
+
 
+logger = logging.getLogger(__name__)
+
+startup_phase_seconds = metrics_registry.gauge(
+    "startup_phase_seconds",
+    "Duration of each startup step of this worker",
+)
 
 app = FastAPI(title="Idea Maestro Backend", version="0.1.0")
 
@@ -23,18 +47,55 @@ app.add_middleware(
 
 @app.on_event("startup")
 async def startup_event():
-    run_migrations()
-    ensure_checkpoint_schema()
+    phases = [
+        ("migrations", run_migrations),
+        ("checkpoint_schema", ensure_checkpoint_schema),
+        ("event_bus", get_event_bus),
+        ("run_executor", get_run_executor),
+        ("run_control", start_run_control_listener),
+        ("run_leases", start_run_lease_keeper),
+        ("checkpoint_compactor", start_checkpoint_compactor),
+    ]
+    timings = []
+    for phase, step in phases:
+        started = perf_counter()
+        step()
+        elapsed = perf_counter() - started
+        startup_phase_seconds.set(elapsed, phase=phase)
+        timings.append(f"{phase} {elapsed * 1000:.0f} ms")
+    logger.info("Startup: %s", ", ".join(timings))
+    if PRELOAD_WORKFLOW:
+        preload_workflow()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Drain off the event loop so attached run streams keep flushing meanwhile.
+    await asyncio.to_thread(get_run_executor().shutdown, timeout=RUN_EXECUTOR_DRAIN_SECONDS)
+    stop_run_lease_keeper()
+    stop_run_control_listener()
+    stop_checkpoint_compactor()
+    get_event_bus().close()
 
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
 
-app.include_router(test_router)
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return metrics_registry.render()
+
 app.include_router(chat_router)
 app.include_router(threads_router)
 app.include_router(docs_router)
 app.include_router(reviews_router)
+app.include_router(runs_router)
+
+if ENABLE_DEBUG_ROUTES:
+    # Dev-only; imported here so production workers never load it.
+    from app.routes.test import router as test_router
+
+    app.include_router(test_router)
 
 if __name__ == "__main__":
     import uvicorn
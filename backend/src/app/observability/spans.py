@@ -0,0 +1,354 @@
+"""
+Run profiling.
+
+`run_profile` collects spans for one run in memory and writes them to
+`run_spans` in a single batch when the run ends. Spans come from three places:
+
+- `SpanCallbackHandler`, attached to the graph config, times graph nodes, LLM
+  calls (with token usage) and tool calls.
+- `timed` wraps repository functions; `span` times any other block
+  (checkpoint reads/writes use it).
+- The run itself is the root span.
+
+Every span duration is also observed on the `run_span_duration_seconds`
+histogram. With `OBSERVABILITY_ENABLED=false`, or outside a profiled run, the
+hooks return before doing any work.
+"""
+
+from __future__ import annotations
+
+import functools
+import itertools
+import logging
+import uuid
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable, ContextManager, Iterator, TypeVar
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from app.config import OBSERVABILITY_ENABLED, OBSERVABILITY_MAX_SPANS_PER_RUN
+from app.db.run_span_repository import insert_run_spans
+from app.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_span_seconds = registry.histogram(
+    "run_span_duration_seconds",
+    "Duration of profiled run spans by kind and name",
+)
+_llm_tokens = registry.counter(
+    "llm_tokens_total",
+    "LLM tokens consumed, by model and direction (input/output; cached_input is the part of "
+    "input served from the provider's prompt cache)",
+)
+_dropped_spans = registry.counter(
+    "run_spans_dropped_total",
+    "Spans not stored because a run exceeded OBSERVABILITY_MAX_SPANS_PER_RUN",
+)
+
+
+class RunProfile:
+    def __init__(self, *, run_id: str, thread_id: str, max_spans: int):
+        self.run_id = run_id
+        self.thread_id = thread_id
+        self.root_span_id = uuid.uuid4().hex
+        self._span_ids = itertools.count(1)
+        self.started = perf_counter()
+        self._max_spans = max_spans
+        self._spans: list[dict[str, Any]] = []
+        self._lock = Lock()
+
+    def next_span_id(self) -> str:
+        return f"{self.root_span_id[:16]}-{next(self._span_ids)}"
+
+    def record(
+        self,
+        *,
+        span_id: str,
+        parent_span_id: str | None,
+        kind: str,
+        name: str,
+        started: float,
+        ended: float,
+        status: str = "ok",
+        attributes: dict[str, Any] | None = None,
+    ) -> None:
+        _span_seconds.observe(ended - started, kind=kind, name=name)
+        span = {
+            "span_id": span_id,
+            "parent_span_id": parent_span_id or self.root_span_id,
+            "kind": kind,
+            "name": name,
+            "start_ms": (started - self.started) * 1000,
+            "duration_ms": (ended - started) * 1000,
+            "status": status,
+            "attributes": attributes or {},
+        }
+        with self._lock:
+            if len(self._spans) >= self._max_spans:
+                _dropped_spans.inc()
+                return
+            self._spans.append(span)
+
+    def finish(self, *, status: str) -> list[dict[str, Any]]:
+        ended = perf_counter()
+        with self._lock:
+            spans = list(self._spans)
+        spans.insert(
+            0,
+            {
+                "span_id": self.root_span_id,
+                "parent_span_id": None,
+                "kind": "run",
+                "name": "run",
+                "start_ms": 0.0,
+                "duration_ms": (ended - self.started) * 1000,
+                "status": status,
+                "attributes": {},
+            },
+        )
+        _span_seconds.observe(ended - self.started, kind="run", name="run")
+        return spans
+
+
+_current_profile: ContextVar[RunProfile | None] = ContextVar("run_profile", default=None)
+_current_span: ContextVar[str | None] = ContextVar("run_span", default=None)
+
+
+def current_profile() -> RunProfile | None:
+    return _current_profile.get()
+
+
+@contextmanager
+def run_profile(*, run_id: str, thread_id: str) -> Iterator[RunProfile | None]:
+    """Profile everything executed in this context (and contexts copied from it)."""
+    if not OBSERVABILITY_ENABLED:
+        yield None
+        return
+
+    profile = RunProfile(run_id=run_id, thread_id=thread_id, max_spans=OBSERVABILITY_MAX_SPANS_PER_RUN)
+    token = _current_profile.set(profile)
+    status = "ok"
+    try:
+        yield profile
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        try:
+            _current_profile.reset(token)
+        except ValueError:
+            # Generator-based runs can be closed from another context.
+            pass
+        try:
+            insert_run_spans(run_id=run_id, thread_id=thread_id, spans=profile.finish(status=status))
+        except Exception:
+            logger.exception("Failed to store spans for run %s", run_id)
+
+
+class _Span:
+    """Context manager behind `span`/`timed`; a class rather than a generator to keep per-call cost low."""
+
+    __slots__ = ("_profile", "_kind", "_name", "_attributes", "_span_id", "_parent_span_id", "_token", "_started")
+
+    def __init__(self, profile: RunProfile, kind: str, name: str, attributes: dict[str, Any]):
+        self._profile = profile
+        self._kind = kind
+        self._name = name
+        self._attributes = attributes
+
+    def __enter__(self) -> None:
+        self._span_id = self._profile.next_span_id()
+        self._parent_span_id = _current_span.get()
+        self._token = _current_span.set(self._span_id)
+        self._started = perf_counter()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        ended = perf_counter()
+        _current_span.reset(self._token)
+        self._profile.record(
+            span_id=self._span_id,
+            parent_span_id=self._parent_span_id,
+            kind=self._kind,
+            name=self._name,
+            started=self._started,
+            ended=ended,
+            status="ok" if exc_type is None else "error",
+            attributes=self._attributes,
+        )
+
+
+def span(kind: str, name: str, **attributes: Any) -> ContextManager[None]:
+    profile = _current_profile.get()
+    if profile is None:
+        return nullcontext()
+    return _Span(profile, kind, name, attributes)
+
+
+def timed(kind: str, name: str | None = None) -> Callable[[F], F]:
+    """Record each call of the decorated function as a span."""
+
+    def decorator(func: F) -> F:
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = _current_profile.get()
+            if profile is None:
+                return func(*args, **kwargs)
+            with _Span(profile, kind, span_name, {}):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def usage_from_llm_result(response: Any) -> dict[str, int]:
+    usage: dict[str, int] = {}
+    for generations in getattr(response, "generations", None) or []:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            for key in ("input_tokens", "output_tokens", "total_tokens"):
+                if metadata.get(key):
+                    usage[key] = usage.get(key, 0) + int(metadata[key])
+            # "cache_read", or "priority_cache_read"/"flex_cache_read" for those service tiers.
+            details = metadata.get("input_token_details") or {}
+            cached = sum(int(value or 0) for key, value in details.items() if key.endswith("cache_read"))
+            if cached:
+                usage["cached_input_tokens"] = usage.get("cached_input_tokens", 0) + cached
+    if not usage:
+        token_usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+        if token_usage.get("prompt_tokens"):
+            usage["input_tokens"] = int(token_usage["prompt_tokens"])
+        if token_usage.get("completion_tokens"):
+            usage["output_tokens"] = int(token_usage["completion_tokens"])
+        cached = (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+        if cached:
+            usage["cached_input_tokens"] = int(cached)
+    return usage
+
+
+class SpanCallbackHandler(BaseCallbackHandler):
+    """
+    Turns LangChain callbacks into spans: graph nodes (`node`), chat/LLM calls
+    (`llm`) and tools (`tool`). Intermediate runnables are not recorded; their
+    children are attached to the nearest recorded ancestor.
+    """
+
+    def __init__(self, profile: RunProfile):
+        self._profile = profile
+        self._parents: dict[UUID, UUID | None] = {}
+        self._open: dict[UUID, tuple[str, str, str | None, float, dict[str, Any]]] = {}
+        self._lock = Lock()
+
+    def _recorded_parent(self, parent_run_id: UUID | None) -> str | None:
+        while parent_run_id is not None:
+            if parent_run_id in self._open:
+                return parent_run_id.hex
+            parent_run_id = self._parents.get(parent_run_id)
+        return None
+
+    def _start(
+        self,
+        run_id: UUID,
+        parent_run_id: UUID | None,
+        kind: str | None,
+        name: str,
+        attributes: dict[str, Any],
+    ) -> None:
+        started = perf_counter()
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+            if kind is not None:
+                parent = self._recorded_parent(parent_run_id)
+                self._open[run_id] = (kind, name, parent, started, attributes)
+
+    def _end(self, run_id: UUID, *, status: str = "ok", attributes: dict[str, Any] | None = None) -> None:
+        ended = perf_counter()
+        with self._lock:
+            self._parents.pop(run_id, None)
+            opened = self._open.pop(run_id, None)
+        if opened is None:
+            return
+        kind, name, parent, started, start_attributes = opened
+        if attributes:
+            start_attributes = {**start_attributes, **attributes}
+        self._profile.record(
+            span_id=run_id.hex,
+            parent_span_id=parent,
+            kind=kind,
+            name=name,
+            started=started,
+            ended=ended,
+            status=status,
+            attributes=start_attributes,
+        )
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = kwargs.get("name") or ""
+        node = (metadata or {}).get("langgraph_node")
+        kind = "node" if node and name == node else None
+        self._start(run_id, parent_run_id, kind, name, {})
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        # GraphInterrupt/Command bubbling up surfaces here too; the node did not fail.
+        status = "interrupted" if type(error).__name__ in {"GraphInterrupt", "ParentCommand"} else "error"
+        self._end(run_id, status=status)
+
+    def _on_model_start(self, serialized, run_id, parent_run_id, metadata, kwargs) -> None:
+        metadata = metadata or {}
+        model = metadata.get("ls_model_name") or kwargs.get("name") or "llm"
+        # Top-level graph node, i.e. maestro or the specialist whose subgraph made the call.
+        agent = (metadata.get("langgraph_checkpoint_ns") or "").split(":", 1)[0] or metadata.get("langgraph_node")
+        self._start(run_id, parent_run_id, "llm", model, {"agent": agent})
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._on_model_start(serialized, run_id, parent_run_id, metadata, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._on_model_start(serialized, run_id, parent_run_id, metadata, kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = usage_from_llm_result(response)
+        with self._lock:
+            opened = self._open.get(run_id)
+        if opened is not None and usage:
+            model = opened[1]
+            if usage.get("input_tokens"):
+                _llm_tokens.inc(usage["input_tokens"], model=model, direction="input")
+            if usage.get("output_tokens"):
+                _llm_tokens.inc(usage["output_tokens"], model=model, direction="output")
+            if usage.get("cached_input_tokens"):
+                _llm_tokens.inc(usage["cached_input_tokens"], model=model, direction="cached_input")
+        self._end(run_id, attributes=usage)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, status="error", attributes={"error": type(error).__name__})
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self._start(run_id, parent_run_id, "tool", name, {})
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, status="error", attributes={"error": type(error).__name__})
+
+
+def profiling_callbacks() -> list[BaseCallbackHandler]:
+    """Callbacks to add to a graph config for the current run (none when not profiling)."""
+    profile = _current_profile.get()
+    if profile is None:
+        return []
+    return [SpanCallbackHandler(profile)]
@@ -9,6 +9,10 @@ class ChatRequest(BaseModel):
         default=None,
         description="Optional client-side ID for optimistic UI bookkeeping",
     )
+    on_busy: Optional[Literal["queue", "reject", "coalesce"]] = Field(
+        default=None,
+        description="Admission policy when the thread already has an active run",
+    )
 
 
 class ApprovalDecision(BaseModel):
@@ -1,60 +1,143 @@
 from __future__ import annotations
 
+import math
 import uuid
 
-from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
+from typing import Any
+
+from fastapi import APIRouter, Header, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
 from langgraph.types import Command
 
+from app.agents.llm_governor import INTERACTIVE, retry_after as llm_retry_after
+from app.agents.models import ROUTING_AGENT, agent_models
+from app.db.fetch_resource_versions import fetch_snapshot_version
 from app.db.fetch_thread_snapshot import fetch_thread_snapshot
 from app.db.get_conn_factory import conn_factory
-from app.db.run_repository import create_run
-from app.db.thread_repository import ensure_thread
+from app.config import RUN_ADMISSION_POLICY
+from app.db.run_repository import create_run, fetch_active_runs, set_run_status
+from app.db.thread_repository import ensure_thread, fetch_thread_model_settings
+from app.metrics import registry
+from app.routes.conditional import etag_matches, make_etag, not_modified, set_etag
+from app.runs.executor import RunJob, RunRejectedError, get_run_executor
 from .models import ApprovalDecision, ChatRequest
-from .service import (
-    build_initial_chat_state,
-    ensure_thread_documents,
-    graph_event_stream,
-    persist_user_chat_message,
-)
-from .streaming import STREAM_RESPONSE_HEADERS
 
 router = APIRouter(prefix="/api", tags=["chat"])
 
+ADMISSION_POLICIES = ("queue", "reject", "coalesce")
+if RUN_ADMISSION_POLICY not in ADMISSION_POLICIES:
+    raise RuntimeError(f"Unknown RUN_ADMISSION_POLICY: {RUN_ADMISSION_POLICY!r}")
+
+admissions_total = registry.counter(
+    "run_admissions_total",
+    "Chat run admission decisions by policy and outcome.",
+)
 
-@router.post("/chat/{thread_id}")
-async def api_chat(thread_id: str, payload: ChatRequest):
-    run_id = str(uuid.uuid4())
 
+def _enqueue_run(
+    *,
+    thread_id: str,
+    trigger: str,
+    payload: dict[str, Any],
+    run_id: str,
+) -> dict[str, Any]:
     ensure_thread(thread_id)
-    create_run(run_id=run_id, thread_id=thread_id, trigger="chat", status="queued")
+    create_run(run_id=run_id, thread_id=thread_id, trigger=trigger, status="queued")
 
-    user_message = persist_user_chat_message(thread_id, payload.message, run_id=run_id)
-    ensure_thread_documents(thread_id)
+    try:
+        get_run_executor().submit(
+            RunJob(run_id=run_id, thread_id=thread_id, trigger=trigger, payload=payload)
+        )
+    except RunRejectedError as exc:
+        set_run_status(run_id, status="error", error=str(exc), completed=True)
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
 
-    state_update = build_initial_chat_state(
-        thread_id=thread_id,
-        run_id=run_id,
-        user_message=user_message,
-    )
+    return {
+        "ok": True,
+        "thread_id": thread_id,
+        "run_id": run_id,
+        "status": "queued",
+        "events_url": f"/api/runs/{run_id}/events",
+    }
+
+
+def _routing_retry_after(thread_id: str) -> tuple[str, float | None]:
+    """The thread's routing model and `llm_retry_after` for an interactive call to it (blocking)."""
+    routing_model = agent_models(ROUTING_AGENT, fetch_thread_model_settings(thread_id))[0]
+    return routing_model, llm_retry_after(routing_model, INTERACTIVE)
 
-    return StreamingResponse(
-        graph_event_stream(
-            thread_id=thread_id,
-            run_id=run_id,
-            graph_input=state_update,
-            trigger="chat",
-        ),
-        media_type="text/event-stream",
-        headers=STREAM_RESPONSE_HEADERS,
+
+@router.post("/chat/{thread_id}", status_code=202)
+async def api_chat(thread_id: str, payload: ChatRequest):
+    policy = payload.on_busy or RUN_ADMISSION_POLICY
+    executor = get_run_executor()
+
+    if policy == "coalesce":
+        coalesced_run_id = executor.coalesce(thread_id, payload.message)
+        if coalesced_run_id:
+            admissions_total.inc(policy=policy, outcome="coalesced")
+            return {
+                "ok": True,
+                "thread_id": thread_id,
+                "run_id": coalesced_run_id,
+                "status": "queued",
+                "coalesced": True,
+                "events_url": f"/api/runs/{coalesced_run_id}/events",
+            }
+
+    # The run's first model call is maestro's, at interactive priority: when even
+    # that would be turned away, say so now instead of failing the run.
+    routing_model, retry_after = await run_in_threadpool(_routing_retry_after, thread_id)
+    if retry_after is not None:
+        admissions_total.inc(policy=policy, outcome="overloaded")
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "error": "llm_overloaded",
+                "message": f"Too many requests are waiting for {routing_model}",
+                "retry_after": math.ceil(retry_after),
+            },
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+    if policy == "reject":
+        # `runs` also covers runs admitted by other replicas; a run whose replica died
+        # (its lease ran out) does not keep the thread busy.
+        active_run_ids = [row["run_id"] for row in await run_in_threadpool(fetch_active_runs, thread_id)]
+        if active_run_ids or executor.is_thread_busy(thread_id):
+            admissions_total.inc(policy=policy, outcome="rejected")
+            raise HTTPException(
+                status_code=409,
+                detail={
+                    "error": "thread_busy",
+                    "message": "This thread already has an active run",
+                    "active_run_ids": active_run_ids,
+                },
+            )
+
+    admissions_total.inc(policy=policy, outcome="queued")
+    return _enqueue_run(
+        thread_id=thread_id,
+        trigger="chat",
+        payload={"messages": [payload.message]},
+        run_id=str(uuid.uuid4()),
     )
 
 
 @router.get("/chat/{thread_id}")
-async def get_chat_snapshot(thread_id: str):
+async def get_chat_snapshot(
+    thread_id: str,
+    response: Response,
+    if_none_match: str | None = Header(default=None),
+):
     with conn_factory() as conn:
+        etag = make_etag("snapshot", thread_id, *fetch_snapshot_version(conn, thread_id))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
         snapshot = fetch_thread_snapshot(conn, thread_id)
 
+    set_etag(response, etag)
+
     return {
         "ok": True,
         "thread_id": thread_id,
@@ -62,13 +145,10 @@ async def get_chat_snapshot(thread_id: str):
     }
 
 
-@router.post("/chat/{thread_id}/approval")
+@router.post("/chat/{thread_id}/approval", status_code=202)
 async def approve_changeset(thread_id: str, payload: ApprovalDecision):
     run_id = str(uuid.uuid4())
 
-    ensure_thread(thread_id)
-    create_run(run_id=run_id, thread_id=thread_id, trigger="approval", status="queued")
-
     resume_payload = {"decision": payload.decision}
     if payload.comment:
         resume_payload["comment"] = payload.comment
@@ -79,13 +159,9 @@ async def approve_changeset(thread_id: str, payload: ApprovalDecision):
 
     resume = Command(resume=resume_value, update={"run_id": run_id})
 
-    return StreamingResponse(
-        graph_event_stream(
-            thread_id=thread_id,
-            run_id=run_id,
-            graph_input=resume,
-            trigger="approval",
-        ),
-        media_type="text/event-stream",
-        headers=STREAM_RESPONSE_HEADERS,
+    return _enqueue_run(
+        thread_id=thread_id,
+        trigger="approval",
+        payload={"graph_input": resume},
+        run_id=run_id,
     )
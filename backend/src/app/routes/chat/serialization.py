@@ -133,10 +133,11 @@ def guess_agent_from_namespace(namespace: Any) -> Optional[str]:
     return None
 
 
-def find_approval_interrupt(updates: dict[str, Any]) -> Optional[dict[str, Any]]:
+def find_approval_interrupts(updates: dict[str, Any]) -> list[dict[str, Any]]:
+    """Approval payloads of every interrupt in an update; parallel specialists can each raise one."""
     raw_interrupt = updates.get("__interrupt__")
     if raw_interrupt is None:
-        return None
+        return []
 
     def normalize_approval_payload(value: Any, interrupt_id: Any = None) -> Optional[dict[str, Any]]:
         if not isinstance(value, dict):
@@ -163,8 +164,7 @@ def find_approval_interrupt(updates: dict[str, Any]) -> Optional[dict[str, Any]]
             return None
         return normalize_approval_payload(parsed, interrupt_id)
 
-    candidates = raw_interrupt if isinstance(raw_interrupt, list) else [raw_interrupt]
-    for candidate in candidates:
+    def parse_candidate(candidate: Any) -> Optional[dict[str, Any]]:
         candidate_value = getattr(candidate, "value", None)
         candidate_id = getattr(candidate, "id", None) or getattr(candidate, "interrupt_id", None)
         payload = normalize_approval_payload(candidate_value, candidate_id)
@@ -177,21 +177,25 @@ def find_approval_interrupt(updates: dict[str, Any]) -> Optional[dict[str, Any]]
             payload = normalize_approval_payload(value, interrupt_id)
             if payload:
                 return payload
-            payload = normalize_approval_payload(candidate, interrupt_id)
-            if payload:
-                return payload
+            return normalize_approval_payload(candidate, interrupt_id)
 
         if isinstance(candidate, str):
-            payload = parse_interrupt_repr(candidate)
-            if payload:
-                return payload
+            return parse_interrupt_repr(candidate)
+        return None
+
+    candidates = raw_interrupt if isinstance(raw_interrupt, (list, tuple)) else [raw_interrupt]
+    approvals = [payload for payload in map(parse_candidate, candidates) if payload]
+    if approvals:
+        return approvals
 
     serialized_interrupt = make_json_serializable(raw_interrupt)
     if isinstance(serialized_interrupt, list):
-        for entry in serialized_interrupt:
-            if isinstance(entry, str):
-                payload = parse_interrupt_repr(entry)
-                if payload:
-                    return payload
-
-    return {"type": "approval_required", "value": serialized_interrupt}
+        approvals = [
+            payload
+            for payload in (parse_interrupt_repr(entry) for entry in serialized_interrupt if isinstance(entry, str))
+            if payload
+        ]
+        if approvals:
+            return approvals
+
+    return [{"type": "approval_required", "value": serialized_interrupt}]
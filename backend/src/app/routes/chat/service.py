@@ -4,10 +4,14 @@ from typing import Any, Iterator
 
 from langchain_core.messages import HumanMessage
 
-from app.agents.build_workflow import build_workflow
+from app.agents.build_workflow import get_compiled_workflow
+from app.agents.llm_governor import BACKGROUND, INTERACTIVE
+from app.agents.run_budget import BudgetCallbackHandler, current_run_budget
+from app.agents.state.doc_refs import to_state_docs
 from app.agents.state.empty_docs import empty_docs
 from app.agents.state.get_initial_state_update import get_initial_state_update
-from app.db.checkpoint import checkpoint_db_url
+from app.agents.state.types import RunBudget
+from app.db.checkpoint import open_checkpointer
 from app.db.fetch_thread_docs import fetch_thread_docs_map
 from app.db.get_conn_factory import conn_factory
 from app.db.lc_message_to_row import lc_message_to_row
@@ -15,10 +19,12 @@ from app.db.persist_docs_to_db import persist_docs_to_db
 from app.db.persist_messages_to_db import persist_messages_to_db
 from app.db.thread_repository import (
     ensure_thread,
+    fetch_thread_model_settings,
     mark_docs_bootstrapped,
     needs_docs_bootstrap,
 )
-from langgraph.checkpoint.postgres import PostgresSaver
+from app.observability.spans import profiling_callbacks
+from app.runs.cancellation import CancellationCallbackHandler, current_cancellation
 from .streaming import stream_graph_events
 
 LEGACY_TO_V2_DOC_ID = {
@@ -33,17 +39,22 @@ LEGACY_TO_V2_DOC_ID = {
 }
 
 
-def persist_user_chat_message(thread_id: str, message: str, *, run_id: str) -> HumanMessage:
+def persist_user_chat_messages(
+    thread_id: str,
+    messages: list[str],
+    *,
+    run_id: str,
+) -> list[HumanMessage]:
     ensure_thread(thread_id)
-    user_message = HumanMessage(content=message)
+    user_messages = [HumanMessage(content=message) for message in messages]
     with conn_factory() as conn:
         persist_messages_to_db(
             conn,
             thread_id,
-            [lc_message_to_row(user_message)],
+            [lc_message_to_row(user_message) for user_message in user_messages],
             run_id=run_id,
         )
-    return user_message
+    return user_messages
 
 
 def ensure_thread_documents(thread_id: str) -> None:
@@ -105,13 +116,15 @@ def build_initial_chat_state(
     *,
     thread_id: str,
     run_id: str,
-    user_message: HumanMessage,
+    user_messages: list[HumanMessage],
+    budget: RunBudget | None = None,
 ) -> dict[str, Any]:
     return get_initial_state_update(
         thread_id=thread_id,
         run_id=run_id,
-        user_message=user_message,
-        docs=_load_thread_docs(thread_id),
+        user_messages=user_messages,
+        docs=to_state_docs(_load_thread_docs(thread_id), thread_id=thread_id, run_id=run_id),
+        budget=budget,
     )
 
 
@@ -122,11 +135,25 @@ def graph_event_stream(
     graph_input: dict[str, Any] | Any,
     trigger: str,
 ) -> Iterator[str]:
-    with PostgresSaver.from_conn_string(checkpoint_db_url()) as checkpointer:
-        checkpointer.setup()
-        workflow = build_workflow()
-        graph = workflow.compile(checkpointer=checkpointer)
-        config = {"configurable": {"thread_id": thread_id}}
+    # The checkpoint schema is set up once at startup (`ensure_checkpoint_schema`).
+    with open_checkpointer() as checkpointer:
+        graph = get_compiled_workflow().copy(update={"checkpointer": checkpointer})
+        callbacks = profiling_callbacks()
+        cancellation = current_cancellation()
+        if cancellation is not None:
+            callbacks.append(CancellationCallbackHandler(cancellation))
+        budget = current_run_budget()
+        if budget is not None:
+            callbacks.append(BudgetCallbackHandler(budget))
+        config = {
+            "configurable": {
+                "thread_id": thread_id,
+                "model_settings": fetch_thread_model_settings(thread_id),
+                # An approval resume is what the user is waiting on; see `llm_governor`.
+                "llm_priority": INTERACTIVE if trigger == "approval" else BACKGROUND,
+            },
+            "callbacks": callbacks,
+        }
         yield from stream_graph_events(
             graph_input=graph_input,
             config=config,
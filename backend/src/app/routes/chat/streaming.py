@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import json
+import logging
 import uuid
+from contextvars import copy_context
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from queue import Empty, Queue
@@ -9,15 +11,19 @@ from threading import Thread
 from time import monotonic
 from typing import Any, Iterator, Optional
 
+from app.config import RUN_CANCEL_GRACE_SECONDS
 from app.db.run_repository import append_agent_status, set_run_status
+from app.runs.cancellation import RunCancellation, RunCancelledError, current_cancellation
 from .serialization import (
     extract_text,
-    find_approval_interrupt,
+    find_approval_interrupts,
     guess_agent_from_namespace,
     make_json_serializable,
     normalize_tool_calls,
 )
 
+logger = logging.getLogger(__name__)
+
 
 STREAM_RESPONSE_HEADERS = {
     "Cache-Control": "no-cache",
@@ -61,15 +67,24 @@ def _graph_stream_worker(
     graph_input: dict[str, Any] | Any,
     config: dict[str, Any],
     out_queue: Queue[tuple[str, Any]],
+    cancellation: RunCancellation | None = None,
 ) -> None:
     try:
-        for item in graph.stream(
+        stream = graph.stream(
             graph_input,
             stream_mode=["messages", "updates", "custom"],
             config=config,
             subgraphs=True,
-        ):
-            out_queue.put(("record", item))
+        )
+        try:
+            for item in stream:
+                if cancellation is not None and cancellation.cancelled:
+                    # Closing the stream stops the graph after its running tasks
+                    # (which fail fast once cancelled); completed steps stay checkpointed.
+                    break
+                out_queue.put(("record", item))
+        finally:
+            stream.close()
     except Exception as exc:
         out_queue.put(("error", exc))
     finally:
@@ -94,6 +109,7 @@ def stream_graph_events(
     active_agent: str | None = None
     last_agent_status: dict[str, str] = {}
     interrupted_for_approval = False
+    seen_approvals: set[str | None] = set()
 
     def emit_agent_status(
         agent: str,
@@ -131,13 +147,24 @@ def stream_graph_events(
         yield maestro_status
 
     queue: Queue[tuple[str, Any]] = Queue()
+    cancellation = current_cancellation()
+
+    def wake_on_cancel() -> None:
+        queue.put(("cancelled", None))
+
+    if cancellation is not None:
+        cancellation.add_callback(wake_on_cancel)
+    # Run the graph in a copy of this context so run-scoped context (e.g. the
+    # run profile and cancellation) reaches graph nodes.
     worker = Thread(
-        target=_graph_stream_worker,
+        target=copy_context().run,
+        args=(_graph_stream_worker,),
         kwargs={
             "graph": graph,
             "graph_input": graph_input,
             "config": config,
             "out_queue": queue,
+            "cancellation": cancellation,
         },
         daemon=True,
     )
@@ -170,6 +197,9 @@ def stream_graph_events(
                 stream_done = True
                 continue
 
+            if item_type == "cancelled" and cancellation is not None:
+                cancellation.raise_if_cancelled()
+
             if item_type == "error":
                 raise item_payload
 
@@ -181,10 +211,14 @@ def stream_graph_events(
             by_agent = guess_agent_from_namespace(namespace)
 
             if by_agent:
-                if active_agent and by_agent != active_agent:
-                    finished_status = emit_agent_status(active_agent, "done")
-                    if finished_status:
-                        yield finished_status
+                # Specialists delegated in parallel interleave their records, so an agent
+                # is only done once control is back with maestro (or the run ends).
+                if active_agent and by_agent != active_agent and "maestro" in (by_agent, active_agent):
+                    for agent, status in list(last_agent_status.items()):
+                        if agent != by_agent and status == "thinking":
+                            finished_status = emit_agent_status(agent, "done")
+                            if finished_status:
+                                yield finished_status
                 active_agent = by_agent
                 thinking_status = emit_agent_status(by_agent, "thinking")
                 if thinking_status:
@@ -195,6 +229,8 @@ def stream_graph_events(
                 msg_role = getattr(msg, "type", None)
 
                 if msg_role == "ai":
+                    # Merged consultation messages carry the specialist as their name.
+                    message_agent = guess_agent_from_namespace(getattr(msg, "name", None)) or by_agent
                     msg_id = getattr(msg, "id", None)
                     if not msg_id:
                         if fallback_message_id is None:
@@ -204,14 +240,21 @@ def stream_graph_events(
                         fallback_message_id = msg_id
 
                     text_delta = extract_text(getattr(msg, "content", None))
+                    # Messages whose text was already streamed by their node (maestro's
+                    # user message) only add what was not streamed yet.
+                    streamed = message_buffers.get(msg_id, {}).get("content", "")
+                    if streamed and text_delta.startswith(streamed):
+                        text_delta = text_delta[len(streamed) :]
+                    elif msg_id in completed_ids:
+                        text_delta = ""
                     if text_delta:
                         existing = message_buffers.setdefault(
                             msg_id,
-                            {"content": "", "by_agent": by_agent},
+                            {"content": "", "by_agent": message_agent},
                         )
                         existing["content"] += text_delta
-                        if by_agent:
-                            existing["by_agent"] = by_agent
+                        if message_agent:
+                            existing["by_agent"] = message_agent
 
                         yield emitter.emit(
                             "message.delta",
@@ -268,7 +311,7 @@ def stream_graph_events(
                             "message.completed",
                             {
                                 "message_id": msg_id,
-                                "by_agent": buffered.get("by_agent", by_agent),
+                                "by_agent": buffered.get("by_agent", message_agent),
                                 "content": buffered.get("content", ""),
                             },
                         )
@@ -293,7 +336,34 @@ def stream_graph_events(
                 )
                 event_type = event_payload.get("type", "custom")
 
-                if event_type == "agent.staged_edits":
+                if event_type == "message.delta":
+                    msg_id = event_payload.get("message_id")
+                    existing = message_buffers.setdefault(
+                        msg_id,
+                        {"content": "", "by_agent": event_payload.get("by_agent")},
+                    )
+                    existing["content"] += event_payload.get("delta", "")
+                    yield emitter.emit(
+                        "message.delta",
+                        {
+                            "message_id": msg_id,
+                            "by_agent": existing.get("by_agent"),
+                            "delta": event_payload.get("delta", ""),
+                        },
+                    )
+                elif event_type == "message.completed":
+                    msg_id = event_payload.get("message_id")
+                    if msg_id not in completed_ids:
+                        completed_ids.add(msg_id)
+                        yield emitter.emit(
+                            "message.completed",
+                            {
+                                "message_id": msg_id,
+                                "by_agent": event_payload.get("by_agent"),
+                                "content": event_payload.get("content", ""),
+                            },
+                        )
+                elif event_type == "agent.staged_edits":
                     yield emitter.emit(
                         "tool.result",
                         {
@@ -301,23 +371,28 @@ def stream_graph_events(
                             "result": event_payload,
                         },
                     )
-                elif isinstance(event_type, str) and event_type.startswith("changeset."):
+                elif isinstance(event_type, str) and event_type.startswith(("changeset.", "consultation.", "budget.")):
                     yield emitter.emit(event_type, event_payload)
                 else:
                     yield emitter.emit("custom", event_payload)
 
             elif mode == "updates":
                 if isinstance(data, dict):
-                    approval = find_approval_interrupt(data)
-                    if approval:
+                    # Keep reading after an approval interrupt: specialists delegated in
+                    # parallel may still be working, and each can raise its own. A
+                    # subgraph's interrupt is reported again by its parents.
+                    for approval in find_approval_interrupts(data):
+                        change_set = approval.get("change_set") or {}
+                        approval_key = approval.get("interrupt_id") or change_set.get("change_set_id")
+                        if approval_key and approval_key in seen_approvals:
+                            continue
+                        seen_approvals.add(approval_key)
                         interrupted_for_approval = True
-                        if active_agent:
-                            waiting_status = emit_agent_status(active_agent, "waiting_approval")
+                        if by_agent or active_agent:
+                            waiting_status = emit_agent_status(by_agent or active_agent, "waiting_approval")
                             if waiting_status:
                                 yield waiting_status
-                        set_run_status(run_id, status="waiting_approval", completed=True)
                         yield emitter.emit("approval.required", approval)
-                        break
 
         for message_id, buffered in message_buffers.items():
             if message_id in completed_ids:
@@ -335,6 +410,7 @@ def stream_graph_events(
             )
 
         if interrupted_for_approval:
+            set_run_status(run_id, status="waiting_approval", completed=True)
             yield emitter.emit(
                 "run.completed",
                 {
@@ -357,6 +433,29 @@ def stream_graph_events(
                 "completed_at": _now_iso(),
             },
         )
+    except RunCancelledError as exc:
+        reason = (cancellation.reason if cancellation is not None else None) or str(exc)
+        # Nothing more is forwarded; give the graph a bounded time to stop so the
+        # thread lock is not released under a run that is still writing.
+        worker.join(timeout=RUN_CANCEL_GRACE_SECONDS)
+        if worker.is_alive():
+            logger.warning("Run %s still stopping %.0fs after cancellation", run_id, RUN_CANCEL_GRACE_SECONDS)
+
+        for agent, status in list(last_agent_status.items()):
+            if status in ("queued", "thinking", "tool_call"):
+                done_status = emit_agent_status(agent, "done", note="run cancelled")
+                if done_status:
+                    yield done_status
+
+        set_run_status(run_id, status="cancelled", error=reason, completed=True)
+        yield emitter.emit(
+            "run.cancelled",
+            {
+                "status": "cancelled",
+                "reason": reason,
+                "completed_at": _now_iso(),
+            },
+        )
     except Exception as exc:
         if active_agent:
             error_status = emit_agent_status(active_agent, "error", note=str(exc), force=True)
@@ -372,3 +471,6 @@ def stream_graph_events(
                 "completed_at": _now_iso(),
             },
         )
+    finally:
+        if cancellation is not None:
+            cancellation.remove_callback(wake_on_cancel)
@@ -2,10 +2,12 @@ from __future__ import annotations
 
 from typing import Any
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Response
 
+from app.db.fetch_resource_versions import fetch_doc_version, fetch_docs_version
 from app.db.fetch_thread_docs import fetch_thread_doc, fetch_thread_docs
 from app.db.get_conn_factory import conn_factory
+from app.routes.conditional import etag_matches, make_etag, not_modified, set_etag
 
 router = APIRouter(prefix="/api/threads/{thread_id}/docs", tags=["docs"])
 
@@ -25,10 +27,19 @@ def _serialize_doc(row: dict[str, Any]) -> dict[str, Any]:
 
 
 @router.get("")
-async def api_list_docs(thread_id: str):
+async def api_list_docs(
+    thread_id: str,
+    response: Response,
+    if_none_match: str | None = Header(default=None),
+):
     with conn_factory() as conn:
+        etag = make_etag("docs", thread_id, *fetch_docs_version(conn, thread_id))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
         rows = fetch_thread_docs(conn, thread_id)
 
+    set_etag(response, etag)
+
     return {
         "ok": True,
         "thread_id": thread_id,
@@ -37,13 +48,26 @@ async def api_list_docs(thread_id: str):
 
 
 @router.get("/{doc_id}")
-async def api_get_doc(thread_id: str, doc_id: str):
+async def api_get_doc(
+    thread_id: str,
+    doc_id: str,
+    response: Response,
+    if_none_match: str | None = Header(default=None),
+):
     with conn_factory() as conn:
+        version = fetch_doc_version(conn, thread_id, doc_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+        etag = make_etag("doc", thread_id, doc_id, *version)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
         row = fetch_thread_doc(conn, thread_id, doc_id)
 
     if not row:
         raise HTTPException(status_code=404, detail="Document not found")
 
+    set_etag(response, etag)
+
     return {
         "ok": True,
         "thread_id": thread_id,
@@ -1,10 +1,20 @@
 from __future__ import annotations
 
-from typing import Any
+import base64
+from datetime import datetime
+from typing import Any, Literal
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Response
 
-from app.db.changeset_repository import fetch_changeset_detail, fetch_changesets
+from app.db.changeset_repository import (
+    fetch_changeset_detail,
+    fetch_changeset_doc,
+    fetch_changeset_summaries,
+    fetch_changesets,
+)
+from app.db.fetch_resource_versions import fetch_changeset_version, fetch_changesets_version
+from app.db.get_conn_factory import conn_factory
+from app.routes.conditional import etag_matches, make_etag, not_modified, set_etag
 
 router = APIRouter(prefix="/api/threads/{thread_id}/changesets", tags=["reviews"])
 
@@ -25,9 +35,78 @@ def _serialize_changeset(row: dict[str, Any]) -> dict[str, Any]:
     }
 
 
+def _serialize_changeset_summary(row: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "change_set_id": row["change_set_id"],
+        "thread_id": row["thread_id"],
+        "run_id": row["run_id"],
+        "created_by": row["created_by"],
+        "summary": row["summary"],
+        "status": row["status"],
+        "created_at": row["created_at"].isoformat() if row.get("created_at") else None,
+        "decided_at": row["decided_at"].isoformat() if row.get("decided_at") else None,
+        "decision_note": row["decision_note"],
+        "docs": row.get("docs", []),
+        "doc_stats": row.get("doc_stats", []),
+    }
+
+
+def _encode_cursor(row: dict[str, Any]) -> str:
+    raw = f"{row['created_at'].isoformat()}|{row['change_set_id']}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, change_set_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), change_set_id
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+
 @router.get("")
-async def api_list_changesets(thread_id: str):
+async def api_list_changesets(
+    thread_id: str,
+    response: Response,
+    # Full stays the default for the existing client; pages of summaries are opt-in.
+    view: Literal["summary", "full"] = Query(default="full"),
+    status: str | None = Query(default=None),
+    before: str | None = Query(default=None, description="Cursor from a previous page"),
+    limit: int = Query(default=50, ge=1, le=200),
+    if_none_match: str | None = Header(default=None),
+):
+    with conn_factory() as conn:
+        etag = make_etag(
+            "changesets",
+            thread_id,
+            view,
+            status,
+            before,
+            limit,
+            *fetch_changesets_version(conn, thread_id),
+        )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    if view == "summary":
+        rows = fetch_changeset_summaries(
+            thread_id,
+            status=status,
+            before=_decode_cursor(before) if before else None,
+            limit=limit,
+        )
+        set_etag(response, etag)
+        return {
+            "ok": True,
+            "thread_id": thread_id,
+            "changesets": [_serialize_changeset_summary(row) for row in rows],
+            "next_cursor": _encode_cursor(rows[-1]) if len(rows) == limit else None,
+        }
+
+    # Full listing: every change set with every diff, oldest first, unpaginated.
     changesets = fetch_changesets(thread_id)
+    set_etag(response, etag)
     return {
         "ok": True,
         "thread_id": thread_id,
@@ -36,11 +115,26 @@ async def api_list_changesets(thread_id: str):
 
 
 @router.get("/{change_set_id}")
-async def api_get_changeset(thread_id: str, change_set_id: str):
+async def api_get_changeset(
+    thread_id: str,
+    change_set_id: str,
+    response: Response,
+    if_none_match: str | None = Header(default=None),
+):
+    with conn_factory() as conn:
+        version = fetch_changeset_version(conn, thread_id, change_set_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Change set not found")
+    etag = make_etag("changeset", thread_id, change_set_id, *version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
     changeset = fetch_changeset_detail(thread_id, change_set_id)
     if not changeset:
         raise HTTPException(status_code=404, detail="Change set not found")
 
+    set_etag(response, etag)
+
     serialized = _serialize_changeset(changeset)
     serialized["doc_changes"] = [
         {
@@ -68,3 +162,25 @@ async def api_get_changeset(thread_id: str, change_set_id: str):
         "thread_id": thread_id,
         "changeset": serialized,
     }
+
+
+@router.get("/{change_set_id}/docs/{doc_id}")
+async def api_get_changeset_doc(thread_id: str, change_set_id: str, doc_id: str):
+    row = fetch_changeset_doc(thread_id, change_set_id, doc_id)
+    if not row:
+        raise HTTPException(status_code=404, detail="Change set document not found")
+
+    return {
+        "ok": True,
+        "thread_id": thread_id,
+        "change_set_id": change_set_id,
+        "doc_change": {
+            "doc_id": row["doc_id"],
+            "before_content": row["before_content"],
+            "after_content": row["after_content"],
+            "diff": row["diff"],
+            "hunks": row["hunks"],
+            "lines_added": row["lines_added"],
+            "lines_removed": row["lines_removed"],
+        },
+    }
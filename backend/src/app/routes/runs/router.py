@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.db.activity_repository import fetch_run_activity
+from app.db.run_repository import fetch_run
+from app.db.run_span_repository import fetch_run_spans
+from app.events.bus import get_event_bus, run_topic
+from app.routes.chat.streaming import HEARTBEAT_INTERVAL_SECONDS, STREAM_RESPONSE_HEADERS
+from app.runs.event_log import iter_subscription_frames
+from app.runs.executor import get_run_executor, request_run_cancel
+
+router = APIRouter(prefix="/api/runs", tags=["runs"])
+
+
+def _serialize_run(row: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "run_id": row["run_id"],
+        "thread_id": row["thread_id"],
+        "trigger": row["trigger"],
+        "status": row["status"],
+        "started_at": row["started_at"].isoformat() if row.get("started_at") else None,
+        "completed_at": row["completed_at"].isoformat() if row.get("completed_at") else None,
+        "error": row["error"],
+    }
+
+
+def serialize_activity(row: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "id": row["id"],
+        "thread_id": row["thread_id"],
+        "run_id": row["run_id"],
+        "seq": row["seq"],
+        "agent": row["agent"],
+        "activity": row["activity"],
+        "payload": row["payload"],
+        "created_at": row["created_at"].isoformat(),
+    }
+
+
+def _is_active(run: dict[str, Any] | None) -> bool:
+    return bool(run) and run["status"] in {"queued", "running"}
+
+
+@router.get("/{run_id}")
+async def api_get_run(run_id: str):
+    row = fetch_run(run_id)
+    if not row:
+        raise HTTPException(status_code=404, detail="Run not found")
+
+    return {
+        "ok": True,
+        "run": _serialize_run(row),
+    }
+
+
+@router.post("/{run_id}/cancel", status_code=202)
+async def api_cancel_run(run_id: str):
+    run = fetch_run(run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    if not _is_active(run):
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "error": "run_not_active",
+                "message": "Only queued or running runs can be cancelled",
+                "status": run["status"],
+            },
+        )
+
+    # The run's event stream ends with `run.cancelled` once it has stopped.
+    owned = request_run_cancel(run_id)
+    return {
+        "ok": True,
+        "run_id": run_id,
+        "status": "cancelling",
+        "owner": "local" if owned else "remote",
+    }
+
+
+@router.get("/{run_id}/activity")
+async def api_get_run_activity(
+    run_id: str,
+    after: int = Query(default=0, ge=0, description="Return entries with seq greater than this"),
+    limit: int = Query(default=100, ge=1, le=500),
+):
+    if not fetch_run(run_id):
+        raise HTTPException(status_code=404, detail="Run not found")
+
+    rows = fetch_run_activity(run_id, after_seq=after, limit=limit)
+    return {
+        "ok": True,
+        "activity": [serialize_activity(row) for row in rows],
+        "next_after": rows[-1]["seq"] if len(rows) == limit else None,
+    }
+
+
+@router.get("/{run_id}/profile")
+async def api_get_run_profile(run_id: str):
+    run = fetch_run(run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+
+    spans = [
+        {
+            "span_id": row["span_id"],
+            "parent_span_id": row["parent_span_id"],
+            "kind": row["kind"],
+            "name": row["name"],
+            "start_ms": round(row["start_ms"], 3),
+            "duration_ms": round(row["duration_ms"], 3),
+            "status": row["status"],
+            "attributes": row["attributes"],
+        }
+        for row in fetch_run_spans(run_id)
+    ]
+
+    # Inclusive totals: a node span also covers the LLM/tool/db spans inside it.
+    by_kind: dict[str, dict[str, Any]] = {}
+    for item in spans:
+        if item["kind"] == "run":
+            continue
+        totals = by_kind.setdefault(item["kind"], {"kind": item["kind"], "count": 0, "total_ms": 0.0})
+        totals["count"] += 1
+        totals["total_ms"] = round(totals["total_ms"] + item["duration_ms"], 3)
+
+    # LLM token usage; cached_input_tokens is what the provider served from its prompt cache.
+    tokens = {"input_tokens": 0, "cached_input_tokens": 0, "output_tokens": 0}
+    for item in spans:
+        if item["kind"] == "llm":
+            for key in tokens:
+                tokens[key] += int((item["attributes"] or {}).get(key) or 0)
+
+    root = next((item for item in spans if item["kind"] == "run"), None)
+    return {
+        "ok": True,
+        "run": _serialize_run(run),
+        "total_ms": root["duration_ms"] if root else None,
+        "breakdown": sorted(by_kind.values(), key=lambda totals: totals["total_ms"], reverse=True),
+        "tokens": tokens,
+        "spans": spans,
+    }
+
+
+@router.get("/{run_id}/events")
+async def api_run_events(
+    run_id: str,
+    after: int = Query(default=0, ge=0, description="Replay events after this event id"),
+    last_event_id: str | None = Header(default=None),
+):
+    cursor = after
+    if last_event_id and last_event_id.isdigit():
+        cursor = max(cursor, int(last_event_id))
+
+    log = get_run_executor().event_logs.get(run_id)
+    if log is not None:
+        frames = log.iter_frames(after=cursor, heartbeat_seconds=HEARTBEAT_INTERVAL_SECONDS)
+    else:
+        # The run is owned by another replica (or already gone): relay it live
+        # from the event bus. Subscribe before checking status so no frame is lost.
+        subscription = get_event_bus().subscribe(run_topic(run_id))
+        run = fetch_run(run_id)
+        if run is None or not _is_active(run):
+            subscription.close()
+            if run is None:
+                raise HTTPException(status_code=404, detail="Run not found")
+            raise HTTPException(status_code=410, detail="Run event stream is no longer available")
+
+        frames = iter_subscription_frames(
+            subscription,
+            after=cursor,
+            heartbeat_seconds=HEARTBEAT_INTERVAL_SECONDS,
+            is_active=lambda: _is_active(fetch_run(run_id)),
+        )
+
+    return StreamingResponse(
+        frames,
+        media_type="text/event-stream",
+        headers=STREAM_RESPONSE_HEADERS,
+    )
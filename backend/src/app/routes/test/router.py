@@ -4,15 +4,11 @@ from fastapi import APIRouter, Request
 from typing import TypedDict
 from langchain_core.messages import AIMessageChunk
 from langgraph.graph import StateGraph, START, END
-from langchain.chat_models import init_chat_model
-from langgraph.checkpoint.postgres import PostgresSaver
 from langgraph.checkpoint.memory import InMemorySaver, MemorySaver
 from langgraph.types import Command, interrupt
 
 from app.agents.build_workflow import build_workflow
-from app.db.checkpoint import checkpoint_db_url
-
-model = init_chat_model(model="gpt-4o-mini", temperature=0.0)
+from app.db.checkpoint import open_checkpointer
 
 config = {"configurable": {"thread_id": 1}}
 
@@ -22,6 +18,9 @@ class State(TypedDict):
     suggested_edit: str
 
 def suggest_edit(state: State) -> State:
+    from langchain.chat_models import init_chat_model
+
+    model = init_chat_model(model="gpt-4o-mini", temperature=0.0)
     response = model.invoke(f"Expand on the following document. Overwrite: {state['document']}")
     return {"suggested_edit": response.content}
 
@@ -44,8 +43,6 @@ def make_edit(state: State) -> State:
 def cancel(state: State) -> State:
     return {"document": state["document"]}
 
-DB_URL = checkpoint_db_url()
-print(DB_URL)
 
 
 
@@ -62,7 +59,7 @@ def checkpointer_decorator(func):
     """
 
     async def wrapper(request: Request):
-        with PostgresSaver.from_conn_string(DB_URL) as checkpointer:
+        with open_checkpointer() as checkpointer:
             checkpointer.setup()
             request.state.checkpointer = checkpointer
             return await func(request)
@@ -14,3 +14,16 @@ class CreateThreadRequest(BaseModel):
 class UpdateThreadRequest(BaseModel):
     title: str | None = Field(default=None, description="Thread title")
     status: Literal["active", "archived"] | None = Field(default=None)
+
+
+class ModelSettingsRequest(BaseModel):
+    models: dict[str, list[str]] = Field(
+        default_factory=dict,
+        description="Model cascade per agent, cheapest first; agents not listed use the server defaults",
+    )
+    routing_min_confidence: float | None = Field(
+        default=None,
+        ge=0,
+        le=1,
+        description="Maestro escalates decisions below this confidence to its next model",
+    )
@@ -1,12 +1,29 @@
 from __future__ import annotations
 
 import uuid
-from typing import Any
+from time import monotonic
+from typing import Any, Iterator
 
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
-from app.db.thread_repository import create_thread, list_threads, update_thread
-from .models import CreateThreadRequest, UpdateThreadRequest
+from app.agents.models import allowed_models
+from app.config import THREAD_EVENTS_COALESCE_SECONDS
+from app.db.activity_repository import fetch_activity
+from app.db.thread_repository import (
+    create_thread,
+    fetch_thread_model_settings,
+    list_threads,
+    thread_exists,
+    update_thread,
+    update_thread_model_settings,
+)
+from app.events.bus import Subscription, get_event_bus
+from app.events.thread_events import ThreadEventCoalescer, thread_topic
+from app.routes.chat.streaming import HEARTBEAT_INTERVAL_SECONDS, STREAM_RESPONSE_HEADERS, to_sse
+from app.routes.runs.router import serialize_activity
+from app.runs.event_log import KEEPALIVE_FRAME
+from .models import CreateThreadRequest, ModelSettingsRequest, UpdateThreadRequest
 
 router = APIRouter(prefix="/api/threads", tags=["threads"])
 
@@ -22,6 +39,30 @@ def _serialize_thread(row: dict[str, Any]) -> dict[str, Any]:
     }
 
 
+def _iter_thread_event_frames(thread_id: str, subscription: Subscription) -> Iterator[str]:
+    coalescer = ThreadEventCoalescer()
+    with subscription:
+        yield to_sse("ready", {"thread_id": thread_id})
+        while True:
+            event = subscription.get(timeout=HEARTBEAT_INTERVAL_SECONDS)
+            if event is None:
+                yield KEEPALIVE_FRAME
+                continue
+
+            # Hold the first event briefly so a burst (e.g. a change set applying
+            # several docs) reaches the client as one frame per entity.
+            coalescer.add(event)
+            window_ends = monotonic() + THREAD_EVENTS_COALESCE_SECONDS
+            while (remaining := window_ends - monotonic()) > 0:
+                event = subscription.get(timeout=remaining)
+                if event is None:
+                    break
+                coalescer.add(event)
+
+            for coalesced in coalescer.drain():
+                yield to_sse(coalesced["type"], coalesced)
+
+
 @router.get("")
 async def api_list_threads(
     limit: int = Query(default=100, ge=1, le=200),
@@ -59,3 +100,61 @@ async def api_update_thread(thread_id: str, payload: UpdateThreadRequest):
         "ok": True,
         "thread": _serialize_thread(row),
     }
+
+
+def _known_agents() -> set[str]:
+    # Imported here: the agent definitions pull in the whole agent stack.
+    from app.agents.defintions.maestro import AGENT_NAME, subagents_by_name
+
+    return {AGENT_NAME, *subagents_by_name}
+
+
+@router.get("/{thread_id}/model-settings")
+async def api_thread_model_settings(thread_id: str):
+    if not thread_exists(thread_id):
+        raise HTTPException(status_code=404, detail="Thread not found")
+    return {"ok": True, "model_settings": fetch_thread_model_settings(thread_id)}
+
+
+@router.put("/{thread_id}/model-settings")
+async def api_update_thread_model_settings(thread_id: str, payload: ModelSettingsRequest):
+    unknown = sorted(set(payload.models) - _known_agents())
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown agents: {', '.join(unknown)}")
+    if any(not models or not all(model.strip() for model in models) for models in payload.models.values()):
+        raise HTTPException(status_code=400, detail="Each agent needs a non-empty list of model names")
+    # Unknown names would fail every later run of the thread at its first model call.
+    unknown = sorted({model.strip() for models in payload.models.values() for model in models} - allowed_models())
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown models: {', '.join(unknown)}")
+
+    settings = update_thread_model_settings(thread_id, payload.model_dump(exclude_none=True))
+    if settings is None:
+        raise HTTPException(status_code=404, detail="Thread not found")
+    return {"ok": True, "model_settings": settings}
+
+
+@router.get("/{thread_id}/activity")
+async def api_thread_activity(
+    thread_id: str,
+    run_id: str | None = Query(default=None),
+    agent: str | None = Query(default=None),
+    after: int = Query(default=0, ge=0, description="Return entries with id greater than this"),
+    limit: int = Query(default=100, ge=1, le=500),
+):
+    rows = fetch_activity(thread_id, run_id=run_id, agent=agent, after_id=after, limit=limit)
+    return {
+        "ok": True,
+        "activity": [serialize_activity(row) for row in rows],
+        "next_after": rows[-1]["id"] if len(rows) == limit else None,
+    }
+
+
+@router.get("/{thread_id}/events")
+async def api_thread_events(thread_id: str):
+    subscription = get_event_bus().subscribe(thread_topic(thread_id))
+    return StreamingResponse(
+        _iter_thread_event_frames(thread_id, subscription),
+        media_type="text/event-stream",
+        headers=STREAM_RESPONSE_HEADERS,
+    )
@@ -0,0 +1,159 @@
+"""
+Cooperative run cancellation.
+
+Each run has a `RunCancellation`, created with its `RunJob`. `POST
+/api/runs/{run_id}/cancel` (or the last event stream subscriber leaving, with
+RUN_CANCEL_ON_DISCONNECT) sets it, and everything the run does checks it at
+the points where it would otherwise keep spending:
+
+- `stream_graph_events` stops forwarding graph events and stops the graph at the
+  next step (the checkpoint keeps the last completed step);
+- model calls raise `RunCancelledError` (`ResilientChatModel` at once, any other
+  model on its next token, through `CancellationCallbackHandler`);
+- tool and chain starts raise it too, and slow blocking calls such as
+  `search_web` wait through `run_cancellable`.
+
+The cancellation travels in a context variable set by `execute_run`, which the
+graph's worker threads inherit.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Iterator, TypeVar
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+T = TypeVar("T")
+
+
+class RunCancelledError(RuntimeError):
+    """Raised inside a run once it has been cancelled."""
+
+
+class RunCancellation:
+    def __init__(self):
+        self.reason: str | None = None
+        self._event = Event()
+        self._callbacks: list[Callable[[], None]] = []
+        self._lock = Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str) -> bool:
+        """Request cancellation; False when it was already requested."""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback()
+        return True
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        """Call `callback` on cancellation (at once if already cancelled)."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def wait(self, timeout: float) -> bool:
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise RunCancelledError(self.reason or "Run cancelled")
+
+
+_current_cancellation: ContextVar[RunCancellation | None] = ContextVar("run_cancellation", default=None)
+
+
+def current_cancellation() -> RunCancellation | None:
+    return _current_cancellation.get()
+
+
+@contextmanager
+def run_cancellation(cancellation: RunCancellation) -> Iterator[RunCancellation]:
+    """Make `cancellation` the current run's for everything executed in this context."""
+    token = _current_cancellation.set(cancellation)
+    try:
+        yield cancellation
+    finally:
+        try:
+            _current_cancellation.reset(token)
+        except ValueError:
+            # Generator-based runs can be closed from another context.
+            pass
+
+
+def raise_if_cancelled() -> None:
+    cancellation = _current_cancellation.get()
+    if cancellation is not None:
+        cancellation.raise_if_cancelled()
+
+
+def run_cancellable(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Call a blocking `fn` that cannot be interrupted (e.g. an HTTP request) on its
+    own thread, and stop waiting for it as soon as the run is cancelled.
+    """
+    cancellation = _current_cancellation.get()
+    if cancellation is None:
+        return fn(*args, **kwargs)
+    cancellation.raise_if_cancelled()
+
+    outcome: dict[str, Any] = {}
+    finished = Event()
+
+    def call() -> None:
+        try:
+            outcome["value"] = fn(*args, **kwargs)
+        except BaseException as exc:
+            outcome["error"] = exc
+        finally:
+            finished.set()
+
+    cancellation.add_callback(finished.set)
+    try:
+        Thread(target=copy_context().run, args=(call,), daemon=True, name="run-cancellable").start()
+        finished.wait()
+    finally:
+        cancellation.remove_callback(finished.set)
+    if "error" in outcome:
+        raise outcome["error"]
+    if "value" not in outcome:
+        cancellation.raise_if_cancelled()
+    return outcome["value"]
+
+
+class CancellationCallbackHandler(BaseCallbackHandler):
+    """Fails model tokens, tool and chain starts of a cancelled run (for models without their own check)."""
+
+    raise_error = True
+
+    def __init__(self, cancellation: RunCancellation):
+        self.cancellation = cancellation
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self.cancellation.raise_if_cancelled()
+
+    def on_chat_model_start(self, serialized: dict[str, Any], messages: Any, **kwargs: Any) -> None:
+        self.cancellation.raise_if_cancelled()
+
+    def on_tool_start(self, serialized: dict[str, Any], input_str: str, **kwargs: Any) -> None:
+        self.cancellation.raise_if_cancelled()
+
+    def on_chain_start(self, serialized: dict[str, Any], inputs: Any, **kwargs: Any) -> None:
+        self.cancellation.raise_if_cancelled()
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+from threading import Condition, Lock
+from time import monotonic
+from typing import Any, Callable, Iterator
+
+KEEPALIVE_FRAME = ": keepalive\n\n"
+
+
+class RunEventLog:
+    """
+    Append-only buffer of SSE frames produced by one run.
+
+    The executor appends frames as the graph streams; any number of HTTP
+    subscribers can attach (or re-attach) at any point and replay from a cursor.
+    """
+
+    def __init__(
+        self,
+        run_id: str,
+        thread_id: str,
+        *,
+        on_event: Callable[[dict[str, Any]], None] | None = None,
+        on_unwatched: Callable[[RunEventLog], None] | None = None,
+    ):
+        self.run_id = run_id
+        self.thread_id = thread_id
+        self.closed_at: float | None = None
+        self.subscribers = 0
+        self._frames: list[str] = []
+        self._cond = Condition()
+        self._on_event = on_event
+        self._on_unwatched = on_unwatched
+
+    @property
+    def closed(self) -> bool:
+        return self.closed_at is not None
+
+    def append(self, frame: str) -> int:
+        with self._cond:
+            self._frames.append(frame)
+            seq = len(self._frames)
+            self._cond.notify_all()
+        if self._on_event is not None:
+            self._on_event({"seq": seq, "frame": frame})
+        return seq
+
+    def close(self) -> None:
+        with self._cond:
+            already_closed = self.closed_at is not None
+            if not already_closed:
+                self.closed_at = monotonic()
+            self._cond.notify_all()
+        if self._on_event is not None and not already_closed:
+            self._on_event({"closed": True})
+
+    def read(self, after: int, *, timeout: float) -> tuple[list[tuple[int, str]], bool]:
+        with self._cond:
+            if len(self._frames) <= after and self.closed_at is None:
+                self._cond.wait(timeout=timeout)
+            frames = [
+                (seq, frame)
+                for seq, frame in enumerate(self._frames[after:], start=after + 1)
+            ]
+            return frames, self.closed_at is not None
+
+    def iter_frames(self, *, after: int = 0, heartbeat_seconds: float) -> Iterator[str]:
+        cursor = max(after, 0)
+        with self._cond:
+            self.subscribers += 1
+        try:
+            while True:
+                frames, closed = self.read(cursor, timeout=heartbeat_seconds)
+                for seq, frame in frames:
+                    cursor = seq
+                    yield f"id: {seq}\n{frame}"
+                if frames:
+                    continue
+                if closed:
+                    return
+                yield KEEPALIVE_FRAME
+        finally:
+            # A client that went away is noticed here, at its next frame or keepalive.
+            with self._cond:
+                self.subscribers -= 1
+                unwatched = self.subscribers == 0 and self.closed_at is None
+            if unwatched and self._on_unwatched is not None:
+                self._on_unwatched(self)
+
+
+class RunEventLogRegistry:
+    """
+    Process-local index of run event logs. Closed logs are kept for `ttl_seconds`
+    so late subscribers can still replay a finished run.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: float,
+        publish: Callable[[str, dict[str, Any]], None] | None = None,
+        on_unwatched: Callable[[RunEventLog], None] | None = None,
+    ):
+        self._ttl_seconds = ttl_seconds
+        self._publish = publish
+        self._on_unwatched = on_unwatched
+        self._logs: dict[str, RunEventLog] = {}
+        self._lock = Lock()
+
+    def create(self, run_id: str, thread_id: str) -> RunEventLog:
+        on_event = None
+        if self._publish is not None:
+            publish = self._publish
+
+            def on_event(event: dict[str, Any]) -> None:
+                publish(run_id, event)
+
+        with self._lock:
+            self._evict_expired()
+            log = RunEventLog(run_id, thread_id, on_event=on_event, on_unwatched=self._on_unwatched)
+            self._logs[run_id] = log
+            return log
+
+    def get(self, run_id: str) -> RunEventLog | None:
+        with self._lock:
+            self._evict_expired()
+            return self._logs.get(run_id)
+
+    def _evict_expired(self) -> None:
+        now = monotonic()
+        expired = [
+            run_id
+            for run_id, log in self._logs.items()
+            if log.closed_at is not None and now - log.closed_at > self._ttl_seconds
+        ]
+        for run_id in expired:
+            del self._logs[run_id]
+
+
+def iter_subscription_frames(
+    subscription: Any,
+    *,
+    after: int = 0,
+    heartbeat_seconds: float,
+    is_active: Callable[[], bool],
+) -> Iterator[str]:
+    """
+    Relay a run's frames received over the event bus, for runs owned by another
+    replica. Only frames published after subscribing are seen; there is no replay.
+    """
+    cursor = max(after, 0)
+    with subscription:
+        while True:
+            event = subscription.get(timeout=heartbeat_seconds)
+            if event is None:
+                if not is_active():
+                    return
+                yield KEEPALIVE_FRAME
+                continue
+            if event.get("closed"):
+                return
+            seq = int(event["seq"])
+            if seq <= cursor:
+                continue
+            cursor = seq
+            yield f"id: {seq}\n{event['frame']}"
@@ -0,0 +1,383 @@
+from __future__ import annotations
+
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from threading import Condition, Event, Lock, Thread, Timer
+from time import monotonic
+from typing import Any, Callable, Iterator
+
+from app.config import (
+    RUN_CANCEL_ON_DISCONNECT,
+    RUN_CANCEL_ON_DISCONNECT_GRACE_SECONDS,
+    RUN_EVENT_LOG_TTL_SECONDS,
+    RUN_EXECUTOR_MAX_QUEUED,
+    RUN_EXECUTOR_MAX_WORKERS,
+    RUN_LEASE_SECONDS,
+)
+from app.events.bus import RUN_CONTROL_TOPIC, get_event_bus, publish_event, run_topic
+from app.metrics import registry
+from app.runs.cancellation import RunCancellation
+from app.runs.event_log import RunEventLog, RunEventLogRegistry
+
+logger = logging.getLogger(__name__)
+
+cancellations_total = registry.counter(
+    "run_cancellations_total",
+    "Runs cancelled on this replica, by stage (queued: dropped before starting; running).",
+)
+reaped_runs_total = registry.counter(
+    "run_reaped_total",
+    "Queued or running runs failed by this replica's reaper because their owner's lease ran out.",
+)
+
+
+@dataclass
+class RunJob:
+    run_id: str
+    thread_id: str
+    trigger: str
+    payload: dict[str, Any]
+    enqueued_at: float = field(default_factory=monotonic)
+    cancellation: RunCancellation = field(default_factory=RunCancellation)
+
+
+class RunRejectedError(RuntimeError):
+    """Raised when the executor cannot accept another run."""
+
+
+class RunExecutor:
+    """
+    Bounded worker pool that executes graph runs independently of HTTP requests.
+
+    - At most `max_workers` runs execute at once across all threads.
+    - Runs on the same thread execute strictly one after another, in FIFO order.
+    - `shutdown` stops admissions and waits for queued and active runs to drain;
+      whatever is left when the drain times out is reported as errored.
+    - `cancel` drops a queued run, or asks a dispatched one to stop (see `cancellation`).
+    """
+
+    def __init__(
+        self,
+        *,
+        runner: Callable[[RunJob], Iterator[str]],
+        abandon: Callable[[RunJob, RunEventLog, str], None],
+        discard: Callable[[RunJob, RunEventLog], None],
+        max_workers: int,
+        max_queued: int,
+        event_log_ttl_seconds: float,
+        publish: Callable[[str, dict[str, Any]], None] | None = None,
+        cancel_on_disconnect_seconds: float | None = None,
+    ):
+        self._runner = runner
+        self._abandon = abandon
+        self._discard = discard
+        self._max_queued = max_queued
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="run-worker")
+        self._lock = Lock()
+        self._idle = Condition(self._lock)
+        self._waiting: dict[str, deque[RunJob]] = {}
+        self._dispatched: dict[str, RunJob] = {}
+        self._active_threads: set[str] = set()
+        self._waiting_count = 0
+        self._inflight_count = 0
+        self._accepting = True
+        self._cancel_on_disconnect_seconds = cancel_on_disconnect_seconds
+        self.event_logs = RunEventLogRegistry(
+            ttl_seconds=event_log_ttl_seconds,
+            publish=publish,
+            on_unwatched=self._on_unwatched if cancel_on_disconnect_seconds is not None else None,
+        )
+
+    def submit(self, job: RunJob) -> RunEventLog:
+        with self._lock:
+            if not self._accepting:
+                raise RunRejectedError("Server is shutting down")
+            if self._waiting_count + self._inflight_count >= self._max_queued:
+                raise RunRejectedError("Run queue is full")
+
+            log = self.event_logs.create(job.run_id, job.thread_id)
+            if job.thread_id in self._active_threads:
+                self._waiting.setdefault(job.thread_id, deque()).append(job)
+                self._waiting_count += 1
+            else:
+                self._active_threads.add(job.thread_id)
+                self._dispatch_locked(job)
+            return log
+
+    def coalesce(self, thread_id: str, message: str) -> str | None:
+        """
+        Fold a chat message into the newest chat run still waiting for this thread.
+        Returns that run's id, or None when there is no waiting chat run to join.
+        """
+        with self._lock:
+            queue = self._waiting.get(thread_id)
+            if not queue:
+                return None
+            job = queue[-1]
+            if job.trigger != "chat":
+                return None
+            job.payload["messages"].append(message)
+            return job.run_id
+
+    def cancel(self, run_id: str, *, reason: str) -> bool:
+        """
+        Cancel a run this executor owns: a queued run is dropped at once, a dispatched
+        one is asked to stop. Returns False when the run is not (or no longer) here.
+        """
+        with self._lock:
+            job = self._dispatched.get(run_id)
+            if job is None:
+                for queue in self._waiting.values():
+                    job = next((queued for queued in queue if queued.run_id == run_id), None)
+                    if job is not None:
+                        queue.remove(job)
+                        self._waiting_count -= 1
+                        if not queue:
+                            del self._waiting[job.thread_id]
+                        self._idle.notify_all()
+                        break
+                else:
+                    return False
+                queued = True
+            else:
+                queued = False
+
+        if job.cancellation.cancel(reason):
+            cancellations_total.inc(stage="queued" if queued else "running")
+        if queued:
+            log = self.event_logs.get(run_id)
+            if log is not None:
+                try:
+                    self._discard(job, log)
+                finally:
+                    log.close()
+        return True
+
+    def _on_unwatched(self, log: RunEventLog) -> None:
+        # Every subscriber of a running run left: cancel it unless one is back in time.
+        def check() -> None:
+            if log.subscribers == 0 and not log.closed:
+                logger.info("Cancelling run %s: its event stream was left unwatched", log.run_id)
+                self.cancel(log.run_id, reason="Client disconnected")
+
+        timer = Timer(self._cancel_on_disconnect_seconds, check)
+        timer.daemon = True
+        timer.start()
+
+    def is_thread_busy(self, thread_id: str) -> bool:
+        with self._lock:
+            return thread_id in self._active_threads
+
+    def owned_run_ids(self) -> list[str]:
+        """Runs this executor has queued or dispatched, whose leases it keeps."""
+        with self._lock:
+            return [*self._dispatched, *(job.run_id for queue in self._waiting.values() for job in queue)]
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "inflight": self._inflight_count,
+                "waiting": self._waiting_count,
+                "active_threads": len(self._active_threads),
+            }
+
+    def shutdown(self, *, timeout: float) -> None:
+        deadline = monotonic() + timeout
+        with self._lock:
+            self._accepting = False
+            while self._inflight_count or self._waiting_count:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    break
+                self._idle.wait(timeout=remaining)
+
+            queued = [job for queue in self._waiting.values() for job in queue]
+            abandoned = [
+                *((job, "Server shut down before the run started") for job in queued),
+                # Still executing: the process is going away with them.
+                *((job, "Server shut down before the run finished") for job in self._dispatched.values()),
+            ]
+            self._waiting.clear()
+            self._waiting_count = 0
+            inflight = self._inflight_count
+
+        for job, reason in abandoned:
+            log = self.event_logs.get(job.run_id)
+            if log is None:
+                continue
+            try:
+                self._abandon(job, log, reason)
+            finally:
+                log.close()
+
+        if inflight:
+            logger.warning("Run executor drain timed out with %s active run(s)", inflight)
+        self._pool.shutdown(wait=False, cancel_futures=False)
+
+    def _dispatch_locked(self, job: RunJob) -> None:
+        self._inflight_count += 1
+        self._dispatched[job.run_id] = job
+        self._pool.submit(self._execute, job)
+
+    def _execute(self, job: RunJob) -> None:
+        log = self.event_logs.get(job.run_id)
+        try:
+            for frame in self._runner(job):
+                if log is not None:
+                    log.append(frame)
+        except Exception:
+            logger.exception("Run %s failed outside of the graph stream", job.run_id)
+        finally:
+            if log is not None:
+                log.close()
+            self._finish(job)
+
+    def _finish(self, job: RunJob) -> None:
+        with self._lock:
+            self._inflight_count -= 1
+            self._dispatched.pop(job.run_id, None)
+            queue = self._waiting.get(job.thread_id)
+            if queue:
+                next_job = queue.popleft()
+                self._waiting_count -= 1
+                if not queue:
+                    del self._waiting[job.thread_id]
+                self._dispatch_locked(next_job)
+            else:
+                self._active_threads.discard(job.thread_id)
+            self._idle.notify_all()
+
+
+_run_executor: RunExecutor | None = None
+_run_executor_lock = Lock()
+
+
+def get_run_executor() -> RunExecutor:
+    global _run_executor
+    with _run_executor_lock:
+        if _run_executor is None:
+            from app.runs.runner import abandon_run, discard_run, execute_run
+
+            _run_executor = RunExecutor(
+                runner=execute_run,
+                abandon=abandon_run,
+                discard=discard_run,
+                max_workers=RUN_EXECUTOR_MAX_WORKERS,
+                max_queued=RUN_EXECUTOR_MAX_QUEUED,
+                event_log_ttl_seconds=RUN_EVENT_LOG_TTL_SECONDS,
+                publish=lambda run_id, event: publish_event(run_topic(run_id), event),
+                cancel_on_disconnect_seconds=(
+                    RUN_CANCEL_ON_DISCONNECT_GRACE_SECONDS if RUN_CANCEL_ON_DISCONNECT else None
+                ),
+            )
+        return _run_executor
+
+
+def request_run_cancel(run_id: str, *, reason: str = "Cancelled by request") -> bool:
+    """
+    Cancel a run wherever it executes. Returns True when this replica owns it;
+    otherwise the request is broadcast to the replica that does.
+    """
+    if get_run_executor().cancel(run_id, reason=reason):
+        return True
+    publish_event(RUN_CONTROL_TOPIC, {"action": "cancel", "run_id": run_id, "reason": reason})
+    return False
+
+
+_control_listener: Thread | None = None
+_control_stop = Event()
+
+
+def _listen_for_run_control() -> None:
+    while not _control_stop.is_set():
+        try:
+            with get_event_bus().subscribe(RUN_CONTROL_TOPIC) as subscription:
+                while not _control_stop.is_set():
+                    event = subscription.get(timeout=1.0)
+                    if event and event.get("action") == "cancel" and event.get("run_id"):
+                        get_run_executor().cancel(event["run_id"], reason=event.get("reason") or "Cancelled")
+        except Exception:
+            logger.exception("Run control listener failed; resubscribing")
+            _control_stop.wait(1.0)
+
+
+def start_run_control_listener() -> None:
+    """Follow cancellation requests sent by other replicas for runs this one owns."""
+    global _control_listener
+    if _control_listener is None:
+        _control_stop.clear()
+        _control_listener = Thread(target=_listen_for_run_control, name="run-control-listener", daemon=True)
+        _control_listener.start()
+
+
+def stop_run_control_listener() -> None:
+    global _control_listener
+    _control_stop.set()
+    if _control_listener is not None:
+        _control_listener.join(timeout=5)
+        _control_listener = None
+
+
+_lease_keeper: Thread | None = None
+_lease_stop = Event()
+
+
+def _keep_run_leases() -> None:
+    from app.db.run_repository import fail_expired_runs, renew_run_leases
+
+    while True:
+        try:
+            renew_run_leases(get_run_executor().owned_run_ids())
+            reaped = fail_expired_runs("The server running this run stopped")
+            if reaped:
+                reaped_runs_total.inc(len(reaped))
+                logger.warning("Failed %s run(s) whose owner stopped: %s", len(reaped), ", ".join(reaped))
+        except Exception:
+            logger.exception("Run lease renewal failed")
+        if _lease_stop.wait(RUN_LEASE_SECONDS / 3):
+            return
+
+
+def start_run_lease_keeper() -> None:
+    """Renew the leases of the runs this replica owns, and fail runs whose owner is gone."""
+    global _lease_keeper
+    if _lease_keeper is None:
+        _lease_stop.clear()
+        _lease_keeper = Thread(target=_keep_run_leases, name="run-lease-keeper", daemon=True)
+        _lease_keeper.start()
+
+
+def stop_run_lease_keeper() -> None:
+    global _lease_keeper
+    _lease_stop.set()
+    if _lease_keeper is not None:
+        _lease_keeper.join(timeout=5)
+        _lease_keeper = None
+
+
+def _stat_gauge(key: str):
+    def read() -> float:
+        if _run_executor is None:
+            return 0.0
+        return float(_run_executor.stats()[key])
+
+    return read
+
+
+registry.gauge(
+    "run_executor_inflight_runs",
+    "Runs currently executing or waiting for a worker slot.",
+    callback=_stat_gauge("inflight"),
+)
+registry.gauge(
+    "run_executor_queue_depth",
+    "Runs waiting behind another run on the same thread.",
+    callback=_stat_gauge("waiting"),
+)
+registry.gauge(
+    "run_executor_active_threads",
+    "Threads with a queued or executing run.",
+    callback=_stat_gauge("active_threads"),
+)
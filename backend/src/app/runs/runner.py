@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from datetime import datetime, timezone
+from typing import Any, Iterator
+
+from langgraph.types import Command
+
+from app.agents.helpers.context_prefetch import release_run_prefetches
+from app.agents.run_budget import RunBudgetTracker, new_run_budget, run_budget_scope
+from app.agents.state.doc_refs import release_run_doc_cache
+from app.agents.state.types import RunBudget
+from app.db.run_lock import thread_run_lock
+from app.db.run_repository import set_run_status
+from app.observability.spans import run_profile
+from app.routes.chat.service import (
+    build_initial_chat_state,
+    ensure_thread_documents,
+    graph_event_stream,
+    persist_user_chat_messages,
+)
+from app.routes.chat.streaming import StreamEmitter
+from app.runs.cancellation import RunCancelledError, run_cancellation
+from app.runs.event_log import RunEventLog
+from app.runs.executor import RunJob
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _build_graph_input(job: RunJob, budget: RunBudget) -> Any:
+    if job.trigger != "chat":
+        graph_input = job.payload["graph_input"]
+        if isinstance(graph_input, Command):
+            # An approval resume gets a budget of its own, like a chat run.
+            return replace(graph_input, update={**dict(graph_input.update or {}), "budget": budget})
+        return graph_input
+
+    # User messages are persisted when the run starts, not when it is enqueued,
+    # so message seq order matches run execution order within a thread.
+    user_messages = persist_user_chat_messages(
+        job.thread_id,
+        job.payload["messages"],
+        run_id=job.run_id,
+    )
+    ensure_thread_documents(job.thread_id)
+    return build_initial_chat_state(
+        thread_id=job.thread_id,
+        run_id=job.run_id,
+        user_messages=user_messages,
+        budget=budget,
+    )
+
+
+def _error_frame(job: RunJob, error: str) -> str:
+    return StreamEmitter(thread_id=job.thread_id, run_id=job.run_id).emit(
+        "run.error",
+        {
+            "status": "error",
+            "error": error,
+            "completed_at": _now_iso(),
+        },
+    )
+
+
+def _cancelled_frame(job: RunJob, reason: str) -> str:
+    return StreamEmitter(thread_id=job.thread_id, run_id=job.run_id).emit(
+        "run.cancelled",
+        {
+            "status": "cancelled",
+            "reason": reason,
+            "completed_at": _now_iso(),
+        },
+    )
+
+
+def _cancelled(job: RunJob) -> str:
+    reason = job.cancellation.reason or "Run cancelled"
+    set_run_status(job.run_id, status="cancelled", error=reason, completed=True)
+    return _cancelled_frame(job, reason)
+
+
+def execute_run(job: RunJob) -> Iterator[str]:
+    try:
+        with (
+            run_profile(run_id=job.run_id, thread_id=job.thread_id),
+            run_cancellation(job.cancellation),
+            thread_run_lock(job.thread_id),
+        ):
+            # Cancelled while queued or waiting for the thread lock: nothing has run yet.
+            job.cancellation.raise_if_cancelled()
+            # The budget starts once the run holds its thread, not while it queues.
+            budget = new_run_budget(job.run_id)
+            graph_input = _build_graph_input(job, budget)
+            with run_budget_scope(RunBudgetTracker(budget)):
+                yield from graph_event_stream(
+                    thread_id=job.thread_id,
+                    run_id=job.run_id,
+                    graph_input=graph_input,
+                    trigger=job.trigger,
+                )
+    except RunCancelledError:
+        yield _cancelled(job)
+    except Exception as exc:
+        # stream_graph_events reports its own failures; this covers setup errors
+        # such as a failed checkpointer connection before the stream starts.
+        set_run_status(job.run_id, status="error", error=str(exc), completed=True)
+        yield _error_frame(job, str(exc))
+    finally:
+        release_run_doc_cache(job.run_id)
+        release_run_prefetches(job.run_id)
+
+
+def abandon_run(job: RunJob, log: RunEventLog, reason: str) -> None:
+    set_run_status(job.run_id, status="error", error=reason, completed=True)
+    log.append(_error_frame(job, reason))
+
+
+def discard_run(job: RunJob, log: RunEventLog) -> None:
+    """Close out a run cancelled before a worker picked it up."""
+    log.append(_cancelled(job))
@@ -100,6 +100,29 @@ async function streamSseResponse(
   }
 }
 
+interface EnqueuedRun {
+  run_id: string;
+  events_url?: string;
+}
+
+async function attachRunStream(
+  response: Response,
+  onEvent: (event: StreamEvent) => void,
+): Promise<void> {
+  if (!response.ok) {
+    const body = await response.text();
+    throw new Error(`HTTP ${response.status}: ${body}`);
+  }
+
+  const run = (await response.json()) as EnqueuedRun;
+  const eventsPath = run.events_url ?? `/api/runs/${run.run_id}/events`;
+  const eventsResponse = await fetch(buildApiUrl(eventsPath), {
+    headers: { Accept: "text/event-stream" },
+  });
+
+  await streamSseResponse(eventsResponse, onEvent);
+}
+
 export async function postChatMessageStream(
   threadId: string,
   message: string,
@@ -109,12 +132,11 @@ export async function postChatMessageStream(
     method: "POST",
     headers: {
       "Content-Type": "application/json",
-      Accept: "text/event-stream",
     },
     body: JSON.stringify({ message, client_message_id: crypto.randomUUID() }),
   });
 
-  await streamSseResponse(response, onEvent);
+  await attachRunStream(response, onEvent);
 }
 
 export async function postApprovalStream(
@@ -128,7 +150,6 @@ export async function postApprovalStream(
     method: "POST",
     headers: {
       "Content-Type": "application/json",
-      Accept: "text/event-stream",
     },
     body: JSON.stringify({
       decision,
@@ -137,7 +158,19 @@ export async function postApprovalStream(
     }),
   });
 
-  await streamSseResponse(response, onEvent);
+  await attachRunStream(response, onEvent);
+}
+
+export async function cancelRun(runId: string): Promise<void> {
+  const response = await fetch(buildApiUrl(`/api/runs/${runId}/cancel`), {
+    method: "POST",
+  });
+
+  // 409: the run already finished; its stream reports how.
+  if (!response.ok && response.status !== 409) {
+    const body = await response.text();
+    throw new Error(`Failed to cancel run ${runId}: ${body}`);
+  }
 }
 
 export async function fetchThreadSnapshot(threadId: string): Promise<ThreadSnapshot> {
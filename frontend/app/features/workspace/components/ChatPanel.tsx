@@ -41,6 +41,20 @@ export function ChatPanel({
               Run: {latestRun.status.replace("_", " ")}
             </span>
           ) : null}
+          {latestRun?.budget ? (
+            <span
+              className="rounded-full bg-[var(--bg-muted)] px-2 py-1 text-[10px] font-semibold uppercase"
+              title={`${latestRun.budget.tokensUsed} tokens, ${latestRun.budget.toolCallsUsed} tool calls`}
+            >
+              {latestRun.budget.exhausted
+                ? `Budget: ${latestRun.budget.exhausted.replace("_", " ")} spent`
+                : `${Math.round(latestRun.budget.elapsedSeconds)}s${
+                    latestRun.budget.deadlineSeconds !== null
+                      ? ` / ${Math.round(latestRun.budget.deadlineSeconds)}s`
+                      : ""
+                  }`}
+            </span>
+          ) : null}
           {latestAgentStatuses.map((agentStatus) => (
             <span
               key={agentStatus.id}
@@ -163,6 +163,7 @@ function upsertRun(
         ? patch.completedAt
         : existing?.completedAt ?? null,
     error: patch.error !== undefined ? patch.error : existing?.error ?? null,
+    budget: patch.budget !== undefined ? patch.budget : existing?.budget ?? null,
   };
 
   return {
@@ -759,6 +760,31 @@ export function workspaceReducer(
         };
       }
 
+      if (event.type === "budget.usage") {
+        if (!runId) {
+          return nextState;
+        }
+
+        const numberOrNull = (value: unknown) =>
+          typeof value === "number" ? value : null;
+
+        return {
+          ...nextState,
+          runs: upsertRun(nextState.runs, runId, {
+            threadId,
+            budget: {
+              elapsedSeconds: numberOrNull(payload.elapsed_seconds) ?? 0,
+              deadlineSeconds: numberOrNull(payload.deadline_seconds),
+              tokensUsed: numberOrNull(payload.tokens_used) ?? 0,
+              maxTokens: numberOrNull(payload.max_tokens),
+              toolCallsUsed: numberOrNull(payload.tool_calls_used) ?? 0,
+              maxToolCalls: numberOrNull(payload.max_tool_calls),
+              exhausted: typeof payload.exhausted === "string" ? payload.exhausted : null,
+            },
+          }),
+        };
+      }
+
       if (event.type === "run.error") {
         const error = typeof payload.error === "string" ? payload.error : "Run failed";
         if (!runId) {
@@ -782,6 +808,27 @@ export function workspaceReducer(
         };
       }
 
+      if (event.type === "run.cancelled") {
+        if (!runId) {
+          return { ...nextState, streamStatus: "idle", currentRunId: null };
+        }
+
+        return {
+          ...nextState,
+          streamStatus: "idle",
+          currentRunId: null,
+          runs: upsertRun(nextState.runs, runId, {
+            threadId,
+            status: "cancelled",
+            error: typeof payload.reason === "string" ? payload.reason : null,
+            completedAt:
+              typeof payload.completed_at === "string"
+                ? payload.completed_at
+                : new Date(emittedAt).toISOString(),
+          }),
+        };
+      }
+
       if (event.type === "run.completed") {
         const status =
           payload.status === "waiting_approval" ? "waiting_approval" : "completed";
@@ -1,6 +1,12 @@
 export type ChatRole = "user" | "assistant" | "tool" | "system";
 export type StreamStatus = "idle" | "streaming" | "error";
-export type RunStatus = "queued" | "running" | "waiting_approval" | "completed" | "error";
+export type RunStatus =
+  | "queued"
+  | "running"
+  | "waiting_approval"
+  | "completed"
+  | "error"
+  | "cancelled";
 export type AgentLifecycleStatus =
   | "queued"
   | "thinking"
@@ -37,6 +43,16 @@ export interface DocEntity {
   createdAt: string | null;
 }
 
+export interface RunBudgetUsage {
+  elapsedSeconds: number;
+  deadlineSeconds: number | null;
+  tokensUsed: number;
+  maxTokens: number | null;
+  toolCallsUsed: number;
+  maxToolCalls: number | null;
+  exhausted: string | null;
+}
+
 export interface RunEntity {
   id: string;
   threadId: string;
@@ -45,6 +61,7 @@ export interface RunEntity {
   startedAt: string;
   completedAt: string | null;
   error: string | null;
+  budget: RunBudgetUsage | null;
 }
 
 export interface AgentStatusEntity {
@@ -211,11 +228,18 @@ export interface PersistedChangeSetRow {
   decided_at: string | null;
   decision_note: string | null;
   docs: string[];
-  diffs: Record<string, string>;
+  diffs?: Record<string, string>;
+  doc_stats?: PersistedChangeSetDocStats[];
   doc_changes?: PersistedChangeSetDocRow[];
   reviews?: PersistedChangeSetReviewRow[];
 }
 
+export interface PersistedChangeSetDocStats {
+  doc_id: string;
+  lines_added: number;
+  lines_removed: number;
+}
+
 export interface PersistedChangeSetDocRow {
   doc_id: string;
   before_content: string;
@@ -66,9 +66,11 @@ export function buildRunLog(params: {
         title:
           run.status === "error"
             ? "Run failed"
-            : run.status === "waiting_approval"
-              ? "Run waiting approval"
-              : "Run completed",
+            : run.status === "cancelled"
+              ? "Run cancelled"
+              : run.status === "waiting_approval"
+                ? "Run waiting approval"
+                : "Run completed",
         description: run.error ?? `Status: ${run.status.replaceAll("_", " ")}`,
         runId: run.id,
       });